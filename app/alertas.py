@@ -0,0 +1,359 @@
+"""
+Alertas de vencimiento materializadas: expedientes, SDQS y correspondencia.
+
+El estado de alerta de un caso depende solo de sus datos y de la fecha de
+hoy, pero el banner del portal y los tableros lo recalculaban desde cero en
+cada carga, fila por fila. La tabla `alertas` (migración 13) guarda una fila
+por caso abierto y por tipo de plazo, con las fechas en que cambia de estado:
+
+    fecha_aviso      desde ese día cuenta en el banner del portal
+    fecha_amarilla   desde ese día está amarilla (próximo / por vencer)
+    fecha_roja       desde ese día está roja (vencido)
+    estado           verde / amarilla / roja a la fecha de alertas_dia;
+                     NULL si el caso no tiene semáforo (solo aviso)
+
+Las fechas las deriva este módulo de las mismas reglas de cada pantalla
+(app/vencimientos.py y app/semaforos.py, no de los routers), así que las
+vistas leen conteos y filas con consultas por índice:
+
+- Cada router llama a refrescar_alertas(conn, modulo, ids) antes del commit
+  de todo lo que escribe (crear, editar, eliminar, restaurar, purgar,
+  importar, restaurar backup). No hace commit.
+- Al cambiar la fecha, avanzar_dia() mueve de estado solo las filas cuya
+  fecha_amarilla o fecha_roja quedó entre el último día aplicado y hoy. Lo
+  corre el planificador cada REVISION_ALERTAS_SEG, y toda vista que lee
+  `estado` llama antes a planificador.asegurar_dia(). Las que solo comparan
+  fechas (fecha_aviso, fecha_vencimiento) con hoy no lo necesitan.
+- verificar_alertas() compara la tabla con las funciones de cada pantalla y
+  devuelve las diferencias (python -m app.alertas --verificar).
+
+Equivalencias con cada pantalla:
+
+    expedientes      vigente / proximo / vencido  (calcular_alerta)
+    sdqs             verde / amarillo / rojo      (semaforo_sdqs)
+    correspondencia  verde / amarilla / roja      (semaforo_correspondencia)
+"""
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from app.semaforos import ANEXO_VALS, semaforo_correspondencia, semaforo_sdqs
+from app.vencimientos import cerrado, enriquecer, vencimientos
+
+REVISION_ALERTAS_SEG = float(os.environ.get("OCDI_REVISION_ALERTAS_SEG", "60"))
+DIAS_AVISO = 3  # banner del portal: vence en <= DIAS_AVISO días
+
+MODULOS = ("expedientes", "sdqs", "correspondencia")
+TIPOS_EXPEDIENTE = ("ind", "inv", "prescripcion", "prorroga")
+
+# Estado de la tabla -> clase de cada pantalla
+CLASE_EXPEDIENTE = {"verde": "vigente", "amarilla": "proximo", "roja": "vencido"}
+CLASE_SDQS = {"verde": "verde", "amarilla": "amarillo", "roja": "rojo"}
+
+
+def _iso(d: date | None) -> str | None:
+    return d.isoformat() if d else None
+
+
+def _fecha(s) -> date | None:
+    try:
+        return date.fromisoformat(str(s)[:10]) if s else None
+    except ValueError:
+        return None
+
+
+def estado_en(fecha_amarilla: str | None, fecha_roja: str | None, hoy: date) -> str | None:
+    h = hoy.isoformat()
+    if fecha_roja and fecha_roja <= h:
+        return "roja"
+    if fecha_amarilla and fecha_amarilla <= h:
+        return "amarilla"
+    if fecha_roja or fecha_amarilla:
+        return "verde"
+    return None
+
+
+# ── Filas por módulo ──────────────────────────────────────────────────────────
+# Cada función recibe la fila del caso (dict) y devuelve sus alertas como
+# (tipo, fecha_vencimiento, fecha_aviso, fecha_amarilla, fecha_roja).
+
+def _alertas_expediente(r: dict) -> list[tuple]:
+    if cerrado(r):
+        return []
+    v = vencimientos(r)
+    filas = []
+    for tipo, col in zip(TIPOS_EXPEDIENTE, ("fecha_vencimiento_ind", "fecha_vencimiento_inv",
+                                           "fecha_prescripcion", "fecha_vencimiento_prorroga")):
+        fv = _fecha(v[col])
+        if fv is None:
+            continue
+        # calcular_alerta: dias = fv - hoy; < 0 vencido, <= 30 próximo
+        filas.append((tipo, fv.isoformat(), _iso(fv - timedelta(days=DIAS_AVISO)),
+                      _iso(fv - timedelta(days=30)), _iso(fv + timedelta(days=1))))
+    return filas
+
+
+def _alertas_sdqs(r: dict) -> list[tuple]:
+    reg = semaforo_sdqs(dict(r))
+    fv = _fecha(r.get("fecha_vencimiento"))
+    # Banner del portal: sin rad_salida y vence en <= DIAS_AVISO días
+    aviso = _iso(fv - timedelta(days=DIAS_AVISO)) if fv and not r.get("rad_salida") else None
+    amarilla = roja = None
+    if reg.get("semaforo_sdqs") in CLASE_SDQS.values():
+        fa = datetime.fromisoformat(str(r["fecha_asignacion"])[:10]).date()
+        fv_d = datetime.fromisoformat(str(r["fecha_vencimiento"])[:10]).date()
+        # rojo: fv - hoy <= 2; amarillo: hoy - fa >= total // 2 (rojo manda)
+        roja = _iso(fv_d - timedelta(days=2))
+        amarilla = _iso(fa + timedelta(days=reg["estado_dias"] // 2))
+    if not (aviso or roja):
+        return []
+    return [("plazo", _iso(fv), aviso, amarilla, roja)]
+
+
+def _alertas_correspondencia(r: dict) -> list[tuple]:
+    reg = semaforo_correspondencia(dict(r))
+    if (not reg.get("pendiente") or reg.get("semaforo") not in ("verde", "amarilla", "roja")
+            or (reg.get("tipo_respuesta") or "").strip().upper() in ANEXO_VALS):
+        return []
+    rev = _fecha(reg.get("fecha_termino_respuesta"))
+    if rev:
+        # dias_restantes = revisión - hoy; >= 2 verde, >= 0 amarilla
+        return [("plazo", reg["fecha_vencimiento"], _iso(rev - timedelta(days=DIAS_AVISO)),
+                 _iso(rev - timedelta(days=1)), _iso(rev + timedelta(days=1)))]
+    # Sin término: días desde el ingreso; <= 5 verde, <= 8 amarilla; banner = roja
+    fi = date.fromisoformat(r["fecha_ingreso"][:10])
+    roja = _iso(fi + timedelta(days=9))
+    return [("plazo", None, roja, _iso(fi + timedelta(days=6)), roja)]
+
+
+_FUENTES = {
+    "expedientes": _alertas_expediente,
+    "sdqs": _alertas_sdqs,
+    "correspondencia": _alertas_correspondencia,
+}
+
+
+def refrescar_alertas(conn, modulo: str, ids: list[int] | None = None) -> int:
+    """Recalcula las alertas de `ids` del módulo (o de todo el módulo).
+
+    Los ids borrados o en la papelera quedan sin alertas. No hace commit.
+    """
+    fuente = _FUENTES[modulo]
+    sql = f"SELECT * FROM {modulo} WHERE eliminado_en IS NULL"
+    params: list = []
+    if ids is None:
+        conn.execute("DELETE FROM alertas WHERE modulo = ?", (modulo,))
+    else:
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return 0
+        marcas = ",".join("?" * len(ids))
+        conn.execute(f"DELETE FROM alertas WHERE modulo = ? AND registro_id IN ({marcas})", [modulo, *ids])
+        sql += f" AND id IN ({marcas})"
+        params = ids
+    hoy = date.today()
+    filas = [
+        (modulo, r["id"], tipo, fv, aviso, amarilla, roja, estado_en(amarilla, roja, hoy))
+        for r in conn.execute(sql, params).fetchall()
+        for tipo, fv, aviso, amarilla, roja in fuente(dict(r))
+    ]
+    conn.executemany(
+        """INSERT INTO alertas (modulo, registro_id, tipo, fecha_vencimiento, fecha_aviso,
+                                fecha_amarilla, fecha_roja, estado)
+           VALUES (?,?,?,?,?,?,?,?)""",
+        filas,
+    )
+    return len(filas)
+
+
+# ── Cambio de día ─────────────────────────────────────────────────────────────
+
+_SQL_ESTADO = """CASE WHEN fecha_roja <= :hoy THEN 'roja'
+                      WHEN fecha_amarilla <= :hoy THEN 'amarilla'
+                      WHEN fecha_roja IS NOT NULL OR fecha_amarilla IS NOT NULL THEN 'verde' END"""
+
+
+def avanzar_dia(conn, hoy: date) -> int:
+    """Lleva `estado` a la fecha `hoy`. Devuelve cuántas filas cambió. No hace commit.
+
+    Solo toca las filas con un umbral entre el último día aplicado y hoy;
+    si no hay día anterior o el reloj retrocedió, recalcula todas.
+    """
+    h = hoy.isoformat()
+    fila = conn.execute("SELECT fecha FROM alertas_dia WHERE id = 1").fetchone()
+    ultimo = fila[0] if fila else None
+    if ultimo == h:
+        return 0
+    if ultimo is None or h < ultimo:
+        cur = conn.execute(
+            f"UPDATE alertas SET estado = {_SQL_ESTADO} WHERE estado IS NOT ({_SQL_ESTADO})", {"hoy": h}
+        )
+    else:
+        cur = conn.execute(
+            f"""UPDATE alertas SET estado = {_SQL_ESTADO}
+                WHERE (fecha_amarilla > :ultimo AND fecha_amarilla <= :hoy)
+                   OR (fecha_roja > :ultimo AND fecha_roja <= :hoy)""",
+            {"hoy": h, "ultimo": ultimo},
+        )
+    conn.execute(
+        "INSERT INTO alertas_dia (id, fecha) VALUES (1, ?) ON CONFLICT(id) DO UPDATE SET fecha = excluded.fecha",
+        (h,),
+    )
+    return cur.rowcount
+
+
+class PlanificadorAlertas:
+    """Hilo que aplica avanzar_dia() cuando cambia la fecha."""
+
+    def __init__(self, intervalo_seg: float = REVISION_ALERTAS_SEG):
+        self.intervalo = intervalo_seg
+        self.dia: date | None = None
+        self._detener = threading.Event()
+        self._hilo: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    def asegurar_dia(self, hoy: date | None = None) -> bool:
+        """Aplica el cambio de día si hace falta. True si lo aplicó ahora."""
+        from app.escritor import get_escritor
+
+        hoy = hoy or date.today()
+        if self.dia == hoy:
+            return False
+        with self._lock:
+            if self.dia == hoy:
+                return False
+            get_escritor().ejecutar(avanzar_dia, hoy)
+            self.dia = hoy
+        return True
+
+    def olvidar(self):
+        """Obliga a revisar la tabla en la próxima lectura (otra BD, tests)."""
+        self.dia = None
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="alertas-dia", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+            self._hilo = None
+        self.olvidar()
+
+    def _bucle(self):
+        while True:
+            try:
+                self.asegurar_dia()
+            except Exception:
+                pass  # se reintenta en el próximo ciclo
+            if self._detener.wait(self.intervalo):
+                return
+
+
+planificador = PlanificadorAlertas()
+
+
+# ── Verificación ──────────────────────────────────────────────────────────────
+
+def _esperado_expediente(r: dict, hoy: date) -> dict:
+    e = enriquecer(dict(r))
+    esperado = {}
+    for tipo in TIPOS_EXPEDIENTE:
+        a = e[f"alerta_{tipo}"]
+        if a["clase"] != "sin-plazo":
+            esperado[tipo] = (a["clase"], a["dias"] <= DIAS_AVISO)
+    return esperado
+
+
+def _esperado_sdqs(r: dict, hoy: date) -> dict:
+    reg = semaforo_sdqs(dict(r))
+    sem = reg.get("semaforo_sdqs")
+    clase = sem if sem in CLASE_SDQS.values() else None
+    # Mismo criterio que el banner del portal antes de esta tabla
+    aviso = False
+    fv = _fecha(r.get("fecha_vencimiento"))
+    if fv and not r.get("rad_salida"):
+        aviso = (fv - hoy).days <= DIAS_AVISO
+    return {"plazo": (clase, aviso)} if clase or aviso else {}
+
+
+def _esperado_correspondencia(r: dict, hoy: date) -> dict:
+    reg = semaforo_correspondencia(dict(r))
+    if (reg.get("semaforo") not in ("verde", "amarilla", "roja") or not reg.get("pendiente")
+            or (reg.get("tipo_respuesta") or "").strip().upper() in ANEXO_VALS):
+        return {}
+    if reg.get("termino_dias"):
+        aviso = reg.get("dias_restantes") is not None and reg["dias_restantes"] <= DIAS_AVISO
+    else:
+        aviso = reg["semaforo"] == "roja"
+    return {"plazo": (reg["semaforo"], aviso)}
+
+
+_ESPERADOS = {
+    "expedientes": (_esperado_expediente, CLASE_EXPEDIENTE),
+    "sdqs": (_esperado_sdqs, CLASE_SDQS),
+    "correspondencia": (_esperado_correspondencia, {"verde": "verde", "amarilla": "amarilla", "roja": "roja"}),
+}
+
+
+def verificar_alertas(conn, modulos=MODULOS) -> list[str]:
+    """Diferencias entre la tabla y las funciones de cada pantalla, a hoy.
+
+    Compara, por caso y tipo de plazo, la clase que muestra la pantalla y si
+    cuenta en el banner del portal. Lista vacía = la tabla está al día.
+    """
+    hoy = date.today()
+    h = hoy.isoformat()
+    diferencias = []
+    for modulo in modulos:
+        esperado_de, clases = _ESPERADOS[modulo]
+        tabla = {
+            (r["registro_id"], r["tipo"]): (
+                clases.get(r["estado"]) if r["estado"] else None,
+                bool(r["fecha_aviso"] and r["fecha_aviso"] <= h),
+            )
+            for r in conn.execute(
+                "SELECT registro_id, tipo, estado, fecha_aviso FROM alertas WHERE modulo = ?", (modulo,)
+            ).fetchall()
+        }
+        esperado = {}
+        for r in conn.execute(f"SELECT * FROM {modulo} WHERE eliminado_en IS NULL").fetchall():
+            for tipo, valor in esperado_de(dict(r), hoy).items():
+                esperado[(r["id"], tipo)] = valor
+        for clave in sorted(set(tabla) | set(esperado)):
+            if tabla.get(clave) != esperado.get(clave):
+                diferencias.append(
+                    f"{modulo} #{clave[0]} {clave[1]}: tabla={tabla.get(clave)} esperado={esperado.get(clave)}"
+                )
+    return diferencias
+
+
+def main():
+    import argparse
+
+    from app.database import get_db
+
+    ap = argparse.ArgumentParser(description="Verifica (y repara) la tabla de alertas.")
+    ap.add_argument("--verificar", action="store_true", help="lista las diferencias con las pantallas")
+    ap.add_argument("--reparar", action="store_true", help="recalcula toda la tabla")
+    args = ap.parse_args()
+
+    conn = get_db()
+    if args.reparar:
+        for modulo in MODULOS:
+            refrescar_alertas(conn, modulo)
+    # Sin el planificador corriendo, `estado` puede venir de otro día
+    avanzar_dia(conn, date.today())
+    conn.commit()
+    diferencias = verificar_alertas(conn)
+    conn.close()
+    for d in diferencias:
+        print(d)
+    print(f"{len(diferencias)} diferencias")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import hashlib
 import secrets
+from contextvars import ContextVar
 from fastapi import Request
+from starlette.datastructures import FormData
 
 # ── Módulos del sistema y sus etiquetas ───────────────────────────────────────
 
@@ -51,37 +53,108 @@ def new_token() -> str:
 
 # ── Sesión ───────────────────────────────────────────────────────────────────
 
-def get_session_user(request: Request) -> dict | None:
-    """Retorna el dict del usuario autenticado según la cookie ocdi_session, o None."""
+def cargar_sesion(token: str) -> tuple[dict, dict] | None:
+    """(usuario, permisos) de una sesión activa, o None.
+
+    Resuelve `sesiones JOIN usuarios` y permisos_modulo en un solo paso y lo
+    deja en cache_sesiones: las requests siguientes de la misma sesión no
+    consultan la base hasta que venza el TTL o se invalide la entrada.
+    """
+    from app.sesiones import (
+        actividad, cache_sesiones, descartar_sesion, sesion_vigente, vence_absoluto_epoch,
+    )
+    cacheado = cache_sesiones.obtener(token)
+    if cacheado is not None:
+        return cacheado
+
     from app.database import get_db
-    token = request.cookies.get("ocdi_session")
-    if not token:
-        return None
     conn = get_db()
     row = conn.execute("""
-        SELECT u.id, u.username, u.nombre_completo, u.rol, u.activo
+        SELECT u.id, u.username, u.nombre_completo, u.rol, u.activo,
+               s.created_at AS sesion_creada, s.last_seen AS sesion_last_seen
         FROM sesiones s
         JOIN usuarios u ON u.id = s.user_id
         WHERE s.token = ? AND u.activo = 1
     """, (token,)).fetchone()
-    if row:
-        conn.execute(
-            "UPDATE sesiones SET last_seen = datetime('now','localtime') WHERE token = ?",
-            (token,)
-        )
-        conn.commit()
+    if not row:
+        conn.close()
+        return None
+    user = dict(row)
+    creada = user.pop("sesion_creada")
+    visto = actividad.pendiente(token) or user.pop("sesion_last_seen")
+    user.pop("sesion_last_seen", None)
+    if not sesion_vigente(creada, visto):
+        conn.close()
+        descartar_sesion(token)
+        return None
+    modulos = [m for m, _ in MODULOS_SISTEMA]
+    if user["rol"] in ROLES_SUPERUSUARIO:
+        permisos = {m: {"puede_ver": True, "puede_escribir": True, "puede_importar": True} for m in modulos}
+    else:
+        perm_rows = conn.execute(
+            "SELECT modulo, puede_ver, puede_escribir, puede_importar FROM permisos_modulo WHERE user_id = ?",
+            (user["id"],)
+        ).fetchall()
+        permisos = {m: {"puede_ver": True, "puede_escribir": False, "puede_importar": False} for m in modulos}
+        for pr in perm_rows:
+            permisos[pr["modulo"]] = {
+                "puede_ver": pr["puede_ver"] != 0,
+                "puede_escribir": bool(pr["puede_escribir"]),
+                "puede_importar": bool(pr["puede_importar"]),
+            }
     conn.close()
-    return dict(row) if row else None
+    cache_sesiones.guardar(token, user, permisos, vence_absoluto_epoch(creada))
+    return user, permisos
+
+
+def get_session_user(request: Request) -> dict | None:
+    """Retorna el dict del usuario autenticado según la cookie ocdi_session, o None."""
+    token = request.cookies.get("ocdi_session")
+    if not token:
+        return None
+    sesion = cargar_sesion(token)
+    if sesion is None:
+        return None
+    from app.sesiones import actividad
+    actividad.registrar(token)
+    return sesion[0]
 
 
 # ── Permisos ─────────────────────────────────────────────────────────────────
 
+# auth_middleware deja aquí (user_id, permisos) de la request en curso: los
+# puede_* sobre el usuario de la request responden sin consultar la base. Para
+# otro usuario (o fuera de una request) se consulta permisos_modulo.
+_permisos_request: ContextVar[tuple[int, dict] | None] = ContextVar("_permisos_request", default=None)
+
+
+def fijar_permisos_request(user: dict, permisos: dict):
+    """Registra los permisos de la request en curso. Devuelve el token para reset."""
+    return _permisos_request.set((user["id"], permisos))
+
+
+def liberar_permisos_request(token):
+    _permisos_request.reset(token)
+
+
+def _permiso(user: dict, modulo: str, campo: str):
+    """Valor del permiso desde la request en curso, o None si hay que consultar."""
+    actual = _permisos_request.get()
+    if actual is None or actual[0] != user.get("id"):
+        return None
+    por_defecto = campo == "puede_ver"  # sin fila → visible, sin escritura/importación
+    return actual[1].get(modulo, {}).get(campo, por_defecto)
+
+
 def puede_escribir(user: dict | None, modulo: str) -> bool:
     """True si el usuario tiene permiso de escritura en el módulo dado."""
     if not user:
         return False
     if user["rol"] in ROLES_SUPERUSUARIO:
         return True
+    valor = _permiso(user, modulo, "puede_escribir")
+    if valor is not None:
+        return valor
     from app.database import get_db
     conn = get_db()
     row = conn.execute(
@@ -98,6 +171,9 @@ def puede_importar(user: dict | None, modulo: str) -> bool:
         return False
     if user["rol"] in ROLES_SUPERUSUARIO:
         return True
+    valor = _permiso(user, modulo, "puede_importar")
+    if valor is not None:
+        return valor
     from app.database import get_db
     conn = get_db()
     row = conn.execute(
@@ -114,6 +190,9 @@ def puede_ver(user: dict | None, modulo: str) -> bool:
         return False
     if user["rol"] in ROLES_SUPERUSUARIO:
         return True
+    valor = _permiso(user, modulo, "puede_ver")
+    if valor is not None:
+        return valor
     from app.database import get_db
     conn = get_db()
     row = conn.execute(
@@ -145,6 +224,18 @@ def get_permisos_usuario(user_id: int) -> dict:
     }
 
 
+# ── Formularios en handlers síncronos ────────────────────────────────────────
+
+async def form_request(request: Request) -> FormData:
+    """Dependencia que lee el formulario completo en el event loop.
+
+    Los handlers son `def` (FastAPI los corre en el pool de hilos, fuera del
+    loop) y no pueden hacer `await request.form()`; los que leen campos
+    dinámicos reciben el formulario así: `form: FormData = Depends(form_request)`.
+    """
+    return await request.form()
+
+
 # ── Contexto de template ─────────────────────────────────────────────────────
 
 def tpl(request: Request, modulo: str | None = None, **kwargs) -> dict:
@@ -187,19 +278,22 @@ def registrar_log(
     """Inserta un registro en logs_actividad. registro_id (opcional) referencia
     el id del registro afectado en su tabla de origen — permite construir un
     historial "qué cambió y cuándo" por registro individual (ver historial_registro)."""
-    from app.database import get_db
-    conn = get_db()
+    from app.escritor import get_escritor
     nombre = user["nombre_completo"] if user else "Sistema"
     rol = user.get("rol") if user else None
     uid = user.get("id") if user else None
+    get_escritor().ejecutar(
+        _insertar_log, (uid, nombre, rol, accion, modulo, detalle, ip, registro_id)
+    )
+
+
+def _insertar_log(conn, valores: tuple):
     conn.execute(
         """INSERT INTO logs_actividad
            (user_id, nombre_usuario, rol, accion, modulo, detalle, ip, registro_id)
            VALUES (?,?,?,?,?,?,?,?)""",
-        (uid, nombre, rol, accion, modulo, detalle, ip, registro_id),
+        valores,
     )
-    conn.commit()
-    conn.close()
 
 
 def historial_registro(conn, modulo: str, registro_id: int) -> list[dict]:
@@ -0,0 +1,265 @@
+"""
+Índice de texto completo (FTS5) de la búsqueda global /buscar.
+
+/buscar comparaba LIKE '%q%' sobre varias columnas de cada módulo: cuatro
+recorridos completos por búsqueda, sensibles a tildes. Desde la migración 18
+cada módulo tiene una tabla FTS5 de contenido externo (el texto vive en la
+tabla del módulo; el índice guarda solo los términos):
+
+    fts_expedientes      n_expediente, nombre_investigado, quejoso
+    fts_sdqs             sdqs, quejoso
+    fts_correspondencia  n_radicado, origen
+    fts_digitales        n_expediente
+
+- Tokenizador unicode61 con remove_diacritics 2: "GÓMEZ", "gomez" y "Gómez"
+  son el mismo término.
+- Triggers AFTER INSERT / DELETE / UPDATE de esas columnas mantienen el
+  índice, sin tocar los routers. Se indexan también los registros en la
+  papelera; /buscar los descarta al unir con la tabla del módulo.
+- consulta_fts() convierte el texto del usuario en una consulta de prefijos
+  ("gom 2025" → "gom"* "2025"*) y los resultados se ordenan por bm25.
+
+verificar() corre el integrity-check de FTS5 contra las tablas y
+reconstruir() rehace los índices (python -m app.busqueda --verificar / --reparar).
+
+sugerencias() atiende el autocompletar de números (/buscar/sugerencias) con
+índices B-tree por prefijo, y filtro_subcadena() las búsquedas por fragmento
+de las listas con índices de trigramas; ver las secciones al final.
+"""
+import re
+
+# módulo -> (tabla, columnas indexadas)
+INDICES = {
+    "expedientes": ("expedientes", ("n_expediente", "nombre_investigado", "quejoso")),
+    "sdqs": ("sdqs", ("sdqs", "quejoso")),
+    "correspondencia": ("correspondencia", ("n_radicado", "origen")),
+    "digitales": ("exp_digitales", ("n_expediente",)),
+}
+
+_TOKENIZADOR = "unicode61 remove_diacritics 2"
+
+
+def tabla_fts(modulo: str) -> str:
+    return f"fts_{modulo}"
+
+
+def consulta_fts(q: str) -> str | None:
+    """Consulta MATCH: cada palabra del texto como prefijo, todas obligatorias."""
+    palabras = re.findall(r"\w+", q or "")
+    if not palabras:
+        return None
+    return " ".join(f'"{p}"*' for p in palabras)
+
+
+# ── Esquema (migración 18) ─────────────────────────────────────────────────────
+
+def _sql_fts(fts: str, tabla: str, cols, opciones: str) -> str:
+    """Tabla FTS5 de contenido externo sobre `tabla` y triggers que la mantienen."""
+    lista = ", ".join(cols)
+    nuevos = ", ".join(f"NEW.{c}" for c in cols)
+    viejos = ", ".join(f"OLD.{c}" for c in cols)
+    borra = f"INSERT INTO {fts} ({fts}, rowid, {lista}) VALUES ('delete', OLD.id, {viejos});"
+    agrega = f"INSERT INTO {fts} (rowid, {lista}) VALUES (NEW.id, {nuevos});"
+    return f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+    {lista}, content='{tabla}', content_rowid='id', {opciones}
+);
+CREATE TRIGGER IF NOT EXISTS tr_{fts}_ins AFTER INSERT ON {tabla} BEGIN
+    {agrega}
+END;
+CREATE TRIGGER IF NOT EXISTS tr_{fts}_del AFTER DELETE ON {tabla} BEGIN
+    {borra}
+END;
+CREATE TRIGGER IF NOT EXISTS tr_{fts}_upd AFTER UPDATE OF {lista} ON {tabla} BEGIN
+    {borra}
+    {agrega}
+END;
+"""
+
+
+def sql_indice(modulo: str) -> str:
+    """Tabla FTS5 de contenido externo y triggers que la mantienen."""
+    tabla, cols = INDICES[modulo]
+    return _sql_fts(tabla_fts(modulo), tabla, cols, f"tokenize='{_TOKENIZADOR}', prefix='2 3'")
+
+
+def _tablas(modulos, trigramas) -> list[tuple[str, str]]:
+    return ([(m, tabla_fts(m)) for m in modulos]
+            + [(f"{t} (trigramas)", tabla_trigramas(t)) for t in trigramas])
+
+
+def reconstruir(conn, modulos=tuple(INDICES), trigramas=()) -> None:
+    """Rehace los índices desde las tablas. No hace commit."""
+    for _nombre, fts in _tablas(modulos, trigramas):
+        conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+
+
+def verificar(conn, modulos=tuple(INDICES), trigramas=()) -> list[str]:
+    """Índices que no coinciden con su tabla; lista vacía si todos coinciden."""
+    import sqlite3
+
+    malos = []
+    for modulo, fts in _tablas(modulos, trigramas):
+        try:
+            conn.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError as e:
+            malos.append(f"{modulo}: {e}")
+    return malos
+
+
+# ── Sugerencias por prefijo (migración 19) ─────────────────────────────────────
+#
+# Autocompletar números (radicado, expediente, SDQS, cédula) mientras se
+# escribe. Cada fuente compara UPPER(TRIM(campo)) con el rango
+# [prefijo, prefijo siguiente) sobre un índice B-tree de esa misma
+# expresión (radicado_norm donde ya existe, migración 15), así que cada
+# consulta recorre solo las entradas que empiezan por el prefijo y se corta en
+# el LIMIT: no hay estructura en memoria y el costo no crece con la tabla.
+
+# (módulo, tabla, campo mostrado, expresión indexada, ruta del registro)
+FUENTES_PREFIJO = (
+    ("expedientes", "expedientes", "n_expediente", "UPPER(TRIM(n_expediente))", "/expediente/"),
+    ("expedientes", "expedientes", "n_radicado", "radicado_norm", "/expediente/"),
+    ("expedientes", "expedientes", "cedula", "UPPER(TRIM(cedula))", "/expediente/"),
+    ("sdqs", "sdqs", "sdqs", "radicado_norm", "/sdqs/"),
+    ("correspondencia", "correspondencia", "n_radicado", "radicado_norm", "/correspondencia/"),
+    ("digitales", "exp_digitales", "n_expediente", "UPPER(TRIM(n_expediente))", "/digitales/"),
+)
+
+
+def rango_prefijo(prefijo: str) -> tuple[str, str] | None:
+    """(desde, hasta) tales que desde <= v < hasta sii v empieza por el prefijo normalizado."""
+    # UPPER() de SQLite solo cambia letras ASCII
+    p = "".join(c.upper() if c.isascii() else c for c in (prefijo or "").strip())
+    if not p or ord(p[-1]) == 0x10FFFF:
+        return None
+    return p, p[:-1] + chr(ord(p[-1]) + 1)
+
+
+def sugerencias(conn, prefijo: str, modulos, limite: int = 10,
+                presupuesto_ms: float | None = None) -> tuple[list[dict], bool]:
+    """Registros activos cuyo número empieza por `prefijo`, solo de `modulos`.
+
+    Recorre las fuentes en orden y se detiene al llegar a `limite` o al agotar
+    `presupuesto_ms`. Devuelve (resultados, completo): completo es False si
+    el presupuesto cortó la búsqueda antes de pasar por todas las fuentes.
+    """
+    import time
+
+    rango = rango_prefijo(prefijo)
+    if rango is None:
+        return [], True
+    inicio = time.perf_counter()
+    resultados: list[dict] = []
+    for modulo, tabla, campo, expr, ruta in FUENTES_PREFIJO:
+        if modulo not in modulos:
+            continue
+        if len(resultados) >= limite:
+            break
+        if presupuesto_ms is not None and (time.perf_counter() - inicio) * 1000 > presupuesto_ms:
+            return resultados, False
+        filas = conn.execute(
+            f"""SELECT id, {campo} AS valor FROM {tabla}
+                WHERE {expr} >= ? AND {expr} < ? AND eliminado_en IS NULL
+                ORDER BY {expr}, id LIMIT ?""",
+            (*rango, limite - len(resultados)),
+        ).fetchall()
+        resultados += [
+            {"modulo": modulo, "campo": campo, "valor": f["valor"], "id": f["id"], "url": f"{ruta}{f['id']}"}
+            for f in filas
+        ]
+    return resultados, True
+
+
+# ── Subcadenas con trigramas (migración 21) ────────────────────────────────────
+#
+# Un fragmento del medio de un radicado o de un nombre ("ER00123", "mezan")
+# no es prefijo de ninguna palabra: ni los índices de arriba ni los B-tree
+# por prefijo lo encuentran, y las listas caían en LIKE '%q%' sobre varias
+# columnas, un recorrido completo de la tabla por request. Cada tabla de
+# TRIGRAMAS tiene una tabla FTS5 de contenido externo con el tokenizador
+# trigram, mantenida por triggers como las de /buscar:
+#
+#     tri_expedientes      columnas de la búsqueda de lista_expedientes
+#     tri_correspondencia  columnas de la búsqueda de correspondencia.lista
+#     tri_control_autos    columnas de la búsqueda de ca_lista
+#     tri_sdqs, tri_digitales  columnas de /buscar de esos módulos
+#
+# Una frase MATCH sobre trigramas coincide exactamente con las filas que
+# contienen el texto en alguna columna, sin distinguir mayúsculas (también
+# las no ASCII, que LIKE sí distingue). filtro_subcadena() arma la condición
+# `id IN (SELECT rowid ...)` que se suma a los demás filtros de la lista;
+# con menos de 3 caracteres no hay trigramas y vuelve al LIKE de siempre.
+
+# clave -> (tabla, columnas indexadas)
+TRIGRAMAS = {
+    "expedientes": ("expedientes", ("n_expediente", "nombre_investigado", "asunto", "n_radicado",
+                                    "quejoso", "entidad_origen")),
+    "correspondencia": ("correspondencia", ("n_radicado", "origen", "asunto", "caso_bmp")),
+    "control_autos": ("control_autos_sustanciacion", ("expediente", "numero_auto", "asunto_auto",
+                                                      "abogado_responsable")),
+    "sdqs": ("sdqs", ("sdqs", "quejoso")),
+    "digitales": ("exp_digitales", ("n_expediente",)),
+}
+
+_MIN_TRIGRAMA = 3
+
+
+def tabla_trigramas(clave: str) -> str:
+    return f"tri_{clave}"
+
+
+def sql_trigramas(clave: str) -> str:
+    """Tabla FTS5 de trigramas de contenido externo y triggers que la mantienen."""
+    tabla, cols = TRIGRAMAS[clave]
+    return _sql_fts(tabla_trigramas(clave), tabla, cols, "tokenize='trigram'")
+
+
+def consulta_subcadena(q: str, columnas=None) -> str | None:
+    """Frase MATCH que busca `q` como subcadena; None si es muy corta para trigramas."""
+    q = (q or "").strip()
+    if len(q) < _MIN_TRIGRAMA:
+        return None
+    frase = '"' + q.replace('"', '""') + '"'
+    return f"{{{' '.join(columnas)}}} : {frase}" if columnas else frase
+
+
+def filtro_subcadena(clave: str, q: str, columnas=None, alias: str = "") -> tuple[str, list]:
+    """Condición WHERE (y sus parámetros) para "alguna columna contiene q".
+
+    `columnas` restringe la búsqueda a parte de las columnas indexadas y
+    `alias` es el de la tabla en la consulta que recibe la condición.
+    """
+    tabla, cols = TRIGRAMAS[clave]
+    p = f"{alias}." if alias else ""
+    consulta = consulta_subcadena(q, columnas)
+    if consulta:
+        tri = tabla_trigramas(clave)
+        return f"{p}id IN (SELECT rowid FROM {tri} WHERE {tri} MATCH ?)", [consulta]
+    cols = columnas or cols
+    return "(" + " OR ".join(f"{p}{c} LIKE ?" for c in cols) + ")", [f"%{q}%"] * len(cols)
+
+
+def main():
+    import argparse
+
+    from app.database import get_db
+
+    ap = argparse.ArgumentParser(description="Verifica (y repara) los índices de texto de /buscar y de las listas.")
+    ap.add_argument("--verificar", action="store_true", help="compara los índices con las tablas")
+    ap.add_argument("--reparar", action="store_true", help="reconstruye todos los índices")
+    args = ap.parse_args()
+
+    conn = get_db()
+    if args.reparar:
+        reconstruir(conn, tuple(INDICES), tuple(TRIGRAMAS))
+        conn.commit()
+    malos = verificar(conn, tuple(INDICES), tuple(TRIGRAMAS))
+    conn.close()
+    for m in malos:
+        print(m)
+    print(f"{len(malos)} índices con diferencias")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Calendario de días hábiles de Colombia.
+
+Antes correspondencia._add_dias_habiles() y _subtract_dias_habiles()
+reconstruían los festivos de dos años (Pascua incluida) en cada llamada y
+avanzaban día por día; _calcular_semaforo_row() las llama dos veces por fila
+en la Lista, el Dashboard, los reportes y el backup.
+
+Ahora los festivos se calculan una vez por año y el calendario precalcula,
+para un rango de años, el índice acumulado de días hábiles:
+
+    acumulado[i] = días hábiles en [1 ene ANIO_DESDE, ese día + i]
+
+con eso sumar o restar N días hábiles y contar hábiles entre dos fechas son
+búsquedas en listas. Fuera del rango se recorre día por día como antes.
+
+    from app.calendario import get_calendario
+    cal = get_calendario()
+    vence = cal.sumar(date(2026, 3, 18), 15)
+    revision = cal.restar(vence, 2)
+
+El rango se ajusta con OCDI_CALENDARIO_DESDE / OCDI_CALENDARIO_HASTA.
+"""
+import os
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+
+ANIO_DESDE = int(os.environ.get("OCDI_CALENDARIO_DESDE", "2000"))
+ANIO_HASTA = int(os.environ.get("OCDI_CALENDARIO_HASTA", str(date.today().year + 20)))
+
+
+# ── Festivos ──────────────────────────────────────────────────────────────────
+
+def pascua(year: int) -> date:
+    """Domingo de Pascua (algoritmo de Gauss)."""
+    a = year % 19
+    b = year // 100
+    c = year % 100
+    d = b // 4
+    e = b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i = c // 4
+    k = c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = ((h + l - 7 * m + 114) % 31) + 1
+    return date(year, month, day)
+
+
+def _siguiente_lunes(d: date) -> date:
+    """d si es lunes; si no, el lunes siguiente (Ley Emiliani)."""
+    days_ahead = (7 - d.weekday()) % 7
+    return d if days_ahead == 0 else d + timedelta(days=days_ahead)
+
+
+@lru_cache(maxsize=None)
+def festivos_colombia(year: int) -> frozenset:
+    festivos = set()
+    for m, day in [(1, 1), (5, 1), (7, 20), (8, 7), (12, 8), (12, 25)]:
+        festivos.add(date(year, m, day))
+    for m, day in [(1, 6), (3, 19), (6, 29), (8, 15), (10, 12), (11, 1), (11, 11)]:
+        festivos.add(_siguiente_lunes(date(year, m, day)))
+    easter = pascua(year)
+    festivos.add(easter - timedelta(days=3))   # Jueves Santo
+    festivos.add(easter - timedelta(days=2))   # Viernes Santo
+    festivos.add(_siguiente_lunes(easter + timedelta(days=39)))   # Ascensión
+    festivos.add(_siguiente_lunes(easter + timedelta(days=60)))   # Corpus Christi
+    festivos.add(_siguiente_lunes(easter + timedelta(days=68)))   # Sagrado Corazón
+    return frozenset(festivos)
+
+
+def es_habil(d: date) -> bool:
+    return d.weekday() < 5 and d not in festivos_colombia(d.year)
+
+
+# ── Calendario precalculado ───────────────────────────────────────────────────
+
+class CalendarioHabil:
+    """Índice acumulado de días hábiles entre el 1 de enero de `desde` y el
+    31 de diciembre de `hasta`."""
+
+    def __init__(self, desde: int = ANIO_DESDE, hasta: int = ANIO_HASTA):
+        self.desde, self.hasta = desde, hasta
+        self._base = date(desde, 1, 1).toordinal()
+        self._fin = date(hasta, 12, 31).toordinal()
+        self._acumulado: list[int] = []   # por día del rango
+        self._habiles: list[int] = []     # ordinales de los días hábiles, en orden
+        for o in range(self._base, self._fin + 1):
+            if es_habil(date.fromordinal(o)):
+                self._habiles.append(o)
+            self._acumulado.append(len(self._habiles))
+
+    def _en_rango(self, o: int) -> bool:
+        return self._base <= o <= self._fin
+
+    def sumar(self, inicio: date, dias: int) -> date:
+        """Día hábil número `dias` después de `inicio` (sin contar `inicio`)."""
+        if dias <= 0:
+            return inicio
+        o = inicio.toordinal()
+        if self._en_rango(o):
+            k = self._acumulado[o - self._base] + dias - 1
+            if k < len(self._habiles):
+                return date.fromordinal(self._habiles[k])
+        return _sumar_dia_a_dia(inicio, dias)
+
+    def restar(self, fin: date, dias: int) -> date:
+        """Día hábil número `dias` antes de `fin` (sin contar `fin`)."""
+        if dias <= 0:
+            return fin
+        o = fin.toordinal()
+        if self._en_rango(o - 1):
+            k = self._acumulado[o - 1 - self._base] - dias
+            if k >= 0:
+                return date.fromordinal(self._habiles[k])
+        return _restar_dia_a_dia(fin, dias)
+
+    def habiles_entre(self, desde: date, hasta: date) -> int:
+        """Días hábiles en (desde, hasta]; negativo si hasta < desde."""
+        if hasta < desde:
+            return -self.habiles_entre(hasta, desde)
+        a, b = desde.toordinal(), hasta.toordinal()
+        if self._en_rango(a) and self._en_rango(b):
+            return self._acumulado[b - self._base] - self._acumulado[a - self._base]
+        return sum(1 for o in range(a + 1, b + 1) if es_habil(date.fromordinal(o)))
+
+
+def _sumar_dia_a_dia(inicio: date, dias: int) -> date:
+    current, count = inicio, 0
+    while count < dias:
+        current += timedelta(days=1)
+        if es_habil(current):
+            count += 1
+    return current
+
+
+def _restar_dia_a_dia(fin: date, dias: int) -> date:
+    current, count = fin, 0
+    while count < dias:
+        current -= timedelta(days=1)
+        if es_habil(current):
+            count += 1
+    return current
+
+
+_calendario: CalendarioHabil | None = None
+_lock = threading.Lock()
+
+
+def get_calendario() -> CalendarioHabil:
+    """Calendario compartido del proceso; se construye en el primer uso."""
+    global _calendario
+    if _calendario is None:
+        with _lock:
+            if _calendario is None:
+                _calendario = CalendarioHabil()
+    return _calendario
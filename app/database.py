@@ -1,6 +1,10 @@
+import os
 import sqlite3
+import threading
+from contextvars import ContextVar
 from pathlib import Path
 from datetime import date, timedelta
+from typing import Callable
 
 DB_PATH = Path(__file__).parent.parent / "data" / "ocdi.db"
 
@@ -345,13 +349,186 @@ CREATE INDEX IF NOT EXISTS ix_control_autos_eliminado_en ON control_autos_sustan
 """
 
 
-def get_db():
-    DB_PATH.parent.mkdir(exist_ok=True)
-    conn = sqlite3.connect(str(DB_PATH))
+# ── Perfil de rendimiento ─────────────────────────────────────────────────────
+#
+# PRAGMAs por conexión que se aplican una sola vez al crearla en el pool.
+# busy_timeout hace que un escritor concurrente espere el lock en vez de fallar
+# con "database is locked". Con WAL, synchronous=NORMAL no arriesga corrupción
+# (solo las últimas transacciones ante un corte de luz). Ningún perfil usa
+# synchronous=OFF: sin fsync, un corte de luz puede perder transacciones ya
+# confirmadas o dejar la base corrupta; "rapido" gana con caché y mmap más
+# grandes, no relajando la durabilidad. cache_size negativo está en KiB. El perfil se elige con la variable de entorno OCDI_PERFIL_BD;
+# bench/bench_perfiles.py mide los tres con las cargas reales.
+
+PERFILES_BD: dict[str, dict] = {
+    "seguro": {
+        "busy_timeout": 5000,
+        "synchronous": "FULL",
+        "cache_size": -2000,
+        "mmap_size": 0,
+        "temp_store": "DEFAULT",
+    },
+    "equilibrado": {
+        "busy_timeout": 5000,
+        "synchronous": "NORMAL",
+        "cache_size": -16000,
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+    "rapido": {
+        "busy_timeout": 10000,
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+    },
+}
+
+PERFIL_BD = os.environ.get("OCDI_PERFIL_BD", "equilibrado")
+
+
+def aplicar_perfil(conn: sqlite3.Connection, perfil: str):
+    """Aplica los PRAGMAs del perfil dado a la conexión."""
+    if perfil not in PERFILES_BD:
+        raise ValueError(f"Perfil de BD desconocido: {perfil!r} (opciones: {', '.join(PERFILES_BD)})")
+    for pragma, valor in PERFILES_BD[perfil].items():
+        conn.execute(f"PRAGMA {pragma}={valor}")
+
+
+def configurar_conexion(conn: sqlite3.Connection, perfil: str):
+    """Configuración común de toda conexión de la app (pool y escritor)."""
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL")
     conn.execute("PRAGMA foreign_keys=ON")
-    return conn
+    aplicar_perfil(conn, perfil)
+
+
+# ── Pool de conexiones ────────────────────────────────────────────────────────
+#
+# Cada conexión se configura UNA sola vez al crearse (row_factory + PRAGMAs) y
+# se reutiliza. Durante una request HTTP, auth_middleware presta una conexión y
+# la deja en _conexion_request: todos los get_db() de esa request (handler,
+# registrar_log, puede_*, _abogados_activos...) reciben la misma conexión y su
+# close() no la cierra — la devuelve el middleware al terminar la request.
+# Fuera de una request (init_db, scripts, tests) get_db() presta una conexión
+# del pool y close() la devuelve.
+
+POOL_MAX_LIBRES = 8  # conexiones ociosas que se conservan; el exceso se cierra
+
+_conexion_request: ContextVar["ConexionPool | None"] = ContextVar("_conexion_request", default=None)
+
+
+class ConexionPool(sqlite3.Connection):
+    """Conexión SQLite cuyo close() la devuelve al pool en vez de cerrarla."""
+
+    _pool: "PoolConexiones | None" = None
+
+    def close(self):
+        if _conexion_request.get() is self:
+            return  # la libera el middleware al final de la request
+        if self._pool is not None:
+            self._pool.liberar(self)
+        else:
+            super().close()
+
+    def cerrar_definitivo(self):
+        super().close()
+
+
+class PoolConexiones:
+    """Pool LIFO de conexiones configuradas contra una ruta de base de datos.
+
+    Nunca bloquea: si no hay conexiones libres crea una nueva (el event loop es
+    un solo hilo, esperar aquí a que otra request devuelva la suya sería un
+    deadlock). Al liberar, solo conserva hasta `max_libres` conexiones ociosas.
+    """
+
+    def __init__(self, ruta: Path, perfil: str = PERFIL_BD, max_libres: int = POOL_MAX_LIBRES):
+        self.ruta = ruta
+        self.perfil = perfil
+        self.max_libres = max_libres
+        self._libres: list[ConexionPool] = []
+        self._lock = threading.Lock()
+        self.creadas = 0
+        self.prestamos = 0
+
+    def _crear(self) -> ConexionPool:
+        self.ruta.parent.mkdir(exist_ok=True)
+        conn = sqlite3.connect(str(self.ruta), factory=ConexionPool, check_same_thread=False)
+        configurar_conexion(conn, self.perfil)
+        conn._pool = self
+        with self._lock:
+            self.creadas += 1
+        return conn
+
+    def adquirir(self) -> ConexionPool:
+        with self._lock:
+            self.prestamos += 1
+            if self._libres:
+                return self._libres.pop()
+        return self._crear()
+
+    def liberar(self, conn: ConexionPool):
+        if conn.in_transaction:
+            # Igual que cerrar una conexión sin commit: se descarta lo pendiente
+            conn.rollback()
+        with self._lock:
+            if conn not in self._libres and len(self._libres) < self.max_libres:
+                self._libres.append(conn)
+                return
+        conn.cerrar_definitivo()
+
+    def cerrar(self):
+        with self._lock:
+            libres, self._libres = self._libres, []
+        for conn in libres:
+            conn.cerrar_definitivo()
+
+
+_pool: PoolConexiones | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> PoolConexiones:
+    """Pool de la base actual. Se recrea si cambió DB_PATH o PERFIL_BD (tests, benchmarks)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.ruta != DB_PATH or _pool.perfil != PERFIL_BD:
+            if _pool is not None:
+                _pool.cerrar()
+            _pool = PoolConexiones(DB_PATH, PERFIL_BD)
+        return _pool
+
+
+def cerrar_pool():
+    """Cierra todas las conexiones ociosas del pool (apagado / tests)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.cerrar()
+        _pool = None
+
+
+def abrir_conexion_request():
+    """Presta una conexión para toda la request. Devuelve el token para liberarla."""
+    conn = get_pool().adquirir()
+    return _conexion_request.set(conn)
+
+
+def liberar_conexion_request(token):
+    """Devuelve al pool la conexión prestada por abrir_conexion_request()."""
+    conn = _conexion_request.get()
+    _conexion_request.reset(token)
+    if conn is not None:
+        conn.close()
+
+
+def get_db():
+    """Conexión de la request en curso, o una prestada del pool fuera de requests."""
+    conn = _conexion_request.get()
+    if conn is not None:
+        return conn
+    return get_pool().adquirir()
 
 
 def get_personal_oficina(conn):
@@ -361,9 +538,49 @@ def get_personal_oficina(conn):
     ).fetchall()]
 
 
+# ── Migraciones versionadas ───────────────────────────────────────────────────
+#
+# PRAGMA user_version guarda el número de la última migración aplicada.
+# init_db() corre solo las pendientes, en orden, y registra cada una al
+# terminarla: arrancar sobre una base al día cuesta una lectura del pragma.
+#
+# Las migraciones 1-8 son el init_db() histórico partido en pasos; sus
+# sentencias toleran bases creadas por versiones anteriores (user_version = 0)
+# que ya tienen parte de las columnas/índices. Para agregar una migración:
+# nueva función @_migracion(N, "...") con N = última + 1. Nunca editar una
+# migración ya publicada — las bases existentes no la vuelven a correr.
+
+MIGRACIONES: list[tuple[int, str, Callable]] = []
+
+
+def _migracion(version: int, descripcion: str):
+    def registrar(fn):
+        MIGRACIONES.append((version, descripcion, fn))
+        return fn
+    return registrar
+
+
+def version_esquema(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
 def init_db():
+    """Aplica las migraciones pendientes sobre DB_PATH."""
     conn = get_db()
-
+    try:
+        actual = version_esquema(conn)
+        for version, _desc, fn in sorted(MIGRACIONES, key=lambda m: m[0]):
+            if version <= actual:
+                continue
+            fn(conn)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+    finally:
+        conn.close()
+
+
+@_migracion(1, "esquema base (tablas de SCHEMA)")
+def _m001_esquema_base(conn):
     # Migración v4: reemplazar tabla expedientes si tiene el schema antiguo
     old_cols = [r[1] for r in conn.execute("PRAGMA table_info(expedientes)").fetchall()]
     if old_cols and "ingreso_siias" in old_cols:
@@ -373,6 +590,10 @@ def init_db():
         conn.commit()
 
     conn.executescript(SCHEMA)
+
+
+@_migracion(2, "columnas agregadas y papelera (soft-delete)")
+def _m002_columnas_papelera(conn):
     # Migraciones: agregar columnas nuevas a tablas existentes
     try:
         conn.execute("ALTER TABLE exp_digitales ADD COLUMN observaciones TEXT")
@@ -426,6 +647,10 @@ def init_db():
             conn.execute(f"ALTER TABLE {_tabla_papelera} ADD COLUMN eliminado_por TEXT")
         except Exception:
             pass
+
+
+@_migracion(3, "normalización de responsables, origen y asunto")
+def _m003_normalizar_correspondencia(conn):
     # Migrar corr_responsables a nombres completos oficiales
     nombres_completos = [
         "ANDRES EDUARDO SANDOVAL MAYORGA",
@@ -489,6 +714,9 @@ def init_db():
     conn.execute("UPDATE correspondencia SET origen = UPPER(origen) WHERE origen IS NOT NULL AND origen != UPPER(origen)")
     conn.execute("UPDATE correspondencia SET asunto = UPPER(asunto) WHERE asunto IS NOT NULL AND asunto != UPPER(asunto)")
 
+
+@_migracion(4, "índices únicos sdqs y expedientes")
+def _m004_indices_unicos(conn):
     # Migración: índice único en sdqs.sdqs para deduplicación en importación
     try:
         conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_sdqs_sdqs ON sdqs(sdqs)")
@@ -507,6 +735,10 @@ def init_db():
             conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_expedientes_n_anio ON expedientes(n_expediente, anio)")
         except Exception:
             pass
+
+
+@_migracion(5, "sdqs v2 y tipo de contrato")
+def _m005_sdqs_v2_tipo_contrato(conn):
     # Migración sdqs v2: renombrar fecha_radicado → fecha_asignacion, agregar fecha_vencimiento
     sdqs_cols = [r[1] for r in conn.execute("PRAGMA table_info(sdqs)").fetchall()]
     if "fecha_radicado" in sdqs_cols:
@@ -557,6 +789,9 @@ def init_db():
             (nombre,),
         )
 
+
+@_migracion(6, "catálogos de correspondencia, personal y permisos equipos")
+def _m006_catalogos(conn):
     for nombre in ["RADICADO", "CORREO ELECTRONICO", "SDQS"]:
         try:
             conn.execute("INSERT INTO corr_tipos_documento (nombre) VALUES (?)", (nombre,))
@@ -624,6 +859,9 @@ def init_db():
                 (u["id"], "equipos", escribir),
             )
 
+
+@_migracion(7, "datos iniciales")
+def _m007_datos_iniciales(conn):
     # Seed inicial de usuarios (solo si la tabla está vacía)
     if conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] == 0:
         _seed_usuarios(conn)
@@ -632,10 +870,336 @@ def init_db():
     if conn.execute("SELECT COUNT(*) FROM expedientes").fetchone()[0] == 0:
         _seed_expedientes_demo(conn)
 
+
+@_migracion(8, "índices de consulta")
+def _m008_indices(conn):
     conn.executescript(INDEXES)
 
-    conn.commit()
-    conn.close()
+
+@_migracion(9, "sesiones: quitar índice duplicado de token")
+def _m009_sesiones_compactas(conn):
+    # token ya es UNIQUE (sqlite_autoindex_sesiones_1): ix_sesiones_token era
+    # un segundo índice idéntico que se mantenía en cada login y borrado.
+    conn.execute("DROP INDEX IF EXISTS ix_sesiones_token")
+
+
+# Índices parciales de la papelera. Casi todas las consultas filtran
+# `eliminado_en IS NULL` y el índice simple sobre eliminado_en no sirve para
+# eso (todas las filas activas comparten la misma clave NULL). Los índices
+# `WHERE eliminado_en IS NULL` solo contienen filas activas y siguen el
+# orden de cada lista, así la página sale del índice sin ordenar la tabla;
+# la papelera (`IS NOT NULL`) usa un índice parcial propio, diminuto.
+INDICES_PARCIALES = """
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_num ON expedientes(CAST(n_expediente AS INTEGER)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_anio_num ON expedientes(anio, CAST(n_expediente AS INTEGER)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_etapa_num ON expedientes(etapa_actual, CAST(n_expediente AS INTEGER)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_estado_num ON expedientes(estado_proceso, CAST(n_expediente AS INTEGER)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_abogado ON expedientes(abogado_asignado) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_papelera ON expedientes(eliminado_en) WHERE eliminado_en IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_correspondencia_act_fecha ON correspondencia(fecha_ingreso) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_correspondencia_act_resp_fecha ON correspondencia(responsable, fecha_ingreso) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_correspondencia_act_anio_mes_fecha ON correspondencia(anio, mes, fecha_ingreso) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_correspondencia_papelera ON correspondencia(eliminado_en) WHERE eliminado_en IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_sdqs_act_mes ON sdqs(UPPER(mes)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_sdqs_act_responsable ON sdqs(UPPER(responsable)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_sdqs_act_competencia ON sdqs(UPPER(competencia_ocdi)) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_sdqs_papelera ON sdqs(eliminado_en) WHERE eliminado_en IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_act_orden ON exp_digitales(anio DESC, CAST(n_expediente AS INTEGER), n_expediente) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_act_abogado ON exp_digitales(abogado, anio DESC, CAST(n_expediente AS INTEGER), n_expediente) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_act_etapa ON exp_digitales(etapa) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_papelera ON exp_digitales(eliminado_en) WHERE eliminado_en IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_control_autos_act_fecha ON control_autos_sustanciacion(fecha_auto) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_control_autos_act_abogado_fecha ON control_autos_sustanciacion(abogado_responsable, fecha_auto) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_control_autos_papelera ON control_autos_sustanciacion(eliminado_en) WHERE eliminado_en IS NOT NULL;
+
+DROP INDEX IF EXISTS ix_expedientes_eliminado_en;
+DROP INDEX IF EXISTS ix_correspondencia_eliminado_en;
+DROP INDEX IF EXISTS ix_sdqs_eliminado_en;
+DROP INDEX IF EXISTS ix_exp_digitales_eliminado_en;
+DROP INDEX IF EXISTS ix_control_autos_eliminado_en;
+"""
+
+
+@_migracion(10, "índices parciales de la papelera (eliminado_en IS NULL)")
+def _m010_indices_parciales(conn):
+    conn.executescript(INDICES_PARCIALES)
+
+
+# n_num: número de expediente como entero (columna generada, siempre en
+# sincronía con n_expediente: '007' -> 7, '12-2024' -> 12, texto -> 0). Las
+# listas ordenan por n_num y los índices lo guardan ya calculado, en vez de
+# evaluar CAST(n_expediente AS INTEGER) fila por fila. Los índices parciales
+# de la migración 10 que usaban el CAST se recrean sobre n_num.
+INDICES_N_NUM = """
+DROP INDEX IF EXISTS ix_expedientes_act_num;
+DROP INDEX IF EXISTS ix_expedientes_act_anio_num;
+DROP INDEX IF EXISTS ix_expedientes_act_etapa_num;
+DROP INDEX IF EXISTS ix_expedientes_act_estado_num;
+DROP INDEX IF EXISTS ix_exp_digitales_act_orden;
+DROP INDEX IF EXISTS ix_exp_digitales_act_abogado;
+
+CREATE INDEX IF NOT EXISTS ix_expedientes_n_num ON expedientes(n_num);
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_num ON expedientes(n_num) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_anio_num ON expedientes(anio DESC, n_num, n_expediente) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_etapa_num ON expedientes(etapa_actual, n_num) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_expedientes_act_estado_num ON expedientes(estado_proceso, n_num) WHERE eliminado_en IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_act_orden ON exp_digitales(anio DESC, n_num, n_expediente) WHERE eliminado_en IS NULL;
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_act_abogado ON exp_digitales(abogado, anio DESC, n_num, n_expediente) WHERE eliminado_en IS NULL;
+"""
+
+
+@_migracion(11, "n_num entero para ordenar expedientes y digitales")
+def _m011_n_num(conn):
+    for tabla in ("expedientes", "exp_digitales"):
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_xinfo({tabla})").fetchall()]
+        if "n_num" not in cols:
+            conn.execute(
+                f"ALTER TABLE {tabla} ADD COLUMN n_num INTEGER "
+                "GENERATED ALWAYS AS (CAST(n_expediente AS INTEGER)) VIRTUAL"
+            )
+    conn.executescript(INDICES_N_NUM)
+
+
+@_migracion(12, "vencimientos persistidos de expedientes")
+def _m012_vencimientos(conn):
+    # Las calcula app/vencimientos.py, con las reglas de la pantalla;
+    # crear, editar, importar y restaurar las mantienen al día.
+    from app.vencimientos import actualizar_vencimientos
+
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(expedientes)").fetchall()]
+    for col in ("fecha_vencimiento_ind", "fecha_vencimiento_inv", "fecha_prescripcion",
+                "fecha_vencimiento_prorroga", "fecha_proximo_vencimiento"):
+        if col not in cols:
+            conn.execute(f"ALTER TABLE expedientes ADD COLUMN {col} TEXT")
+    actualizar_vencimientos(conn)
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_proximo ON expedientes(fecha_proximo_vencimiento) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_venc_ind ON expedientes(fecha_vencimiento_ind) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_venc_inv ON expedientes(fecha_vencimiento_inv) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_prescripcion ON expedientes(fecha_prescripcion) WHERE eliminado_en IS NULL;
+    """)
+
+
+@_migracion(13, "tabla de alertas de vencimiento")
+def _m013_alertas(conn):
+    # Una fila por caso abierto y tipo de plazo; ver app/alertas.py.
+    from datetime import date
+    from app.alertas import MODULOS, avanzar_dia, refrescar_alertas
+
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS alertas (
+            modulo            TEXT NOT NULL,
+            registro_id       INTEGER NOT NULL,
+            tipo              TEXT NOT NULL,
+            fecha_vencimiento TEXT,
+            fecha_aviso       TEXT,
+            fecha_amarilla    TEXT,
+            fecha_roja        TEXT,
+            estado            TEXT,
+            PRIMARY KEY (modulo, registro_id, tipo)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ix_alertas_estado ON alertas(modulo, estado, tipo);
+        CREATE INDEX IF NOT EXISTS ix_alertas_aviso ON alertas(modulo, fecha_aviso);
+        CREATE INDEX IF NOT EXISTS ix_alertas_vencimiento ON alertas(modulo, fecha_vencimiento);
+        CREATE INDEX IF NOT EXISTS ix_alertas_amarilla ON alertas(fecha_amarilla);
+        CREATE INDEX IF NOT EXISTS ix_alertas_roja ON alertas(fecha_roja);
+        CREATE TABLE IF NOT EXISTS alertas_dia (
+            id    INTEGER PRIMARY KEY CHECK (id = 1),
+            fecha TEXT NOT NULL
+        );
+    """)
+    for modulo in MODULOS:
+        refrescar_alertas(conn, modulo)
+    avanzar_dia(conn, date.today())
+
+
+@_migracion(14, "plazo en días hábiles persistido en correspondencia")
+def _m014_plazos_correspondencia(conn):
+    # Las calcula app/vencimientos.py, con las reglas de la pantalla;
+    # crear, editar, importar y restaurar las mantienen al día.
+    from app.vencimientos import actualizar_plazos
+
+    cols = [r[1] for r in conn.execute("PRAGMA table_info(correspondencia)").fetchall()]
+    for col in ("fecha_ingreso_dia", "fecha_vencimiento_plazo", "fecha_revision_plazo"):
+        if col not in cols:
+            conn.execute(f"ALTER TABLE correspondencia ADD COLUMN {col} TEXT")
+    actualizar_plazos(conn)
+
+
+@_migracion(15, "radicados normalizados y conteo de repetidos")
+def _m015_radicados(conn):
+    # radicado_norm = UPPER(TRIM(número)), generada e indexada; los triggers de
+    # app/radicados.py mantienen radicados_conteo (registros activos por radicado).
+    from app.radicados import COLUMNAS, recontar, sql_triggers
+
+    for tabla, col in COLUMNAS.items():
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_xinfo({tabla})").fetchall()]
+        if "radicado_norm" not in cols:
+            conn.execute(
+                f"ALTER TABLE {tabla} ADD COLUMN radicado_norm TEXT "
+                f"GENERATED ALWAYS AS (UPPER(TRIM({col}))) VIRTUAL"
+            )
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS ix_correspondencia_act_radicado_norm ON correspondencia(radicado_norm) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_radicado_norm ON expedientes(radicado_norm) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_sdqs_radicado_norm ON sdqs(radicado_norm);
+        CREATE TABLE IF NOT EXISTS radicados_conteo (
+            modulo    TEXT NOT NULL,
+            radicado  TEXT NOT NULL,
+            cantidad  INTEGER NOT NULL,
+            PRIMARY KEY (modulo, radicado)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS ix_radicados_conteo_repetidos ON radicados_conteo(modulo, cantidad) WHERE cantidad > 1;
+    """)
+    for tabla in COLUMNAS:
+        conn.executescript(sql_triggers(tabla))
+    recontar(conn)
+
+
+# Resumen de comunicaciones por expediente digital: la Lista calculaba cuatro
+# subconsultas correlacionadas por fila (comunicaciones, sin respuesta, días
+# de la más antigua pendiente y última revisión). Los triggers recalculan la
+# fila del expediente afectado en cada escritura de exp_comunicaciones o
+# exp_revisiones; solo hay fila si el expediente tiene alguna de las dos.
+# envio_pendiente_min es la fecha_envio válida más antigua sin respuesta:
+# CAST(julianday('now') - julianday(envio_pendiente_min) AS INTEGER) es el
+# máximo de días pendientes que antes se calculaba comunicación por comunicación.
+def _sql_recalcular_resumen(exp_id: str) -> str:
+    return f"""
+    DELETE FROM exp_digitales_resumen WHERE exp_digital_id = {exp_id};
+    INSERT INTO exp_digitales_resumen
+        (exp_digital_id, num_coms, coms_sin_resp, envio_pendiente_min, ultima_revision)
+    SELECT {exp_id},
+        (SELECT COUNT(*) FROM exp_comunicaciones WHERE exp_digital_id = {exp_id}),
+        (SELECT COUNT(*) FROM exp_comunicaciones WHERE exp_digital_id = {exp_id}
+            AND (fecha_respuesta IS NULL OR fecha_respuesta = '')),
+        (SELECT fecha_envio FROM exp_comunicaciones WHERE exp_digital_id = {exp_id}
+            AND (fecha_respuesta IS NULL OR fecha_respuesta = '') AND julianday(fecha_envio) IS NOT NULL
+            ORDER BY julianday(fecha_envio) LIMIT 1),
+        (SELECT MAX(fecha_revision) FROM exp_revisiones WHERE exp_digital_id = {exp_id})
+    WHERE EXISTS (SELECT 1 FROM exp_comunicaciones WHERE exp_digital_id = {exp_id})
+       OR EXISTS (SELECT 1 FROM exp_revisiones WHERE exp_digital_id = {exp_id});"""
+
+
+def _sql_resumen_comunicaciones() -> str:
+    partes = ["""
+        CREATE TABLE IF NOT EXISTS exp_digitales_resumen (
+            exp_digital_id       INTEGER PRIMARY KEY,
+            num_coms             INTEGER NOT NULL DEFAULT 0,
+            coms_sin_resp        INTEGER NOT NULL DEFAULT 0,
+            envio_pendiente_min  TEXT,
+            ultima_revision      TEXT
+        );
+        CREATE INDEX IF NOT EXISTS ix_exp_revisiones_exp_fecha ON exp_revisiones(exp_digital_id, fecha_revision);
+        CREATE INDEX IF NOT EXISTS ix_exp_comunicaciones_pendientes
+            ON exp_comunicaciones(exp_digital_id, fecha_envio) WHERE (fecha_respuesta IS NULL OR fecha_respuesta = '');
+    """]
+    for tabla, campos in (("exp_comunicaciones", "exp_digital_id, fecha_envio, fecha_respuesta"),
+                          ("exp_revisiones", "exp_digital_id, fecha_revision")):
+        partes.append(f"""
+        CREATE TRIGGER IF NOT EXISTS tr_{tabla}_resumen_ins AFTER INSERT ON {tabla} BEGIN
+            {_sql_recalcular_resumen("NEW.exp_digital_id")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS tr_{tabla}_resumen_del AFTER DELETE ON {tabla} BEGIN
+            {_sql_recalcular_resumen("OLD.exp_digital_id")}
+        END;
+        CREATE TRIGGER IF NOT EXISTS tr_{tabla}_resumen_upd AFTER UPDATE OF {campos} ON {tabla} BEGIN
+            {_sql_recalcular_resumen("OLD.exp_digital_id")}
+            {_sql_recalcular_resumen("NEW.exp_digital_id")}
+        END;""")
+    return "\n".join(partes)
+
+
+@_migracion(16, "resumen de comunicaciones de expedientes digitales")
+def _m016_resumen_comunicaciones(conn):
+    conn.executescript(_sql_resumen_comunicaciones())
+    conn.execute("DELETE FROM exp_digitales_resumen")
+    # Un UPDATE sin cambios dispara el recálculo de cada expediente
+    conn.execute("UPDATE exp_comunicaciones SET exp_digital_id = exp_digital_id")
+    conn.execute("UPDATE exp_revisiones SET exp_digital_id = exp_digital_id")
+
+
+@_migracion(17, "versión de datos por tabla para la caché de estadísticas")
+def _m017_datos_version(conn):
+    # Contador por tabla que suben los triggers de app/estadisticas.py en cada
+    # escritura; arranca al azar para no repetir versiones entre bases.
+    from app.estadisticas import TABLAS, sql_triggers
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS datos_version (
+            tabla    TEXT PRIMARY KEY,
+            version  INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.executemany(
+        "INSERT OR IGNORE INTO datos_version (tabla, version) VALUES (?, abs(random() % 1000000000))",
+        [(t,) for t in TABLAS],
+    )
+    for tabla in TABLAS:
+        conn.executescript(sql_triggers(tabla))
+
+
+@_migracion(18, "índice de texto completo (FTS5) de la búsqueda global")
+def _m018_busqueda_fts(conn):
+    # Tablas FTS5 de contenido externo por módulo y sus triggers (app/busqueda.py)
+    from app.busqueda import INDICES, reconstruir, sql_indice
+
+    for modulo in INDICES:
+        conn.executescript(sql_indice(modulo))
+    reconstruir(conn)
+
+
+@_migracion(19, "índices por prefijo para autocompletar números")
+def _m019_indices_prefijo(conn):
+    # Expresiones de app/busqueda.FUENTES_PREFIJO sin índice previo; los
+    # radicados ya tienen radicado_norm indexado (migración 15).
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_n_expediente_norm
+            ON expedientes(UPPER(TRIM(n_expediente))) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_expedientes_act_cedula_norm
+            ON expedientes(UPPER(TRIM(cedula))) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_exp_digitales_act_n_expediente_norm
+            ON exp_digitales(UPPER(TRIM(n_expediente))) WHERE eliminado_en IS NULL;
+    """)
+
+
+@_migracion(20, "columnas normalizadas (sin tildes ni mayúsculas) para filtros")
+def _m020_columnas_normalizadas(conn):
+    # Columnas *_norm de app/texto.COLUMNAS_NORMALIZADAS, sus triggers y los
+    # índices de los filtros por igualdad; reemplazan a los de UPPER(...) de
+    # la migración 10, que ya no usa ningún router.
+    from app.texto import COLUMNAS_NORMALIZADAS, sql_backfill, sql_triggers
+
+    for tabla, sombras in COLUMNAS_NORMALIZADAS.items():
+        existentes = {r[1] for r in conn.execute(f"PRAGMA table_info({tabla})")}
+        for sombra in sombras:
+            if sombra not in existentes:
+                conn.execute(f"ALTER TABLE {tabla} ADD COLUMN {sombra} TEXT")
+        conn.executescript(sql_backfill(tabla))
+        conn.executescript(sql_triggers(tabla))
+    conn.executescript("""
+        CREATE INDEX IF NOT EXISTS ix_sdqs_act_mes_norm ON sdqs(mes_norm) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_sdqs_act_competencia_norm ON sdqs(competencia_norm) WHERE eliminado_en IS NULL;
+        CREATE INDEX IF NOT EXISTS ix_sdqs_act_responsable_norm ON sdqs(responsable_norm) WHERE eliminado_en IS NULL;
+        DROP INDEX IF EXISTS ix_sdqs_act_mes;
+        DROP INDEX IF EXISTS ix_sdqs_act_competencia;
+        DROP INDEX IF EXISTS ix_sdqs_act_responsable;
+    """)
+
+
+@_migracion(21, "índices de trigramas para buscar por fragmento")
+def _m021_trigramas(conn):
+    # Tablas FTS5 trigram de contenido externo y sus triggers (app/busqueda.TRIGRAMAS)
+    from app.busqueda import TRIGRAMAS, reconstruir, sql_trigramas
+
+    for clave in TRIGRAMAS:
+        conn.executescript(sql_trigramas(clave))
+    reconstruir(conn, (), tuple(TRIGRAMAS))
 
 
 def _seed_usuarios(conn):
@@ -0,0 +1,149 @@
+"""
+Escritor único de la base de datos.
+
+SQLite admite un solo escritor a la vez: con cada request haciendo su propio
+commit, bajo uso concurrente aparecen esperas por el lock y SQLITE_BUSY. El
+escritor es un hilo dedicado con su propia conexión que recibe tareas por una
+cola y las aplica en lotes: todas las tareas encoladas al mismo tiempo
+comparten una transacción y un solo commit (group commit). Las lecturas
+siguen por el pool de conexiones, en paralelo.
+
+Una tarea es una función `fn(conn, *args)` que escribe con `conn.execute(...)`
+y NO hace commit — lo hace el escritor al cerrar el lote. Cada tarea corre en
+su propio SAVEPOINT: si falla, solo se deshace lo suyo y el error vuelve a
+quien la envió; el resto del lote se confirma igual.
+
+    from app.escritor import get_escritor
+    nuevo_id = get_escritor().ejecutar(_insertar, datos)   # espera el commit
+    get_escritor().enviar(_tocar_sesion, token)            # no espera
+"""
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+
+from app import database
+
+MAX_LOTE = 64  # tareas por transacción
+
+
+class EscritorBD:
+    """Hilo escritor con cola de tareas y commit por lotes."""
+
+    def __init__(self, ruta, perfil: str, max_lote: int = MAX_LOTE):
+        self.ruta = ruta
+        self.perfil = perfil
+        self.max_lote = max_lote
+        self._cola: queue.Queue = queue.Queue()
+        self._hilo = threading.Thread(target=self._bucle, name="escritor-bd", daemon=True)
+        self.lotes = 0
+        self.tareas = 0
+        self._hilo.start()
+
+    # ── API ───────────────────────────────────────────────────────────────────
+
+    def enviar(self, fn, *args) -> Future:
+        """Encola la tarea y devuelve un Future con su resultado o su error."""
+        fut: Future = Future()
+        self._cola.put((fn, args, fut))
+        return fut
+
+    def ejecutar(self, fn, *args, timeout: float | None = 30):
+        """Encola la tarea y espera a que su lote quede confirmado."""
+        return self.enviar(fn, *args).result(timeout=timeout)
+
+    def cerrar(self):
+        """Procesa lo pendiente y detiene el hilo."""
+        self._cola.put(None)
+        self._hilo.join(timeout=10)
+
+    # ── Hilo escritor ─────────────────────────────────────────────────────────
+
+    def _bucle(self):
+        conn = sqlite3.connect(str(self.ruta), isolation_level=None)
+        database.configurar_conexion(conn, self.perfil)
+        try:
+            while True:
+                item = self._cola.get()
+                if item is None:
+                    return
+                lote = [item]
+                fin = False
+                while len(lote) < self.max_lote:
+                    try:
+                        sig = self._cola.get_nowait()
+                    except queue.Empty:
+                        break
+                    if sig is None:
+                        fin = True
+                        break
+                    lote.append(sig)
+                self._aplicar(conn, lote)
+                if fin:
+                    return
+        finally:
+            conn.close()
+
+    def _aplicar(self, conn, lote):
+        resultados = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for fn, args, fut in lote:
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                conn.execute("SAVEPOINT tarea")
+                try:
+                    res = fn(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO tarea")
+                    conn.execute("RELEASE tarea")
+                    resultados.append((fut, None, e))
+                else:
+                    conn.execute("RELEASE tarea")
+                    resultados.append((fut, res, None))
+            conn.execute("COMMIT")
+        except Exception as e:
+            # Falló BEGIN/COMMIT (p. ej. lock agotado): nada del lote quedó escrito
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            for _fn, _args, fut in lote:
+                if fut.done():
+                    continue
+                if fut.running() or fut.set_running_or_notify_cancel():
+                    fut.set_exception(e)
+            return
+        self.lotes += 1
+        self.tareas += len(resultados)
+        for fut, res, exc in resultados:
+            if exc is not None:
+                fut.set_exception(exc)
+            else:
+                fut.set_result(res)
+
+
+_escritor: EscritorBD | None = None
+_escritor_lock = threading.Lock()
+
+
+def get_escritor() -> EscritorBD:
+    """Escritor de la base actual. Se recrea si cambió DB_PATH o PERFIL_BD."""
+    global _escritor
+    with _escritor_lock:
+        if (
+            _escritor is None
+            or _escritor.ruta != database.DB_PATH
+            or _escritor.perfil != database.PERFIL_BD
+        ):
+            if _escritor is not None:
+                _escritor.cerrar()
+            _escritor = EscritorBD(database.DB_PATH, database.PERFIL_BD)
+        return _escritor
+
+
+def cerrar_escritor():
+    """Detiene el hilo escritor (apagado / tests)."""
+    global _escritor
+    with _escritor_lock:
+        if _escritor is not None:
+            _escritor.cerrar()
+        _escritor = None
@@ -0,0 +1,110 @@
+"""
+Caché de estadísticas de los tableros por versión de datos.
+
+Los tableros (inicio de expedientes, correspondencia, expedientes digitales y
+la página de backup) recalculaban todos sus conteos en cada carga aunque los
+datos no hubieran cambiado. Desde la migración 17:
+
+- `datos_version` guarda un contador por tabla que suben triggers AFTER
+  INSERT / UPDATE / DELETE, así que toda escritura lo cambia (routers,
+  importaciones, restauración de backup o SQL a mano) sin tocar los routers.
+  Cada contador arranca en un valor al azar para que una base nueva o
+  restaurada no repita las versiones de otra.
+- cache_estadisticas.obtener() devuelve el resultado guardado mientras las
+  versiones de las tablas que lee el tablero (y el día, si el resultado
+  depende de la fecha) sean las mismas; si no, lo recalcula y lo guarda.
+
+    from app.estadisticas import cache_estadisticas
+    datos = cache_estadisticas.obtener(conn, "correspondencia", ("correspondencia",),
+                                       _estadisticas, dia=date.today())
+
+Los valores guardados se comparten entre requests: quien los lee no los
+modifica. aciertos / fallos cuentan las lecturas servidas desde la caché y
+las recalculadas.
+"""
+import threading
+from typing import Callable
+
+# Tablas con contador de versión (las que leen los tableros en caché)
+TABLAS = (
+    "expedientes", "alertas", "correspondencia", "sdqs", "exp_digitales",
+    "exp_comunicaciones", "sala_agenda", "control_autos_sustanciacion",
+    "seguimiento_mensual",
+)
+
+
+# ── Esquema (migración 17) ─────────────────────────────────────────────────────
+
+def sql_triggers(tabla: str) -> str:
+    """Triggers que suben la versión de `tabla` en cada fila escrita."""
+    sube = f"UPDATE datos_version SET version = version + 1 WHERE tabla = '{tabla}';"
+    return "\n".join(
+        f"CREATE TRIGGER IF NOT EXISTS tr_{tabla}_version_{sufijo} AFTER {evento} ON {tabla} BEGIN {sube} END;"
+        for sufijo, evento in (("ins", "INSERT"), ("upd", "UPDATE"), ("del", "DELETE"))
+    )
+
+
+def versiones(conn, tablas) -> tuple:
+    """Versiones actuales de `tablas`, en el mismo orden."""
+    filas = dict(conn.execute(
+        f"SELECT tabla, version FROM datos_version WHERE tabla IN ({','.join('?' * len(tablas))})",
+        tuple(tablas),
+    ).fetchall())
+    return tuple(filas.get(t) for t in tablas)
+
+
+def sumar_por(filas, columnas) -> dict:
+    """Suma la última columna de `filas` por el valor de `columnas` (índice o tupla de índices).
+
+    Con un GROUP BY por todas las dimensiones del tablero en una sola pasada,
+    cada conteo por dimensión sale de sumar esas filas; las claves quedan en
+    el orden en que aparecen.
+    """
+    totales: dict = {}
+    for f in filas:
+        k = tuple(f[i] for i in columnas) if isinstance(columnas, tuple) else f[columnas]
+        totales[k] = totales.get(k, 0) + f[-1]
+    return totales
+
+
+def mayores(totales: dict) -> list[tuple]:
+    """(clave, total) de mayor a menor total."""
+    return sorted(totales.items(), key=lambda kv: -kv[1])
+
+
+# ── Caché ─────────────────────────────────────────────────────────────────────
+
+class CacheEstadisticas:
+    """clave → (versiones de las tablas + día, resultado)."""
+
+    def __init__(self):
+        self._datos: dict[str, tuple[tuple, object]] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, conn, clave: str, tablas, calcular: Callable, dia=None):
+        """Resultado de calcular(conn), recalculado solo si cambiaron las versiones o el día.
+
+        Las versiones se leen antes de calcular: si una escritura entra en
+        medio, el resultado queda guardado con la versión vieja y la próxima
+        lectura lo recalcula.
+        """
+        firma = versiones(conn, tablas) + (dia,)
+        with self._lock:
+            guardado = self._datos.get(clave)
+            if guardado is not None and guardado[0] == firma:
+                self.aciertos += 1
+                return guardado[1]
+            self.fallos += 1
+        valor = calcular(conn)
+        with self._lock:
+            self._datos[clave] = (firma, valor)
+        return valor
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+cache_estadisticas = CacheEstadisticas()
@@ -0,0 +1,368 @@
+"""
+Exportación a Excel en streaming, común a todos los módulos.
+
+Cada exportador armaba un openpyxl.Workbook() completo en memoria (un objeto
+por celda, con su estilo), lo guardaba en un BytesIO y recién entonces
+respondía: el pico de memoria crecía con la tabla y la descarga no empezaba
+hasta tener el archivo entero. Ahora:
+
+- Una hoja se declara con Hoja y sus Columna (título, ancho, formato del
+  valor, relleno, enlace). Las filas salen de `filas(conn)`, que recorre el
+  cursor de la consulta sin fetchall().
+- Las hojas son write-only: openpyxl pasa cada fila al XML de la hoja (en un
+  archivo temporal) apenas se agrega y no guarda las celdas.
+- respuesta_xlsx() / respuesta_stream() devuelven un StreamingResponse cuyo
+  cuerpo escribe un hilo aparte: el ZIP del archivo sale por partes a una
+  cola acotada y cada parte se envía al cliente apenas está lista. Si el
+  cliente corta la descarga, el hilo se detiene en la siguiente escritura.
+
+El hilo usa su propia conexión del pool: la de la request la devuelve el
+middleware antes de que termine de enviarse el cuerpo.
+
+    hoja = Hoja("SDQS", [Columna("MES", "mes", 10, formato=na), ...],
+                lambda conn: conn.execute("SELECT * FROM sdqs ..."))
+    return respuesta_xlsx([hoja], "SDQS_export.xlsx")
+"""
+import os
+import queue
+import threading
+from copy import copy
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import SheetFormatProperties
+
+from app import database
+
+MEDIA_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_TAM_PARTE = 64 * 1024     # bytes por parte enviada al cliente
+_PARTES_EN_COLA = 16       # partes escritas que esperan ser enviadas
+
+FUENTE_ENCABEZADO = Font(bold=True, color="FFFFFF", size=10)
+CENTRO = Alignment(horizontal="center", vertical="center", wrap_text=True)
+VERTICAL_CENTRO = Alignment(vertical="center")
+_COLOR_ENLACE = "0563C1"
+
+
+def na(v):
+    """Valor vacío → "N/A", como en todas las exportaciones."""
+    return v if (v is not None and str(v).strip() != "") else "N/A"
+
+
+def relleno(color: str | None) -> PatternFill | None:
+    return PatternFill("solid", fgColor=color) if color else None
+
+
+# ── Especificación de hojas ───────────────────────────────────────────────────
+
+class Columna:
+    """Una columna de la hoja.
+
+    campo      clave de la fila o función fila -> valor
+    ancho      ancho en caracteres; None lo calcula Hoja.anchos_desde
+    formato    función valor -> valor escrito (p. ej. na)
+    relleno    función fila -> color de fondo de esta celda (gana al de la fila)
+    enlace     función fila -> URL del hipervínculo de la celda, o None
+    alineacion Alignment de la celda; por defecto el de la hoja
+    color      fondo del encabezado de esta columna; por defecto el de la hoja
+    """
+
+    def __init__(self, titulo: str, campo=None, ancho: float | None = None, formato=None,
+                 relleno=None, enlace=None, alineacion: Alignment | None = None,
+                 color: str | None = None):
+        self.titulo = titulo
+        self.campo = campo
+        self.ancho = ancho
+        self.formato = formato
+        self.relleno = relleno
+        self.enlace = enlace
+        self.alineacion = alineacion
+        self.color = color
+
+    def valor(self, fila):
+        v = self.campo(fila) if callable(self.campo) else (fila[self.campo] if self.campo else None)
+        return self.formato(v) if self.formato else v
+
+
+class Hoja:
+    """Una hoja: encabezado + una fila por cada fila que devuelve `filas(conn)`.
+
+    filas             función conn -> iterable de filas (dict o sqlite3.Row)
+    color             fondo del encabezado; fuente_encabezado, alto_encabezado y
+                      alineacion_encabezado completan su estilo
+    alterna           fondo de las filas pares (None: sin alternar)
+    relleno_fila      función (fila, n° de fila) -> color; reemplaza a `alterna`
+    fuente, borde, alineacion  estilo de las celdas de datos
+    alto_fila         alto de todas las filas de datos
+    congelar          celda de freeze_panes (None: sin congelar)
+    columna_inicial   primera columna con datos (las anteriores quedan vacías)
+    previas           función (ws, conn) -> filas escritas antes del encabezado
+                      (títulos, celdas combinadas); puede fijar ws.row_dimensions
+    anchos_desde      (sql "tabla WHERE ...", params): las columnas sin ancho
+                      toman el largo del texto más largo + 4, hasta ancho_maximo
+    """
+
+    def __init__(self, titulo: str, columnas: list[Columna], filas, *, color: str = "1B4F8A",
+                 fuente_encabezado: Font = FUENTE_ENCABEZADO, alto_encabezado: float | None = 30,
+                 alineacion_encabezado: Alignment = CENTRO, alterna: str | None = "EBF1F8",
+                 relleno_fila=None, fuente: Font | None = None, borde=None,
+                 alineacion: Alignment | None = VERTICAL_CENTRO, alto_fila: float | None = None,
+                 congelar: str | None = "A2", columna_inicial: int = 1, previas=None,
+                 anchos_desde: tuple[str, list] | None = None, ancho_maximo: float = 40):
+        self.titulo = titulo
+        self.columnas = columnas
+        self.filas = filas
+        self.color = color
+        self.fuente_encabezado = fuente_encabezado
+        self.alto_encabezado = alto_encabezado
+        self.alineacion_encabezado = alineacion_encabezado
+        self.alterna = alterna
+        self.relleno_fila = relleno_fila
+        self.fuente = fuente
+        self.borde = borde
+        self.alineacion = alineacion
+        self.alto_fila = alto_fila
+        self.congelar = congelar
+        self.columna_inicial = columna_inicial
+        self.previas = previas
+        self.anchos_desde = anchos_desde
+        self.ancho_maximo = ancho_maximo
+
+
+# ── Escritura ─────────────────────────────────────────────────────────────────
+
+def celda(ws, valor=None, *, fuente=None, relleno=None, alineacion=None, borde=None):
+    """Celda con estilo para hojas write-only (filas previas al encabezado)."""
+    c = WriteOnlyCell(ws, value=valor)
+    if fuente:
+        c.font = fuente
+    if relleno:
+        c.fill = relleno
+    if alineacion:
+        c.alignment = alineacion
+    if borde:
+        c.border = borde
+    return c
+
+
+def _anchos_por_contenido(conn, hoja: Hoja) -> dict[int, float]:
+    desde, params = hoja.anchos_desde
+    cols = [(i, c) for i, c in enumerate(hoja.columnas) if c.ancho is None and isinstance(c.campo, str)]
+    if not cols:
+        return {}
+    fila = conn.execute(
+        f"SELECT {', '.join(f'MAX(LENGTH({c.campo}))' for _, c in cols)} FROM {desde}", params
+    ).fetchone()
+    return {
+        i: min(max(len(c.titulo), largo or 0) + 4, hoja.ancho_maximo)
+        for (i, c), largo in zip(cols, fila)
+    }
+
+
+def escribir_hoja(wb: Workbook, hoja: Hoja, conn) -> int:
+    """Agrega la hoja al libro write-only y escribe sus filas. Devuelve cuántas."""
+    ws = wb.create_sheet(hoja.titulo)
+    inicio = hoja.columna_inicial
+    calculados = _anchos_por_contenido(conn, hoja) if hoja.anchos_desde else {}
+    for i, col in enumerate(hoja.columnas):
+        ancho = col.ancho if col.ancho is not None else calculados.get(i)
+        if ancho is not None:
+            ws.column_dimensions[get_column_letter(inicio + i)].width = ancho
+    if hoja.congelar:
+        ws.freeze_panes = hoja.congelar
+    if hoja.alto_fila:
+        # Alto por defecto de la hoja: una RowDimension por fila crecería con la tabla
+        ws.sheet_format = SheetFormatProperties(defaultRowHeight=hoja.alto_fila, customHeight=True)
+
+    vacias = [None] * (inicio - 1)
+    n = 0
+    for fila in (hoja.previas(ws, conn) if hoja.previas else []):
+        ws.append(fila)
+        n += 1
+
+    n += 1
+    if hoja.alto_encabezado:
+        ws.row_dimensions[n].height = hoja.alto_encabezado
+    relleno_encabezado = relleno(hoja.color)
+    ws.append(vacias + [
+        celda(ws, col.titulo, fuente=hoja.fuente_encabezado,
+              relleno=relleno(col.color) if col.color else relleno_encabezado,
+              alineacion=hoja.alineacion_encabezado, borde=hoja.borde)
+        for col in hoja.columnas
+    ])
+
+    alterna = relleno(hoja.alterna)
+    rellenos: dict[str, PatternFill] = {}
+    fuente_enlace = Font(color=_COLOR_ENLACE, underline="single", size=hoja.fuente.size if hoja.fuente else None)
+    # Asignar fuente/relleno/borde celda por celda registra cada objeto en el
+    # libro (hash incluido) y era la mayor parte del tiempo de escritura. Las
+    # combinaciones posibles son pocas: se arma cada una una vez y las celdas
+    # copian su arreglo de índices de estilo.
+    estilos: dict[tuple, object] = {}
+
+    def estilo(fondo, alineacion, enlace: bool):
+        clave = (id(fondo), id(alineacion), enlace)
+        if clave not in estilos:
+            estilos[clave] = celda(ws, fuente=fuente_enlace if enlace else hoja.fuente, relleno=fondo,
+                                   alineacion=alineacion, borde=hoja.borde)._style
+        return copy(estilos[clave])
+
+    escritas = 0
+    for fila in hoja.filas(conn):
+        n += 1
+        if hoja.relleno_fila:
+            color = hoja.relleno_fila(fila, n)
+            fondo = rellenos.setdefault(color, relleno(color)) if color else None
+        else:
+            fondo = alterna if n % 2 == 0 else None
+        celdas = []
+        for col in hoja.columnas:
+            c = WriteOnlyCell(ws, value=col.valor(fila))
+            color = col.relleno(fila) if col.relleno else None
+            propio = rellenos.setdefault(color, relleno(color)) if color else fondo
+            url = col.enlace(fila) if col.enlace else None
+            if url:
+                c.hyperlink = url
+            c._style = estilo(propio, col.alineacion or hoja.alineacion, bool(url))
+            celdas.append(c)
+        ws.append(vacias + celdas)
+        escritas += 1
+    return escritas
+
+
+def _descartar(wb: Workbook) -> None:
+    """Cierra las hojas de un libro que no llegó a guardarse y borra sus temporales.
+
+    Las filas de cada hoja write-only van a un archivo temporal que solo
+    wb.save() elimina; sin esto quedarían en disco tras un error o una
+    descarga cancelada.
+    """
+    for ws in wb.worksheets:
+        try:
+            if not ws.closed:
+                ws.close()
+            os.remove(ws._writer.out)
+        except Exception:
+            pass
+
+
+def escribir_xlsx(hojas: list[Hoja], destino, conn) -> None:
+    """Escribe el libro con `hojas` en `destino` (archivo o ruta), leyendo de `conn`."""
+    wb = Workbook(write_only=True)
+    try:
+        for hoja in hojas:
+            escribir_hoja(wb, hoja, conn)
+    except BaseException:
+        _descartar(wb)
+        raise
+    wb.save(destino)
+
+
+# ── Respuesta en streaming ────────────────────────────────────────────────────
+
+class _Cancelado(Exception):
+    """El cliente dejó de leer la descarga."""
+
+
+class _Tubo:
+    """Archivo de solo escritura que entrega lo escrito a una cola, por partes.
+
+    Sin tell()/seek(): zipfile lo detecta y escribe el ZIP en modo secuencial.
+    """
+
+    def __init__(self, cola: queue.Queue, cancelado: threading.Event):
+        self._cola = cola
+        self._cancelado = cancelado
+        self._buf = bytearray()
+
+    def write(self, datos) -> int:
+        self._buf += datos
+        if len(self._buf) >= _TAM_PARTE:
+            self.poner(bytes(self._buf))
+            self._buf.clear()
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        if self._buf:
+            self.poner(bytes(self._buf))
+            self._buf.clear()
+
+    def poner(self, item):
+        while True:
+            if self._cancelado.is_set():
+                raise _Cancelado
+            try:
+                self._cola.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+_FIN = object()
+
+
+def transmitir(escribir):
+    """Corre escribir(destino, conn) en un hilo y entrega por partes lo que escribe.
+
+    `conn` es una conexión propia del pool, con una transacción de lectura
+    abierta, devuelta al terminar. Un error del hilo se relanza en quien
+    consume el iterador.
+    """
+    cola: queue.Queue = queue.Queue(maxsize=_PARTES_EN_COLA)
+    cancelado = threading.Event()
+    tubo = _Tubo(cola, cancelado)
+    pool = database.get_pool()
+
+    def trabajo():
+        conn = pool.adquirir()
+        try:
+            # Todas las hojas salen de la misma instantánea de la base, como
+            # cuando se leía todo antes de armar el libro; al devolver la
+            # conexión, el pool descarta la transacción.
+            conn.execute("BEGIN")
+            escribir(tubo, conn)
+            tubo.vaciar()
+            tubo.poner(_FIN)
+        except _Cancelado:
+            pass
+        except BaseException as e:  # se relanza del lado del cliente
+            try:
+                tubo.poner(e)
+            except _Cancelado:
+                pass
+        finally:
+            conn.close()
+
+    threading.Thread(target=trabajo, name="exportar-excel", daemon=True).start()
+    try:
+        while True:
+            parte = cola.get()
+            if parte is _FIN:
+                return
+            if isinstance(parte, BaseException):
+                raise parte
+            yield parte
+    finally:
+        cancelado.set()
+
+
+def respuesta_stream(escribir, nombre: str, media_type: str = MEDIA_XLSX):
+    """StreamingResponse de adjunto cuyo cuerpo produce escribir(destino, conn)."""
+    from fastapi.responses import StreamingResponse
+
+    return StreamingResponse(
+        transmitir(escribir),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={nombre}"},
+    )
+
+
+def respuesta_xlsx(hojas: list[Hoja], nombre: str):
+    """Descarga de un .xlsx con `hojas`, generado mientras se envía."""
+    return respuesta_stream(lambda destino, conn: escribir_xlsx(hojas, destino, conn), nombre)
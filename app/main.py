@@ -3,8 +3,12 @@ from fastapi.responses import FileResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
 from app.template_utils import make_templates
 from pathlib import Path
+from anyio import to_thread
 
-from app.database import init_db
+from app.database import init_db, abrir_conexion_request, liberar_conexion_request
+from app.escritor import cerrar_escritor
+from app.alertas import planificador
+from app.sesiones import actividad, barredor, cache_sesiones
 from app.routers import (
     expedientes, importar, dashboard, seguimiento,
     portal, digitales, sala, backup, correspondencia, control_autos,
@@ -26,6 +30,11 @@ app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="stat
 
 templates = make_templates(str(BASE_DIR / "templates"))
 
+# Los handlers son `def`: FastAPI los corre en el pool de hilos de anyio, fuera
+# del event loop, así un backup ZIP o una importación no congelan al resto de
+# usuarios. El pool se acota porque cada hilo activo sostiene una conexión SQLite.
+HILOS_HANDLERS = 16
+
 # ── Middleware de autenticación ───────────────────────────────────────────────
 
 _RUTAS_PUBLICAS = {"/login", "/login/abogado", "/login/credencial", "/logout", "/favicon.ico"}
@@ -50,48 +59,41 @@ _URL_MODULO_MAP = [
 async def auth_middleware(request: Request, call_next):
     path = request.url.path
 
-    # Rutas públicas: estáticos y login/logout
-    if path.startswith("/static") or path in _RUTAS_PUBLICAS:
+    if path.startswith("/static"):
+        return await call_next(request)
+
+    # Una sola conexión del pool para toda la request (middleware + handler +
+    # registrar_log + puede_*); se devuelve al pool al terminar.
+    token_conn = abrir_conexion_request()
+    try:
+        return await _autenticar(request, call_next)
+    finally:
+        liberar_conexion_request(token_conn)
+
+
+async def _autenticar(request: Request, call_next):
+    path = request.url.path
+
+    # Rutas públicas: login/logout
+    if path in _RUTAS_PUBLICAS:
         return await call_next(request)
 
-    # Verificar sesión activa y cargar permisos en el mismo query
-    from app.database import get_db
-    from app.auth_utils import MODULOS_SISTEMA, ROLES_SUPERUSUARIO
+    # Verificar sesión activa y cargar permisos: desde caché si la sesión ya se
+    # vio; si no, la consulta va al pool de hilos para no bloquear el event loop
+    from app.auth_utils import (
+        ROLES_SUPERUSUARIO, cargar_sesion, fijar_permisos_request, liberar_permisos_request,
+    )
     token = request.cookies.get("ocdi_session")
     user = None
     permisos: dict = {}
 
     if token:
-        conn = get_db()
-        row = conn.execute("""
-            SELECT u.id, u.username, u.nombre_completo, u.rol, u.activo
-            FROM sesiones s
-            JOIN usuarios u ON u.id = s.user_id
-            WHERE s.token = ? AND u.activo = 1
-        """, (token,)).fetchone()
-        if row:
-            conn.execute(
-                "UPDATE sesiones SET last_seen = datetime('now','localtime') WHERE token = ?",
-                (token,)
-            )
-            user = dict(row)
-            modulos = [m for m, _ in MODULOS_SISTEMA]
-            if user["rol"] in ROLES_SUPERUSUARIO:
-                permisos = {m: {"puede_ver": True, "puede_escribir": True, "puede_importar": True} for m in modulos}
-            else:
-                perm_rows = conn.execute(
-                    "SELECT modulo, puede_ver, puede_escribir, puede_importar FROM permisos_modulo WHERE user_id = ?",
-                    (user["id"],)
-                ).fetchall()
-                permisos = {m: {"puede_ver": True, "puede_escribir": False, "puede_importar": False} for m in modulos}
-                for pr in perm_rows:
-                    permisos[pr["modulo"]] = {
-                        "puede_ver": pr["puede_ver"] != 0,
-                        "puede_escribir": bool(pr["puede_escribir"]),
-                        "puede_importar": bool(pr["puede_importar"]),
-                    }
-        conn.commit()
-        conn.close()
+        sesion = cache_sesiones.obtener(token)
+        if sesion is None:
+            sesion = await to_thread.run_sync(cargar_sesion, token)
+        if sesion is not None:
+            user, permisos = sesion
+            actividad.registrar(token)
 
     if user is None:
         from urllib.parse import quote_plus
@@ -112,7 +114,11 @@ async def auth_middleware(request: Request, call_next):
                     return RedirectResponse("/?msg=sin_acceso", status_code=303)
                 break
 
-    return await call_next(request)
+    token_permisos = fijar_permisos_request(user, permisos)
+    try:
+        return await call_next(request)
+    finally:
+        liberar_permisos_request(token_permisos)
 
 
 # ── Routers ───────────────────────────────────────────────────────────────────
@@ -143,4 +149,15 @@ async def favicon():
 
 @app.on_event("startup")
 async def startup():
+    to_thread.current_default_thread_limiter().total_tokens = HILOS_HANDLERS
     init_db()
+    barredor.iniciar()
+    planificador.iniciar()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    barredor.detener()
+    planificador.detener()
+    actividad.detener()
+    cerrar_escritor()
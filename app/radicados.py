@@ -0,0 +1,140 @@
+"""
+Radicados normalizados y conteo de repetidos: correspondencia, SDQS y
+expedientes.
+
+La Lista de correspondencia agrupaba toda la tabla por UPPER(TRIM(n_radicado))
+en cada carga para el banner de duplicados, y /verificar-radicado comparaba
+UPPER(TRIM(n_radicado)) = ? fila por fila en cada consulta del formulario.
+Desde la migración 15:
+
+- cada tabla tiene la columna generada `radicado_norm` = UPPER(TRIM(número))
+  con índice, así que buscar un radicado es una búsqueda por índice;
+- `radicados_conteo` guarda cuántos registros activos (no en papelera)
+  tiene cada radicado normalizado por módulo. La mantienen triggers en
+  INSERT, DELETE y UPDATE del número o de eliminado_en, sin tocar los
+  routers; el banner lee solo las filas con cantidad > 1.
+
+    from app.radicados import repetidos
+    for r in repetidos(conn, "correspondencia"):
+        print(r["radicado"], r["cantidad"])
+
+verificar_conteo() compara la tabla con un GROUP BY sobre los datos y
+recontar() la reconstruye (python -m app.radicados --verificar / --reparar).
+"""
+
+# módulo -> columna con el número de radicado
+COLUMNAS = {
+    "correspondencia": "n_radicado",
+    "sdqs": "sdqs",
+    "expedientes": "n_radicado",
+}
+
+
+def normalizar(valor) -> str:
+    """Forma de búsqueda de un radicado escrito por el usuario."""
+    return (valor or "").strip().upper()
+
+
+# ── Esquema (migración 15) ─────────────────────────────────────────────────────
+
+def _cuenta(fila: str) -> str:
+    """Condición: la fila (NEW u OLD) suma en radicados_conteo."""
+    return f"{fila}.eliminado_en IS NULL AND COALESCE({fila}.radicado_norm, '') != ''"
+
+
+def sql_triggers(modulo: str) -> str:
+    """Triggers que mantienen radicados_conteo para la tabla `modulo`."""
+    col = COLUMNAS[modulo]
+    nuevo, viejo = _cuenta("NEW"), _cuenta("OLD")
+    cambia = "(NEW.eliminado_en IS NOT OLD.eliminado_en OR NEW.radicado_norm IS NOT OLD.radicado_norm)"
+    suma = f"""INSERT INTO radicados_conteo (modulo, radicado, cantidad) VALUES ('{modulo}', NEW.radicado_norm, 1)
+        ON CONFLICT (modulo, radicado) DO UPDATE SET cantidad = cantidad + 1;"""
+    resta = f"""UPDATE radicados_conteo SET cantidad = cantidad - 1
+        WHERE modulo = '{modulo}' AND radicado = OLD.radicado_norm;
+        DELETE FROM radicados_conteo WHERE modulo = '{modulo}' AND radicado = OLD.radicado_norm AND cantidad <= 0;"""
+    return f"""
+CREATE TRIGGER IF NOT EXISTS tr_{modulo}_radicado_ins AFTER INSERT ON {modulo}
+WHEN {nuevo} BEGIN
+    {suma}
+END;
+CREATE TRIGGER IF NOT EXISTS tr_{modulo}_radicado_del AFTER DELETE ON {modulo}
+WHEN {viejo} BEGIN
+    {resta}
+END;
+CREATE TRIGGER IF NOT EXISTS tr_{modulo}_radicado_sale AFTER UPDATE OF {col}, eliminado_en ON {modulo}
+WHEN {viejo} AND {cambia} BEGIN
+    {resta}
+END;
+CREATE TRIGGER IF NOT EXISTS tr_{modulo}_radicado_entra AFTER UPDATE OF {col}, eliminado_en ON {modulo}
+WHEN {nuevo} AND {cambia} BEGIN
+    {suma}
+END;
+"""
+
+
+def _conteo_real(conn, modulo: str) -> dict[str, int]:
+    return dict(conn.execute(
+        f"""SELECT radicado_norm, COUNT(*) FROM {modulo}
+            WHERE eliminado_en IS NULL AND COALESCE(radicado_norm, '') != ''
+            GROUP BY radicado_norm"""
+    ).fetchall())
+
+
+def recontar(conn, modulos=tuple(COLUMNAS)) -> None:
+    """Reconstruye radicados_conteo desde los datos. No hace commit."""
+    for modulo in modulos:
+        conn.execute("DELETE FROM radicados_conteo WHERE modulo = ?", (modulo,))
+        conn.executemany(
+            "INSERT INTO radicados_conteo (modulo, radicado, cantidad) VALUES (?, ?, ?)",
+            [(modulo, rad, n) for rad, n in _conteo_real(conn, modulo).items()],
+        )
+
+
+# ── Consultas ─────────────────────────────────────────────────────────────────
+
+def repetidos(conn, modulo: str) -> list:
+    """Radicados normalizados con más de un registro activo, de más a menos."""
+    return conn.execute(
+        """SELECT radicado, cantidad FROM radicados_conteo
+           WHERE modulo = ? AND cantidad > 1 ORDER BY cantidad DESC, radicado""",
+        (modulo,),
+    ).fetchall()
+
+
+def verificar_conteo(conn, modulos=tuple(COLUMNAS)) -> list[str]:
+    """Diferencias entre radicados_conteo y los datos; lista vacía si coinciden."""
+    diferencias = []
+    for modulo in modulos:
+        real = _conteo_real(conn, modulo)
+        tabla = dict(conn.execute(
+            "SELECT radicado, cantidad FROM radicados_conteo WHERE modulo = ?", (modulo,)
+        ).fetchall())
+        for rad in sorted(set(real) | set(tabla)):
+            if real.get(rad) != tabla.get(rad):
+                diferencias.append(f"{modulo} {rad!r}: tabla={tabla.get(rad)} datos={real.get(rad)}")
+    return diferencias
+
+
+def main():
+    import argparse
+
+    from app.database import get_db
+
+    ap = argparse.ArgumentParser(description="Verifica (y repara) el conteo de radicados repetidos.")
+    ap.add_argument("--verificar", action="store_true", help="lista las diferencias con los datos")
+    ap.add_argument("--reparar", action="store_true", help="reconstruye toda la tabla")
+    args = ap.parse_args()
+
+    conn = get_db()
+    if args.reparar:
+        recontar(conn)
+        conn.commit()
+    diferencias = verificar_conteo(conn)
+    conn.close()
+    for d in diferencias:
+        print(d)
+    print(f"{len(diferencias)} diferencias")
+
+
+if __name__ == "__main__":
+    main()
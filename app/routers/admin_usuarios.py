@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Request, Form
+from fastapi import APIRouter, Request, Form, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
+from starlette.datastructures import FormData
 
 from app.database import get_db
+from app.sesiones import (
+    cache_sesiones, actividad, descartar_sesion, sesion_vigente, vencimiento,
+    SESION_INACTIVIDAD_MIN, SESION_MAXIMA_HORAS,
+)
 from app.auth_utils import (
-    hash_password, MODULOS_SISTEMA, ROLES_SUPERUSUARIO, ROLES_ESCRITURA_DEFAULT, registrar_log
+    hash_password, MODULOS_SISTEMA, ROLES_SUPERUSUARIO, ROLES_ESCRITURA_DEFAULT, registrar_log,
+    form_request,
 )
 
 router = APIRouter(prefix="/admin")
@@ -25,7 +31,7 @@ ROLES_VALIDOS = {"admin", "jefe", "secretario", "auxiliar", "abogado"}
 # ── Gestión de usuarios ───────────────────────────────────────────────────────
 
 @router.get("/usuarios", response_class=HTMLResponse)
-async def admin_usuarios(request: Request, msg: str = ""):
+def admin_usuarios(request: Request, msg: str = ""):
     user = _require_superuser(request)
     if not user:
         return RedirectResponse("/?msg=sin_permiso", status_code=303)
@@ -66,7 +72,7 @@ async def admin_usuarios(request: Request, msg: str = ""):
 
 
 @router.post("/usuarios/nuevo")
-async def crear_usuario(
+def crear_usuario(
     request: Request,
     nombre_completo: str = Form(""),
     rol: str = Form(""),
@@ -125,7 +131,7 @@ async def crear_usuario(
 
 
 @router.post("/usuarios/{user_id}/toggle-activo")
-async def toggle_activo(request: Request, user_id: int):
+def toggle_activo(request: Request, user_id: int):
     user = _require_superuser(request)
     if not user or user["rol"] != "admin":
         return RedirectResponse("/admin/usuarios?msg=sin_permiso", status_code=303)
@@ -138,6 +144,7 @@ async def toggle_activo(request: Request, user_id: int):
         new_val = 0 if row["activo"] else 1
         conn.execute("UPDATE usuarios SET activo = ? WHERE id = ?", (new_val, user_id))
         conn.commit()
+        cache_sesiones.invalidar_usuario(user_id)
         registrar_log(user, "toggle_activo", "usuarios",
                       f"'{row['nombre_completo']}' activo → {new_val}",
                       request.client.host if request.client else None)
@@ -146,7 +153,7 @@ async def toggle_activo(request: Request, user_id: int):
 
 
 @router.post("/usuarios/{user_id}/cambiar-password")
-async def cambiar_password(
+def cambiar_password(
     request: Request,
     user_id: int,
     nueva_password: str = Form(""),
@@ -164,6 +171,7 @@ async def cambiar_password(
     row = conn.execute("SELECT nombre_completo FROM usuarios WHERE id = ?", (user_id,)).fetchone()
     conn.execute("UPDATE usuarios SET password_hash = ? WHERE id = ?", (hashed, user_id))
     conn.commit()
+    cache_sesiones.invalidar_usuario(user_id)
     if row:
         registrar_log(user, "cambiar_password", "usuarios",
                       f"Contraseña actualizada para '{row['nombre_completo']}'",
@@ -173,12 +181,11 @@ async def cambiar_password(
 
 
 @router.post("/usuarios/{user_id}/permisos")
-async def actualizar_permisos(request: Request, user_id: int):
+def actualizar_permisos(request: Request, user_id: int, form: FormData = Depends(form_request)):
     user = _require_superuser(request)
     if not user:
         return RedirectResponse("/admin/usuarios?msg=sin_permiso", status_code=303)
 
-    form = await request.form()
     conn = get_db()
 
     target = conn.execute(
@@ -206,6 +213,7 @@ async def actualizar_permisos(request: Request, user_id: int):
         """, (user_id, modulo, puede_e, puede_v, puede_i))
 
     conn.commit()
+    cache_sesiones.invalidar_usuario(user_id)
     registrar_log(user, "actualizar_permisos", "usuarios",
                   f"Permisos de '{target['nombre_completo']}' actualizados",
                   request.client.host if request.client else None)
@@ -214,7 +222,7 @@ async def actualizar_permisos(request: Request, user_id: int):
 
 
 @router.post("/usuarios/{user_id}/tipo-contrato")
-async def cambiar_tipo_contrato(
+def cambiar_tipo_contrato(
     request: Request,
     user_id: int,
     tipo_contrato: str = Form(""),
@@ -242,7 +250,7 @@ async def cambiar_tipo_contrato(
 # ── Personal de la Oficina ────────────────────────────────────────────────────
 
 @router.post("/personal/nuevo")
-async def personal_nuevo(request: Request, nombre: str = Form(...)):
+def personal_nuevo(request: Request, nombre: str = Form(...)):
     user = _require_superuser(request)
     if not user:
         return RedirectResponse("/admin/usuarios?msg=sin_permiso", status_code=303)
@@ -263,7 +271,7 @@ async def personal_nuevo(request: Request, nombre: str = Form(...)):
 
 
 @router.post("/personal/{pid}/editar")
-async def personal_editar(request: Request, pid: int, nombre: str = Form(...)):
+def personal_editar(request: Request, pid: int, nombre: str = Form(...)):
     user = _require_superuser(request)
     if not user:
         return RedirectResponse("/admin/usuarios?msg=sin_permiso", status_code=303)
@@ -280,7 +288,7 @@ async def personal_editar(request: Request, pid: int, nombre: str = Form(...)):
 
 
 @router.post("/personal/{pid}/eliminar")
-async def personal_eliminar(request: Request, pid: int):
+def personal_eliminar(request: Request, pid: int):
     user = _require_superuser(request)
     if not user:
         return RedirectResponse("/admin/usuarios?msg=sin_permiso", status_code=303)
@@ -294,7 +302,7 @@ async def personal_eliminar(request: Request, pid: int):
 
 
 @router.post("/personal/{pid}/toggle-activo")
-async def personal_toggle_activo(request: Request, pid: int):
+def personal_toggle_activo(request: Request, pid: int):
     user = _require_superuser(request)
     if not user:
         return RedirectResponse("/admin/usuarios?msg=sin_permiso", status_code=303)
@@ -314,7 +322,7 @@ async def personal_toggle_activo(request: Request, pid: int):
 # ── Registro de actividad ─────────────────────────────────────────────────────
 
 @router.get("/logs", response_class=HTMLResponse)
-async def admin_logs(
+def admin_logs(
     request: Request,
     modulo: str = "",
     accion: str = "",
@@ -375,3 +383,73 @@ async def admin_logs(
         "acciones_list": acciones_list,
         "active": "admin_logs",
     })
+
+
+# ── Sesiones activas ──────────────────────────────────────────────────────────
+
+@router.get("/sesiones", response_class=HTMLResponse)
+def admin_sesiones(request: Request, msg: str = ""):
+    user = _require_superuser(request)
+    if not user:
+        return RedirectResponse("/?msg=sin_permiso", status_code=303)
+
+    conn = get_db()
+    rows = conn.execute("""
+        SELECT s.id, s.token, s.created_at, s.last_seen,
+               u.nombre_completo, u.username, u.rol
+        FROM sesiones s
+        JOIN usuarios u ON u.id = s.user_id
+        ORDER BY s.last_seen DESC
+    """).fetchall()
+    total_filas = len(rows)
+    conn.close()
+
+    sesiones = []
+    for r in rows:
+        visto = actividad.pendiente(r["token"]) or r["last_seen"]
+        if not sesion_vigente(r["created_at"], visto):
+            continue  # vencida: la borra el próximo barrido
+        sesiones.append({
+            "id": r["id"],
+            "nombre_completo": r["nombre_completo"],
+            "username": r["username"],
+            "rol": r["rol"],
+            "created_at": r["created_at"],
+            "last_seen": visto,
+            "vence": vencimiento(r["created_at"], visto),
+            "propia": r["token"] == request.cookies.get("ocdi_session"),
+        })
+    sesiones.sort(key=lambda x: x["last_seen"] or "", reverse=True)
+
+    return templates.TemplateResponse("admin_sesiones.html", {
+        "request": request,
+        "current_user": user,
+        "msg": msg,
+        "sesiones": sesiones,
+        "total_filas": total_filas,
+        "inactividad_min": int(SESION_INACTIVIDAD_MIN),
+        "maxima_horas": int(SESION_MAXIMA_HORAS),
+        "active": "admin_sesiones",
+    })
+
+
+@router.post("/sesiones/{sid}/cerrar")
+def admin_cerrar_sesion(request: Request, sid: int):
+    user = _require_superuser(request)
+    if not user:
+        return RedirectResponse("/?msg=sin_permiso", status_code=303)
+
+    conn = get_db()
+    row = conn.execute("""
+        SELECT s.token, u.nombre_completo FROM sesiones s
+        JOIN usuarios u ON u.id = s.user_id WHERE s.id = ?
+    """, (sid,)).fetchone()
+    conn.close()
+    if not row:
+        return RedirectResponse("/admin/sesiones?msg=no_encontrado", status_code=303)
+
+    descartar_sesion(row["token"])
+    registrar_log(user, "cerrar_sesion", "usuarios",
+                  f"Sesión de '{row['nombre_completo']}' cerrada por administración",
+                  request.client.host if request.client else None)
+    return RedirectResponse("/admin/sesiones?msg=sesion_cerrada", status_code=303)
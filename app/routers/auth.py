@@ -5,6 +5,7 @@ from app.template_utils import make_templates
 
 from app.database import get_db
 from app.auth_utils import verify_password, new_token, registrar_log, get_session_user
+from app.sesiones import actividad, cache_sesiones
 
 router = APIRouter()
 templates = make_templates(str(Path(__file__).parent.parent / "templates"))
@@ -13,7 +14,7 @@ templates = make_templates(str(Path(__file__).parent.parent / "templates"))
 # ── LOGIN ─────────────────────────────────────────────────────────────────────
 
 @router.get("/login", response_class=HTMLResponse)
-async def login_form(request: Request, next: str = "/", error: str = ""):
+def login_form(request: Request, next: str = "/", error: str = ""):
     # Si ya está autenticado, redirigir al portal
     if get_session_user(request):
         return RedirectResponse("/")
@@ -31,7 +32,7 @@ async def login_form(request: Request, next: str = "/", error: str = ""):
 
 
 @router.post("/login/abogado")
-async def login_abogado(
+def login_abogado(
     request: Request,
     user_id: int = Form(...),
     next: str = Form("/"),
@@ -65,7 +66,7 @@ async def login_abogado(
 
 
 @router.post("/login/credencial")
-async def login_credencial(
+def login_credencial(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
@@ -103,7 +104,7 @@ async def login_credencial(
 # ── LOGOUT ────────────────────────────────────────────────────────────────────
 
 @router.post("/logout")
-async def logout(request: Request):
+def logout(request: Request):
     token = request.cookies.get("ocdi_session")
     user = getattr(request.state, "user", None)
 
@@ -112,6 +113,8 @@ async def logout(request: Request):
         conn.execute("DELETE FROM sesiones WHERE token = ?", (token,))
         conn.commit()
         conn.close()
+        actividad.olvidar(token)
+        cache_sesiones.invalidar_token(token)
 
     if user:
         registrar_log(user, "logout", None, None,
@@ -123,6 +126,6 @@ async def logout(request: Request):
 
 
 @router.get("/logout")
-async def logout_get(request: Request):
+def logout_get(request: Request):
     """Permite cerrar sesión desde un enlace <a href="/logout">."""
-    return await logout(request)
+    return logout(request)
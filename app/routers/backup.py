@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Request, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
 from datetime import date
@@ -8,7 +8,9 @@ import io
 import zipfile
 
 from app.database import get_db
-from app.routers.correspondencia import _calcular_semaforo_row
+from app.estadisticas import cache_estadisticas
+from app.vencimientos import actualizar_plazos, actualizar_vencimientos
+from app.alertas import MODULOS as ALERTAS_MODULOS, refrescar_alertas
 from app.auth_utils import puede_escribir as _pw, registrar_log
 
 _MOD = "backup"
@@ -44,38 +46,45 @@ def _v(val):
 
 # ── Página principal ───────────────────────────────────────────────────────────
 
+def _totales(conn) -> dict:
+    return {
+        "total_base":          conn.execute("SELECT COUNT(*) FROM expedientes WHERE eliminado_en IS NULL").fetchone()[0],
+        "total_digitales":     conn.execute("SELECT COUNT(*) FROM exp_digitales WHERE eliminado_en IS NULL").fetchone()[0],
+        "total_sala":          conn.execute("SELECT COUNT(*) FROM sala_agenda").fetchone()[0],
+        "total_control_autos": conn.execute("SELECT COUNT(*) FROM control_autos_sustanciacion WHERE eliminado_en IS NULL").fetchone()[0],
+        "total_corr":          conn.execute("SELECT COUNT(*) FROM correspondencia WHERE eliminado_en IS NULL").fetchone()[0],
+        "total_sdqs":          conn.execute("SELECT COUNT(*) FROM sdqs WHERE eliminado_en IS NULL").fetchone()[0],
+        "total_seguimiento":   conn.execute("""
+            SELECT COUNT(*) FROM seguimiento_mensual sm
+            JOIN expedientes e ON e.id = sm.expediente_id
+            WHERE e.eliminado_en IS NULL
+        """).fetchone()[0],
+    }
+
+
+_TABLAS_TOTALES = (
+    "expedientes", "exp_digitales", "sala_agenda", "control_autos_sustanciacion",
+    "correspondencia", "sdqs", "seguimiento_mensual",
+)
+
+
 @router.get("/", response_class=HTMLResponse)
-async def backup_home(request: Request, msg: str = ""):
+def backup_home(request: Request, msg: str = ""):
     conn = get_db()
-    total_base          = conn.execute("SELECT COUNT(*) FROM expedientes WHERE eliminado_en IS NULL").fetchone()[0]
-    total_digitales     = conn.execute("SELECT COUNT(*) FROM exp_digitales WHERE eliminado_en IS NULL").fetchone()[0]
-    total_sala          = conn.execute("SELECT COUNT(*) FROM sala_agenda").fetchone()[0]
-    total_control_autos = conn.execute("SELECT COUNT(*) FROM control_autos_sustanciacion WHERE eliminado_en IS NULL").fetchone()[0]
-    total_corr          = conn.execute("SELECT COUNT(*) FROM correspondencia WHERE eliminado_en IS NULL").fetchone()[0]
-    total_sdqs          = conn.execute("SELECT COUNT(*) FROM sdqs WHERE eliminado_en IS NULL").fetchone()[0]
-    total_seguimiento   = conn.execute("""
-        SELECT COUNT(*) FROM seguimiento_mensual sm
-        JOIN expedientes e ON e.id = sm.expediente_id
-        WHERE e.eliminado_en IS NULL
-    """).fetchone()[0]
+    # Los conteos se recalculan solo si cambió alguna de las tablas
+    totales = cache_estadisticas.obtener(conn, "backup", _TABLAS_TOTALES, _totales)
     conn.close()
     return templates.TemplateResponse("backup.html", {
         "request": request,
         "msg": msg,
-        "total_base": total_base,
-        "total_digitales": total_digitales,
-        "total_sala": total_sala,
-        "total_control_autos": total_control_autos,
-        "total_corr": total_corr,
-        "total_sdqs": total_sdqs,
-        "total_seguimiento": total_seguimiento,
+        **totales,
     })
 
 
 # ── Página de restauración ────────────────────────────────────────────────────
 
 @router.get("/restauracion", response_class=HTMLResponse)
-async def backup_restauracion(request: Request):
+def backup_restauracion(request: Request):
     return templates.TemplateResponse("restauracion.html", {"request": request})
 
 
@@ -96,69 +105,92 @@ async def backup_ejecutar(request: Request):
     return RedirectResponse(f"/?backup={estado}&msg={urllib.parse.quote(mensaje)}", status_code=303)
 
 
-# ── Exportar Excel completo (3 hojas) ─────────────────────────────────────────
+# ── Hojas del respaldo ────────────────────────────────────────────────────────
+
+# Campos de Base Expedientes, en el orden de sus encabezados (Excel y ZIP)
+_CAMPOS_BASE = [
+    "n_expediente","anio","mes","medio_ingreso","n_radicado",
+    "fecha_radicado","abogado_asignado","entidad_origen",
+    "quejoso","asunto","impedimento","fecha_apertura_expediente",
+    "numero_auto_apertura_ind","fecha_auto_apertura_ind","tipo_expediente",
+    "tipologia","relacionado_siniestro","responsable_siniestro",
+    "relacionado_maltrato","relacionado_corrupcion","valores_institucionales",
+    "fecha_hechos_obs","fecha_hechos",
+    "fecha_ultima_act_indagacion","numero_auto_ultima_act_ind",
+    "fecha_apertura_investigacion","numero_auto_apertura_inv",
+    "nombre_investigado","cedula","perfil_investigado","area_origen_investigado",
+    "fecha_prorroga","numero_auto_prorroga","tiempo_prorroga",
+    "fecha_ultima_act_investigacion","numero_auto_ultima_act_inv",
+    "numero_auto_traslado","fecha_auto_traslado",
+    "numero_auto_acumulacion","fecha_auto_acumulacion","expediente_acumula",
+    "fecha_auto_archivo","numero_auto_archivo",
+    "fecha_auto_pliego_cargos","numero_auto_pliego_cargos",
+    "etapa_actual","estado_proceso","observaciones",
+    "created_by","created_at","updated_at",
+]
+
+_CAMPOS_SALA   = ["fecha", "franja", "titulo", "descripcion", "estado", "responsable", "created_at"]
+_CAMPOS_AUTOS  = ["expediente", "numero_auto", "fecha_auto", "asunto_auto", "abogado_responsable", "observaciones",
+                  "created_by", "created_at", "updated_at"]
+_HEADERS_SALA  = ["Fecha", "Franja", "Título", "Descripción", "Estado", "Responsable", "Fecha Creación"]
+_HEADERS_AUTOS = ["EXPEDIENTE", "NÚMERO DEL AUTO", "FECHA DEL AUTO", "ASUNTO AUTO", "ABOGADO RESPONSABLE",
+                  "OBSERVACIONES", "CREADO POR", "FECHA CREACIÓN", "ÚLTIMA ACTUALIZACIÓN"]
+# "AÑO EXPEDIENTE" es indispensable para reimportar correctamente: los
+# números de expediente se reinician cada año (ver H2/H11), así que
+# buscar solo por N. EXPEDIENTE al reimportar puede enlazar el
+# seguimiento al expediente equivocado si el número se repite en otro año.
+_HEADERS_SEG   = ["AÑO", "MES", "N. EXPEDIENTE", "AÑO EXPEDIENTE", "ABOGADO", "DESCRIPCIÓN ACTUACIÓN",
+                  "REGISTRADO POR", "FECHA REGISTRO"]
+_CAMPOS_SEG    = ["anio", "mes", "n_expediente", "exp_anio", "abogado_asignado", "descripcion",
+                  "created_by", "created_at"]
+
+_SQL_EXPEDIENTES = "SELECT * FROM expedientes WHERE eliminado_en IS NULL ORDER BY anio, n_expediente"
+_SQL_SALA        = "SELECT * FROM sala_agenda ORDER BY fecha, franja"
+_SQL_AUTOS       = "SELECT * FROM control_autos_sustanciacion WHERE eliminado_en IS NULL ORDER BY fecha_auto ASC, id ASC"
+_SQL_SDQS        = "SELECT * FROM sdqs WHERE eliminado_en IS NULL ORDER BY fecha_asignacion, id"
+_SQL_SEGUIMIENTO = """
+    SELECT s.anio, s.mes, e.n_expediente, e.anio AS exp_anio, e.abogado_asignado,
+           s.descripcion, s.created_by, s.created_at
+    FROM seguimiento_mensual s
+    JOIN expedientes e ON e.id = s.expediente_id
+    WHERE e.eliminado_en IS NULL
+    ORDER BY e.anio DESC, e.n_num"""
+
+
+def _consulta(sql: str):
+    """filas(conn) de una consulta fija."""
+    return lambda conn: conn.execute(sql)
+
+
+def _columnas(encabezados, campos, anchos=None, formato=None, ajustar=()):
+    """Columnas campo a campo; `ajustar` son las posiciones (desde 1) con texto ajustado."""
+    from app.excel import Columna
+    from openpyxl.styles import Alignment
+
+    ajustado = Alignment(vertical="center", wrap_text=True)
+    anchos = anchos or [None] * len(campos)
+    return [
+        Columna(h, c, w, formato=formato, alineacion=ajustado if i in ajustar else None)
+        for i, (h, c, w) in enumerate(zip(encabezados, campos, anchos), 1)
+    ]
+
+
+def _enlace(url_campo: str, campo: str):
+    return lambda d: d[url_campo] if d[url_campo] and d[campo] else None
+
+
+# ── Exportar Excel completo (7 hojas) ─────────────────────────────────────────
 
 @router.get("/exportar")
-async def backup_exportar():
+def backup_exportar():
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from app.excel import Hoja, respuesta_xlsx
     except ImportError:
         return RedirectResponse("/backup/?msg=error_openpyxl")
 
-    conn = get_db()
-    exps        = conn.execute("SELECT * FROM expedientes WHERE eliminado_en IS NULL ORDER BY anio, n_expediente").fetchall()
-    dig_exps    = conn.execute("SELECT * FROM exp_digitales WHERE eliminado_en IS NULL ORDER BY anio DESC, n_expediente ASC").fetchall()
-    dig_coms    = conn.execute(
-        "SELECT * FROM exp_comunicaciones ORDER BY exp_digital_id ASC, fecha_envio ASC, id ASC"
-    ).fetchall()
-    dig_revs    = conn.execute(
-        "SELECT exp_digital_id, MAX(fecha_revision) AS ultima_revision FROM exp_revisiones GROUP BY exp_digital_id"
-    ).fetchall()
-    sala        = conn.execute("SELECT * FROM sala_agenda ORDER BY fecha, franja").fetchall()
-    ctrl_autos  = conn.execute(
-        "SELECT * FROM control_autos_sustanciacion WHERE eliminado_en IS NULL ORDER BY fecha_auto ASC, id ASC"
-    ).fetchall()
-    sdqs_rows   = conn.execute("SELECT * FROM sdqs WHERE eliminado_en IS NULL ORDER BY fecha_asignacion, id").fetchall()
-    corr_rows   = conn.execute("""
-        SELECT c.*,
-               GROUP_CONCAT(rs.radicado, ' | ') AS radicados_salida,
-               GROUP_CONCAT(COALESCE(rs.url, ''), ' | ') AS radicados_urls
-        FROM correspondencia c
-        LEFT JOIN correspondencia_radicados_salida rs ON rs.correspondencia_id = c.id
-        WHERE c.eliminado_en IS NULL
-        GROUP BY c.id
-        ORDER BY c.fecha_ingreso DESC
-    """).fetchall()
-    seg_rows    = conn.execute("""
-        SELECT s.anio, s.mes, e.n_expediente, e.anio AS exp_anio, e.abogado_asignado,
-               s.descripcion, s.created_by, s.created_at
-        FROM seguimiento_mensual s
-        JOIN expedientes e ON e.id = s.expediente_id
-        WHERE e.eliminado_en IS NULL
-        ORDER BY e.anio DESC, CAST(e.n_expediente AS INTEGER)
-    """).fetchall()
-    conn.close()
-
-    ultima_rev = {r["exp_digital_id"]: r["ultima_revision"] for r in dig_revs}
-    coms_por_exp: dict[int, list] = {}
-    for c in dig_coms:
-        coms_por_exp.setdefault(c["exp_digital_id"], []).append(dict(c))
-
-    wb = openpyxl.Workbook()
-
-    h_font    = Font(bold=True, color="FFFFFF", size=10)
-    center    = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    alt_fill  = PatternFill("solid", fgColor="EBF1F8")
-    sub_fill  = PatternFill("solid", fgColor="dbeafe")
-    fill_base = PatternFill("solid", fgColor="1B4F8A")
-    fill_dig  = PatternFill("solid", fgColor="1e3a5f")
-    fill_sala = PatternFill("solid", fgColor="065F46")
+    from app.routers import digitales
 
     # ── Hoja 1: Base Expedientes ───────────────────────────────────────────────
-    ws1 = wb.active
-    ws1.title = "Base Expedientes"
-
     headers1 = [
         "N. EXPEDIENTE","AÑO","MES","MEDIO DE INGRESO","N. RADICADO",
         "FECHA RADICADO","ABOGADO ASIGNADO","ENTIDAD ORIGEN",
@@ -179,157 +211,31 @@ async def backup_exportar():
         "ETAPA ACTUAL","ESTADO DEL PROCESO","OBSERVACIONES",
         "CREADO POR","FECHA CREACIÓN","ÚLTIMA ACTUALIZACIÓN",
     ]
-    campos1 = [
-        "n_expediente","anio","mes","medio_ingreso","n_radicado",
-        "fecha_radicado","abogado_asignado","entidad_origen",
-        "quejoso","asunto","impedimento","fecha_apertura_expediente",
-        "numero_auto_apertura_ind","fecha_auto_apertura_ind","tipo_expediente",
-        "tipologia","relacionado_siniestro","responsable_siniestro",
-        "relacionado_maltrato","relacionado_corrupcion","valores_institucionales",
-        "fecha_hechos_obs","fecha_hechos",
-        "fecha_ultima_act_indagacion","numero_auto_ultima_act_ind",
-        "fecha_apertura_investigacion","numero_auto_apertura_inv",
-        "nombre_investigado","cedula","perfil_investigado","area_origen_investigado",
-        "fecha_prorroga","numero_auto_prorroga","tiempo_prorroga",
-        "fecha_ultima_act_investigacion","numero_auto_ultima_act_inv",
-        "numero_auto_traslado","fecha_auto_traslado",
-        "numero_auto_acumulacion","fecha_auto_acumulacion","expediente_acumula",
-        "fecha_auto_archivo","numero_auto_archivo",
-        "fecha_auto_pliego_cargos","numero_auto_pliego_cargos",
-        "etapa_actual","estado_proceso","observaciones",
-        "created_by","created_at","updated_at",
-    ]
-    for col_idx, h in enumerate(headers1, 1):
-        cell = ws1.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_base
-        cell.font = h_font
-        cell.alignment = center
-    ws1.row_dimensions[1].height = 40
-
-    for row_idx, row in enumerate(exps, 2):
-        d = dict(row)
-        fill = alt_fill if row_idx % 2 == 0 else None
-        for col_idx, campo in enumerate(campos1, 1):
-            cell = ws1.cell(row=row_idx, column=col_idx, value=d.get(campo))
-            cell.alignment = Alignment(vertical="center")
-            if fill:
-                cell.fill = fill
-
-    for col in ws1.columns:
-        max_len = max((len(str(c.value or "")) for c in col), default=10)
-        ws1.column_dimensions[col[0].column_letter].width = min(max_len + 4, 40)
-    ws1.freeze_panes = "A2"
+    hoja_base = Hoja(
+        "Base Expedientes", _columnas(headers1, _CAMPOS_BASE), _consulta(_SQL_EXPEDIENTES),
+        alto_encabezado=40, anchos_desde=("expedientes WHERE eliminado_en IS NULL", []),
+    )
 
     # ── Hoja 2: Exp. Digitales ─────────────────────────────────────────────────
-    ws2 = wb.create_sheet("Exp. Digitales")
-
-    headers2 = [
-        "N° Expediente", "Año", "Abogado", "Etapa", "Queja Inicial",
-        "Radicado Auto", "Nombre Auto", "Fecha Auto",
-        "Obs. Generales", "Última Revisión",
-        "Radicado Comunicación", "Dependencia", "Fecha Envío",
-        "Fecha Seguimiento", "Radicado Respuesta", "Fecha Respuesta",
-        "Responsable", "Observaciones Com.",
-    ]
-    for col_idx, h in enumerate(headers2, 1):
-        cell = ws2.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_dig
-        cell.font = h_font
-        cell.alignment = center
-    ws2.row_dimensions[1].height = 30
-
-    for exp in dig_exps:
-        ed = dict(exp)
-        exp_coms = coms_por_exp.get(ed["id"], [])
-        primera = exp_coms[0] if exp_coms else {}
-        row = [
-            ed.get("n_expediente"), ed.get("anio"), ed.get("abogado"), ed.get("etapa"),
-            ed.get("queja_inicial"), ed.get("radicado_auto"), ed.get("nombre_auto"), ed.get("fecha_auto"),
-            ed.get("observaciones"), ultima_rev.get(ed["id"]),
-            primera.get("radicado_comunicacion"), primera.get("dependencia"),
-            primera.get("fecha_envio"), primera.get("fecha_seguimiento"),
-            primera.get("radicado_respuesta"), primera.get("fecha_respuesta"),
-            primera.get("responsable"), primera.get("observaciones"),
-        ]
-        ws2.append(row)
-        for com in exp_coms[1:]:
-            sub_row = [None] * 10 + [
-                com.get("radicado_comunicacion"), com.get("dependencia"),
-                com.get("fecha_envio"), com.get("fecha_seguimiento"),
-                com.get("radicado_respuesta"), com.get("fecha_respuesta"),
-                com.get("responsable"), com.get("observaciones"),
-            ]
-            ws2.append(sub_row)
-            for cell in ws2[ws2.max_row]:
-                cell.fill = sub_fill
-
-    col_widths2 = [15, 6, 22, 20, 14, 20, 30, 14, 40, 22, 22, 25, 14, 16, 22, 14, 20, 40]
-    for i, w in enumerate(col_widths2, 1):
-        ws2.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws2.freeze_panes = "A2"
+    hoja_digitales = Hoja(
+        "Exp. Digitales", digitales._columnas_exportar(observaciones_com="Observaciones Com."),
+        digitales._filas_exportar, color="1e3a5f", alterna=None, alineacion=None,
+        relleno_fila=lambda d, n: "dbeafe" if d["sub"] else None,
+    )
 
     # ── Hoja 3: Sala de Audiencias ─────────────────────────────────────────────
-    ws3 = wb.create_sheet("Sala de Audiencias")
-
-    headers3 = ["Fecha", "Franja", "Título", "Descripción", "Estado", "Responsable", "Fecha Creación"]
-    campos3   = ["fecha", "franja", "titulo", "descripcion", "estado", "responsable", "created_at"]
-
-    for col_idx, h in enumerate(headers3, 1):
-        cell = ws3.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_sala
-        cell.font = h_font
-        cell.alignment = center
-    ws3.row_dimensions[1].height = 30
-
-    for row_idx, row in enumerate(sala, 2):
-        d = dict(row)
-        fill = alt_fill if row_idx % 2 == 0 else None
-        for col_idx, campo in enumerate(campos3, 1):
-            cell = ws3.cell(row=row_idx, column=col_idx, value=d.get(campo))
-            cell.alignment = Alignment(vertical="center")
-            if fill:
-                cell.fill = fill
-
-    col_widths3 = [14, 16, 30, 40, 12, 25, 20]
-    for i, w in enumerate(col_widths3, 1):
-        ws3.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws3.freeze_panes = "A2"
+    hoja_sala = Hoja(
+        "Sala de Audiencias", _columnas(_HEADERS_SALA, _CAMPOS_SALA, [14, 16, 30, 40, 12, 25, 20]),
+        _consulta(_SQL_SALA), color="065F46",
+    )
 
     # ── Hoja 4: Control de Autos de Sustanciación ─────────────────────────────
-    ws4 = wb.create_sheet("Control Autos")
-    fill_autos = PatternFill("solid", fgColor="2E7D32")
-
-    headers4 = ["EXPEDIENTE", "NÚMERO DEL AUTO", "FECHA DEL AUTO", "ASUNTO AUTO", "ABOGADO RESPONSABLE", "OBSERVACIONES",
-                "CREADO POR", "FECHA CREACIÓN", "ÚLTIMA ACTUALIZACIÓN"]
-    campos4   = ["expediente", "numero_auto", "fecha_auto", "asunto_auto", "abogado_responsable", "observaciones",
-                "created_by", "created_at", "updated_at"]
-
-    for col_idx, h in enumerate(headers4, 1):
-        cell = ws4.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_autos
-        cell.font = h_font
-        cell.alignment = center
-    ws4.row_dimensions[1].height = 30
-
-    for row_idx, row in enumerate(ctrl_autos, 2):
-        d = dict(row)
-        fill = alt_fill if row_idx % 2 == 0 else None
-        for col_idx, campo in enumerate(campos4, 1):
-            cell = ws4.cell(row=row_idx, column=col_idx, value=d.get(campo))
-            cell.alignment = Alignment(vertical="center")
-            if fill:
-                cell.fill = fill
-
-    col_widths4 = [18, 16, 16, 48, 22, 30, 20, 20, 20]
-    for i, w in enumerate(col_widths4, 1):
-        ws4.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws4.freeze_panes = "A2"
+    hoja_autos = Hoja(
+        "Control Autos", _columnas(_HEADERS_AUTOS, _CAMPOS_AUTOS, [18, 16, 16, 48, 22, 30, 20, 20, 20]),
+        _consulta(_SQL_AUTOS), color="2E7D32",
+    )
 
     # ── Hoja 5: SDQS ─────────────────────────────────────────────────────────
-    ws5 = wb.create_sheet("SDQS")
-    fill_sdqs = PatternFill("solid", fgColor="7B3F00")
-    link_font = Font(color="0563C1", underline="single")
-
     headers5 = [
         "MES", "FECHA ASIGNACION", "SDQS", "URL SDQS", "FECHA VENCIMIENTO",
         "QUEJOSO", "CORREO", "TEMA", "COMPETENCIA OCDI", "BPM", "RESPONSABLE",
@@ -344,38 +250,17 @@ async def backup_exportar():
         "estado_proceso", "hecho_corrupto", "valor_institucional", "tipologia",
         "created_by", "created_at", "updated_at",
     ]
-    for col_idx, h in enumerate(headers5, 1):
-        cell = ws5.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_sdqs
-        cell.font = h_font
-        cell.alignment = center
-    ws5.row_dimensions[1].height = 30
-
-    for row_idx, row in enumerate(sdqs_rows, 2):
-        d = dict(row)
-        fill = alt_fill if row_idx % 2 == 0 else None
-        for col_idx, campo in enumerate(campos5, 1):
-            cell = ws5.cell(row=row_idx, column=col_idx, value=d.get(campo))
-            cell.alignment = Alignment(vertical="center")
-            if fill:
-                cell.fill = fill
-        if d.get("url_sdqs") and d.get("sdqs"):
-            c = ws5.cell(row_idx, 3)
-            c.hyperlink = d["url_sdqs"]
-            c.font = link_font
-        if d.get("url_rad_salida") and d.get("rad_salida"):
-            c = ws5.cell(row_idx, 12)
-            c.hyperlink = d["url_rad_salida"]
-            c.font = link_font
-
-    col_widths5 = [10, 16, 14, 40, 16, 28, 28, 50, 14, 14, 28, 16, 40, 16, 40, 22, 22, 22, 20, 20, 20, 20]
-    for i, w in enumerate(col_widths5, 1):
-        ws5.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws5.freeze_panes = "A2"
+    cols5 = _columnas(headers5, campos5,
+                      [10, 16, 14, 40, 16, 28, 28, 50, 14, 14, 28, 16, 40, 16, 40, 22, 22, 22, 20, 20, 20, 20])
+    cols5[2].enlace = _enlace("url_sdqs", "sdqs")
+    cols5[11].enlace = _enlace("url_rad_salida", "rad_salida")
+    hoja_sdqs = Hoja("SDQS", cols5, _consulta(_SQL_SDQS), color="7B3F00")
 
     # ── Hoja 6: Correspondencia ───────────────────────────────────────────────
-    ws6 = wb.create_sheet("Correspondencia")
-    fill_corr6 = PatternFill("solid", fgColor="1B4F8A")
+    from app.routers.correspondencia import _filas_exportar as filas_correspondencia
+
+    def recortar(campo, largo):
+        return lambda d: d[campo][:largo] if d[campo] else None
 
     headers6 = [
         "AÑO", "MES", "FECHA INGRESO", "N. RADICADO", "ENTIDAD",
@@ -386,89 +271,39 @@ async def backup_exportar():
         "TIPO RESPUESTA", "TRÁMITE DE SALIDA",
         "FECHA CREACIÓN", "ÚLTIMA ACTUALIZACIÓN",
     ]
-    for col_idx, h in enumerate(headers6, 1):
-        cell = ws6.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_corr6
-        cell.font = h_font
-        cell.alignment = center
-    ws6.row_dimensions[1].height = 30
-
-    for row_idx, row in enumerate(corr_rows, 2):
-        d = dict(row)
-        fill = alt_fill if row_idx % 2 == 0 else None
-        vals6 = [
-            d.get("anio"), d.get("mes"),
-            d.get("fecha_ingreso")[:10] if d.get("fecha_ingreso") else None,
-            d.get("n_radicado"), d.get("origen"), d.get("correo_remitente"), d.get("asunto"),
-            d.get("sinproc_personeria"), d.get("tipo_requerimiento"), d.get("termino_dias"),
-            d.get("tipo_documento"), d.get("responsable"), d.get("caso_bmp"),
-            d.get("radicados_salida"),
-            d.get("radicados_urls"),
-            d.get("fecha_radicado_salida"),
-            d.get("tipo_respuesta"), d.get("tramite_salida"),
-            d.get("created_at")[:16] if d.get("created_at") else None,
-            d.get("updated_at")[:16] if d.get("updated_at") else None,
-        ]
-        for col_idx, v in enumerate(vals6, 1):
-            cell = ws6.cell(row=row_idx, column=col_idx, value=v)
-            cell.alignment = Alignment(vertical="center", wrap_text=(col_idx in (5, 7)))
-            if fill:
-                cell.fill = fill
-
-    col_widths6 = [6, 12, 20, 18, 30, 30, 40, 20, 40, 10, 18, 28, 10, 30, 50, 20, 25, 30, 20, 20]
-    for i, w in enumerate(col_widths6, 1):
-        ws6.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws6.freeze_panes = "A2"
+    campos6 = [
+        "anio", "mes", recortar("fecha_ingreso", 10),
+        "n_radicado", "origen", "correo_remitente", "asunto",
+        "sinproc_personeria", "tipo_requerimiento", "termino_dias",
+        "tipo_documento", "responsable", "caso_bmp",
+        "radicados_salida", "radicados_urls", "fecha_radicado_salida",
+        "tipo_respuesta", "tramite_salida",
+        recortar("created_at", 16), recortar("updated_at", 16),
+    ]
+    hoja_corr = Hoja(
+        "Correspondencia",
+        _columnas(headers6, campos6, [6, 12, 20, 18, 30, 30, 40, 20, 40, 10, 18, 28, 10, 30, 50, 20, 25, 30, 20, 20],
+                  ajustar=(5, 7)),
+        filas_correspondencia,
+    )
 
     # ── Hoja 7: Seguimiento Mensual ───────────────────────────────────────────
-    ws7 = wb.create_sheet("Seguimiento Mensual")
-    fill_seg7 = PatternFill("solid", fgColor="0D3060")
-
-    # "AÑO EXPEDIENTE" es indispensable para reimportar correctamente: los
-    # números de expediente se reinician cada año (ver H2/H11), así que
-    # buscar solo por N. EXPEDIENTE al reimportar puede enlazar el
-    # seguimiento al expediente equivocado si el número se repite en otro año.
-    headers7 = ["AÑO", "MES", "N. EXPEDIENTE", "AÑO EXPEDIENTE", "ABOGADO", "DESCRIPCIÓN ACTUACIÓN", "REGISTRADO POR", "FECHA REGISTRO"]
-    for col_idx, h in enumerate(headers7, 1):
-        cell = ws7.cell(row=1, column=col_idx, value=h)
-        cell.fill = fill_seg7
-        cell.font = h_font
-        cell.alignment = center
-    ws7.row_dimensions[1].height = 30
-
-    for row_idx, row in enumerate(seg_rows, 2):
-        d = dict(row)
-        fill = alt_fill if row_idx % 2 == 0 else None
-        vals7 = [d.get("anio"), d.get("mes"), d.get("n_expediente"), d.get("exp_anio"),
-                 d.get("abogado_asignado"), d.get("descripcion"),
-                 d.get("created_by"), d.get("created_at")]
-        for col_idx, v in enumerate(vals7, 1):
-            cell = ws7.cell(row=row_idx, column=col_idx, value=v)
-            cell.alignment = Alignment(vertical="center", wrap_text=(col_idx == 6))
-            if fill:
-                cell.fill = fill
-
-    col_widths7 = [10, 14, 16, 12, 28, 60, 24, 20]
-    for i, w in enumerate(col_widths7, 1):
-        ws7.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws7.freeze_panes = "A2"
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    hoja_seg = Hoja(
+        "Seguimiento Mensual", _columnas(_HEADERS_SEG, _CAMPOS_SEG, [10, 14, 16, 12, 28, 60, 24, 20], ajustar=(6,)),
+        _consulta(_SQL_SEGUIMIENTO), color="0D3060",
+    )
 
     hoy = date.today().strftime("%Y%m%d")
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=OCDI_Respaldo_Completo_{hoy}.xlsx"},
+    return respuesta_xlsx(
+        [hoja_base, hoja_digitales, hoja_sala, hoja_autos, hoja_sdqs, hoja_corr, hoja_seg],
+        f"OCDI_Respaldo_Completo_{hoy}.xlsx",
     )
 
 
 # ── Importar Excel completo (reemplaza todo) ───────────────────────────────────
 
 @router.post("/importar")
-async def backup_importar(request: Request, archivo: UploadFile = File(...)):
+def backup_importar(request: Request, archivo: UploadFile = File(...)):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/backup/?msg=sin_permiso", status_code=303)
@@ -477,7 +312,7 @@ async def backup_importar(request: Request, archivo: UploadFile = File(...)):
     except ImportError:
         return RedirectResponse("/backup/?msg=error_openpyxl", status_code=303)
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     if not contenido:
         return RedirectResponse("/backup/?msg=error_vacio", status_code=303)
 
@@ -526,6 +361,7 @@ async def backup_importar(request: Request, archivo: UploadFile = File(...)):
                     vals,
                 )
                 stats["base"] += 1
+            actualizar_vencimientos(conn)
 
         # ── Hoja 2: Exp. Digitales ─────────────────────────────────────────────
         if "Exp. Digitales" in wb.sheetnames:
@@ -810,6 +646,9 @@ async def backup_importar(request: Request, archivo: UploadFile = File(...)):
                 ])
                 stats["seg"] += 1
 
+        actualizar_plazos(conn)
+        for modulo in ALERTAS_MODULOS:
+            refrescar_alertas(conn, modulo)
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -824,387 +663,114 @@ async def backup_importar(request: Request, archivo: UploadFile = File(...)):
 # ── Backup ZIP completo (4 carpetas, 4 Excel) ─────────────────────────────────
 
 @router.get("/zip")
-async def backup_zip():
+def backup_zip():
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from app.excel import Hoja, escribir_xlsx, na, respuesta_stream
     except ImportError:
         return RedirectResponse("/backup/?msg=error_openpyxl")
 
+    from app.routers import correspondencia, digitales
+    from app.routers.sdqs import _calcular_semaforo_sdqs
+
     hoy = date.today().strftime("%Y%m%d")
-    conn = get_db()
 
-    # ── Cargar todos los datos ────────────────────────────────────────────────
-    exps      = conn.execute("SELECT * FROM expedientes WHERE eliminado_en IS NULL ORDER BY anio, n_expediente").fetchall()
-    dig_exps  = conn.execute("SELECT * FROM exp_digitales WHERE eliminado_en IS NULL ORDER BY anio DESC, n_expediente ASC").fetchall()
-    dig_coms  = conn.execute(
-        "SELECT * FROM exp_comunicaciones ORDER BY exp_digital_id ASC, fecha_envio ASC, id ASC"
-    ).fetchall()
-    dig_revs  = conn.execute(
-        "SELECT exp_digital_id, MAX(fecha_revision) AS ultima_revision FROM exp_revisiones GROUP BY exp_digital_id"
-    ).fetchall()
-    sala         = conn.execute("SELECT * FROM sala_agenda ORDER BY fecha, franja").fetchall()
-    ctrl_autos_z = conn.execute(
-        "SELECT * FROM control_autos_sustanciacion WHERE eliminado_en IS NULL ORDER BY fecha_auto ASC, id ASC"
-    ).fetchall()
-    corr_rows_raw = conn.execute("""
-        SELECT c.*,
-               GROUP_CONCAT(rs.radicado, ' | ') AS radicados_salida,
-               GROUP_CONCAT(COALESCE(rs.url, ''), ' | ') AS radicados_urls
-        FROM correspondencia c
-        LEFT JOIN correspondencia_radicados_salida rs ON rs.correspondencia_id = c.id
-        WHERE c.eliminado_en IS NULL
-        GROUP BY c.id
-        ORDER BY c.fecha_ingreso DESC
-    """).fetchall()
-    corr_rows = [_calcular_semaforo_row(dict(r)) for r in corr_rows_raw]
-    sdqs_rows    = conn.execute("SELECT * FROM sdqs WHERE eliminado_en IS NULL ORDER BY fecha_asignacion, id").fetchall()
-    seg_rows     = conn.execute("""
-        SELECT s.anio, s.mes, e.n_expediente, e.anio AS exp_anio, e.abogado_asignado,
-               s.descripcion, s.created_by, s.created_at
-        FROM seguimiento_mensual s
-        JOIN expedientes e ON e.id = s.expediente_id
-        WHERE e.eliminado_en IS NULL
-        ORDER BY e.anio DESC, CAST(e.n_expediente AS INTEGER), s.anio DESC,
+    # ── 01 Base Expedientes + Seguimiento Mensual ─────────────────────────────
+    headers_base = [
+        "N. EXPEDIENTE","AÑO","MES","MEDIO DE INGRESO","N. RADICADO",
+        "FECHA RADICADO","ABOGADO ASIGNADO","ENTIDAD ORIGEN","QUEJOSO","ASUNTO",
+        "IMPEDIMENTO","FECHA APERTURA EXPEDIENTE","N. AUTO APERTURA IND.",
+        "FECHA AUTO APERTURA IND.","TIPO EXPEDIENTE","TIPOLOGÍA",
+        "RELACIONADO SINIESTRO","RESPONSABLE SINIESTRO","RELACIONADO MALTRATO",
+        "RELACIONADO CORRUPCIÓN","VALORES INSTITUCIONALES",
+        "FECHA HECHOS (OBS)","FECHA HECHOS","F. ÚLTIMA ACT. INDAGACIÓN",
+        "N. AUTO ÚLTIMA ACT. IND.","F. APERTURA INVESTIGACIÓN","N. AUTO APERTURA INV.",
+        "NOMBRE INVESTIGADO","CÉDULA","PERFIL INVESTIGADO","ÁREA ORIGEN INVESTIGADO",
+        "FECHA PRÓRROGA","N. AUTO PRÓRROGA","TIEMPO PRÓRROGA",
+        "F. ÚLTIMA ACT. INVESTIGACIÓN","N. AUTO ÚLTIMA ACT. INV.",
+        "N. AUTO TRASLADO","F. AUTO TRASLADO","N. AUTO ACUMULACIÓN","F. AUTO ACUMULACIÓN",
+        "EXPEDIENTE ACUMULA","F. AUTO ARCHIVO","N. AUTO ARCHIVO",
+        "F. AUTO PLIEGO CARGOS","N. AUTO PLIEGO CARGOS",
+        "ETAPA ACTUAL","ESTADO DEL PROCESO","OBSERVACIONES",
+        "CREADO POR","FECHA CREACIÓN","ÚLTIMA ACTUALIZACIÓN",
+    ]
+    hoja_base = Hoja(
+        "Base Expedientes", _columnas(headers_base, _CAMPOS_BASE, formato=na), _consulta(_SQL_EXPEDIENTES),
+        alto_encabezado=40, anchos_desde=("expedientes WHERE eliminado_en IS NULL", []),
+    )
+    # Seguimiento Mensual pertenece a Base Expedientes
+    hoja_seg = Hoja(
+        "Seguimiento Mensual",
+        _columnas(_HEADERS_SEG, _CAMPOS_SEG, [10, 14, 16, 12, 28, 60, 24, 20], formato=na, ajustar=(6,)),
+        _consulta(_SQL_SEGUIMIENTO + """, s.anio DESC,
                  CASE s.mes
                    WHEN 'ENERO' THEN 1 WHEN 'FEBRERO' THEN 2 WHEN 'MARZO' THEN 3
                    WHEN 'ABRIL' THEN 4 WHEN 'MAYO' THEN 5 WHEN 'JUNIO' THEN 6
                    WHEN 'JULIO' THEN 7 WHEN 'AGOSTO' THEN 8 WHEN 'SEPTIEMBRE' THEN 9
                    WHEN 'OCTUBRE' THEN 10 WHEN 'NOVIEMBRE' THEN 11 WHEN 'DICIEMBRE' THEN 12
-                   ELSE 13 END
-    """).fetchall()
-    conn.close()
+                   ELSE 13 END"""),
+        color="0D3060",
+    )
 
-    ultima_rev = {r["exp_digital_id"]: r["ultima_revision"] for r in dig_revs}
-    coms_por_exp: dict[int, list] = {}
-    for c in dig_coms:
-        coms_por_exp.setdefault(c["exp_digital_id"], []).append(dict(c))
-
-    h_font   = Font(bold=True, color="FFFFFF", size=10)
-    center   = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    alt_fill = PatternFill("solid", fgColor="EBF1F8")
-    sub_fill = PatternFill("solid", fgColor="dbeafe")
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    def make_wb_base() -> io.BytesIO:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Base Expedientes"
-        fill = PatternFill("solid", fgColor="1B4F8A")
-        headers = [
-            "N. EXPEDIENTE","AÑO","MES","MEDIO DE INGRESO","N. RADICADO",
-            "FECHA RADICADO","ABOGADO ASIGNADO","ENTIDAD ORIGEN","QUEJOSO","ASUNTO",
-            "IMPEDIMENTO","FECHA APERTURA EXPEDIENTE","N. AUTO APERTURA IND.",
-            "FECHA AUTO APERTURA IND.","TIPO EXPEDIENTE","TIPOLOGÍA",
-            "RELACIONADO SINIESTRO","RESPONSABLE SINIESTRO","RELACIONADO MALTRATO",
-            "RELACIONADO CORRUPCIÓN","VALORES INSTITUCIONALES",
-            "FECHA HECHOS (OBS)","FECHA HECHOS","F. ÚLTIMA ACT. INDAGACIÓN",
-            "N. AUTO ÚLTIMA ACT. IND.","F. APERTURA INVESTIGACIÓN","N. AUTO APERTURA INV.",
-            "NOMBRE INVESTIGADO","CÉDULA","PERFIL INVESTIGADO","ÁREA ORIGEN INVESTIGADO",
-            "FECHA PRÓRROGA","N. AUTO PRÓRROGA","TIEMPO PRÓRROGA",
-            "F. ÚLTIMA ACT. INVESTIGACIÓN","N. AUTO ÚLTIMA ACT. INV.",
-            "N. AUTO TRASLADO","F. AUTO TRASLADO","N. AUTO ACUMULACIÓN","F. AUTO ACUMULACIÓN",
-            "EXPEDIENTE ACUMULA","F. AUTO ARCHIVO","N. AUTO ARCHIVO",
-            "F. AUTO PLIEGO CARGOS","N. AUTO PLIEGO CARGOS",
-            "ETAPA ACTUAL","ESTADO DEL PROCESO","OBSERVACIONES",
-            "CREADO POR","FECHA CREACIÓN","ÚLTIMA ACTUALIZACIÓN",
-        ]
-        campos = [
-            "n_expediente","anio","mes","medio_ingreso","n_radicado",
-            "fecha_radicado","abogado_asignado","entidad_origen","quejoso","asunto",
-            "impedimento","fecha_apertura_expediente","numero_auto_apertura_ind",
-            "fecha_auto_apertura_ind","tipo_expediente","tipologia",
-            "relacionado_siniestro","responsable_siniestro","relacionado_maltrato",
-            "relacionado_corrupcion","valores_institucionales",
-            "fecha_hechos_obs","fecha_hechos","fecha_ultima_act_indagacion",
-            "numero_auto_ultima_act_ind","fecha_apertura_investigacion","numero_auto_apertura_inv",
-            "nombre_investigado","cedula","perfil_investigado","area_origen_investigado",
-            "fecha_prorroga","numero_auto_prorroga","tiempo_prorroga",
-            "fecha_ultima_act_investigacion","numero_auto_ultima_act_inv",
-            "numero_auto_traslado","fecha_auto_traslado","numero_auto_acumulacion","fecha_auto_acumulacion",
-            "expediente_acumula","fecha_auto_archivo","numero_auto_archivo",
-            "fecha_auto_pliego_cargos","numero_auto_pliego_cargos",
-            "etapa_actual","estado_proceso","observaciones",
-            "created_by","created_at","updated_at",
-        ]
-        for ci, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=ci, value=h)
-            cell.fill = fill; cell.font = h_font; cell.alignment = center
-        ws.row_dimensions[1].height = 40
-        for ri, row in enumerate(exps, 2):
-            d = dict(row)
-            rf = alt_fill if ri % 2 == 0 else None
-            for ci, campo in enumerate(campos, 1):
-                cell = ws.cell(row=ri, column=ci, value=_na(d.get(campo)))
-                cell.alignment = Alignment(vertical="center")
-                if rf: cell.fill = rf
-        for col in ws.columns:
-            ml = max((len(str(c.value or "")) for c in col), default=10)
-            ws.column_dimensions[col[0].column_letter].width = min(ml + 4, 40)
-        ws.freeze_panes = "A2"
-
-        # Hoja 2: Seguimiento Mensual (pertenece a Base Expedientes)
-        ws_seg = wb.create_sheet("Seguimiento Mensual")
-        fill_seg = PatternFill("solid", fgColor="0D3060")
-        seg_headers = ["AÑO", "MES", "N. EXPEDIENTE", "AÑO EXPEDIENTE", "ABOGADO", "DESCRIPCIÓN ACTUACIÓN", "REGISTRADO POR", "FECHA REGISTRO"]
-        for ci, h in enumerate(seg_headers, 1):
-            cell = ws_seg.cell(row=1, column=ci, value=h)
-            cell.fill = fill_seg; cell.font = h_font; cell.alignment = center
-        ws_seg.row_dimensions[1].height = 30
-        for ri, row in enumerate(seg_rows, 2):
-            d = dict(row)
-            rf = alt_fill if ri % 2 == 0 else None
-            vals = [_na(d.get("anio")), _na(d.get("mes")), _na(d.get("n_expediente")), _na(d.get("exp_anio")),
-                    _na(d.get("abogado_asignado")), _na(d.get("descripcion")),
-                    _na(d.get("created_by")), _na(d.get("created_at"))]
-            for ci, v in enumerate(vals, 1):
-                cell = ws_seg.cell(row=ri, column=ci, value=v)
-                cell.alignment = Alignment(vertical="center", wrap_text=(ci == 6))
-                if rf: cell.fill = rf
-        for i, w in enumerate([10, 14, 16, 12, 28, 60, 24, 20], 1):
-            ws_seg.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-        ws_seg.freeze_panes = "A2"
-
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return buf
-
-    def make_wb_sdqs() -> io.BytesIO:
-        from app.routers.sdqs import _calcular_semaforo_sdqs
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "SDQS"
-        fill = PatternFill("solid", fgColor="7B3F00")
-        link_font_sdqs = Font(color="0563C1", underline="single", size=10)
-        headers = [
-            "MES","FECHA ASIGNACION","SDQS","URL SDQS","FECHA VENCIMIENTO","ESTADO DIAS",
-            "QUEJOSO","CORREO","TEMA",
-            "COMPETENCIA OCDI","BPM","RESPONSABLE","RAD SALIDA","URL RAD SALIDA","FECHA RESPUESTA",
-            "OBSERVACIONES","ESTADO PROCESO","HECHO CORRUPTO","VALOR INSTITUCIONAL",
-            "TIPOLOGIA","CREADO POR","FECHA CREACIÓN","ÚLTIMA ACTUALIZACIÓN",
-        ]
-        campos = [
-            "mes","fecha_asignacion","sdqs","url_sdqs","fecha_vencimiento","estado_dias",
-            "quejoso","correo","tema",
-            "competencia_ocdi","bpm","responsable","rad_salida","url_rad_salida","fecha_respuesta",
-            "observaciones","estado_proceso","hecho_corrupto","valor_institucional",
-            "tipologia","created_by","created_at","updated_at",
-        ]
-        SEM_COLORS = {"verde": "D4EDDA", "amarillo": "FFF3CD", "rojo": "F8D7DA"}
-        for ci, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=ci, value=h)
-            cell.fill = fill; cell.font = h_font; cell.alignment = center
-        ws.row_dimensions[1].height = 30
-        for ri, row in enumerate(sdqs_rows, 2):
-            d = _calcular_semaforo_sdqs(dict(row))
-            rf = alt_fill if ri % 2 == 0 else None
-            for ci, campo in enumerate(campos, 1):
-                cell = ws.cell(row=ri, column=ci, value=_na(d.get(campo)))
-                cell.alignment = Alignment(vertical="center", wrap_text=(ci == 9))
-                if rf: cell.fill = rf
-            sem = d.get("semaforo_sdqs")
-            if sem and sem in SEM_COLORS:
-                ws.cell(ri, 6).fill = PatternFill("solid", fgColor=SEM_COLORS[sem])
-            url_sdqs_val = d.get("url_sdqs")
-            if url_sdqs_val and d.get("sdqs"):
-                c = ws.cell(ri, 3)
-                c.hyperlink = url_sdqs_val
-                c.font = link_font_sdqs
-            url = d.get("url_rad_salida")
-            if url and d.get("rad_salida"):
-                c = ws.cell(ri, 13)
-                c.hyperlink = url
-                c.font = link_font_sdqs
-        col_widths = [10, 16, 14, 40, 16, 12, 28, 28, 50, 14, 14, 28, 16, 40, 16, 40, 22, 22, 22, 20, 20, 20, 20]
-        for i, w in enumerate(col_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-        ws.freeze_panes = "A2"
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return buf
-
-    def make_wb_correspondencia() -> io.BytesIO:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "CORRESPONDENCIA"
-        fill = PatternFill("solid", fgColor="1B4F8A")
-        link_font = Font(color="0563C1", underline="single", size=10)
-        headers = [
-            "AÑO", "MES", "FECHA INGRESO DE OFICIO", "N. RADICADOS",
-            "ENTIDAD", "CORREO REMITENTE", "ASUNTO", "NUMERO SINPROC PERSONERIA",
-            "TIPO DE REQUERIMIENTO", "TERMINO (DIAS)", "TIPO DE DOCUMENTO",
-            "RESPONSABLE", "CASO BMP", "N RADICADO SALIDA",
-            "FECHA RADICADO DE SALIDA", "TIPO DE RESPUESTA", "TRÁMITE DE SALIDA",
-            "FECHA DE VENCIMIENTO LEGAL",
-            "FECHA REVISIÓN SUGERIDA (−2 días hábiles)",
-            "DÍAS TRANSCURRIDOS",
-        ]
-        for ci, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=ci, value=h)
-            cell.fill = fill; cell.font = h_font; cell.alignment = center
-        ws.row_dimensions[1].height = 36
-        for ri, d in enumerate(corr_rows, 2):
-            rf = alt_fill if ri % 2 == 0 else None
-            urls_str = d.get("radicados_urls") or ""
-            urls_list = [u.strip() for u in urls_str.split(" | ")] if urls_str.strip() else []
-            first_url = next((u for u in urls_list if u), None)
-            vals = [
-                _na(d.get("anio")), _na(d.get("mes")),
-                _na(d.get("fecha_ingreso")[:10] if d.get("fecha_ingreso") else None),
-                _na(d.get("n_radicado")), _na(d.get("origen")), _na(d.get("correo_remitente")), _na(d.get("asunto")),
-                _na(d.get("sinproc_personeria")), _na(d.get("tipo_requerimiento")),
-                d.get("termino_dias") if d.get("termino_dias") is not None else "N/A",
-                _na(d.get("tipo_documento")), _na(d.get("responsable")), _na(d.get("caso_bmp")),
-                _na(d.get("radicados_salida")),      # col 14 — N RADICADO SALIDA
-                _na(d.get("fecha_radicado_salida")[:10] if d.get("fecha_radicado_salida") else None),
-                _na(d.get("tipo_respuesta")), _na(d.get("tramite_salida")),
-                _na(d.get("fecha_vencimiento")),     # col 18 — plazo legal real
-                _na(d.get("fecha_termino_respuesta")),  # col 19 — fecha revisión sugerida
-                d.get("dias_transcurridos") if d.get("dias_transcurridos") is not None else "N/A",
-            ]
-            for ci, v in enumerate(vals, 1):
-                cell = ws.cell(row=ri, column=ci, value=v)
-                cell.alignment = Alignment(vertical="center", wrap_text=ci in (5, 7))
-                if rf: cell.fill = rf
-            if first_url and d.get("radicados_salida"):
-                rad_cell = ws.cell(row=ri, column=14)
-                rad_cell.hyperlink = first_url
-                rad_cell.font = link_font
-        col_widths = [6, 12, 20, 18, 30, 30, 40, 20, 40, 10, 18, 28, 10, 22, 20, 25, 30, 20, 28, 8]
-        for i, w in enumerate(col_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-        ws.freeze_panes = "A2"
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return buf
-
-    def make_wb_digitales() -> io.BytesIO:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "EXP DIGIT 2025-2026"
-        fill = PatternFill("solid", fgColor="1e3a5f")
-        headers = [
-            "N° Expediente","Año","Abogado","Etapa","Queja Inicial",
-            "Radicado Auto","Nombre Auto","Fecha Auto",
-            "Obs. Generales","Última Revisión",
-            "Radicado Comunicación","Dependencia","Fecha Envío",
-            "Fecha Seguimiento","Radicado Respuesta","Fecha Respuesta",
-            "Responsable","Observaciones",
-        ]
-        ws.append(["SEGUIMIENTO EXPEDIENTES DIGITALES"])
-        ws.append(headers)
-        for cell in ws[2]:
-            cell.font = h_font; cell.fill = fill
-            cell.alignment = Alignment(horizontal="center")
-        for exp in dig_exps:
-            ed = dict(exp)
-            exp_coms = coms_por_exp.get(ed["id"], [])
-            primera = exp_coms[0] if exp_coms else {}
-            ws.append([
-                _na(ed.get("n_expediente")), _na(ed.get("anio")), _na(ed.get("abogado")), _na(ed.get("etapa")),
-                _na(ed.get("queja_inicial")), _na(ed.get("radicado_auto")), _na(ed.get("nombre_auto")), _na(ed.get("fecha_auto")),
-                _na(ed.get("observaciones")), _na(ultima_rev.get(ed["id"])),
-                _na(primera.get("radicado_comunicacion")), _na(primera.get("dependencia")),
-                _na(primera.get("fecha_envio")), _na(primera.get("fecha_seguimiento")),
-                _na(primera.get("radicado_respuesta")), _na(primera.get("fecha_respuesta")),
-                _na(primera.get("responsable")), _na(primera.get("observaciones")),
-            ])
-            for com in exp_coms[1:]:
-                sr = [None]*10 + [
-                    _na(com.get("radicado_comunicacion")), _na(com.get("dependencia")),
-                    _na(com.get("fecha_envio")), _na(com.get("fecha_seguimiento")),
-                    _na(com.get("radicado_respuesta")), _na(com.get("fecha_respuesta")),
-                    _na(com.get("responsable")), _na(com.get("observaciones")),
-                ]
-                ws.append(sr)
-                for cell in ws[ws.max_row]: cell.fill = sub_fill
-        col_widths = [15, 6, 22, 20, 14, 20, 30, 14, 40, 22, 22, 25, 14, 16, 22, 14, 20, 40]
-        for i, w in enumerate(col_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return buf
-
-    def make_wb_sala() -> io.BytesIO:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Sala de Audiencias"
-        fill = PatternFill("solid", fgColor="065F46")
-        headers = ["Fecha","Franja","Título","Descripción","Estado","Responsable","Fecha Creación"]
-        campos  = ["fecha","franja","titulo","descripcion","estado","responsable","created_at"]
-        for ci, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=ci, value=h)
-            cell.fill = fill; cell.font = h_font; cell.alignment = center
-        ws.row_dimensions[1].height = 30
-        for ri, row in enumerate(sala, 2):
-            d = dict(row)
-            rf = alt_fill if ri % 2 == 0 else None
-            for ci, campo in enumerate(campos, 1):
-                cell = ws.cell(row=ri, column=ci, value=_na(d.get(campo)))
-                cell.alignment = Alignment(vertical="center")
-                if rf: cell.fill = rf
-        col_widths = [14, 16, 30, 40, 12, 25, 20]
-        for i, w in enumerate(col_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-        ws.freeze_panes = "A2"
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return buf
-
-    def make_wb_control_autos() -> io.BytesIO:
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Control Autos"
-        fill = PatternFill("solid", fgColor="2E7D32")
-        headers = ["EXPEDIENTE", "NÚMERO DEL AUTO", "FECHA DEL AUTO", "ASUNTO AUTO", "ABOGADO RESPONSABLE", "OBSERVACIONES",
-                   "CREADO POR", "FECHA CREACIÓN", "ÚLTIMA ACTUALIZACIÓN"]
-        campos  = ["expediente", "numero_auto", "fecha_auto", "asunto_auto", "abogado_responsable", "observaciones",
-                   "created_by", "created_at", "updated_at"]
-        for ci, h in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=ci, value=h)
-            cell.fill = fill; cell.font = h_font; cell.alignment = center
-        ws.row_dimensions[1].height = 30
-        alt_autos = PatternFill("solid", fgColor="F1F8E9")
-        for ri, row in enumerate(ctrl_autos_z, 2):
-            d = dict(row)
-            rf = alt_autos if ri % 2 == 0 else None
-            for ci, campo in enumerate(campos, 1):
-                cell = ws.cell(row=ri, column=ci, value=_na(d.get(campo)))
-                cell.alignment = Alignment(vertical="center")
-                if rf: cell.fill = rf
-        col_widths = [18, 16, 16, 48, 22, 30, 20, 20, 20]
-        for i, w in enumerate(col_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-        ws.freeze_panes = "A2"
-        buf = io.BytesIO(); wb.save(buf); buf.seek(0)
-        return buf
+    # ── 03 Control Autos ──────────────────────────────────────────────────────
+    hoja_autos = Hoja(
+        "Control Autos",
+        _columnas(_HEADERS_AUTOS, _CAMPOS_AUTOS, [18, 16, 16, 48, 22, 30, 20, 20, 20], formato=na),
+        _consulta(_SQL_AUTOS), color="2E7D32", alterna="F1F8E9",
+    )
 
-    # ── Construir ZIP ─────────────────────────────────────────────────────────
-    zip_buf = io.BytesIO()
-    with zipfile.ZipFile(zip_buf, "w", zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(
-            f"OCDI/01_Base_Expedientes/Base_Expedientes_{hoy}.xlsx",
-            make_wb_base().read(),
-        )
-        zf.writestr(
-            f"OCDI/02_Lista_Reparto_Abogados/Correspondencia_{hoy}.xlsx",
-            make_wb_correspondencia().read(),
-        )
-        zf.writestr(
-            f"OCDI/03_Control_Autos_Sustanciacion/SDS-CDO-FT-001_Control_Autos_{hoy}.xlsx",
-            make_wb_control_autos().read(),
-        )
-        zf.writestr(
-            f"OCDI/04_SDQS/SDQS_{hoy}.xlsx",
-            make_wb_sdqs().read(),
-        )
-        zf.writestr(
-            f"OCDI/05_Expedientes_Digitales/Exp_Digitales_{hoy}.xlsx",
-            make_wb_digitales().read(),
-        )
-        zf.writestr(
-            f"OCDI/06_Sala_Audiencias/Sala_Audiencias_{hoy}.xlsx",
-            make_wb_sala().read(),
-        )
-    zip_buf.seek(0)
-
-    return StreamingResponse(
-        zip_buf,
-        media_type="application/zip",
-        headers={"Content-Disposition": f"attachment; filename=OCDI_Backup_Completo_{hoy}.zip"},
+    # ── 04 SDQS ───────────────────────────────────────────────────────────────
+    headers_sdqs = [
+        "MES","FECHA ASIGNACION","SDQS","URL SDQS","FECHA VENCIMIENTO","ESTADO DIAS",
+        "QUEJOSO","CORREO","TEMA",
+        "COMPETENCIA OCDI","BPM","RESPONSABLE","RAD SALIDA","URL RAD SALIDA","FECHA RESPUESTA",
+        "OBSERVACIONES","ESTADO PROCESO","HECHO CORRUPTO","VALOR INSTITUCIONAL",
+        "TIPOLOGIA","CREADO POR","FECHA CREACIÓN","ÚLTIMA ACTUALIZACIÓN",
+    ]
+    campos_sdqs = [
+        "mes","fecha_asignacion","sdqs","url_sdqs","fecha_vencimiento","estado_dias",
+        "quejoso","correo","tema",
+        "competencia_ocdi","bpm","responsable","rad_salida","url_rad_salida","fecha_respuesta",
+        "observaciones","estado_proceso","hecho_corrupto","valor_institucional",
+        "tipologia","created_by","created_at","updated_at",
+    ]
+    SEM_COLORS = {"verde": "D4EDDA", "amarillo": "FFF3CD", "rojo": "F8D7DA"}
+    cols_sdqs = _columnas(
+        headers_sdqs, campos_sdqs,
+        [10, 16, 14, 40, 16, 12, 28, 28, 50, 14, 14, 28, 16, 40, 16, 40, 22, 22, 22, 20, 20, 20, 20],
+        formato=na, ajustar=(9,),
+    )
+    cols_sdqs[5].relleno = lambda d: SEM_COLORS.get(d.get("semaforo_sdqs"))
+    cols_sdqs[2].enlace = _enlace("url_sdqs", "sdqs")
+    cols_sdqs[12].enlace = _enlace("url_rad_salida", "rad_salida")
+    hoja_sdqs = Hoja(
+        "SDQS", cols_sdqs,
+        lambda conn: (_calcular_semaforo_sdqs(dict(r)) for r in conn.execute(_SQL_SDQS)),
+        color="7B3F00",
     )
+
+    # ── 06 Sala de Audiencias ─────────────────────────────────────────────────
+    hoja_sala = Hoja(
+        "Sala de Audiencias",
+        _columnas(_HEADERS_SALA, _CAMPOS_SALA, [14, 16, 30, 40, 12, 25, 20], formato=na),
+        _consulta(_SQL_SALA), color="065F46",
+    )
+
+    libros = [
+        (f"OCDI/01_Base_Expedientes/Base_Expedientes_{hoy}.xlsx", [hoja_base, hoja_seg]),
+        (f"OCDI/02_Lista_Reparto_Abogados/Correspondencia_{hoy}.xlsx", [correspondencia._hoja_exportar()]),
+        (f"OCDI/03_Control_Autos_Sustanciacion/SDS-CDO-FT-001_Control_Autos_{hoy}.xlsx", [hoja_autos]),
+        (f"OCDI/04_SDQS/SDQS_{hoy}.xlsx", [hoja_sdqs]),
+        (f"OCDI/05_Expedientes_Digitales/Exp_Digitales_{hoy}.xlsx", [digitales._hoja_exportar()]),
+        (f"OCDI/06_Sala_Audiencias/Sala_Audiencias_{hoy}.xlsx", [hoja_sala]),
+    ]
+
+    # ── Construir ZIP ─────────────────────────────────────────────────────────
+    # Cada libro se escribe directo en su entrada del ZIP, que sale al cliente
+    # a medida que se comprime.
+    def escribir(destino, conn):
+        with zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+            for ruta, hojas in libros:
+                with zf.open(ruta, "w") as entrada:
+                    escribir_xlsx(hojas, entrada, conn)
+
+    return respuesta_stream(escribir, f"OCDI_Backup_Completo_{hoy}.zip", media_type="application/zip")
@@ -2,12 +2,17 @@
 Búsqueda global — un solo cuadro de texto que busca por número o nombre a
 través de los módulos de casos (Expedientes, SDQS, Correspondencia,
 Expedientes Digitales), sin duplicar la lógica de filtro de cada lista.
+Busca en los índices FTS5 de app/busqueda.py: sin distinguir tildes ni
+mayúsculas, por prefijo de cada palabra y ordenado por relevancia (bm25);
+completa con los registros que contienen el texto en medio de una palabra
+(índices de trigramas).
 """
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from pathlib import Path
 
 from app.template_utils import make_templates
+from app.busqueda import INDICES, consulta_fts, consulta_subcadena, sugerencias, tabla_fts, tabla_trigramas
 from app.database import get_db
 from app.auth_utils import tpl, ROLES_SUPERUSUARIO
 
@@ -16,6 +21,20 @@ templates = make_templates(str(Path(__file__).parent.parent / "templates"))
 
 _LIMITE = 20
 
+# Autocompletar: mínimo de caracteres, máximo de sugerencias y tiempo máximo
+# por request (si se agota, responde con lo que alcanzó y completo=false)
+_MIN_SUGERENCIA = 2
+_LIMITE_SUGERENCIAS = 10
+_PRESUPUESTO_MS = 30
+
+# módulo -> columnas que muestra cada grupo de resultados
+_COLUMNAS = {
+    "expedientes": ("id", "n_expediente", "anio", "nombre_investigado", "quejoso", "etapa_actual"),
+    "sdqs": ("id", "sdqs", "quejoso", "tema", "mes"),
+    "correspondencia": ("id", "n_radicado", "origen", "asunto", "anio"),
+    "digitales": ("id", "n_expediente", "anio", "abogado", "etapa"),
+}
+
 
 def _puede_ver(request: Request, modulo: str) -> bool:
     user = getattr(request.state, "user", None)
@@ -26,56 +45,56 @@ def _puede_ver(request: Request, modulo: str) -> bool:
 
 
 @router.get("/buscar", response_class=HTMLResponse)
-async def buscar(request: Request, q: str = ""):
+def buscar(request: Request, q: str = ""):
     q = (q or "").strip()
-    resultados = {"expedientes": [], "sdqs": [], "correspondencia": [], "digitales": []}
+    resultados = {modulo: [] for modulo in _COLUMNAS}
 
-    if len(q) >= 2:
-        like = f"%{q}%"
+    consulta = consulta_fts(q) if len(q) >= 2 else None
+    if consulta:
         conn = get_db()
-
-        if _puede_ver(request, "expedientes"):
-            rows = conn.execute("""
-                SELECT id, n_expediente, anio, nombre_investigado, quejoso, etapa_actual
-                FROM expedientes
-                WHERE eliminado_en IS NULL
-                  AND (n_expediente LIKE ? OR nombre_investigado LIKE ? OR quejoso LIKE ?)
-                ORDER BY id DESC LIMIT ?
-            """, (like, like, like, _LIMITE)).fetchall()
-            resultados["expedientes"] = [dict(r) for r in rows]
-
-        if _puede_ver(request, "sdqs"):
-            rows = conn.execute("""
-                SELECT id, sdqs, quejoso, tema, mes
-                FROM sdqs
-                WHERE eliminado_en IS NULL
-                  AND (sdqs LIKE ? OR quejoso LIKE ?)
-                ORDER BY id DESC LIMIT ?
-            """, (like, like, _LIMITE)).fetchall()
-            resultados["sdqs"] = [dict(r) for r in rows]
-
-        if _puede_ver(request, "correspondencia"):
-            rows = conn.execute("""
-                SELECT id, n_radicado, origen, asunto, anio
-                FROM correspondencia
-                WHERE eliminado_en IS NULL
-                  AND (n_radicado LIKE ? OR origen LIKE ?)
-                ORDER BY id DESC LIMIT ?
-            """, (like, like, _LIMITE)).fetchall()
-            resultados["correspondencia"] = [dict(r) for r in rows]
-
-        if _puede_ver(request, "digitales"):
-            rows = conn.execute("""
-                SELECT id, n_expediente, anio, abogado, etapa
-                FROM exp_digitales
-                WHERE eliminado_en IS NULL AND n_expediente LIKE ?
-                ORDER BY id DESC LIMIT ?
-            """, (like, _LIMITE)).fetchall()
-            resultados["digitales"] = [dict(r) for r in rows]
-
+        for modulo, columnas in _COLUMNAS.items():
+            if not _puede_ver(request, modulo):
+                continue
+            tabla, cols = INDICES[modulo]
+            fts = tabla_fts(modulo)
+            # bm25 (rank) primero; a igual relevancia, los más recientes
+            rows = conn.execute(f"""
+                SELECT {", ".join(f"t.{c}" for c in columnas)}
+                FROM {fts} JOIN {tabla} t ON t.id = {fts}.rowid
+                WHERE {fts} MATCH ? AND t.eliminado_en IS NULL
+                ORDER BY {fts}.rank, t.id DESC LIMIT ?
+            """, (consulta, _LIMITE)).fetchall()
+            resultados[modulo] = [dict(r) for r in rows]
+            # Después, los que solo contienen q en medio de una palabra ("ER0012" en
+            # "2026ER00123"), por el índice de trigramas sobre las mismas columnas
+            subcadena = consulta_subcadena(q, cols)
+            if subcadena and len(rows) < _LIMITE:
+                tri = tabla_trigramas(modulo)
+                vistos = [r["id"] for r in rows] or [0]
+                rows = conn.execute(f"""
+                    SELECT {", ".join(f"t.{c}" for c in columnas)}
+                    FROM {tri} JOIN {tabla} t ON t.id = {tri}.rowid
+                    WHERE {tri} MATCH ? AND t.eliminado_en IS NULL
+                      AND t.id NOT IN ({", ".join("?" * len(vistos))})
+                    ORDER BY t.id DESC LIMIT ?
+                """, (subcadena, *vistos, _LIMITE - len(rows))).fetchall()
+                resultados[modulo] += [dict(r) for r in rows]
         conn.close()
 
     total = sum(len(v) for v in resultados.values())
     return templates.TemplateResponse("buscar.html", tpl(request, None,
         q=q, resultados=resultados, total=total, active="buscar",
     ))
+
+
+@router.get("/buscar/sugerencias")
+def buscar_sugerencias(request: Request, q: str = ""):
+    """Autocompletar por prefijo de número de expediente, radicado, SDQS o cédula (JSON)."""
+    q = (q or "").strip()
+    if len(q) < _MIN_SUGERENCIA:
+        return JSONResponse({"q": q, "resultados": [], "completo": True})
+    modulos = {m for m in _COLUMNAS if _puede_ver(request, m)}
+    conn = get_db()
+    resultados, completo = sugerencias(conn, q, modulos, _LIMITE_SUGERENCIAS, _PRESUPUESTO_MS)
+    conn.close()
+    return JSONResponse({"q": q, "resultados": resultados, "completo": completo})
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
 from datetime import date, datetime
 import io
 import re
 
+from app.busqueda import filtro_subcadena
 from app.database import get_db, get_personal_oficina
 from app.auth_utils import tpl, puede_escribir as _pw, puede_importar as _pi, registrar_log, historial_registro, ROLES_SUPERUSUARIO
 
@@ -71,7 +72,7 @@ def _expediente_reconocido(conn, expediente: str | None) -> bool | None:
         return None
     n_exp, anio = m.group(1), int(m.group(2))
     row = conn.execute(
-        "SELECT 1 FROM expedientes WHERE CAST(n_expediente AS INTEGER) = ? AND anio = ? AND eliminado_en IS NULL",
+        "SELECT 1 FROM expedientes WHERE n_num = ? AND anio = ? AND eliminado_en IS NULL",
         (int(n_exp), anio),
     ).fetchone()
     return row is not None
@@ -94,7 +95,7 @@ def _fecha(val):
 # ── Lista ──────────────────────────────────────────────────────────────────────
 
 @router.get("/", response_class=HTMLResponse)
-async def ca_lista(
+def ca_lista(
     request: Request,
     q: str = "",
     abogado: str = "",
@@ -109,8 +110,9 @@ async def ca_lista(
 
     where, params = ["eliminado_en IS NULL"], []
     if q:
-        where.append("(expediente LIKE ? OR numero_auto LIKE ? OR asunto_auto LIKE ? OR abogado_responsable LIKE ?)")
-        params += [f"%{q}%"] * 4
+        sql_q, params_q = filtro_subcadena("control_autos", q)
+        where.append(sql_q)
+        params += params_q
     if abogado:
         where.append("abogado_responsable = ?")
         params.append(abogado)
@@ -160,7 +162,7 @@ async def ca_lista(
 # ── Nuevo ──────────────────────────────────────────────────────────────────────
 
 @router.get("/nuevo", response_class=HTMLResponse)
-async def ca_nuevo_form(request: Request):
+def ca_nuevo_form(request: Request):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/control-autos/?msg=sin_permiso", status_code=303)
@@ -181,7 +183,7 @@ async def ca_nuevo_form(request: Request):
 
 
 @router.post("/nuevo")
-async def ca_nuevo_post(
+def ca_nuevo_post(
     request: Request,
     expediente: str = Form(""),
     numero_auto: str = Form(""),
@@ -220,7 +222,7 @@ async def ca_nuevo_post(
 # ── Exportar ───────────────────────────────────────────────────────────────────
 
 @router.get("/exportar")
-async def ca_exportar(
+def ca_exportar(
     q: str = "",
     abogado: str = "",
     anio: str = "",
@@ -229,16 +231,17 @@ async def ca_exportar(
     tipo_contrato: str = "",
 ):
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        from app.excel import Columna, Hoja, celda, na, relleno, respuesta_xlsx
+        from openpyxl.styles import Font, Alignment, Border, Side
     except ImportError:
         return RedirectResponse("/control-autos/?msg=error_openpyxl")
 
     # Aplicar los mismos filtros que la lista
     where, params = [], []
     if q:
-        where.append("(expediente LIKE ? OR numero_auto LIKE ? OR asunto_auto LIKE ? OR abogado_responsable LIKE ?)")
-        params += [f"%{q}%"] * 4
+        sql_q, params_q = filtro_subcadena("control_autos", q)
+        where.append(sql_q)
+        params += params_q
     if abogado:
         where.append("abogado_responsable = ?")
         params.append(abogado)
@@ -261,75 +264,54 @@ async def ca_exportar(
     where.append("eliminado_en IS NULL")
     cond = ("WHERE " + " AND ".join(where)) if where else ""
 
-    conn = get_db()
-    rows = conn.execute(
-        f"SELECT * FROM control_autos_sustanciacion {cond} ORDER BY fecha_auto ASC, id ASC",
-        params,
-    ).fetchall()
-    conn.close()
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "CONTROL AUTOS"
-
-    # Ajustar anchos de columna
-    ws.column_dimensions["A"].width = 4
-    ws.column_dimensions["B"].width = 18
-    ws.column_dimensions["C"].width = 16
-    ws.column_dimensions["D"].width = 16
-    ws.column_dimensions["E"].width = 48
-    ws.column_dimensions["F"].width = 22
-    ws.column_dimensions["G"].width = 30
-
     thin = Side(style="thin")
     borde = Border(left=thin, right=thin, top=thin, bottom=thin)
     center = Alignment(horizontal="center", vertical="center", wrap_text=True)
     left_v = Alignment(horizontal="left", vertical="center", wrap_text=True)
 
-    fill_inst  = PatternFill("solid", fgColor="1B4F8A")
-    fill_title = PatternFill("solid", fgColor="1B4F8A")
-    fill_head  = PatternFill("solid", fgColor="2E7D32")
-    fill_meta  = PatternFill("solid", fgColor="E8F5E9")
-    alt_fill   = PatternFill("solid", fgColor="F1F8E9")
+    fill_inst  = relleno("1B4F8A")
+    fill_title = relleno("1B4F8A")
+    fill_meta  = relleno("E8F5E9")
 
     font_w  = Font(bold=True, color="FFFFFF", size=10)
     font_wb = Font(bold=True, color="FFFFFF", size=12)
     font_b  = Font(bold=True, size=9)
-    font_s  = Font(size=9)
-
-    # Fila 1 — logo / institución
-    ws.merge_cells("B1:G1")
-    c = ws["B1"]
-    c.value = "CONTROL DISCIPLINARIO · OFICINA DE CONTROL DISCIPLINARIO INTERNO · SISTEMA DE GESTIÓN · CONTROL DOCUMENTAL"
-    c.fill = fill_inst; c.font = font_w; c.alignment = center; c.border = borde
-    ws.row_dimensions[1].height = 28
-
-    # Fila 2 — título
-    ws.merge_cells("B2:G2")
-    c = ws["B2"]
-    c.value = "CONTROL DE AUTOS DE SUSTANCIACIÓN Y/O TRÁMITES"
-    c.fill = fill_title; c.font = font_wb; c.alignment = center; c.border = borde
-    ws.row_dimensions[2].height = 24
-
-    # Fila 3 — código y versión
-    ws["B3"].value = "Código:"; ws["B3"].font = font_b; ws["B3"].alignment = center; ws["B3"].border = borde; ws["B3"].fill = fill_meta
-    ws.merge_cells("C3:E3")
-    ws["C3"].value = "SDS-CDO-FT-001"; ws["C3"].font = font_b; ws["C3"].alignment = center; ws["C3"].border = borde; ws["C3"].fill = fill_meta
-    ws["F3"].value = "Versión"; ws["F3"].font = font_b; ws["F3"].alignment = center; ws["F3"].border = borde; ws["F3"].fill = fill_meta
-    ws["G3"].value = 4; ws["G3"].font = font_b; ws["G3"].alignment = center; ws["G3"].border = borde; ws["G3"].fill = fill_meta
-    ws.row_dimensions[3].height = 18
-
-    # Fila 4 — elaborado/revisado/aprobado
-    ws.merge_cells("B4:G4")
-    c = ws["B4"]
-    c.value = ("Elaborado por: Maricela Aldana Caicedo  /  "
-               "Revisado por: Rodolfo Carrillo Quintero  /  "
-               "Aprobado por: Martha Patricia Añez Maestre")
-    c.font = Font(size=8, italic=True); c.alignment = left_v; c.border = borde; c.fill = fill_meta
-    ws.row_dimensions[4].height = 16
-
-    # Fila 5 — resumen de filtros activos (o separación vacía si no hay filtros)
-    if hay_filtros:
+
+    def encabezado(ws, conn):
+        """Filas 1-5 del formato SDS-CDO-FT-001; la columna A queda como margen."""
+        ws.column_dimensions["A"].width = 4
+
+        def meta(valor):
+            return celda(ws, valor, fuente=font_b, relleno=fill_meta, alineacion=center, borde=borde)
+
+        # Fila 1 — logo / institución; fila 2 — título
+        ws.merged_cells.add("B1:G1")
+        ws.row_dimensions[1].height = 28
+        ws.merged_cells.add("B2:G2")
+        ws.row_dimensions[2].height = 24
+        # Fila 3 — código y versión
+        ws.merged_cells.add("C3:E3")
+        ws.row_dimensions[3].height = 18
+        # Fila 4 — elaborado/revisado/aprobado
+        ws.merged_cells.add("B4:G4")
+        ws.row_dimensions[4].height = 16
+        previas = [
+            [None, celda(ws, "CONTROL DISCIPLINARIO · OFICINA DE CONTROL DISCIPLINARIO INTERNO · "
+                             "SISTEMA DE GESTIÓN · CONTROL DOCUMENTAL",
+                         fuente=font_w, relleno=fill_inst, alineacion=center, borde=borde)],
+            [None, celda(ws, "CONTROL DE AUTOS DE SUSTANCIACIÓN Y/O TRÁMITES",
+                         fuente=font_wb, relleno=fill_title, alineacion=center, borde=borde)],
+            [None, meta("Código:"), meta("SDS-CDO-FT-001"), None, None, meta("Versión"), meta(4)],
+            [None, celda(ws, "Elaborado por: Maricela Aldana Caicedo  /  "
+                             "Revisado por: Rodolfo Carrillo Quintero  /  "
+                             "Aprobado por: Martha Patricia Añez Maestre",
+                         fuente=Font(size=8, italic=True), relleno=fill_meta, alineacion=left_v, borde=borde)],
+        ]
+
+        # Fila 5 — resumen de filtros activos (o separación vacía si no hay filtros)
+        if not hay_filtros:
+            ws.row_dimensions[5].height = 6
+            return previas + [[]]
         _meses_nom = {
             "01": "Enero", "02": "Febrero", "03": "Marzo", "04": "Abril",
             "05": "Mayo",  "06": "Junio",   "07": "Julio", "08": "Agosto",
@@ -342,65 +324,45 @@ async def ca_exportar(
         if asunto_auto:  partes.append(f"Asunto: {asunto_auto}")
         if tipo_contrato: partes.append(f"Tipo contrato: {tipo_contrato.capitalize()}")
         if q:            partes.append(f'Búsqueda: "{q}"')
-        ws.merge_cells("B5:G5")
-        c = ws["B5"]
-        c.value = f"Filtros aplicados — {' · '.join(partes)} · Total exportado: {len(rows)} registro(s)"
-        c.font = Font(bold=True, size=9, color="856404")
-        c.fill = PatternFill("solid", fgColor="FFF3CD")
-        c.alignment = left_v
-        c.border = borde
+        # El total va antes de las filas: se cuenta aparte en vez de cargarlas
+        total = conn.execute(f"SELECT COUNT(*) FROM control_autos_sustanciacion {cond}", params).fetchone()[0]
+        ws.merged_cells.add("B5:G5")
         ws.row_dimensions[5].height = 16
-    else:
-        ws.row_dimensions[5].height = 6
-
-    # Fila 6 — encabezados de columna
-    headers = ["EXPEDIENTE", "NÚMERO DEL AUTO", "FECHA DEL AUTO", "ASUNTO AUTO", "ABOGADO RESPONSABLE", "OBSERVACIONES"]
-    for ci, h in enumerate(headers, 2):
-        cell = ws.cell(row=6, column=ci, value=h)
-        cell.fill = fill_head; cell.font = font_w; cell.alignment = center; cell.border = borde
-    ws.row_dimensions[6].height = 30
-    ws.freeze_panes = "B7"
-
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    # Datos desde fila 7
-    for ri, row in enumerate(rows, 7):
-        d = dict(row)
-        fill = alt_fill if ri % 2 == 0 else None
-        vals = [
-            _na(d.get("expediente")),
-            _na(d.get("numero_auto")),
-            _na(d.get("fecha_auto")),
-            _na(d.get("asunto_auto")),
-            _na(d.get("abogado_responsable")),
-            _na(d.get("observaciones")),
-        ]
-        for ci, v in enumerate(vals, 2):
-            cell = ws.cell(row=ri, column=ci, value=v)
-            cell.font = font_s
-            cell.alignment = center if ci != 6 else left_v
-            cell.border = borde
-            if fill:
-                cell.fill = fill
-        ws.row_dimensions[ri].height = 16
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+        return previas + [[None, celda(
+            ws, f"Filtros aplicados — {' · '.join(partes)} · Total exportado: {total} registro(s)",
+            fuente=Font(bold=True, size=9, color="856404"), relleno=relleno("FFF3CD"),
+            alineacion=left_v, borde=borde,
+        )]]
+
+    def filas(conn):
+        return conn.execute(
+            f"SELECT * FROM control_autos_sustanciacion {cond} ORDER BY fecha_auto ASC, id ASC",
+            params,
+        )
+
+    columnas = [
+        Columna("EXPEDIENTE", "expediente", 18, formato=na),
+        Columna("NÚMERO DEL AUTO", "numero_auto", 16, formato=na),
+        Columna("FECHA DEL AUTO", "fecha_auto", 16, formato=na),
+        Columna("ASUNTO AUTO", "asunto_auto", 48, formato=na),
+        Columna("ABOGADO RESPONSABLE", "abogado_responsable", 22, formato=na, alineacion=left_v),
+        Columna("OBSERVACIONES", "observaciones", 30, formato=na),
+    ]
+    hoja = Hoja(
+        "CONTROL AUTOS", columnas, filas, color="2E7D32", alterna="F1F8E9",
+        fuente=Font(size=9), borde=borde, alineacion=center, alto_fila=16,
+        congelar="B7", columna_inicial=2, previas=encabezado,
+    )
 
     hoy = date.today().strftime("%Y%m%d")
     sufijo = "_FILTRADO" if hay_filtros else ""
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=SDS-CDO-FT-001_Control_Autos_{hoy}{sufijo}.xlsx"},
-    )
+    return respuesta_xlsx([hoja], f"SDS-CDO-FT-001_Control_Autos_{hoy}{sufijo}.xlsx")
 
 
 # ── Importar ───────────────────────────────────────────────────────────────────
 
 @router.get("/importar", response_class=HTMLResponse)
-async def ca_importar_form(request: Request, msg: str = ""):
+def ca_importar_form(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/control-autos/?msg=sin_permiso", status_code=303)
@@ -412,7 +374,7 @@ async def ca_importar_form(request: Request, msg: str = ""):
 
 
 @router.post("/importar")
-async def ca_importar_post(request: Request, archivo: UploadFile = File(...)):
+def ca_importar_post(request: Request, archivo: UploadFile = File(...)):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/control-autos/?msg=sin_permiso", status_code=303)
@@ -421,7 +383,7 @@ async def ca_importar_post(request: Request, archivo: UploadFile = File(...)):
     except ImportError:
         return RedirectResponse("/control-autos/importar?msg=error_openpyxl", status_code=303)
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     if not contenido:
         return RedirectResponse("/control-autos/importar?msg=error_vacio", status_code=303)
 
@@ -500,7 +462,7 @@ async def ca_importar_post(request: Request, archivo: UploadFile = File(...)):
 # ── Papelera de reciclaje (DEBE ir antes de "/{reg_id}" — ruta estática) ───────
 
 @router.get("/papelera", response_class=HTMLResponse)
-async def papelera(request: Request, msg: str = ""):
+def papelera(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/control-autos/?msg=sin_permiso", status_code=303)
@@ -523,7 +485,7 @@ async def papelera(request: Request, msg: str = ""):
 
 
 @router.post("/{reg_id}/restaurar")
-async def restaurar(request: Request, reg_id: int):
+def restaurar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/control-autos/papelera?msg=sin_permiso", status_code=303)
@@ -536,7 +498,7 @@ async def restaurar(request: Request, reg_id: int):
 
 
 @router.post("/{reg_id}/purgar")
-async def purgar(request: Request, reg_id: int):
+def purgar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not user or user.get("rol") not in ROLES_SUPERUSUARIO:
         return RedirectResponse("/control-autos/papelera?msg=sin_permiso", status_code=303)
@@ -551,7 +513,7 @@ async def purgar(request: Request, reg_id: int):
 # ── Detalle ────────────────────────────────────────────────────────────────────
 
 @router.get("/{reg_id}", response_class=HTMLResponse)
-async def ca_detalle(request: Request, reg_id: int, msg: str = ""):
+def ca_detalle(request: Request, reg_id: int, msg: str = ""):
     conn = get_db()
     reg = conn.execute(
         "SELECT * FROM control_autos_sustanciacion WHERE id = ?", (reg_id,)
@@ -571,7 +533,7 @@ async def ca_detalle(request: Request, reg_id: int, msg: str = ""):
 # ── Editar ─────────────────────────────────────────────────────────────────────
 
 @router.get("/{reg_id}/editar", response_class=HTMLResponse)
-async def ca_editar_form(request: Request, reg_id: int):
+def ca_editar_form(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse(f"/control-autos/{reg_id}?msg=sin_permiso", status_code=303)
@@ -592,7 +554,7 @@ async def ca_editar_form(request: Request, reg_id: int):
 
 
 @router.post("/{reg_id}/editar")
-async def ca_editar_post(
+def ca_editar_post(
     request: Request,
     reg_id: int,
     expediente: str = Form(""),
@@ -632,7 +594,7 @@ async def ca_editar_post(
 # ── Eliminar ───────────────────────────────────────────────────────────────────
 
 @router.post("/{reg_id}/eliminar")
-async def ca_eliminar(request: Request, reg_id: int):
+def ca_eliminar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/control-autos/?msg=sin_permiso", status_code=303)
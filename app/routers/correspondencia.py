@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
 from datetime import date, timedelta
@@ -7,7 +7,15 @@ import io
 
 from urllib.parse import quote_plus as _quote_plus
 
+from app.alertas import refrescar_alertas
+from app.busqueda import filtro_subcadena
+from app.calendario import get_calendario
 from app.database import get_db, get_personal_oficina
+from app.estadisticas import cache_estadisticas, mayores, sumar_por
+from app.radicados import normalizar, repetidos
+from app.semaforos import semaforo_correspondencia as _calcular_semaforo_row
+from app.vencimientos import actualizar_plazos
+from app.routers.sdqs import _ESPACIOS
 from app.auth_utils import tpl, puede_escribir as _pw, puede_importar as _pi, registrar_log, historial_registro, ROLES_SUPERUSUARIO
 
 _MOD = "correspondencia"
@@ -122,223 +130,136 @@ def _get_tipos_requerimiento(conn):
 
 
 # ── Días hábiles Colombia ──────────────────────────────────────────────────────
-
-def _easter(year: int) -> date:
-    """Gauss algorithm for Easter Sunday."""
-    a = year % 19
-    b = year // 100
-    c = year % 100
-    d = b // 4
-    e = b % 4
-    f = (b + 8) // 25
-    g = (b - f + 1) // 3
-    h = (19 * a + b - d - g + 15) % 30
-    i = c // 4
-    k = c % 4
-    l = (32 + 2 * e + 2 * i - h - k) % 7
-    m = (a + 11 * h + 22 * l) // 451
-    month = (h + l - 7 * m + 114) // 31
-    day = ((h + l - 7 * m + 114) % 31) + 1
-    return date(year, month, day)
-
-
-def _next_monday(d: date) -> date:
-    """Return d if Monday, else advance to next Monday."""
-    days_ahead = (7 - d.weekday()) % 7
-    return d if days_ahead == 0 else d + timedelta(days=days_ahead)
-
-
-def _festivos_colombia(year: int) -> set:
-    festivos = set()
-    for m, day in [(1, 1), (5, 1), (7, 20), (8, 7), (12, 8), (12, 25)]:
-        festivos.add(date(year, m, day))
-    for m, day in [(1, 6), (3, 19), (6, 29), (8, 15), (10, 12), (11, 1), (11, 11)]:
-        festivos.add(_next_monday(date(year, m, day)))
-    easter = _easter(year)
-    festivos.add(easter - timedelta(days=3))   # Jueves Santo
-    festivos.add(easter - timedelta(days=2))   # Viernes Santo
-    festivos.add(_next_monday(easter + timedelta(days=39)))   # Ascensión
-    festivos.add(_next_monday(easter + timedelta(days=60)))   # Corpus Christi
-    festivos.add(_next_monday(easter + timedelta(days=68)))   # Sagrado Corazón
-    return festivos
-
+# Festivos e índice de días hábiles precalculados en app/calendario.py.
 
 def _add_dias_habiles(inicio: date, dias: int) -> date:
-    festivos = _festivos_colombia(inicio.year) | _festivos_colombia(inicio.year + 1)
-    current = inicio
-    count = 0
-    while count < dias:
-        current += timedelta(days=1)
-        if current.weekday() < 5 and current not in festivos:
-            count += 1
-    return current
+    return get_calendario().sumar(inicio, dias)
 
 
 def _subtract_dias_habiles(fin: date, dias: int) -> date:
     """Resta `dias` días hábiles hacia atrás desde `fin`."""
-    festivos = _festivos_colombia(fin.year) | _festivos_colombia(fin.year - 1)
-    current = fin
-    count = 0
-    while count < dias:
-        current -= timedelta(days=1)
-        if current.weekday() < 5 and current not in festivos:
-            count += 1
-    return current
-
-
-def _calcular_semaforo_row(r: dict) -> dict:
-    _ANEXO_VALS = {"ANEXO EXPEDIENTE", "ANEXO AL EXPEDIENTE"}
-    r["dias_restantes"] = None
-    r["fecha_vencimiento"] = None        # fecha legal real: fecha_ingreso + termino días hábiles
-    r["fecha_termino_respuesta"] = None  # fecha de revisión: 2 días hábiles antes del vencimiento
-    r["pendiente"] = not bool(r.get("fecha_radicado_salida"))
-
-    if r.get("tipo_respuesta") and r["tipo_respuesta"].strip().upper() in _ANEXO_VALS:
-        r["semaforo"] = "verde"
-        r["dias_transcurridos"] = None
-        return r
-
-    if r.get("fecha_radicado_salida"):
-        r["semaforo"] = "respondido"
-        if r.get("fecha_ingreso"):
-            try:
-                fi = date.fromisoformat(r["fecha_ingreso"][:10])
-                fs = date.fromisoformat(r["fecha_radicado_salida"][:10])
-                r["dias_transcurridos"] = (fs - fi).days
-            except Exception:
-                pass
-        return r
-
-    if not r.get("fecha_ingreso"):
-        r["semaforo"] = None
-        r["dias_transcurridos"] = None
-        return r
-
-    if r.get("termino_dias"):
-        try:
-            fi = date.fromisoformat(r["fecha_ingreso"][:10])
-            termino = int(r["termino_dias"])
-            # Fecha legal de vencimiento: fecha_ingreso + N días hábiles
-            fecha_venc = _add_dias_habiles(fi, termino)
-            # Fecha de revisión: 2 días hábiles antes del vencimiento (nunca cae en finde/festivo)
-            fecha_rev = _subtract_dias_habiles(fecha_venc, 2)
-            r["fecha_vencimiento"] = fecha_venc.isoformat()
-            r["fecha_termino_respuesta"] = fecha_rev.isoformat()
-            dias_restantes = (fecha_rev - date.today()).days
-            r["dias_restantes"] = dias_restantes
-            # dias_transcurridos (calendario, informativo) se mantiene disponible
-            # aunque haya término legal — lo usa el Dashboard para mostrar
-            # "lleva X días" sin afectar la clasificación verde/amarilla/roja,
-            # que siempre depende de dias_restantes en este caso.
-            r["dias_transcurridos"] = (date.today() - fi).days
-            if dias_restantes >= 2:
-                r["semaforo"] = "verde"
-            elif dias_restantes >= 0:
-                r["semaforo"] = "amarilla"
-            else:
-                r["semaforo"] = "roja"
-        except Exception:
-            r["semaforo"] = None
-        return r
-
-    # Sin término definido: usar días transcurridos desde ingreso
-    try:
-        fi = date.fromisoformat(r["fecha_ingreso"][:10])
-        dias = (date.today() - fi).days
-        r["dias_transcurridos"] = dias
-        if dias <= 5:
-            r["semaforo"] = "verde"
-        elif dias <= 8:
-            r["semaforo"] = "amarilla"
-        else:
-            r["semaforo"] = "roja"
-    except Exception:
-        r["semaforo"] = None
-
-    return r
+    return get_calendario().restar(fin, dias)
+
+
+# ── Plazo persistido y semáforo en SQL ────────────────────────────────────────
+#
+# La parte del semáforo que no depende del día (fecha de ingreso como fecha,
+# vencimiento legal en días hábiles y fecha de revisión) se guarda por fila
+# (migración 14, app/vencimientos.py); con eso _sql_semaforo() clasifica en
+# SQL igual que semaforo_correspondencia() (app/semaforos.py) y la Lista
+# cuenta, filtra y pagina en la base. Todo camino que escribe fecha_ingreso o
+# termino_dias (crear, editar, importar, AgilSalud, restaurar backup) llama a
+# actualizar_plazos() antes de su commit.
+
+_SQL_ANEXO = "UPPER(trim(COALESCE(tipo_respuesta, ''), ?)) IN ('ANEXO EXPEDIENTE', 'ANEXO AL EXPEDIENTE')"
+_SQL_PENDIENTE = "COALESCE(fecha_radicado_salida, '') = ''"
+_SQL_CON_TERMINO = "COALESCE(termino_dias, 0) NOT IN (0, '')"
+
+
+def _sql_semaforo(hoy: date) -> tuple[str, list]:
+    """Expresión SQL con el semáforo de semaforo_correspondencia() para el día `hoy`."""
+    sql = f"""CASE
+        WHEN {_SQL_ANEXO} THEN 'verde'
+        WHEN NOT {_SQL_PENDIENTE} THEN 'respondido'
+        WHEN COALESCE(fecha_ingreso, '') = '' THEN NULL
+        WHEN {_SQL_CON_TERMINO} THEN CASE
+            WHEN fecha_revision_plazo IS NULL THEN NULL
+            WHEN fecha_revision_plazo >= ? THEN 'verde'
+            WHEN fecha_revision_plazo >= ? THEN 'amarilla'
+            ELSE 'roja' END
+        WHEN fecha_ingreso_dia IS NULL THEN NULL
+        WHEN fecha_ingreso_dia >= ? THEN 'verde'
+        WHEN fecha_ingreso_dia >= ? THEN 'amarilla'
+        ELSE 'roja' END"""
+    return sql, [
+        _ESPACIOS,
+        (hoy + timedelta(days=2)).isoformat(), hoy.isoformat(),   # dias_restantes >= 2 / >= 0
+        (hoy - timedelta(days=5)).isoformat(), (hoy - timedelta(days=8)).isoformat(),
+    ]
 
 
-# ── DASHBOARD ─────────────────────────────────────────────────────────────────
+def _sql_urgencia(hoy: date) -> tuple[str, list]:
+    """Orden de los críticos del Dashboard: días restantes del plazo legal, o
+    menos los días transcurridos cuando no hay término (0 si no se pudo calcular)."""
+    sql = f"""CASE WHEN {_SQL_CON_TERMINO}
+        THEN COALESCE(CAST(julianday(fecha_revision_plazo) - julianday(?) AS INTEGER), 0)
+        ELSE COALESCE(CAST(julianday(fecha_ingreso_dia) - julianday(?) AS INTEGER), 0) END"""
+    return sql, [hoy.isoformat(), hoy.isoformat()]
 
-@router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    conn = get_db()
 
-    total = conn.execute("SELECT COUNT(*) FROM correspondencia WHERE eliminado_en IS NULL").fetchone()[0]
+# ── DASHBOARD ─────────────────────────────────────────────────────────────────
 
-    # Semáforo: misma fuente de verdad que la Lista (_calcular_semaforo_row),
-    # incluyendo el plazo legal en días hábiles cuando hay termino_dias.
-    # Antes este bloque tenía su propio SQL con días de calendario fijos
-    # (<=5/<=8/>=9) que ignoraba termino_dias por completo — los contadores
-    # del Dashboard no coincidían con lo que mostraba la Lista para los
-    # oficios que sí tienen plazo legal definido.
-    todas = [_calcular_semaforo_row(dict(r)) for r in conn.execute(
-        "SELECT * FROM correspondencia WHERE eliminado_en IS NULL"
-    ).fetchall()]
+def _estadisticas(conn) -> dict:
+    """Conteos del tablero en un GROUP BY por responsable, mes, semáforo y respondido."""
+    # Semáforo: misma clasificación que la Lista (_sql_semaforo, equivalente a
+    # _calcular_semaforo_row), incluido el plazo legal en días hábiles cuando
+    # hay termino_dias.
+    hoy = date.today()
+    sem_sql, sem_params = _sql_semaforo(hoy)
+    cubo = conn.execute(f"""
+        SELECT responsable, mes, {sem_sql} AS sem,
+               fecha_radicado_salida IS NOT NULL AND fecha_radicado_salida != '' AS respondido,
+               COUNT(*)
+        FROM correspondencia WHERE eliminado_en IS NULL
+        GROUP BY responsable, mes, sem, respondido
+    """, sem_params).fetchall()
+    conteo = sumar_por(cubo, 2)
 
     stats = {
-        "respondidos": sum(1 for d in todas if d.get("semaforo") == "respondido"),
-        "verde":       sum(1 for d in todas if d.get("semaforo") == "verde"),
-        "amarilla":    sum(1 for d in todas if d.get("semaforo") == "amarilla"),
-        "roja":        sum(1 for d in todas if d.get("semaforo") == "roja"),
+        "respondidos": conteo.get("respondido", 0),
+        "verde":       conteo.get("verde", 0),
+        "amarilla":    conteo.get("amarilla", 0),
+        "roja":        conteo.get("roja", 0),
     }
 
-    por_responsable = conn.execute("""
-        SELECT responsable, COUNT(*) cant,
-               SUM(CASE WHEN fecha_radicado_salida IS NOT NULL AND fecha_radicado_salida != '' THEN 1 ELSE 0 END) respondidos
-        FROM correspondencia WHERE responsable IS NOT NULL AND eliminado_en IS NULL
-        GROUP BY responsable ORDER BY cant DESC LIMIT 15
-    """).fetchall()
-
-    por_mes = conn.execute("""
-        SELECT mes, COUNT(*) cant FROM correspondencia
-        WHERE mes IS NOT NULL AND eliminado_en IS NULL GROUP BY mes
-        ORDER BY CASE mes
-            WHEN 'ENERO' THEN 1 WHEN 'FEBRERO' THEN 2 WHEN 'MARZO' THEN 3
-            WHEN 'ABRIL' THEN 4 WHEN 'MAYO' THEN 5 WHEN 'JUNIO' THEN 6
-            WHEN 'JULIO' THEN 7 WHEN 'AGOSTO' THEN 8 WHEN 'SEPTIEMBRE' THEN 9
-            WHEN 'OCTUBRE' THEN 10 WHEN 'NOVIEMBRE' THEN 11 WHEN 'DICIEMBRE' THEN 12
-            ELSE 99 END
-    """).fetchall()
+    respondidos = sumar_por([f for f in cubo if f[3]], 0)
+    por_responsable = [
+        {"responsable": k, "cant": n, "respondidos": respondidos.get(k, 0)}
+        for k, n in mayores(sumar_por(cubo, 0)) if k is not None
+    ][:15]
+    por_mes = sorted(
+        ({"mes": k, "cant": n} for k, n in sumar_por(cubo, 1).items() if k is not None),
+        key=lambda m: MESES.index(m["mes"]) if m["mes"] in MESES else 99,
+    )
 
     # Críticos: pendientes (no respondidos, no anexo) con fecha de ingreso,
     # ordenados por urgencia real — días restantes del plazo legal cuando
-    # existe, o días transcurridos cuando no hay término definido. Mismo
-    # alcance que el SQL original (todos los pendientes no-anexo), solo
-    # se corrige el criterio de orden y el semáforo que usa el template.
-    _ANEXO_VALS = {"ANEXO EXPEDIENTE", "ANEXO AL EXPEDIENTE"}
-
-    def _es_anexo(d):
-        tr = (d.get("tipo_respuesta") or "").strip().upper()
-        return tr in _ANEXO_VALS
-
-    def _urgencia(d):
-        if d.get("dias_restantes") is not None:
-            return d["dias_restantes"]
-        return -(d.get("dias_transcurridos") or 0)
+    # existe, o días transcurridos cuando no hay término definido.
+    urg_sql, urg_params = _sql_urgencia(hoy)
+    criticos = [_calcular_semaforo_row(dict(r)) for r in conn.execute(f"""
+        SELECT * FROM correspondencia
+        WHERE eliminado_en IS NULL AND {_SQL_PENDIENTE} AND COALESCE(fecha_ingreso, '') <> ''
+          AND NOT {_SQL_ANEXO}
+        ORDER BY {urg_sql}, id LIMIT 20
+    """, [_ESPACIOS] + urg_params).fetchall()]
+
+    return {
+        "total": sum(f[-1] for f in cubo),
+        "stats": stats,
+        "por_responsable": por_responsable,
+        "por_mes": por_mes,
+        "criticos": [dict(r) for r in criticos],
+    }
 
-    criticos = sorted(
-        (d for d in todas if d.get("pendiente") and d.get("fecha_ingreso") and not _es_anexo(d)),
-        key=_urgencia,
-    )[:20]
 
+@router.get("/dashboard", response_class=HTMLResponse)
+def dashboard(request: Request):
+    conn = get_db()
+    # Se recalcula solo si cambió la tabla o el día (el semáforo depende de hoy)
+    datos = cache_estadisticas.obtener(conn, _MOD, (_MOD,), _estadisticas, dia=date.today())
     conn.close()
 
     return templates.TemplateResponse("corr_dashboard.html", {
         "request": request,
         "active": "corr_dashboard",
-        "total": total,
-        "stats": stats,
-        "por_responsable": [dict(r) for r in por_responsable],
-        "por_mes": [dict(r) for r in por_mes],
-        "criticos": [dict(r) for r in criticos],
+        **datos,
     })
 
 
 # ── LISTA ──────────────────────────────────────────────────────────────────────
 
 @router.get("/", response_class=HTMLResponse)
-async def lista(
+def lista(
     request: Request,
     q: str = "",
     semaforo: str = "",
@@ -361,8 +282,9 @@ async def lista(
     params: list = []
 
     if q.strip():
-        filtros.append("(c.n_radicado LIKE ? OR c.origen LIKE ? OR c.asunto LIKE ? OR c.caso_bmp LIKE ?)")
-        params += [f"%{q}%", f"%{q}%", f"%{q}%", f"%{q}%"]
+        sql_q, params_q = filtro_subcadena("correspondencia", q, alias="c")
+        filtros.append(sql_q)
+        params += params_q
     if responsable.strip():
         filtros.append("c.responsable = ?")
         params.append(responsable.strip())
@@ -378,61 +300,62 @@ async def lista(
         )
         params.append(tipo_contrato.strip())
 
+    if semaforo == "pendiente":
+        filtros.append(_SQL_PENDIENTE)
+    elif semaforo:
+        sem_sql, sem_params = _sql_semaforo(date.today())
+        filtros.append(f"({sem_sql}) = ?")
+        params += sem_params + [semaforo]
+    if tipo_resp == "pendiente":
+        filtros.append("trim(COALESCE(c.tipo_respuesta, ''), ?) = ''")
+        params.append(_ESPACIOS)
+    elif tipo_resp:
+        filtros.append("UPPER(trim(COALESCE(c.tipo_respuesta, ''), ?)) = ?")
+        params += [_ESPACIOS, tipo_resp.strip().upper()]
+
     where = " AND ".join(filtros)
 
-    # Fetch all qualifying rows — semaphore filter applied in Python
+    total = conn.execute(f"SELECT COUNT(*) FROM correspondencia c WHERE {where}", params).fetchone()[0]
+    total_pages = max(1, (total + por_pagina - 1) // por_pagina)
+    page = max(1, min(page, total_pages))
+    offset = (page - 1) * por_pagina
+    # ORDER BY fecha_ingreso, id sale de los índices parciales sin ordenar aparte
     rows_raw = conn.execute(f"""
-        SELECT c.*,
-               GROUP_CONCAT(rs.radicado, ' | ') AS radicados_salida,
-               GROUP_CONCAT(COALESCE(rs.url, ''), ' | ') AS radicados_urls
-        FROM correspondencia c
-        LEFT JOIN correspondencia_radicados_salida rs ON rs.correspondencia_id = c.id
+        SELECT c.* FROM correspondencia c
         WHERE {where}
-        GROUP BY c.id
-        ORDER BY c.fecha_ingreso DESC
-    """, params).fetchall()
+        ORDER BY c.fecha_ingreso DESC, c.id DESC
+        LIMIT ? OFFSET ?
+    """, params + [por_pagina, offset]).fetchall()
+
+    # Radicados de salida solo de la página mostrada
+    radicados: dict[int, list] = {}
+    ids_pagina = [r["id"] for r in rows_raw]
+    if ids_pagina:
+        for rs in conn.execute(f"""
+            SELECT correspondencia_id, radicado, url FROM correspondencia_radicados_salida
+            WHERE correspondencia_id IN ({','.join('?' * len(ids_pagina))})
+            ORDER BY correspondencia_id, id
+        """, ids_pagina).fetchall():
+            radicados.setdefault(rs["correspondencia_id"], []).append(rs)
 
     anios_bd = [r[0] for r in conn.execute(
         "SELECT DISTINCT anio FROM correspondencia WHERE anio IS NOT NULL AND eliminado_en IS NULL ORDER BY anio DESC"
     ).fetchall()]
 
-    dupl_rows = conn.execute("""
-        SELECT UPPER(TRIM(n_radicado)) AS nr, COUNT(*) AS cnt
-        FROM correspondencia
-        WHERE n_radicado IS NOT NULL AND TRIM(n_radicado) != '' AND eliminado_en IS NULL
-        GROUP BY UPPER(TRIM(n_radicado))
-        HAVING COUNT(*) > 1
-        ORDER BY cnt DESC, nr
-    """).fetchall()
-    radicados_duplicados = {r["nr"] for r in dupl_rows}
-    duplicados_info = [{"n_radicado": r["nr"], "cantidad": r["cnt"]} for r in dupl_rows]
+    # Conteo mantenido por triggers (app/radicados.py): solo los repetidos
+    dupl_rows = repetidos(conn, _MOD)
+    radicados_duplicados = {r["radicado"] for r in dupl_rows}
+    duplicados_info = [{"n_radicado": r["radicado"], "cantidad": r["cantidad"]} for r in dupl_rows]
     conn.close()
 
-    # Compute semaphore and extract first radicado URL for list display
-    all_rows = []
+    # Semáforo (con días restantes) y primer URL de salida de la página
+    rows = []
     for r in rows_raw:
         d = _calcular_semaforo_row(dict(r))
-        urls_str = d.get("radicados_urls") or ""
-        urls = [u.strip() for u in urls_str.split(" | ")] if urls_str.strip() else []
-        d["primer_url_salida"] = next((u for u in urls if u), None)
-        all_rows.append(d)
-
-    # Apply semaphore filter in Python
-    if semaforo == "pendiente":
-        all_rows = [r for r in all_rows if r.get("pendiente")]
-    elif semaforo:
-        all_rows = [r for r in all_rows if r.get("semaforo") == semaforo]
-
-    # Apply tipo_respuesta filter in Python
-    if tipo_resp == "pendiente":
-        all_rows = [r for r in all_rows if not (r.get("tipo_respuesta") or "").strip()]
-    elif tipo_resp:
-        all_rows = [r for r in all_rows if (r.get("tipo_respuesta") or "").strip().upper() == tipo_resp.strip().upper()]
-
-    total = len(all_rows)
-    total_pages = max(1, (total + por_pagina - 1) // por_pagina)
-    offset = (page - 1) * por_pagina
-    rows = all_rows[offset:offset + por_pagina]
+        rads = radicados.get(d["id"], [])
+        d["radicados_salida"] = " | ".join(rs["radicado"] for rs in rads) or None
+        d["primer_url_salida"] = next((rs["url"].strip() for rs in rads if (rs["url"] or "").strip()), None)
+        rows.append(d)
 
     return templates.TemplateResponse("corr_lista.html", tpl(request, _MOD,
         active="corr_lista",
@@ -450,7 +373,7 @@ async def lista(
 # ── NUEVO ──────────────────────────────────────────────────────────────────────
 
 @router.get("/nuevo", response_class=HTMLResponse)
-async def nuevo_form(request: Request):
+def nuevo_form(request: Request):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -469,7 +392,7 @@ async def nuevo_form(request: Request):
 
 
 @router.post("/nuevo")
-async def nuevo_post(
+def nuevo_post(
     request: Request,
     anio: int = Form(None),
     mes: str = Form(""),
@@ -508,6 +431,8 @@ async def nuevo_post(
         _v(correo_remitente), _v(sinproc_personeria), _v(tipo_requerimiento), termino_val,
     ])
     new_id = cur.lastrowid
+    actualizar_plazos(conn, [new_id])
+    refrescar_alertas(conn, _MOD, [new_id])
     conn.commit()
     conn.close()
     registrar_log(user, "crear", _MOD, f"Oficio #{new_id} — {_v(n_radicado)}",
@@ -517,16 +442,9 @@ async def nuevo_post(
 
 # ── EXPORTAR EXCEL ─────────────────────────────────────────────────────────────
 
-@router.get("/exportar")
-async def exportar():
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
-    except ImportError:
-        return RedirectResponse("/correspondencia/?msg=error_openpyxl")
-
-    conn = get_db()
-    rows = conn.execute("""
+def _filas_exportar(conn):
+    """Oficios activos con sus radicados de salida y el semáforo calculado."""
+    cur = conn.execute("""
         SELECT c.*,
                GROUP_CONCAT(rs.radicado, ' | ') AS radicados_salida,
                GROUP_CONCAT(COALESCE(rs.url, ''), ' | ') AS radicados_urls
@@ -535,101 +453,68 @@ async def exportar():
         WHERE c.eliminado_en IS NULL
         GROUP BY c.id
         ORDER BY c.fecha_ingreso DESC
-    """).fetchall()
-    conn.close()
+    """)
+    return (_calcular_semaforo_row(dict(r)) for r in cur)
+
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "CORRESPONDENCIA"
-
-    h_fill = PatternFill("solid", fgColor="1B4F8A")
-    h_font = Font(bold=True, color="FFFFFF", size=10)
-    center = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    alt_fill = PatternFill("solid", fgColor="EBF1F8")
-    link_font = Font(color="0563C1", underline="single", size=10)
-
-    headers = [
-        "AÑO", "MES", "FECHA INGRESO DE OFICIO", "N. RADICADOS",
-        "ENTIDAD", "CORREO REMITENTE", "ASUNTO", "NUMERO SINPROC PERSONERIA",
-        "TIPO DE REQUERIMIENTO", "TERMINO (DIAS)", "TIPO DE DOCUMENTO",
-        "RESPONSABLE", "CASO BMP", "N RADICADO SALIDA",
-        "FECHA RADICADO DE SALIDA", "TIPO DE RESPUESTA", "TRÁMITE DE SALIDA",
-        "FECHA DE VENCIMIENTO LEGAL",
-        "FECHA REVISIÓN SUGERIDA (−2 días hábiles)",
-        "DÍAS TRANSCURRIDOS",
+def _hoja_exportar():
+    """Hoja CORRESPONDENCIA de la exportación (también va en el ZIP de backup)."""
+    from app.excel import Columna, Hoja, na
+    from openpyxl.styles import Alignment
+
+    def fecha(campo):
+        return lambda d: d.get(campo)[:10] if d.get(campo) else None
+
+    def numero(campo):
+        return lambda d: d.get(campo) if d.get(campo) is not None else "N/A"
+
+    def primer_url(d):
+        # Hipervínculo en N RADICADO SALIDA: el primero de los radicados con URL
+        if not d.get("radicados_salida"):
+            return None
+        return next((u.strip() for u in (d.get("radicados_urls") or "").split(" | ") if u.strip()), None)
+
+    ajustado = Alignment(vertical="center", wrap_text=True)
+    columnas = [
+        Columna("AÑO", "anio", 6, formato=na),
+        Columna("MES", "mes", 12, formato=na),
+        Columna("FECHA INGRESO DE OFICIO", fecha("fecha_ingreso"), 20, formato=na),
+        Columna("N. RADICADOS", "n_radicado", 18, formato=na),
+        Columna("ENTIDAD", "origen", 30, formato=na, alineacion=ajustado),
+        Columna("CORREO REMITENTE", "correo_remitente", 30, formato=na),
+        Columna("ASUNTO", "asunto", 40, formato=na, alineacion=ajustado),
+        Columna("NUMERO SINPROC PERSONERIA", "sinproc_personeria", 20, formato=na),
+        Columna("TIPO DE REQUERIMIENTO", "tipo_requerimiento", 40, formato=na),
+        Columna("TERMINO (DIAS)", numero("termino_dias"), 10),
+        Columna("TIPO DE DOCUMENTO", "tipo_documento", 18, formato=na),
+        Columna("RESPONSABLE", "responsable", 28, formato=na),
+        Columna("CASO BMP", "caso_bmp", 10, formato=na),
+        Columna("N RADICADO SALIDA", "radicados_salida", 22, formato=na, enlace=primer_url),
+        Columna("FECHA RADICADO DE SALIDA", fecha("fecha_radicado_salida"), 20, formato=na),
+        Columna("TIPO DE RESPUESTA", "tipo_respuesta", 25, formato=na),
+        Columna("TRÁMITE DE SALIDA", "tramite_salida", 30, formato=na),
+        Columna("FECHA DE VENCIMIENTO LEGAL", "fecha_vencimiento", 20, formato=na),
+        Columna("FECHA REVISIÓN SUGERIDA (−2 días hábiles)", "fecha_termino_respuesta", 28, formato=na),
+        Columna("DÍAS TRANSCURRIDOS", numero("dias_transcurridos"), 8),
     ]
-    for ci, h in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=ci, value=h)
-        cell.fill = h_fill
-        cell.font = h_font
-        cell.alignment = center
-    ws.row_dimensions[1].height = 36
-
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    for ri, row in enumerate(rows, 2):
-        d = _calcular_semaforo_row(dict(row))
-        fill = alt_fill if ri % 2 == 0 else None
-
-        urls_str = d.get("radicados_urls") or ""
-        urls_list = [u.strip() for u in urls_str.split(" | ")] if urls_str.strip() else []
-        first_url = next((u for u in urls_list if u), None)
-
-        vals = [
-            _na(d.get("anio")),
-            _na(d.get("mes")),
-            _na(d.get("fecha_ingreso")[:10] if d.get("fecha_ingreso") else None),
-            _na(d.get("n_radicado")),
-            _na(d.get("origen")),
-            _na(d.get("correo_remitente")),
-            _na(d.get("asunto")),
-            _na(d.get("sinproc_personeria")),
-            _na(d.get("tipo_requerimiento")),
-            d.get("termino_dias") if d.get("termino_dias") is not None else "N/A",
-            _na(d.get("tipo_documento")),
-            _na(d.get("responsable")),
-            _na(d.get("caso_bmp")),
-            _na(d.get("radicados_salida")),      # col 14 — N RADICADO SALIDA
-            _na(d.get("fecha_radicado_salida")[:10] if d.get("fecha_radicado_salida") else None),
-            _na(d.get("tipo_respuesta")),
-            _na(d.get("tramite_salida")),
-            _na(d.get("fecha_vencimiento")),     # col 18 — plazo legal real
-            _na(d.get("fecha_termino_respuesta")),  # col 19 — fecha revisión sugerida
-            d.get("dias_transcurridos") if d.get("dias_transcurridos") is not None else "N/A",
-        ]
-        for ci, v in enumerate(vals, 1):
-            cell = ws.cell(row=ri, column=ci, value=v)
-            cell.alignment = Alignment(vertical="center", wrap_text=ci in (5, 7))
-            if fill:
-                cell.fill = fill
-
-        # Add hyperlink on N RADICADO SALIDA (column 14) when URL exists
-        if first_url and d.get("radicados_salida"):
-            rad_cell = ws.cell(row=ri, column=14)
-            rad_cell.hyperlink = first_url
-            rad_cell.font = link_font
-
-    col_widths = [6, 12, 20, 18, 30, 30, 40, 20, 40, 10, 18, 28, 10, 22, 20, 25, 30, 20, 28, 8]
-    for i, w in enumerate(col_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws.freeze_panes = "A2"
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    return Hoja("CORRESPONDENCIA", columnas, _filas_exportar, alto_encabezado=36)
+
+
+@router.get("/exportar")
+def exportar():
+    try:
+        from app.excel import respuesta_xlsx
+    except ImportError:
+        return RedirectResponse("/correspondencia/?msg=error_openpyxl")
 
     hoy = date.today().strftime("%Y%m%d")
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=Correspondencia_{hoy}.xlsx"},
-    )
+    return respuesta_xlsx([_hoja_exportar()], f"Correspondencia_{hoy}.xlsx")
 
 
 # ── IMPORTAR ───────────────────────────────────────────────────────────────────
 
 @router.get("/importar", response_class=HTMLResponse)
-async def importar_form(request: Request, msg: str = ""):
+def importar_form(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -645,7 +530,7 @@ async def importar_form(request: Request, msg: str = ""):
 
 
 @router.post("/importar")
-async def importar_post(request: Request, archivo: UploadFile = File(...)):
+def importar_post(request: Request, archivo: UploadFile = File(...)):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -654,7 +539,7 @@ async def importar_post(request: Request, archivo: UploadFile = File(...)):
     except ImportError:
         return RedirectResponse("/correspondencia/importar?msg=error_openpyxl", status_code=303)
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     if not contenido:
         return RedirectResponse("/correspondencia/importar?msg=error_vacio", status_code=303)
 
@@ -857,6 +742,8 @@ async def importar_post(request: Request, archivo: UploadFile = File(...)):
                             (cid, r, u),
                         )
 
+        actualizar_plazos(conn)
+        refrescar_alertas(conn, _MOD)
         conn.commit()
     except Exception:
         conn.rollback()
@@ -872,7 +759,7 @@ async def importar_post(request: Request, archivo: UploadFile = File(...)):
 # ── CONFIGURAR CATÁLOGOS ───────────────────────────────────────────────────────
 
 @router.get("/configurar", response_class=HTMLResponse)
-async def configurar(request: Request, msg: str = ""):
+def configurar(request: Request, msg: str = ""):
     conn = get_db()
     responsables = get_personal_oficina(conn)
     tipos_doc = conn.execute(
@@ -897,7 +784,7 @@ async def configurar(request: Request, msg: str = ""):
 
 
 @router.post("/configurar/responsable/nuevo")
-async def responsable_nuevo(nombre: str = Form(...)):
+def responsable_nuevo(nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -913,7 +800,7 @@ async def responsable_nuevo(nombre: str = Form(...)):
 
 
 @router.post("/configurar/responsable/{rid}/editar")
-async def responsable_editar(rid: int, nombre: str = Form(...)):
+def responsable_editar(rid: int, nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -925,7 +812,7 @@ async def responsable_editar(rid: int, nombre: str = Form(...)):
 
 
 @router.post("/configurar/responsable/{rid}/eliminar")
-async def responsable_eliminar(rid: int):
+def responsable_eliminar(rid: int):
     conn = get_db()
     conn.execute("DELETE FROM corr_responsables WHERE id=?", (rid,))
     conn.commit()
@@ -934,7 +821,7 @@ async def responsable_eliminar(rid: int):
 
 
 @router.post("/configurar/tipo_doc/nuevo")
-async def tipo_doc_nuevo(nombre: str = Form(...)):
+def tipo_doc_nuevo(nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -950,7 +837,7 @@ async def tipo_doc_nuevo(nombre: str = Form(...)):
 
 
 @router.post("/configurar/tipo_doc/{tid}/editar")
-async def tipo_doc_editar(tid: int, nombre: str = Form(...)):
+def tipo_doc_editar(tid: int, nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     conn = get_db()
     conn.execute("UPDATE corr_tipos_documento SET nombre=? WHERE id=?", (nombre, tid))
@@ -960,7 +847,7 @@ async def tipo_doc_editar(tid: int, nombre: str = Form(...)):
 
 
 @router.post("/configurar/tipo_doc/{tid}/eliminar")
-async def tipo_doc_eliminar(tid: int):
+def tipo_doc_eliminar(tid: int):
     conn = get_db()
     conn.execute("DELETE FROM corr_tipos_documento WHERE id=?", (tid,))
     conn.commit()
@@ -969,7 +856,7 @@ async def tipo_doc_eliminar(tid: int):
 
 
 @router.post("/configurar/tipo_respuesta/nuevo")
-async def tipo_respuesta_nuevo(nombre: str = Form(...)):
+def tipo_respuesta_nuevo(nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -985,7 +872,7 @@ async def tipo_respuesta_nuevo(nombre: str = Form(...)):
 
 
 @router.post("/configurar/tipo_respuesta/{tid}/editar")
-async def tipo_respuesta_editar(tid: int, nombre: str = Form(...)):
+def tipo_respuesta_editar(tid: int, nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -997,7 +884,7 @@ async def tipo_respuesta_editar(tid: int, nombre: str = Form(...)):
 
 
 @router.post("/configurar/tipo_respuesta/{tid}/eliminar")
-async def tipo_respuesta_eliminar(tid: int):
+def tipo_respuesta_eliminar(tid: int):
     conn = get_db()
     conn.execute("DELETE FROM corr_tipos_respuesta WHERE id=?", (tid,))
     conn.commit()
@@ -1006,7 +893,7 @@ async def tipo_respuesta_eliminar(tid: int):
 
 
 @router.post("/configurar/tipo_requerimiento/nuevo")
-async def tipo_requerimiento_nuevo(nombre: str = Form(...)):
+def tipo_requerimiento_nuevo(nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -1022,7 +909,7 @@ async def tipo_requerimiento_nuevo(nombre: str = Form(...)):
 
 
 @router.post("/configurar/tipo_requerimiento/{tid}/editar")
-async def tipo_requerimiento_editar(tid: int, nombre: str = Form(...)):
+def tipo_requerimiento_editar(tid: int, nombre: str = Form(...)):
     nombre = nombre.strip().upper()
     if not nombre:
         return RedirectResponse("/correspondencia/configurar?msg=vacio", status_code=303)
@@ -1034,7 +921,7 @@ async def tipo_requerimiento_editar(tid: int, nombre: str = Form(...)):
 
 
 @router.post("/configurar/tipo_requerimiento/{tid}/eliminar")
-async def tipo_requerimiento_eliminar(tid: int):
+def tipo_requerimiento_eliminar(tid: int):
     conn = get_db()
     conn.execute("DELETE FROM corr_tipos_requerimiento WHERE id=?", (tid,))
     conn.commit()
@@ -1057,7 +944,7 @@ _MES_NOMBRES = {
 
 
 @router.get("/importar-agilsalud", response_class=HTMLResponse)
-async def importar_agilsalud_form(request: Request, msg: str = ""):
+def importar_agilsalud_form(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -1070,7 +957,7 @@ async def importar_agilsalud_form(request: Request, msg: str = ""):
 
 
 @router.post("/importar-agilsalud/preview", response_class=HTMLResponse)
-async def importar_agilsalud_preview(request: Request, archivo: UploadFile = File(...)):
+def importar_agilsalud_preview(request: Request, archivo: UploadFile = File(...)):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -1082,7 +969,7 @@ async def importar_agilsalud_preview(request: Request, archivo: UploadFile = Fil
             "msg": "error_openpyxl", "preview": None,
         })
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     try:
         wb = openpyxl.load_workbook(io.BytesIO(contenido), data_only=True)
         ws = wb.active
@@ -1160,7 +1047,7 @@ async def importar_agilsalud_preview(request: Request, archivo: UploadFile = Fil
 
 
 @router.post("/importar-agilsalud/confirmar")
-async def importar_agilsalud_confirmar(request: Request, datos_json: str = Form(...)):
+def importar_agilsalud_confirmar(request: Request, datos_json: str = Form(...)):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -1185,6 +1072,8 @@ async def importar_agilsalud_confirmar(request: Request, datos_json: str = Form(
                  f.get("responsable") or None, f.get("correo_remitente") or None),
             )
             insertados += 1
+        actualizar_plazos(conn)
+        refrescar_alertas(conn, _MOD)
         conn.commit()
     except Exception:
         conn.rollback()
@@ -1197,28 +1086,21 @@ async def importar_agilsalud_confirmar(request: Request, datos_json: str = Form(
 # ── Verificar duplicado de N. Radicado (API JSON) ─────────────────────────────
 
 @router.get("/verificar-radicado")
-async def verificar_radicado(
+def verificar_radicado(
     request: Request,
     n_radicado: str = "",
     exclude_id: int = 0,
 ):
     from fastapi.responses import JSONResponse
-    val = n_radicado.strip().upper()
+    val = normalizar(n_radicado)
     if not val:
         return JSONResponse({"existe": False, "registros": []})
     conn = get_db()
-    if exclude_id:
-        rows = conn.execute(
-            "SELECT id, n_radicado, responsable, fecha_ingreso, mes, anio "
-            "FROM correspondencia WHERE UPPER(TRIM(n_radicado)) = ? AND id != ? AND eliminado_en IS NULL",
-            (val, exclude_id),
-        ).fetchall()
-    else:
-        rows = conn.execute(
-            "SELECT id, n_radicado, responsable, fecha_ingreso, mes, anio "
-            "FROM correspondencia WHERE UPPER(TRIM(n_radicado)) = ? AND eliminado_en IS NULL",
-            (val,),
-        ).fetchall()
+    rows = conn.execute(
+        "SELECT id, n_radicado, responsable, fecha_ingreso, mes, anio "
+        "FROM correspondencia WHERE radicado_norm = ? AND id != ? AND eliminado_en IS NULL",
+        (val, exclude_id),
+    ).fetchall()
     conn.close()
     registros = [
         {
@@ -1236,7 +1118,7 @@ async def verificar_radicado(
 # ── Papelera de reciclaje (DEBE ir antes de "/{reg_id}" — ruta estática) ───────
 
 @router.get("/papelera", response_class=HTMLResponse)
-async def papelera(request: Request, msg: str = ""):
+def papelera(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -1259,12 +1141,13 @@ async def papelera(request: Request, msg: str = ""):
 
 
 @router.post("/{reg_id}/restaurar")
-async def restaurar(request: Request, reg_id: int):
+def restaurar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/correspondencia/papelera?msg=sin_permiso", status_code=303)
     conn = get_db()
     conn.execute("UPDATE correspondencia SET eliminado_en = NULL, eliminado_por = NULL WHERE id = ?", (reg_id,))
+    refrescar_alertas(conn, _MOD, [reg_id])
     conn.commit()
     conn.close()
     registrar_log(user, "restaurar", _MOD, f"Oficio #{reg_id}", registro_id=reg_id)
@@ -1272,12 +1155,13 @@ async def restaurar(request: Request, reg_id: int):
 
 
 @router.post("/{reg_id}/purgar")
-async def purgar(request: Request, reg_id: int):
+def purgar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not user or user.get("rol") not in ROLES_SUPERUSUARIO:
         return RedirectResponse("/correspondencia/papelera?msg=sin_permiso", status_code=303)
     conn = get_db()
     conn.execute("DELETE FROM correspondencia WHERE id = ? AND eliminado_en IS NOT NULL", (reg_id,))
+    refrescar_alertas(conn, _MOD, [reg_id])
     conn.commit()
     conn.close()
     registrar_log(user, "purgar", _MOD, f"Oficio #{reg_id} — eliminado definitivamente", registro_id=reg_id)
@@ -1287,7 +1171,7 @@ async def purgar(request: Request, reg_id: int):
 # ── VER / EDITAR / ELIMINAR ────────────────────────────────────────────────────
 
 @router.get("/{reg_id}", response_class=HTMLResponse)
-async def ver(request: Request, reg_id: int, back: str = "", msg: str = ""):
+def ver(request: Request, reg_id: int, back: str = "", msg: str = ""):
     conn = get_db()
     row = conn.execute("SELECT * FROM correspondencia WHERE id=?", (reg_id,)).fetchone()
     if not row:
@@ -1310,7 +1194,7 @@ async def ver(request: Request, reg_id: int, back: str = "", msg: str = ""):
 
 
 @router.get("/{reg_id}/editar", response_class=HTMLResponse)
-async def editar_form(request: Request, reg_id: int, msg: str = "", back: str = ""):
+def editar_form(request: Request, reg_id: int, msg: str = "", back: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse(f"/correspondencia/{reg_id}?msg=sin_permiso", status_code=303)
@@ -1342,7 +1226,7 @@ async def editar_form(request: Request, reg_id: int, msg: str = "", back: str =
 
 
 @router.post("/{reg_id}/editar")
-async def editar_post(
+def editar_post(
     request: Request,
     reg_id: int,
     anio: int = Form(None),
@@ -1384,6 +1268,8 @@ async def editar_post(
         _v(correo_remitente), _v(sinproc_personeria), _v(tipo_requerimiento),
         termino_val, reg_id,
     ])
+    actualizar_plazos(conn, [reg_id])
+    refrescar_alertas(conn, _MOD, [reg_id])
     conn.commit()
     conn.close()
     registrar_log(user, "editar", _MOD, f"Oficio #{reg_id} — {_v(n_radicado)}",
@@ -1392,7 +1278,7 @@ async def editar_post(
 
 
 @router.post("/{reg_id}/eliminar")
-async def eliminar(request: Request, reg_id: int):
+def eliminar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/correspondencia/?msg=sin_permiso", status_code=303)
@@ -1401,6 +1287,7 @@ async def eliminar(request: Request, reg_id: int):
         "UPDATE correspondencia SET eliminado_en = datetime('now','localtime'), eliminado_por = ? WHERE id=?",
         (user.get("nombre_completo") if user else None, reg_id),
     )
+    refrescar_alertas(conn, _MOD, [reg_id])
     conn.commit()
     conn.close()
     registrar_log(user, "eliminar", _MOD, f"Oficio #{reg_id}",
@@ -1411,7 +1298,7 @@ async def eliminar(request: Request, reg_id: int):
 # ── RADICADOS DE SALIDA ────────────────────────────────────────────────────────
 
 @router.post("/{reg_id}/radicado_salida/nuevo")
-async def radicado_nuevo(reg_id: int, radicado: str = Form(...), url: str = Form("")):
+def radicado_nuevo(reg_id: int, radicado: str = Form(...), url: str = Form("")):
     r = radicado.strip()
     u = url.strip() or None
     if r:
@@ -1426,7 +1313,7 @@ async def radicado_nuevo(reg_id: int, radicado: str = Form(...), url: str = Form
 
 
 @router.post("/radicado_salida/{rad_id}/eliminar")
-async def radicado_eliminar(rad_id: int):
+def radicado_eliminar(rad_id: int):
     conn = get_db()
     row = conn.execute(
         "SELECT correspondencia_id FROM correspondencia_radicados_salida WHERE id=?", (rad_id,)
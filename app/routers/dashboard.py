@@ -2,9 +2,11 @@ from fastapi import APIRouter, Request
 from fastapi.responses import HTMLResponse
 from pathlib import Path
 from app.template_utils import make_templates
-from datetime import date
+from datetime import date, timedelta
 
+from app.alertas import planificador
 from app.database import get_db, row_to_dict
+from app.estadisticas import cache_estadisticas, mayores, sumar_por
 from app.routers.expedientes import _enriquecer
 
 router = APIRouter()
@@ -21,49 +23,32 @@ MESES_NUM = {
 }
 
 
-@router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    conn = get_db()
-    hoy = date.today().isoformat()
-
-    total = conn.execute("SELECT COUNT(*) FROM expedientes WHERE eliminado_en IS NULL").fetchone()[0]
-
-    por_etapa = [{"etapa": r[0] or "Sin etapa", "cantidad": r[1]}
-        for r in conn.execute(
-            "SELECT etapa_actual, COUNT(*) FROM expedientes WHERE eliminado_en IS NULL GROUP BY etapa_actual ORDER BY COUNT(*) DESC"
-        ).fetchall()]
-
-    por_estado = [{"estado": r[0] or "Sin estado", "cantidad": r[1]}
-        for r in conn.execute(
-            "SELECT estado_proceso, COUNT(*) FROM expedientes WHERE eliminado_en IS NULL GROUP BY estado_proceso ORDER BY COUNT(*) DESC"
-        ).fetchall()]
-
-    por_abogado = [{"abogado": r[0] or "Sin asignar", "cantidad": r[1]}
-        for r in conn.execute(
-            "SELECT abogado_asignado, COUNT(*) FROM expedientes WHERE eliminado_en IS NULL GROUP BY abogado_asignado ORDER BY COUNT(*) DESC"
-        ).fetchall()]
-
-    por_anio = [{"anio": r[0] or "Sin año", "cantidad": r[1]}
-        for r in conn.execute(
-            "SELECT anio, COUNT(*) FROM expedientes WHERE eliminado_en IS NULL GROUP BY anio ORDER BY anio DESC"
-        ).fetchall()]
+def _estadisticas(conn) -> dict:
+    """Conteos del tablero: un GROUP BY por todas las dimensiones, sumado en Python."""
+    cubo = conn.execute("""
+        SELECT etapa_actual, estado_proceso, abogado_asignado, anio, mes, tipologia, COUNT(*)
+        FROM expedientes WHERE eliminado_en IS NULL
+        GROUP BY etapa_actual, estado_proceso, abogado_asignado, anio, mes, tipologia
+        ORDER BY anio DESC
+    """).fetchall()
 
-    por_tipologia = [{"tipologia": r[0] or "Sin especificar", "cantidad": r[1]}
-        for r in conn.execute(
-            "SELECT tipologia, COUNT(*) FROM expedientes WHERE tipologia IS NOT NULL AND eliminado_en IS NULL GROUP BY tipologia ORDER BY COUNT(*) DESC LIMIT 8"
-        ).fetchall()]
+    total = sum(f[-1] for f in cubo)
+    por_etapa = [{"etapa": k or "Sin etapa", "cantidad": n} for k, n in mayores(sumar_por(cubo, 0))]
+    por_estado = [{"estado": k or "Sin estado", "cantidad": n} for k, n in mayores(sumar_por(cubo, 1))]
+    por_abogado = [{"abogado": k or "Sin asignar", "cantidad": n} for k, n in mayores(sumar_por(cubo, 2))]
+    por_anio = [{"anio": k or "Sin año", "cantidad": n} for k, n in sumar_por(cubo, 3).items()]
+    por_tipologia = [{"tipologia": k or "Sin especificar", "cantidad": n}
+                     for k, n in mayores(sumar_por(cubo, 5)) if k is not None][:8]
 
-    filas_tendencia = conn.execute("""
-        SELECT anio, mes, COUNT(*) as cantidad FROM expedientes
-        WHERE anio IS NOT NULL AND mes IS NOT NULL AND eliminado_en IS NULL GROUP BY anio, mes
-    """).fetchall()
     tendencia_raw = []
-    for r in filas_tendencia:
-        mes_num = MESES_NUM.get(str(r[1]).upper(), 0)
+    for (anio, mes), cantidad in sumar_por(cubo, (3, 4)).items():
+        if anio is None or mes is None:
+            continue
+        mes_num = MESES_NUM.get(str(mes).upper(), 0)
         tendencia_raw.append({
-            "anio": r[0], "mes_num": mes_num,
-            "etiqueta": f"{MESES_CORTO.get(str(r[1]).upper(), str(r[1])[:3])} {r[0]}",
-            "cantidad": r[2],
+            "anio": anio, "mes_num": mes_num,
+            "etiqueta": f"{MESES_CORTO.get(str(mes).upper(), str(mes)[:3])} {anio}",
+            "cantidad": cantidad,
         })
     tendencia_raw.sort(key=lambda x: (x["anio"], x["mes_num"]))
     tendencia = tendencia_raw[-24:]
@@ -73,42 +58,57 @@ async def dashboard(request: Request):
     # calcular_alerta), para que "vencidos" signifique exactamente lo mismo en
     # todas las vistas — incluye indagación + investigación + prescripción, y
     # excluye expedientes ya cerrados (AUTO DE ARCHIVO / ACUMULADO / INCORPORADO).
-    todos_enriquecidos = [_enriquecer(dict(r)) for r in conn.execute(
-        "SELECT * FROM expedientes WHERE eliminado_en IS NULL"
-    ).fetchall()]
-
-    def _alertas(e):
-        return (e["alerta_ind"], e["alerta_inv"], e["alerta_prescripcion"])
-
-    vencidos = sum(1 for e in todos_enriquecidos if any(a["clase"] == "vencido" for a in _alertas(e)))
-    prox30 = sum(1 for e in todos_enriquecidos if any(
-        a["dias"] is not None and 0 <= a["dias"] <= 30 for a in _alertas(e)
-    ))
-    prox60 = sum(1 for e in todos_enriquecidos if any(
-        a["dias"] is not None and 31 <= a["dias"] <= 60 for a in _alertas(e)
-    ))
-
-    def _min_dias_indinv(e):
-        vals = [a["dias"] for a in (e["alerta_ind"], e["alerta_inv"]) if a["dias"] is not None]
-        return min(vals) if vals else None
-
-    proximos_lista = sorted(
-        (e for e in todos_enriquecidos if (_min_dias_indinv(e) is not None and _min_dias_indinv(e) <= 60)),
-        key=_min_dias_indinv,
-    )[:15]
+    # Se leen de la tabla `alertas` (app/alertas.py); solo los 15 de la tabla
+    # de próximos pasan por _enriquecer().
+    tipos = "('ind', 'inv', 'prescripcion')"
+    conteo = dict(conn.execute(f"""
+        SELECT estado, COUNT(DISTINCT registro_id) FROM alertas
+        WHERE modulo = 'expedientes' AND estado IN ('roja', 'amarilla') AND tipo IN {tipos}
+        GROUP BY estado
+    """).fetchall())
+    vencidos = conteo.get("roja", 0)
+    prox30 = conteo.get("amarilla", 0)
+    hoy_d = date.today()
+    prox60 = conn.execute(f"""
+        SELECT COUNT(DISTINCT registro_id) FROM alertas
+        WHERE modulo = 'expedientes' AND tipo IN {tipos} AND fecha_vencimiento BETWEEN ? AND ?
+    """, ((hoy_d + timedelta(days=31)).isoformat(), (hoy_d + timedelta(days=60)).isoformat())).fetchone()[0]
+
+    # Más urgentes por indagación/investigación; empates por id, como el
+    # sorted() estable que había sobre la tabla completa.
+    ids_proximos = [r[0] for r in conn.execute("""
+        SELECT registro_id, MIN(fecha_vencimiento) AS primero FROM alertas
+        WHERE modulo = 'expedientes' AND tipo IN ('ind', 'inv') AND fecha_vencimiento <= ?
+        GROUP BY registro_id ORDER BY primero, registro_id LIMIT 15
+    """, ((hoy_d + timedelta(days=60)).isoformat(),)).fetchall()]
+    por_id = {r["id"]: r for r in conn.execute(
+        f"SELECT * FROM expedientes WHERE id IN ({','.join('?' * len(ids_proximos))})", ids_proximos
+    ).fetchall()} if ids_proximos else {}
+    proximos_lista = [_enriquecer(dict(por_id[i])) for i in ids_proximos if i in por_id]
 
     recientes = [row_to_dict(r) for r in conn.execute(
         "SELECT * FROM expedientes WHERE eliminado_en IS NULL ORDER BY created_at DESC LIMIT 10"
     ).fetchall()]
 
-    conn.close()
-
-    return templates.TemplateResponse("dashboard.html", {
-        "request": request, "active": "dashboard",
+    return {
         "total": total, "por_etapa": por_etapa, "por_estado": por_estado,
         "por_abogado": por_abogado, "por_anio": por_anio,
         "por_tipologia": por_tipologia,
         "tendencia": tendencia, "tendencia_max": tendencia_max,
         "vencidos": vencidos, "prox30": prox30, "prox60": prox60,
-        "proximos_lista": proximos_lista, "recientes": recientes, "hoy": hoy,
+        "proximos_lista": proximos_lista, "recientes": recientes,
+    }
+
+
+@router.get("/dashboard", response_class=HTMLResponse)
+def dashboard(request: Request):
+    conn = get_db()
+    hoy = date.today()
+    planificador.asegurar_dia()
+    # Se recalcula solo si cambiaron expedientes o alertas, o cambió el día
+    datos = cache_estadisticas.obtener(conn, "dashboard", ("expedientes", "alertas"), _estadisticas, dia=hoy)
+    conn.close()
+
+    return templates.TemplateResponse("dashboard.html", {
+        "request": request, "active": "dashboard", **datos, "hoy": hoy.isoformat(),
     })
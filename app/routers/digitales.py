@@ -1,12 +1,13 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
-from datetime import date
+from datetime import date, datetime, timezone
 import io
 
 from urllib.parse import quote_plus as _quote_plus
 from app.database import get_db
+from app.estadisticas import cache_estadisticas, mayores, sumar_por
 from app.auth_utils import puede_escribir as _pw, puede_importar as _pi, registrar_log, historial_registro, ROLES_SUPERUSUARIO
 
 _MOD = "digitales"
@@ -44,6 +45,27 @@ def _clase_alerta(dias) -> str | None:
     return None
 
 
+# Comunicación pendiente: sin fecha de respuesta (usa ix_exp_comunicaciones_pendientes)
+_SQL_PENDIENTE = "(c.fecha_respuesta IS NULL OR c.fecha_respuesta = '')"
+
+# alerta -> (días mínimos, días máximos excluidos) sin respuesta, como _clase_alerta()
+_RANGOS_ALERTA = {"roja": (14, None), "amarilla": (13, 14), "azul": (8, 13)}
+
+
+def _sql_alerta(alerta: str, col: str = "c.fecha_envio") -> str:
+    """Condición SQL: `col` cae en el rango de días de la alerta.
+
+    Equivale a CAST(julianday('now') - julianday(col) AS INTEGER) en el rango,
+    escrito como comparación de julianday(col) para no truncar fila por fila.
+    Fechas vacías o inválidas dan julianday NULL y no cumplen.
+    """
+    desde, hasta = _RANGOS_ALERTA[alerta]
+    sql = f"julianday({col}) <= julianday('now') - {desde}"
+    if hasta is not None:
+        sql += f" AND julianday({col}) > julianday('now') - {hasta}"
+    return sql
+
+
 def _fecha(v) -> str | None:
     if v is None:
         return None
@@ -63,7 +85,7 @@ def _fecha(v) -> str | None:
 # ── Lista ──────────────────────────────────────────────────────────────────────
 
 @router.get("/", response_class=HTMLResponse)
-async def lista(
+def lista(
     request: Request,
     q: str = "",
     abogado: str = "",
@@ -94,50 +116,33 @@ async def lista(
         filtros.append("e.anio = ?")
         params.append(int(anio.strip()))
     if sin_respuesta == "1":
-        filtros.append("""e.id IN (
-            SELECT DISTINCT exp_digital_id FROM exp_comunicaciones
-            WHERE fecha_respuesta IS NULL OR fecha_respuesta = ''
-        )""")
+        filtros.append("r.coms_sin_resp > 0")
     if queja == "si":
         filtros.append("(e.queja_inicial = 'Sí' OR e.queja_inicial = 'Si' OR e.queja_inicial = 'SI' OR e.queja_inicial = 'sí')")
+    # Los contadores salen de exp_digitales_resumen (triggers, migración 16).
+    # La roja basta con la comunicación pendiente más antigua; amarilla y azul
+    # piden una pendiente en su rango, que no tiene por qué ser la más antigua.
     if alerta == "roja":
-        filtros.append("""e.id IN (
-            SELECT DISTINCT exp_digital_id FROM exp_comunicaciones
-            WHERE (fecha_respuesta IS NULL OR fecha_respuesta = '')
-            AND fecha_envio IS NOT NULL AND fecha_envio != ''
-            AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) >= 14)""")
-    elif alerta == "amarilla":
-        filtros.append("""e.id IN (
-            SELECT DISTINCT exp_digital_id FROM exp_comunicaciones
-            WHERE (fecha_respuesta IS NULL OR fecha_respuesta = '')
-            AND fecha_envio IS NOT NULL AND fecha_envio != ''
-            AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) = 13)""")
-    elif alerta == "azul":
-        filtros.append("""e.id IN (
-            SELECT DISTINCT exp_digital_id FROM exp_comunicaciones
-            WHERE (fecha_respuesta IS NULL OR fecha_respuesta = '')
-            AND fecha_envio IS NOT NULL AND fecha_envio != ''
-            AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) >= 8
-            AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) < 13)""")
+        filtros.append(_sql_alerta("roja", "r.envio_pendiente_min"))
+    elif alerta in ("amarilla", "azul"):
+        filtros.append(f"""r.coms_sin_resp > 0 AND EXISTS (
+            SELECT 1 FROM exp_comunicaciones c
+            WHERE c.exp_digital_id = e.id AND {_SQL_PENDIENTE} AND {_sql_alerta(alerta)})""")
 
     where = " AND ".join(filtros)
+    desde = "exp_digitales e LEFT JOIN exp_digitales_resumen r ON r.exp_digital_id = e.id"
 
-    total = conn.execute(f"SELECT COUNT(*) FROM exp_digitales e WHERE {where}", params).fetchone()[0]
+    total = conn.execute(f"SELECT COUNT(*) FROM {desde} WHERE {where}", params).fetchone()[0]
     offset = (page - 1) * por_pagina
     rows = conn.execute(
         f"""SELECT e.*,
-            (SELECT COUNT(*) FROM exp_comunicaciones WHERE exp_digital_id = e.id) AS num_coms,
-            (SELECT COUNT(*) FROM exp_comunicaciones
-             WHERE exp_digital_id = e.id AND (fecha_respuesta IS NULL OR fecha_respuesta = '')) AS coms_sin_resp,
-            (SELECT MAX(CAST(julianday('now') - julianday(fecha_envio) AS INTEGER))
-             FROM exp_comunicaciones
-             WHERE exp_digital_id = e.id
-             AND (fecha_respuesta IS NULL OR fecha_respuesta = '')
-             AND fecha_envio IS NOT NULL AND fecha_envio != '') AS max_dias_pendiente,
-            (SELECT MAX(fecha_revision) FROM exp_revisiones WHERE exp_digital_id = e.id) AS ultima_revision
-            FROM exp_digitales e
+            COALESCE(r.num_coms, 0) AS num_coms,
+            COALESCE(r.coms_sin_resp, 0) AS coms_sin_resp,
+            CAST(julianday('now') - julianday(r.envio_pendiente_min) AS INTEGER) AS max_dias_pendiente,
+            r.ultima_revision
+            FROM {desde}
             WHERE {where}
-            ORDER BY e.anio DESC, CAST(e.n_expediente AS INTEGER) ASC, e.n_expediente ASC LIMIT ? OFFSET ?""",
+            ORDER BY e.anio DESC, e.n_num ASC, e.n_expediente ASC LIMIT ? OFFSET ?""",
         params + [por_pagina, offset],
     ).fetchall()
 
@@ -181,77 +186,54 @@ async def lista(
 
 # ── Dashboard ──────────────────────────────────────────────────────────────────
 
-@router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
-    conn = get_db()
-
-    total = conn.execute("SELECT COUNT(*) FROM exp_digitales WHERE eliminado_en IS NULL").fetchone()[0]
-
-    por_etapa = conn.execute("""
-        SELECT etapa, COUNT(*) cant FROM exp_digitales
-        WHERE etapa IS NOT NULL AND eliminado_en IS NULL GROUP BY etapa ORDER BY cant DESC
-    """).fetchall()
-
-    por_abogado = conn.execute("""
-        SELECT abogado, COUNT(*) cant FROM exp_digitales
-        WHERE abogado IS NOT NULL AND eliminado_en IS NULL GROUP BY abogado ORDER BY cant DESC
-    """).fetchall()
-
-    sin_respuesta = conn.execute("""
-        SELECT COUNT(*) FROM exp_comunicaciones c
-        JOIN exp_digitales e ON e.id = c.exp_digital_id
-        WHERE (c.fecha_respuesta IS NULL OR c.fecha_respuesta = '') AND e.eliminado_en IS NULL
-    """).fetchone()[0]
-
-    total_coms = conn.execute("""
-        SELECT COUNT(*) FROM exp_comunicaciones c
-        JOIN exp_digitales e ON e.id = c.exp_digital_id
+def _estadisticas(conn) -> dict:
+    """Conteos del tablero: una pasada por expedientes (con su resumen) y otra por comunicaciones pendientes."""
+    cubo = conn.execute("""
+        SELECT e.etapa, e.abogado, e.anio,
+               e.queja_inicial IN ('Sí', 'Si', 'SI') AS queja_si,
+               COALESCE(SUM(r.coms_sin_resp), 0), COALESCE(SUM(r.num_coms), 0), COUNT(*)
+        FROM exp_digitales e LEFT JOIN exp_digitales_resumen r ON r.exp_digital_id = e.id
         WHERE e.eliminado_en IS NULL
-    """).fetchone()[0]
-
-    queja_si = conn.execute(
-        "SELECT COUNT(*) FROM exp_digitales WHERE (queja_inicial = 'Sí' OR queja_inicial = 'Si' OR queja_inicial = 'SI') AND eliminado_en IS NULL"
-    ).fetchone()[0]
-
-    por_anio = conn.execute("""
-        SELECT anio, COUNT(*) cant FROM exp_digitales
-        WHERE anio IS NOT NULL AND eliminado_en IS NULL GROUP BY anio ORDER BY anio DESC
+        GROUP BY e.etapa, e.abogado, e.anio, queja_si
+        ORDER BY e.anio DESC
     """).fetchall()
 
-    _dias_base = """
-        (c.fecha_respuesta IS NULL OR c.fecha_respuesta = '')
-        AND c.fecha_envio IS NOT NULL AND c.fecha_envio != ''
-        AND e.eliminado_en IS NULL
-        AND CAST(julianday('now') - julianday(c.fecha_envio) AS INTEGER)
-    """
-    alerta_azul = conn.execute(f"""
-        SELECT COUNT(*) FROM exp_comunicaciones c JOIN exp_digitales e ON e.id = c.exp_digital_id
-        WHERE {_dias_base} >= 8 AND CAST(julianday('now') - julianday(c.fecha_envio) AS INTEGER) < 13
-    """).fetchone()[0]
-    alerta_amarilla = conn.execute(f"""
-        SELECT COUNT(*) FROM exp_comunicaciones c JOIN exp_digitales e ON e.id = c.exp_digital_id
-        WHERE {_dias_base} = 13
-    """).fetchone()[0]
-    alerta_roja = conn.execute(f"""
-        SELECT COUNT(*) FROM exp_comunicaciones c JOIN exp_digitales e ON e.id = c.exp_digital_id
-        WHERE {_dias_base} >= 14
-    """).fetchone()[0]
+    # Las alertas cuentan comunicaciones (el enlace abre /digitales/comunicaciones):
+    # una pasada por el índice parcial de pendientes en lugar de tres consultas
+    alerta_azul, alerta_amarilla, alerta_roja = (n or 0 for n in conn.execute(f"""
+        SELECT SUM({_sql_alerta("azul")}), SUM({_sql_alerta("amarilla")}), SUM({_sql_alerta("roja")})
+        FROM exp_comunicaciones c JOIN exp_digitales e ON e.id = c.exp_digital_id
+        WHERE {_SQL_PENDIENTE} AND e.eliminado_en IS NULL
+    """).fetchone())
+
+    return {
+        "total": sum(f[-1] for f in cubo),
+        "por_etapa": [{"etapa": k, "cant": n} for k, n in mayores(sumar_por(cubo, 0)) if k is not None],
+        "por_abogado": [{"abogado": k, "cant": n} for k, n in mayores(sumar_por(cubo, 1)) if k is not None],
+        "sin_respuesta": sum(f[4] for f in cubo),
+        "total_coms": sum(f[5] for f in cubo),
+        "queja_si": sum(f[-1] for f in cubo if f[3]),
+        "por_anio": [{"anio": k, "cant": n} for k, n in sumar_por(cubo, 2).items() if k is not None],
+        "alerta_azul": alerta_azul,
+        "alerta_amarilla": alerta_amarilla,
+        "alerta_roja": alerta_roja,
+    }
 
+
+@router.get("/dashboard", response_class=HTMLResponse)
+def dashboard(request: Request):
+    conn = get_db()
+    # Los días sin respuesta se cuentan con julianday('now') (UTC): el día de la clave también
+    dia = datetime.now(timezone.utc).date()
+    datos = cache_estadisticas.obtener(
+        conn, _MOD, ("exp_digitales", "exp_comunicaciones"), _estadisticas, dia=dia,
+    )
     conn.close()
 
     return templates.TemplateResponse("digitales_dashboard.html", {
         "request": request,
         "active": "digitales_dash",
-        "total": total,
-        "por_etapa": [dict(r) for r in por_etapa],
-        "por_abogado": [dict(r) for r in por_abogado],
-        "sin_respuesta": sin_respuesta,
-        "total_coms": total_coms,
-        "queja_si": queja_si,
-        "por_anio": [dict(r) for r in por_anio],
-        "alerta_azul": alerta_azul,
-        "alerta_amarilla": alerta_amarilla,
-        "alerta_roja": alerta_roja,
+        **datos,
     })
 
 
@@ -265,7 +247,7 @@ def _get_abogados(conn) -> list[str]:
 
 
 @router.get("/nuevo", response_class=HTMLResponse)
-async def nuevo_form(request: Request):
+def nuevo_form(request: Request):
     conn = get_db()
     abogados = _get_abogados(conn)
     conn.close()
@@ -280,7 +262,7 @@ async def nuevo_form(request: Request):
 
 
 @router.post("/nuevo")
-async def nuevo_post(
+def nuevo_post(
     request: Request,
     n_expediente: str = Form(""),
     anio: str = Form(""),
@@ -314,7 +296,7 @@ async def nuevo_post(
 # ── Importar Excel  ← DEBE IR ANTES QUE /{exp_id} ────────────────────────────
 
 @router.get("/importar", response_class=HTMLResponse)
-async def importar_form(request: Request, msg: str = ""):
+def importar_form(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/digitales/?msg=sin_permiso", status_code=303)
@@ -327,7 +309,7 @@ async def importar_form(request: Request, msg: str = ""):
 
 
 @router.post("/importar", response_class=HTMLResponse)
-async def importar_post(request: Request, archivo: UploadFile = File(...)):
+def importar_post(request: Request, archivo: UploadFile = File(...)):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/digitales/?msg=sin_permiso", status_code=303)
@@ -341,7 +323,7 @@ async def importar_post(request: Request, archivo: UploadFile = File(...)):
             "resultado": None,
         })
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     wb = openpyxl.load_workbook(io.BytesIO(contenido), data_only=True)
 
     # Seleccionar hoja
@@ -519,105 +501,95 @@ async def importar_post(request: Request, archivo: UploadFile = File(...)):
 
 # ── Exportar Excel  ← DEBE IR ANTES QUE /{exp_id} ────────────────────────────
 
-@router.get("/exportar")
-async def exportar():
-    try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
-    except ImportError:
-        return RedirectResponse("/digitales/?msg=error_openpyxl")
+def _filas_exportar(conn):
+    """Una fila por comunicación, agrupadas por expediente.
 
-    conn = get_db()
-    exps = conn.execute("SELECT * FROM exp_digitales WHERE eliminado_en IS NULL ORDER BY anio DESC, n_expediente ASC").fetchall()
-    coms = conn.execute(
-        "SELECT * FROM exp_comunicaciones ORDER BY exp_digital_id ASC, fecha_envio ASC, id ASC"
-    ).fetchall()
-    revs = conn.execute(
-        "SELECT exp_digital_id, MAX(fecha_revision) AS ultima_revision FROM exp_revisiones GROUP BY exp_digital_id"
-    ).fetchall()
-    conn.close()
+    La primera de cada expediente lleva sus datos; las siguientes tienen
+    sub=True y van como sub-filas. Un expediente sin comunicaciones sale una vez.
+    """
+    anterior = None
+    for r in conn.execute("""
+        SELECT e.id, e.n_expediente, e.anio, e.abogado, e.etapa, e.queja_inicial,
+               e.radicado_auto, e.nombre_auto, e.fecha_auto, e.observaciones,
+               r.ultima_revision,
+               c.radicado_comunicacion, c.dependencia, c.fecha_envio, c.fecha_seguimiento,
+               c.radicado_respuesta, c.fecha_respuesta, c.responsable,
+               c.observaciones AS com_observaciones
+        FROM exp_digitales e
+        LEFT JOIN exp_digitales_resumen r ON r.exp_digital_id = e.id
+        LEFT JOIN exp_comunicaciones c ON c.exp_digital_id = e.id
+        WHERE e.eliminado_en IS NULL
+        ORDER BY e.anio DESC, e.n_expediente ASC, e.id, c.fecha_envio ASC, c.id ASC
+    """):
+        d = dict(r)
+        d["sub"] = d["id"] == anterior
+        anterior = d["id"]
+        yield d
+
+
+# (título, campo) de las columnas del expediente y de la comunicación
+_COLS_EXPEDIENTE = [
+    ("N° Expediente", "n_expediente"), ("Año", "anio"), ("Abogado", "abogado"), ("Etapa", "etapa"),
+    ("Queja Inicial", "queja_inicial"), ("Radicado Auto", "radicado_auto"), ("Nombre Auto", "nombre_auto"),
+    ("Fecha Auto", "fecha_auto"), ("Obs. Generales", "observaciones"), ("Última Revisión", "ultima_revision"),
+]
+_COLS_COMUNICACION = [
+    ("Radicado Comunicación", "radicado_comunicacion"), ("Dependencia", "dependencia"),
+    ("Fecha Envío", "fecha_envio"), ("Fecha Seguimiento", "fecha_seguimiento"),
+    ("Radicado Respuesta", "radicado_respuesta"), ("Fecha Respuesta", "fecha_respuesta"),
+    ("Responsable", "responsable"), ("Observaciones", "com_observaciones"),
+]
+_ANCHOS_EXPORTAR = [15, 6, 22, 20, 14, 20, 30, 14, 40, 22, 22, 25, 14, 16, 22, 14, 20, 40]
+
+
+def _columnas_exportar(formato=None, observaciones_com: str = "Observaciones"):
+    """Columnas de la exportación; las del expediente quedan vacías en las sub-filas."""
+    from app.excel import Columna
+
+    def del_expediente(campo):
+        if formato:
+            return lambda d: None if d["sub"] else formato(d[campo])
+        return lambda d: None if d["sub"] else d[campo]
+
+    titulos = [t for t, _ in _COLS_COMUNICACION[:-1]] + [observaciones_com]
+    return [
+        Columna(titulo, del_expediente(campo), ancho)
+        for (titulo, campo), ancho in zip(_COLS_EXPEDIENTE, _ANCHOS_EXPORTAR)
+    ] + [
+        Columna(titulo, campo, ancho, formato=formato)
+        for titulo, (_, campo), ancho in zip(titulos, _COLS_COMUNICACION, _ANCHOS_EXPORTAR[10:])
+    ]
 
-    ultima_rev_por_exp: dict[int, str] = {r["exp_digital_id"]: r["ultima_revision"] for r in revs}
 
-    coms_por_exp: dict[int, list] = {}
-    for c in coms:
-        eid = c["exp_digital_id"]
-        coms_por_exp.setdefault(eid, []).append(dict(c))
+def _hoja_exportar():
+    """Hoja EXP DIGIT de la exportación (también va en el ZIP de backup)."""
+    from app.excel import Hoja, na
+    from openpyxl.styles import Font, Alignment
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "EXP DIGIT 2025-2026"
+    return Hoja(
+        "EXP DIGIT 2025-2026", _columnas_exportar(na), _filas_exportar, color="1e3a5f",
+        fuente_encabezado=Font(bold=True, color="FFFFFF"), alto_encabezado=None,
+        alineacion_encabezado=Alignment(horizontal="center"), alterna=None, alineacion=None,
+        relleno_fila=lambda d, n: "dbeafe" if d["sub"] else None, congelar=None,
+        previas=lambda ws, conn: [["SEGUIMIENTO EXPEDIENTES DIGITALES"]],
+    )
 
-    header_fill = PatternFill("solid", fgColor="1e3a5f")
-    header_font = Font(bold=True, color="FFFFFF")
-    sub_fill = PatternFill("solid", fgColor="dbeafe")
 
-    cabeceras = [
-        "N° Expediente", "Año", "Abogado", "Etapa", "Queja Inicial",
-        "Radicado Auto", "Nombre Auto", "Fecha Auto",
-        "Obs. Generales", "Última Revisión",
-        "Radicado Comunicación", "Dependencia", "Fecha Envío",
-        "Fecha Seguimiento", "Radicado Respuesta", "Fecha Respuesta",
-        "Responsable", "Observaciones",
-    ]
-    ws.append(["SEGUIMIENTO EXPEDIENTES DIGITALES"])
-    ws.append(cabeceras)
-    for cell in ws[2]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center")
-
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    for exp in exps:
-        ed = dict(exp)
-        exp_coms = coms_por_exp.get(ed["id"], [])
-        primera_com = exp_coms[0] if exp_coms else {}
-
-        row = [
-            _na(ed.get("n_expediente")), _na(ed.get("anio")), _na(ed.get("abogado")), _na(ed.get("etapa")),
-            _na(ed.get("queja_inicial")), _na(ed.get("radicado_auto")), _na(ed.get("nombre_auto")), _na(ed.get("fecha_auto")),
-            _na(ed.get("observaciones")), _na(ultima_rev_por_exp.get(ed["id"])),
-            _na(primera_com.get("radicado_comunicacion")), _na(primera_com.get("dependencia")),
-            _na(primera_com.get("fecha_envio")), _na(primera_com.get("fecha_seguimiento")),
-            _na(primera_com.get("radicado_respuesta")), _na(primera_com.get("fecha_respuesta")),
-            _na(primera_com.get("responsable")), _na(primera_com.get("observaciones")),
-        ]
-        ws.append(row)
-
-        for com in exp_coms[1:]:
-            sub_row = [
-                None, None, None, None, None, None, None, None,
-                None, None,
-                _na(com.get("radicado_comunicacion")), _na(com.get("dependencia")),
-                _na(com.get("fecha_envio")), _na(com.get("fecha_seguimiento")),
-                _na(com.get("radicado_respuesta")), _na(com.get("fecha_respuesta")),
-                _na(com.get("responsable")), _na(com.get("observaciones")),
-            ]
-            ws.append(sub_row)
-            for cell in ws[ws.max_row]:
-                cell.fill = sub_fill
-
-    col_widths = [15, 6, 22, 20, 14, 20, 30, 14, 40, 22, 22, 25, 14, 16, 22, 14, 20, 40]
-    for i, w in enumerate(col_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+@router.get("/exportar")
+def exportar():
+    try:
+        from app.excel import respuesta_xlsx
+    except ImportError:
+        return RedirectResponse("/digitales/?msg=error_openpyxl")
 
     hoy = date.today().strftime("%Y%m%d")
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=exp_digitales_{hoy}.xlsx"},
-    )
+    return respuesta_xlsx([_hoja_exportar()], f"exp_digitales_{hoy}.xlsx")
 
 
 # ── Vista global de comunicaciones  ← ANTES DE /{exp_id} ─────────────────────
 
 @router.get("/comunicaciones", response_class=HTMLResponse)
-async def comunicaciones_lista(
+def comunicaciones_lista(
     request: Request,
     sin_respuesta: str = "",
     alerta: str = "",
@@ -631,19 +603,9 @@ async def comunicaciones_lista(
 
     if sin_respuesta == "1":
         filtros.append("(c.fecha_respuesta IS NULL OR c.fecha_respuesta = '')")
-    if alerta == "roja":
-        filtros.append("(c.fecha_respuesta IS NULL OR c.fecha_respuesta = '')")
-        filtros.append("c.fecha_envio IS NOT NULL AND c.fecha_envio != ''")
-        filtros.append("CAST(julianday('now') - julianday(c.fecha_envio) AS INTEGER) >= 14")
-    elif alerta == "amarilla":
-        filtros.append("(c.fecha_respuesta IS NULL OR c.fecha_respuesta = '')")
-        filtros.append("c.fecha_envio IS NOT NULL AND c.fecha_envio != ''")
-        filtros.append("CAST(julianday('now') - julianday(c.fecha_envio) AS INTEGER) = 13")
-    elif alerta == "azul":
-        filtros.append("(c.fecha_respuesta IS NULL OR c.fecha_respuesta = '')")
-        filtros.append("c.fecha_envio IS NOT NULL AND c.fecha_envio != ''")
-        filtros.append("CAST(julianday('now') - julianday(c.fecha_envio) AS INTEGER) >= 8")
-        filtros.append("CAST(julianday('now') - julianday(c.fecha_envio) AS INTEGER) < 13")
+    if alerta in _RANGOS_ALERTA:
+        filtros.append(_SQL_PENDIENTE)
+        filtros.append(_sql_alerta(alerta))
     if abogado.strip():
         filtros.append("e.abogado = ?")
         params.append(abogado.strip())
@@ -696,7 +658,7 @@ async def comunicaciones_lista(
 # ── Comunicaciones CRUD (rutas sin {exp_id} al inicio) ────────────────────────
 
 @router.post("/comunicacion/{com_id}/editar")
-async def com_editar(
+def com_editar(
     request: Request,
     com_id: int,
     radicado_comunicacion: str = Form(""),
@@ -736,7 +698,7 @@ async def com_editar(
 
 
 @router.post("/comunicacion/{com_id}/eliminar")
-async def com_eliminar(request: Request, com_id: int):
+def com_eliminar(request: Request, com_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/digitales/?msg=sin_permiso", status_code=303)
@@ -755,7 +717,7 @@ async def com_eliminar(request: Request, com_id: int):
 # ── CRUD Abogados  ← ANTES DE /{exp_id} ──────────────────────────────────────
 
 @router.get("/abogados", response_class=HTMLResponse)
-async def abogados_lista(request: Request, msg: str = ""):
+def abogados_lista(request: Request, msg: str = ""):
     conn = get_db()
     abogados = conn.execute(
         "SELECT id, nombre FROM abogados_digitales ORDER BY nombre"
@@ -770,7 +732,7 @@ async def abogados_lista(request: Request, msg: str = ""):
 
 
 @router.post("/abogados/nuevo")
-async def abogado_crear(request: Request, nombre: str = Form("")):
+def abogado_crear(request: Request, nombre: str = Form("")):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/digitales/abogados?msg=sin_permiso", status_code=303)
@@ -791,7 +753,7 @@ async def abogado_crear(request: Request, nombre: str = Form("")):
 
 
 @router.post("/abogados/{ab_id}/editar")
-async def abogado_editar(request: Request, ab_id: int, nombre: str = Form("")):
+def abogado_editar(request: Request, ab_id: int, nombre: str = Form("")):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/digitales/abogados?msg=sin_permiso", status_code=303)
@@ -831,7 +793,7 @@ async def abogado_editar(request: Request, ab_id: int, nombre: str = Form("")):
 
 
 @router.post("/abogados/{ab_id}/eliminar")
-async def abogado_eliminar(request: Request, ab_id: int):
+def abogado_eliminar(request: Request, ab_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/digitales/abogados?msg=sin_permiso", status_code=303)
@@ -853,7 +815,7 @@ async def abogado_eliminar(request: Request, ab_id: int):
 # ── Papelera de reciclaje (también antes de "/{exp_id}") ──────────────────────
 
 @router.get("/papelera", response_class=HTMLResponse)
-async def papelera(request: Request, msg: str = ""):
+def papelera(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/digitales/?msg=sin_permiso", status_code=303)
@@ -878,7 +840,7 @@ async def papelera(request: Request, msg: str = ""):
 
 
 @router.post("/{exp_id}/restaurar")
-async def restaurar(request: Request, exp_id: int):
+def restaurar(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/digitales/papelera?msg=sin_permiso", status_code=303)
@@ -891,7 +853,7 @@ async def restaurar(request: Request, exp_id: int):
 
 
 @router.post("/{exp_id}/purgar")
-async def purgar(request: Request, exp_id: int):
+def purgar(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not user or user.get("rol") not in ROLES_SUPERUSUARIO:
         return RedirectResponse("/digitales/papelera?msg=sin_permiso", status_code=303)
@@ -906,7 +868,7 @@ async def purgar(request: Request, exp_id: int):
 # ── Detalle  ← /{exp_id} siempre AL FINAL ─────────────────────────────────────
 
 @router.get("/{exp_id}", response_class=HTMLResponse)
-async def detalle(request: Request, exp_id: int, msg: str = "", back: str = ""):
+def detalle(request: Request, exp_id: int, msg: str = "", back: str = ""):
     conn = get_db()
     exp = conn.execute("SELECT * FROM exp_digitales WHERE id = ?", (exp_id,)).fetchone()
     if not exp:
@@ -935,7 +897,7 @@ async def detalle(request: Request, exp_id: int, msg: str = "", back: str = ""):
 
 
 @router.post("/{exp_id}/revisar")
-async def marcar_revisado(request: Request, exp_id: int):
+def marcar_revisado(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse(f"/digitales/{exp_id}?msg=sin_permiso", status_code=303)
@@ -949,7 +911,7 @@ async def marcar_revisado(request: Request, exp_id: int):
 
 
 @router.get("/{exp_id}/editar", response_class=HTMLResponse)
-async def editar_form(request: Request, exp_id: int, msg: str = "", back: str = ""):
+def editar_form(request: Request, exp_id: int, msg: str = "", back: str = ""):
     conn = get_db()
     exp = conn.execute("SELECT * FROM exp_digitales WHERE id = ?", (exp_id,)).fetchone()
     if not exp:
@@ -982,7 +944,7 @@ async def editar_form(request: Request, exp_id: int, msg: str = "", back: str =
 
 
 @router.post("/{exp_id}/editar")
-async def editar_post(
+def editar_post(
     request: Request,
     exp_id: int,
     n_expediente: str = Form(""),
@@ -1017,7 +979,7 @@ async def editar_post(
 
 
 @router.post("/{exp_id}/eliminar")
-async def eliminar(request: Request, exp_id: int):
+def eliminar(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse(f"/digitales/?msg=sin_permiso", status_code=303)
@@ -1038,7 +1000,7 @@ async def eliminar(request: Request, exp_id: int):
 
 
 @router.post("/{exp_id}/comunicacion/nueva")
-async def com_nueva(
+def com_nueva(
     request: Request,
     exp_id: int,
     radicado_comunicacion: str = Form(""),
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
 from datetime import date, datetime
@@ -7,6 +7,7 @@ import io
 
 from app.database import get_db, row_to_dict, get_personal_oficina
 from app.auth_utils import tpl, puede_escribir as _pw, puede_importar as _pi, registrar_log
+from app.texto import patron_like
 
 _MOD = "equipos"
 
@@ -55,7 +56,7 @@ def _equipo_label(b: dict) -> str:
 # ═══════════════════════ PRÉSTAMOS DE EQUIPOS ════════════════════════════════
 
 @router.get("/", response_class=HTMLResponse)
-async def lista(
+def lista(
     request: Request,
     estado: str = "",
     funcionario: str = "",
@@ -71,10 +72,9 @@ async def lista(
     if funcionario:
         where.append("funcionario = ?")
         params.append(funcionario)
-    if q:
-        where.append("(UPPER(equipo_descripcion) LIKE ? OR UPPER(funcionario) LIKE ? OR UPPER(observaciones) LIKE ?)")
-        like = f"%{q.upper()}%"
-        params += [like, like, like]
+    if patron_like(q):
+        where.append("texto_norm LIKE ?")
+        params.append(patron_like(q))
 
     cond = " AND ".join(where)
     total = conn.execute(f"SELECT COUNT(*) FROM prestamos_equipos WHERE {cond}", params).fetchone()[0]
@@ -106,7 +106,7 @@ async def lista(
 
 
 @router.get("/nuevo", response_class=HTMLResponse)
-async def nuevo_form(request: Request):
+def nuevo_form(request: Request):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/equipos/?msg=sin_permiso", status_code=303)
@@ -124,7 +124,7 @@ async def nuevo_form(request: Request):
 
 
 @router.post("/nuevo")
-async def nuevo_post(
+def nuevo_post(
     request: Request,
     bien_id: str = Form(""),
     equipo_descripcion: str = Form(""),
@@ -164,7 +164,7 @@ async def nuevo_post(
 
 
 @router.get("/{reg_id}", response_class=HTMLResponse)
-async def detalle(request: Request, reg_id: int, msg: str = ""):
+def detalle(request: Request, reg_id: int, msg: str = ""):
     conn = get_db()
     reg = conn.execute("SELECT * FROM prestamos_equipos WHERE id = ?", (reg_id,)).fetchone()
     conn.close()
@@ -176,7 +176,7 @@ async def detalle(request: Request, reg_id: int, msg: str = ""):
 
 
 @router.get("/{reg_id}/editar", response_class=HTMLResponse)
-async def editar_form(request: Request, reg_id: int):
+def editar_form(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse(f"/equipos/{reg_id}?msg=sin_permiso", status_code=303)
@@ -197,7 +197,7 @@ async def editar_form(request: Request, reg_id: int):
 
 
 @router.post("/{reg_id}/editar")
-async def editar_post(
+def editar_post(
     request: Request,
     reg_id: int,
     bien_id: str = Form(""),
@@ -247,7 +247,7 @@ async def editar_post(
 
 
 @router.post("/{reg_id}/devolver")
-async def devolver(request: Request, reg_id: int):
+def devolver(request: Request, reg_id: int):
     """Acción rápida: marca el préstamo como Devuelto con fecha de hoy."""
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
@@ -266,7 +266,7 @@ async def devolver(request: Request, reg_id: int):
 
 
 @router.post("/{reg_id}/eliminar")
-async def eliminar(request: Request, reg_id: int):
+def eliminar(request: Request, reg_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/equipos/?msg=sin_permiso", status_code=303)
@@ -281,7 +281,7 @@ async def eliminar(request: Request, reg_id: int):
 # ═══════════════════════ REPORTE DE BIENES MUEBLES OCDI ══════════════════════
 
 @router.get("/bienes/lista", response_class=HTMLResponse)
-async def bienes_lista(
+def bienes_lista(
     request: Request,
     responsable: str = "",
     categoria: str = "",
@@ -297,12 +297,9 @@ async def bienes_lista(
     if categoria:
         where.append("descripcion_elemento = ?")
         params.append(categoria)
-    if q:
-        where.append("""(UPPER(descripcion_elemento) LIKE ? OR UPPER(descripcion_detallada) LIKE ?
-                          OR UPPER(marca) LIKE ? OR UPPER(modelo) LIKE ? OR UPPER(numero_serial) LIKE ?
-                          OR UPPER(nombre_responsable) LIKE ? OR numero_placa_fisica LIKE ?)""")
-        like = f"%{q.upper()}%"
-        params += [like, like, like, like, like, like, f"%{q}%"]
+    if patron_like(q):
+        where.append("(texto_norm LIKE ? OR numero_placa_fisica LIKE ?)")
+        params += [patron_like(q), f"%{q}%"]
 
     cond = " AND ".join(where)
     total = conn.execute(f"SELECT COUNT(*) FROM bienes_muebles WHERE {cond}", params).fetchone()[0]
@@ -331,7 +328,7 @@ async def bienes_lista(
 
 
 @router.get("/bienes/importar", response_class=HTMLResponse)
-async def bienes_importar_form(request: Request, msg: str = ""):
+def bienes_importar_form(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/equipos/bienes/lista?msg=sin_permiso", status_code=303)
@@ -371,7 +368,7 @@ _HEADER_CAMPO = {
 
 
 @router.post("/bienes/importar")
-async def bienes_importar_post(request: Request, archivo: UploadFile = File(...)):
+def bienes_importar_post(request: Request, archivo: UploadFile = File(...)):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/equipos/bienes/lista?msg=sin_permiso", status_code=303)
@@ -380,7 +377,7 @@ async def bienes_importar_post(request: Request, archivo: UploadFile = File(...)
     except ImportError:
         return RedirectResponse("/equipos/bienes/importar?msg=error_openpyxl", status_code=303)
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     if not contenido:
         return RedirectResponse("/equipos/bienes/importar?msg=error_vacio", status_code=303)
 
@@ -435,57 +432,31 @@ async def bienes_importar_post(request: Request, archivo: UploadFile = File(...)
 
 
 @router.get("/bienes/exportar")
-async def bienes_exportar():
+def bienes_exportar():
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from app.excel import Columna, Hoja, na, respuesta_xlsx
+        from openpyxl.styles import Alignment, Font
     except ImportError:
         return RedirectResponse("/equipos/bienes/lista?msg=error_openpyxl", status_code=303)
 
-    conn = get_db()
-    rows = conn.execute("SELECT * FROM bienes_muebles ORDER BY descripcion_elemento, marca").fetchall()
-    conn.close()
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "BIENES MUEBLES OCDI"
-
-    headers = [
-        "ID_PLACA", "NUMERO PLACA FÍSICA", "MARCA DEL ELEMENTO", "MODELO DEL ELEMENTO",
-        "NÚMERO SERIAL", "ID DEL ELEMENTO", "DESCRIPCION DEL ELEMENTO",
-        "DESCRIPCION DETALLADA DEL ELEMENTO", "INTERNO FUNCIONARIO", "NOMBRES RESPONSABLE",
-        "NUMERO DEL INGRESO", "FECHA INGRESO", "FECHA SERVICIO",
-        "NO. IDENTIFICACION FUNCIONARIO", "CANTIDAD_VIDA_UTIL", "NUMERO_CONTRATO", "PROVEEDOR",
-    ]
-    campos = [
-        "id_placa", "numero_placa_fisica", "marca", "modelo", "numero_serial", "id_elemento",
-        "descripcion_elemento", "descripcion_detallada", "interno_funcionario", "nombre_responsable",
-        "numero_ingreso", "fecha_ingreso", "fecha_servicio", "identificacion_funcionario",
-        "cantidad_vida_util", "numero_contrato", "proveedor",
+    columnas = [
+        Columna(titulo, campo, 18, formato=na) for titulo, campo in [
+            ("ID_PLACA", "id_placa"), ("NUMERO PLACA FÍSICA", "numero_placa_fisica"),
+            ("MARCA DEL ELEMENTO", "marca"), ("MODELO DEL ELEMENTO", "modelo"),
+            ("NÚMERO SERIAL", "numero_serial"), ("ID DEL ELEMENTO", "id_elemento"),
+            ("DESCRIPCION DEL ELEMENTO", "descripcion_elemento"),
+            ("DESCRIPCION DETALLADA DEL ELEMENTO", "descripcion_detallada"),
+            ("INTERNO FUNCIONARIO", "interno_funcionario"), ("NOMBRES RESPONSABLE", "nombre_responsable"),
+            ("NUMERO DEL INGRESO", "numero_ingreso"), ("FECHA INGRESO", "fecha_ingreso"),
+            ("FECHA SERVICIO", "fecha_servicio"), ("NO. IDENTIFICACION FUNCIONARIO", "identificacion_funcionario"),
+            ("CANTIDAD_VIDA_UTIL", "cantidad_vida_util"), ("NUMERO_CONTRATO", "numero_contrato"),
+            ("PROVEEDOR", "proveedor"),
+        ]
     ]
-    header_fill = PatternFill("solid", fgColor="1B4F8A")
-    header_font = Font(bold=True, color="FFFFFF")
-    ws.append(headers)
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center")
-
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    for r in rows:
-        d = dict(r)
-        ws.append([_na(d.get(c)) for c in campos])
-
-    ws.freeze_panes = "A2"
-    for i in range(1, len(headers) + 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = 18
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=Bienes_Muebles_OCDI.xlsx"},
+    hoja = Hoja(
+        "BIENES MUEBLES OCDI", columnas,
+        lambda conn: conn.execute("SELECT * FROM bienes_muebles ORDER BY descripcion_elemento, marca"),
+        fuente_encabezado=Font(bold=True, color="FFFFFF"), alto_encabezado=None,
+        alineacion_encabezado=Alignment(horizontal="center"), alterna=None, alineacion=None,
     )
+    return respuesta_xlsx([hoja], "Bienes_Muebles_OCDI.xlsx")
@@ -1,16 +1,19 @@
-from fastapi import APIRouter, Request, Form
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi import APIRouter, Request, Form, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
-from datetime import date, datetime as _dt
-from calendar import monthrange
+from datetime import date, datetime as _dt, timedelta
 from typing import Optional
 import json
 import io
 import sqlite3
+from starlette.datastructures import FormData
 
-from app.database import get_db, calcular_alerta, row_to_dict
-from app.auth_utils import puede_escribir as _pw, puede_importar as _pi, registrar_log, historial_registro, ROLES_SUPERUSUARIO
+from app.alertas import refrescar_alertas
+from app.busqueda import filtro_subcadena
+from app.database import get_db, row_to_dict
+from app.vencimientos import actualizar_vencimientos, enriquecer as _enriquecer
+from app.auth_utils import puede_escribir as _pw, puede_importar as _pi, registrar_log, historial_registro, ROLES_SUPERUSUARIO, form_request
 
 _MOD = "expedientes"
 _ROOT = Path(__file__).parent.parent.parent
@@ -61,11 +64,6 @@ ESTADOS = [
     "PLIEGO DE CARGOS",
 ]
 
-# Estados que cierran el expediente: a partir de aquí los plazos dejan de "correr".
-# Fuente única de verdad — usada por _enriquecer() para que TODAS las vistas
-# (lista, dashboard, detalle, exportar-filtrado) coincidan en qué cuenta como "vencido".
-ESTADOS_CERRADOS = {"AUTO DE ARCHIVO", "ACUMULADO", "INCORPORADO"}
-
 ENTIDADES_SUGERIDAS = [
     "SDQS", "PERSONERIA DE BOGOTA", "PERSONA PARTICULAR", "ANONIMO", "CONTRALORIA",
 ]
@@ -105,94 +103,44 @@ def _get_entidades():
     return _entidades_cache
 
 
-# ── Helpers de fecha y semáforo ────────────────────────────────────────────────
-
-def _safe_date(s) -> date | None:
-    """Acepta 'YYYY-MM-DD' y también 'YYYY-MM-DD HH:MM:SS' (legacy de importaciones anteriores)."""
-    if not s:
-        return None
-    try:
-        return date.fromisoformat(str(s).strip()[:10])
-    except ValueError:
-        return None
-
-
-def _add_months(d: date, months: int) -> date:
-    m = d.month - 1 + months
-    year = d.year + m // 12
-    month = m % 12 + 1
-    day = min(d.day, monthrange(year, month)[1])
-    return date(year, month, day)
-
-
-def _add_years(d: date, years: int) -> date:
-    try:
-        return d.replace(year=d.year + years)
-    except ValueError:
-        return date(d.year + years, 2, 28)
-
-
-def _parse_flexible_date(s: str) -> date | None:
-    if not s:
-        return None
-    s = s.strip()
-    if len(s) == 4 and s.isdigit():
-        try:
-            return date(int(s), 1, 1)
-        except ValueError:
-            return None
-    elif len(s) == 7 and s[4] == "-":
-        try:
-            return date(int(s[:4]), int(s[5:]), 1)
-        except ValueError:
-            return None
-    else:
-        try:
-            return date.fromisoformat(s)
-        except ValueError:
-            return None
-
-
-def _enriquecer(exp: dict) -> dict:
-    # VENCIMIENTO ETAPA INDAGACIÓN = 6 meses desde FECHA DEL AUTO
-    d = _safe_date(exp.get("fecha_auto_apertura_ind"))
-    fv_ind = _add_months(d, 6).isoformat() if d else None
-    exp["fecha_vencimiento_ind"] = fv_ind
-    exp["alerta_ind"] = calcular_alerta(fv_ind)
-
-    # PRESCRIPCION = 5 años desde FECHA DE LOS HECHOS
-    d_hechos = _parse_flexible_date(exp.get("fecha_hechos") or "")
-    fv_presc = _add_years(d_hechos, 5).isoformat() if d_hechos else None
-    exp["fecha_prescripcion"] = fv_presc
-    exp["alerta_prescripcion"] = calcular_alerta(fv_presc)
-
-    # VENCIMIENTO ETAPA INVESTIGACIÓN = 6 meses desde FECHA APERTURA INVESTIGACION
-    d = _safe_date(exp.get("fecha_apertura_investigacion"))
-    fv_inv = _add_months(d, 6).isoformat() if d else None
-    exp["fecha_vencimiento_inv"] = fv_inv
-    exp["alerta_inv"] = calcular_alerta(fv_inv)
-
-    # VENCIMIENTO PRORROGA = FECHA DE PRORROGA + TIEMPO PRORROGA meses
-    fv_prorr = None
-    d_prorr = _safe_date(exp.get("fecha_prorroga"))
-    if d_prorr and exp.get("tiempo_prorroga"):
-        try:
-            fv_prorr = _add_months(d_prorr, int(exp["tiempo_prorroga"])).isoformat()
-        except (ValueError, TypeError):
-            pass
-    exp["fecha_vencimiento_prorroga"] = fv_prorr
-    exp["alerta_prorroga"] = calcular_alerta(fv_prorr)
-
-    # Si el expediente ya está cerrado, el plazo dejó de correr: no debe contar
-    # como "vencido" ni "próximo" en ninguna vista (lista, dashboard, export).
-    if (exp.get("estado_proceso") or "").strip().upper() in ESTADOS_CERRADOS:
-        _cerrado = {"dias": None, "clase": "sin-plazo", "texto": "Cerrado — plazo no aplica"}
-        exp["alerta_ind"] = dict(_cerrado)
-        exp["alerta_inv"] = dict(_cerrado)
-        exp["alerta_prescripcion"] = dict(_cerrado)
-        exp["alerta_prorroga"] = dict(_cerrado)
-
-    return exp
+# ── Vencimientos persistidos ───────────────────────────────────────────────────
+#
+# Las fechas de vencimientos() (app/vencimientos.py) se guardan en columnas
+# indexadas de expedientes (migración 12) para filtrar, ordenar y contar
+# alertas en SQL antes de paginar. Todo camino que escribe los campos de
+# origen (crear, editar, importar, restaurar backup) llama a
+# actualizar_vencimientos() antes de su commit.
+
+_ALERTA_VENC = ("fecha_vencimiento_ind", "fecha_vencimiento_inv", "fecha_prescripcion")
+
+
+def _sql_alguna_entre(desde: str | None, hasta: str | None) -> tuple[str, list]:
+    """Condición: expediente abierto con algún vencimiento de alerta en [desde, hasta]."""
+    partes, params = [], []
+    for col in _ALERTA_VENC:
+        conds = [f"{col} IS NOT NULL"]
+        if desde:
+            conds.append(f"{col} >= ?"); params.append(desde)
+        if hasta:
+            conds.append(f"{col} <= ?"); params.append(hasta)
+        partes.append("(" + " AND ".join(conds) + ")")
+    # fecha_proximo_vencimiento es NULL en los cerrados
+    return f"(fecha_proximo_vencimiento IS NOT NULL AND ({' OR '.join(partes)}))", params
+
+
+def _sql_alerta(alerta: str, hoy: date) -> tuple[str, list] | None:
+    """Filtro SQL equivalente a la clase de calcular_alerta() en alguna de las
+    tres alertas (indagación, investigación, prescripción), como en la Lista."""
+    h = hoy.isoformat()
+    if alerta == "vencido":
+        return "fecha_proximo_vencimiento < ?", [h]
+    if alerta == "proximo":
+        return _sql_alguna_entre(h, (hoy + timedelta(days=30)).isoformat())
+    if alerta == "vigente":
+        return _sql_alguna_entre((hoy + timedelta(days=31)).isoformat(), None)
+    if alerta == "sin-plazo":
+        return "(fecha_proximo_vencimiento IS NULL OR " + " OR ".join(f"{c} IS NULL" for c in _ALERTA_VENC) + ")", []
+    return None
 
 
 def _limpiar(v):
@@ -202,7 +150,7 @@ def _limpiar(v):
 
 
 def _next_n_expediente(conn) -> str:
-    row = conn.execute("SELECT MAX(CAST(n_expediente AS INTEGER)) FROM expedientes").fetchone()
+    row = conn.execute("SELECT MAX(n_num) FROM expedientes").fetchone()
     siguiente = (row[0] or 0) + 1
     return f"{siguiente:03d}"
 
@@ -241,7 +189,7 @@ def _ctx_base():
 # ── Listado ────────────────────────────────────────────────────────────────────
 
 @router.get("/expedientes", response_class=HTMLResponse)
-async def lista_expedientes(
+def lista_expedientes(
     request: Request,
     q: str = "",
     anio: str = "",
@@ -259,14 +207,11 @@ async def lista_expedientes(
     params = []
 
     if q:
-        filtros.append("""(
-            n_expediente LIKE ? OR CAST(n_expediente AS INTEGER) = ?
-            OR nombre_investigado LIKE ? OR asunto LIKE ?
-            OR n_radicado LIKE ? OR quejoso LIKE ?
-            OR entidad_origen LIKE ?
-        )""")
+        # Fragmento en cualquier columna, por el índice de trigramas (app/busqueda.py)
+        sql_q, params_q = filtro_subcadena("expedientes", q)
+        filtros.append(f"({sql_q} OR n_num = ?)")
         q_int = int(q.strip()) if q.strip().isdigit() else -1
-        params += [f"%{q}%", q_int, f"%{q}%", f"%{q}%", f"%{q}%", f"%{q}%", f"%{q}%"]
+        params += params_q + [q_int]
     if anio:
         filtros.append("anio = ?")
         params.append(int(anio))
@@ -282,6 +227,12 @@ async def lista_expedientes(
     if estado:
         filtros.append("estado_proceso = ?")
         params.append(estado)
+    # Alerta sobre los vencimientos persistidos: se filtra ANTES de contar y
+    # paginar, así total y páginas corresponden a lo filtrado.
+    filtro_alerta = _sql_alerta(alerta, date.today()) if alerta else None
+    if filtro_alerta:
+        filtros.append(filtro_alerta[0])
+        params += filtro_alerta[1]
 
     where = ("WHERE " + " AND ".join(filtros)) if filtros else ""
 
@@ -291,7 +242,7 @@ async def lista_expedientes(
     offset = (page - 1) * por_pagina
 
     rows_raw = conn.execute(
-        f"SELECT * FROM expedientes {where} ORDER BY CAST(n_expediente AS INTEGER) DESC LIMIT ? OFFSET ?",
+        f"SELECT * FROM expedientes {where} ORDER BY n_num DESC LIMIT ? OFFSET ?",
         params + [por_pagina, offset],
     ).fetchall()
 
@@ -305,14 +256,6 @@ async def lista_expedientes(
 
     rows = [_enriquecer(dict(r)) for r in rows_raw]
 
-    # Filtro por alerta (post-enriquecimiento)
-    if alerta:
-        rows = [r for r in rows if (
-            r["alerta_ind"]["clase"] == alerta or
-            r["alerta_inv"]["clase"] == alerta or
-            r["alerta_prescripcion"]["clase"] == alerta
-        )]
-
     return templates.TemplateResponse("lista.html", {
         "request": request,
         "rows": rows,
@@ -336,7 +279,7 @@ async def lista_expedientes(
 # ── Nuevo expediente ───────────────────────────────────────────────────────────
 
 @router.get("/expediente/nuevo", response_class=HTMLResponse)
-async def nuevo_form(request: Request):
+def nuevo_form(request: Request):
     conn = get_db()
     proximo = _next_n_expediente(conn)
     conn.close()
@@ -352,13 +295,11 @@ async def nuevo_form(request: Request):
 
 
 @router.post("/expediente/nuevo", response_class=HTMLResponse)
-async def nuevo_post(request: Request):
+def nuevo_post(request: Request, form: FormData = Depends(form_request)):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/expedientes?msg=sin_permiso", status_code=303)
 
-    form = await request.form()
-
     def f(key):
         return _limpiar(form.get(key))
 
@@ -409,8 +350,10 @@ async def nuevo_post(request: Request):
             f"INSERT INTO expedientes ({', '.join(campos)}, created_by) VALUES ({', '.join(['?']*len(campos))}, ?)",
             vals + [user.get("nombre_completo") if user else None],
         )
-        conn.commit()
         new_id = cur.lastrowid
+        actualizar_vencimientos(conn, [new_id])
+        refrescar_alertas(conn, _MOD, [new_id])
+        conn.commit()
     except sqlite3.IntegrityError:
         conn.close()
         return RedirectResponse(f"/expedientes?msg=duplicado_{n_exp}_{anio_val}", status_code=303)
@@ -422,7 +365,7 @@ async def nuevo_post(request: Request):
 # ── Detalle ────────────────────────────────────────────────────────────────────
 
 @router.get("/expediente/{exp_id}", response_class=HTMLResponse)
-async def detalle(request: Request, exp_id: int):
+def detalle(request: Request, exp_id: int):
     conn = get_db()
     row = conn.execute("SELECT * FROM expedientes WHERE id = ?", (exp_id,)).fetchone()
     if not row:
@@ -445,7 +388,7 @@ async def detalle(request: Request, exp_id: int):
 # ── Editar ─────────────────────────────────────────────────────────────────────
 
 @router.get("/expediente/{exp_id}/editar", response_class=HTMLResponse)
-async def editar_form(request: Request, exp_id: int):
+def editar_form(request: Request, exp_id: int):
     conn = get_db()
     row = conn.execute("SELECT * FROM expedientes WHERE id = ?", (exp_id,)).fetchone()
     conn.close()
@@ -465,13 +408,11 @@ async def editar_form(request: Request, exp_id: int):
 
 
 @router.post("/expediente/{exp_id}/editar", response_class=HTMLResponse)
-async def editar_post(request: Request, exp_id: int):
+def editar_post(request: Request, exp_id: int, form: FormData = Depends(form_request)):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse(f"/expediente/{exp_id}?msg=sin_permiso", status_code=303)
 
-    form = await request.form()
-
     def f(key):
         return _limpiar(form.get(key))
 
@@ -513,6 +454,8 @@ async def editar_post(request: Request, exp_id: int):
             f"UPDATE expedientes SET {set_clause}, updated_at = datetime('now','localtime') WHERE id = ? AND eliminado_en IS NULL",
             vals + [exp_id],
         )
+        actualizar_vencimientos(conn, [exp_id])
+        refrescar_alertas(conn, _MOD, [exp_id])
         conn.commit()
     except sqlite3.IntegrityError:
         conn.close()
@@ -525,7 +468,7 @@ async def editar_post(request: Request, exp_id: int):
 # ── Eliminar ───────────────────────────────────────────────────────────────────
 
 @router.post("/expediente/{exp_id}/eliminar")
-async def eliminar(request: Request, exp_id: int):
+def eliminar(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/expedientes?msg=sin_permiso", status_code=303)
@@ -536,6 +479,7 @@ async def eliminar(request: Request, exp_id: int):
         "UPDATE expedientes SET eliminado_en = datetime('now','localtime'), eliminado_por = ? WHERE id = ?",
         (user.get("nombre_completo") if user else None, exp_id),
     )
+    refrescar_alertas(conn, _MOD, [exp_id])
     conn.commit()
     conn.close()
     registrar_log(user, "ELIMINAR", _MOD, f"Expediente {n_exp}", registro_id=exp_id)
@@ -545,7 +489,7 @@ async def eliminar(request: Request, exp_id: int):
 # ── Papelera de reciclaje ────────────────────────────────────────────────────
 
 @router.get("/expedientes/papelera", response_class=HTMLResponse)
-async def papelera(request: Request, msg: str = ""):
+def papelera(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/expedientes?msg=sin_permiso", status_code=303)
@@ -569,13 +513,14 @@ async def papelera(request: Request, msg: str = ""):
 
 
 @router.post("/expediente/{exp_id}/restaurar")
-async def restaurar(request: Request, exp_id: int):
+def restaurar(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/expedientes/papelera?msg=sin_permiso", status_code=303)
     conn = get_db()
     try:
         conn.execute("UPDATE expedientes SET eliminado_en = NULL, eliminado_por = NULL WHERE id = ?", (exp_id,))
+        refrescar_alertas(conn, _MOD, [exp_id])
         conn.commit()
     except sqlite3.IntegrityError:
         conn.close()
@@ -586,12 +531,13 @@ async def restaurar(request: Request, exp_id: int):
 
 
 @router.post("/expediente/{exp_id}/purgar")
-async def purgar(request: Request, exp_id: int):
+def purgar(request: Request, exp_id: int):
     user = getattr(request.state, "user", None)
     if not user or user.get("rol") not in ROLES_SUPERUSUARIO:
         return RedirectResponse("/expedientes/papelera?msg=sin_permiso", status_code=303)
     conn = get_db()
     conn.execute("DELETE FROM expedientes WHERE id = ? AND eliminado_en IS NOT NULL", (exp_id,))
+    refrescar_alertas(conn, _MOD, [exp_id])
     conn.commit()
     conn.close()
     registrar_log(user, "PURGAR", _MOD, f"Expediente id={exp_id} — eliminado definitivamente", registro_id=exp_id)
@@ -601,7 +547,7 @@ async def purgar(request: Request, exp_id: int):
 # ── Exportar — Página de personalización ──────────────────────────────────────
 
 @router.get("/exportar-filtrado", response_class=HTMLResponse)
-async def exportar_filtrado_page(request: Request):
+def exportar_filtrado_page(request: Request):
     conn = get_db()
     anios_list = [r[0] for r in conn.execute(
         "SELECT DISTINCT anio FROM expedientes WHERE anio IS NOT NULL AND eliminado_en IS NULL ORDER BY anio DESC"
@@ -629,7 +575,7 @@ async def exportar_filtrado_page(request: Request):
 # ── Exportar — Descarga Excel ──────────────────────────────────────────────────
 
 @router.get("/exportar-filtrado/descargar")
-async def exportar_descargar(
+def exportar_descargar(
     request: Request,
     q: str = "",
     anio: str = "",
@@ -644,8 +590,7 @@ async def exportar_descargar(
     fecha_hasta: str = "",
 ):
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from app.excel import Columna, Hoja, na, respuesta_xlsx
     except ImportError:
         return RedirectResponse("/expedientes?msg=error_openpyxl")
 
@@ -657,13 +602,14 @@ async def exportar_descargar(
     if not bloques:
         bloques = ["identificacion", "partes", "asunto", "indagacion", "investigacion", "cierre"]
 
-    conn = get_db()
     filtros_sql, params = ["eliminado_en IS NULL"], []
 
     # Filtros simples (compat con lista.html y dashboard)
     if q:
-        filtros_sql.append("(n_expediente LIKE ? OR nombre_investigado LIKE ? OR asunto LIKE ? OR n_radicado LIKE ?)")
-        params += [f"%{q}%"] * 4
+        sql_q, params_q = filtro_subcadena(
+            "expedientes", q, ("n_expediente", "nombre_investigado", "asunto", "n_radicado"))
+        filtros_sql.append(sql_q)
+        params += params_q
     if anio:
         filtros_sql.append("anio = ?"); params.append(int(anio))
     if mes:
@@ -693,31 +639,25 @@ async def exportar_descargar(
     if fecha_hasta:
         filtros_sql.append("fecha_radicado <= ?"); params.append(fecha_hasta)
 
-    where = ("WHERE " + " AND ".join(filtros_sql)) if filtros_sql else ""
-    rows = conn.execute(
-        f"SELECT * FROM expedientes {where} ORDER BY anio, CAST(n_expediente AS INTEGER)",
-        params,
-    ).fetchall()
-    conn.close()
-
-    datos = [_enriquecer(dict(r)) for r in rows]
-
-    # Filtros de alerta — misma fuente de verdad que la pantalla de Lista
-    # (clases calculadas por _enriquecer/calcular_alerta, que ya excluye
-    # expedientes cerrados y cubre indagación + investigación + prescripción).
-    def _alertas(d):
-        return (d["alerta_ind"], d["alerta_inv"], d["alerta_prescripcion"])
-
+    # Filtros de alerta — mismas condiciones que la pantalla de Lista, sobre
+    # los vencimientos persistidos (excluye expedientes cerrados y cubre
+    # indagación + investigación + prescripción).
+    hoy = date.today()
+    filtros_alerta = []
     if solo_vencidos:
-        datos = [d for d in datos if any(a["clase"] == "vencido" for a in _alertas(d))]
+        filtros_alerta.append(_sql_alerta("vencido", hoy))
     if proximos_30:
-        datos = [d for d in datos if any(
-            a["dias"] is not None and 0 <= a["dias"] <= 30 for a in _alertas(d)
-        )]
+        filtros_alerta.append(_sql_alguna_entre(hoy.isoformat(), (hoy + timedelta(days=30)).isoformat()))
     if proximos_60:
-        datos = [d for d in datos if any(
-            a["dias"] is not None and 0 <= a["dias"] <= 60 for a in _alertas(d)
-        )]
+        filtros_alerta.append(_sql_alguna_entre(hoy.isoformat(), (hoy + timedelta(days=60)).isoformat()))
+    for cond, ps in filtros_alerta:
+        filtros_sql.append(cond); params += ps
+
+    where = ("WHERE " + " AND ".join(filtros_sql)) if filtros_sql else ""
+
+    def filas(conn):
+        # Las columnas (calc.) ya vienen persistidas en la fila; no hace falta _enriquecer().
+        return conn.execute(f"SELECT * FROM expedientes {where} ORDER BY anio, n_num", params)
 
     # Columnas según bloques seleccionados
     BLOQUES_DEF = {
@@ -778,49 +718,18 @@ async def exportar_descargar(
         headers_out = ["N. EXPEDIENTE","AÑO","ETAPA ACTUAL","ESTADO DEL PROCESO"]
         campos_out  = ["n_expediente","anio","etapa_actual","estado_proceso"]
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Base Expedientes"
-    h_font   = Font(bold=True, color="FFFFFF", size=10)
-    fill_h   = PatternFill("solid", fgColor="1B4F8A")
-    alt_fill = PatternFill("solid", fgColor="EBF1F8")
-    center   = Alignment(horizontal="center", vertical="center", wrap_text=True)
-
-    for ci, h in enumerate(headers_out, 1):
-        cell = ws.cell(row=1, column=ci, value=h)
-        cell.fill = fill_h; cell.font = h_font; cell.alignment = center
-    ws.row_dimensions[1].height = 42
-
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    for ri, d in enumerate(datos, 2):
-        fill = alt_fill if ri % 2 == 0 else None
-        for ci, campo in enumerate(campos_out, 1):
-            cell = ws.cell(row=ri, column=ci, value=_na(d.get(campo)))
-            cell.alignment = Alignment(vertical="center")
-            if fill:
-                cell.fill = fill
-
-    for col in ws.columns:
-        max_len = max((len(str(c.value or "")) for c in col), default=10)
-        ws.column_dimensions[col[0].column_letter].width = min(max_len + 4, 40)
-    ws.freeze_panes = "A2"
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    # Ancho según el texto más largo de cada columna, calculado en SQL
+    columnas = [Columna(h, c, formato=na) for h, c in zip(headers_out, campos_out)]
+    hoja = Hoja("Base Expedientes", columnas, filas, alto_encabezado=42,
+                anchos_desde=(f"expedientes {where}", params))
     hoy_str = date.today().strftime("%Y%m%d")
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=BaseExpedientes_{hoy_str}.xlsx"},
-    )
+    return respuesta_xlsx([hoja], f"BaseExpedientes_{hoy_str}.xlsx")
 
 
 # ── Importar Excel ─────────────────────────────────────────────────────────────
 
 @router.get("/importar", response_class=HTMLResponse)
-async def importar_form(request: Request, msg: str = ""):
+def importar_form(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
         return RedirectResponse("/expedientes?msg=sin_permiso", status_code=303)
@@ -836,7 +745,7 @@ async def importar_form(request: Request, msg: str = ""):
 
 
 @router.post("/importar", response_class=HTMLResponse)
-async def importar_post(request: Request):
+def importar_post(request: Request, form: FormData = Depends(form_request)):
     from fastapi import UploadFile, File
     user = getattr(request.state, "user", None)
     if not _pi(user, _MOD):
@@ -846,12 +755,11 @@ async def importar_post(request: Request):
     except ImportError:
         return RedirectResponse("/importar?msg=error_openpyxl", status_code=303)
 
-    form = await request.form()
     archivo = form.get("archivo")
     if not archivo or not archivo.filename:
         return RedirectResponse("/importar?msg=error_vacio", status_code=303)
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     try:
         wb = openpyxl.load_workbook(io.BytesIO(contenido), data_only=True)
     except Exception:
@@ -1010,6 +918,8 @@ async def importar_post(request: Request):
                 )
                 restaurados += 1
 
+        actualizar_vencimientos(conn)
+        refrescar_alertas(conn, _MOD)
         conn.commit()
     except Exception:
         conn.rollback()
@@ -1021,5 +931,5 @@ async def importar_post(request: Request):
 
 
 @router.get("/autos", response_class=HTMLResponse)
-async def autos_redirect(request: Request):
+def autos_redirect(request: Request):
     return RedirectResponse("/control-autos/", status_code=302)
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request
 from fastapi.responses import RedirectResponse
 from app.auth_utils import ROLES_SUPERUSUARIO
 
+from app.alertas import refrescar_alertas
 from app.database import get_db
 
 router = APIRouter()
@@ -22,12 +23,13 @@ def _puede_importar_exp(request: Request) -> bool:
 # "Zona de Peligro" de importar.html.
 
 @router.post("/importar/limpiar-bd")
-async def limpiar_base_datos(request: Request):
+def limpiar_base_datos(request: Request):
     if not _puede_importar_exp(request):
         return RedirectResponse("/expedientes?msg=sin_permiso", status_code=303)
     conn = get_db()
     conn.execute("DELETE FROM expedientes")
     conn.execute("DELETE FROM sqlite_sequence WHERE name = 'expedientes'")
+    refrescar_alertas(conn, "expedientes")
     conn.commit()
     conn.close()
     return RedirectResponse("/importar?msg=bd_limpiada", status_code=303)
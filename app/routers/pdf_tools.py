@@ -42,7 +42,7 @@ except ImportError:
 # ── Página principal ──────────────────────────────────────────────────────────
 
 @router.get("/", response_class=HTMLResponse)
-async def pdf_tools_main(request: Request, msg: str = ""):
+def pdf_tools_main(request: Request, msg: str = ""):
     return templates.TemplateResponse("pdf_tools.html", tpl(request, None,
         msg=msg,
         pypdf_ok=PYPDF_OK,
@@ -93,11 +93,11 @@ def _pdf_resp(buf: io.BytesIO, name: str) -> Response:
 # ── Info del PDF (conteo de páginas para UI) ──────────────────────────────────
 
 @router.post("/info")
-async def pdf_info(archivo: UploadFile = File(...)):
+def pdf_info(archivo: UploadFile = File(...)):
     if not PYPDF_OK:
         return Response(content="?", media_type="text/plain")
     try:
-        content = await archivo.read()
+        content = archivo.file.read()
         reader = PdfReader(io.BytesIO(content))
         return Response(content=str(len(reader.pages)), media_type="text/plain")
     except Exception:
@@ -107,13 +107,13 @@ async def pdf_info(archivo: UploadFile = File(...)):
 # ── 1. Unir PDFs ──────────────────────────────────────────────────────────────
 
 @router.post("/unir")
-async def pdf_unir(archivos: List[UploadFile] = File(...)):
+def pdf_unir(archivos: List[UploadFile] = File(...)):
     _require_pypdf()
     if len(archivos) < 2:
         raise HTTPException(400, "Suba al menos dos archivos PDF.")
     writer = PdfWriter()
     for f in archivos:
-        content = await f.read()
+        content = f.file.read()
         try:
             reader = PdfReader(io.BytesIO(content))
             for page in reader.pages:
@@ -128,12 +128,12 @@ async def pdf_unir(archivos: List[UploadFile] = File(...)):
 # ── 2. Extraer páginas ────────────────────────────────────────────────────────
 
 @router.post("/extraer")
-async def pdf_extraer(
+def pdf_extraer(
     archivo: UploadFile = File(...),
     paginas: str = Form(...),
 ):
     _require_pypdf()
-    content = await archivo.read()
+    content = archivo.file.read()
     reader = PdfReader(io.BytesIO(content))
     total = len(reader.pages)
     selected = _parse_paginas(paginas, total)
@@ -150,12 +150,12 @@ async def pdf_extraer(
 # ── 3. Eliminar páginas ───────────────────────────────────────────────────────
 
 @router.post("/eliminar-paginas")
-async def pdf_eliminar_paginas(
+def pdf_eliminar_paginas(
     archivo: UploadFile = File(...),
     paginas: str = Form(...),
 ):
     _require_pypdf()
-    content = await archivo.read()
+    content = archivo.file.read()
     reader = PdfReader(io.BytesIO(content))
     total = len(reader.pages)
     eliminar = set(_parse_paginas(paginas, total))
@@ -173,12 +173,12 @@ async def pdf_eliminar_paginas(
 # ── 4. Comprimir PDF ──────────────────────────────────────────────────────────
 
 @router.post("/comprimir")
-async def pdf_comprimir(
+def pdf_comprimir(
     archivo: UploadFile = File(...),
     nivel: str = Form("normal"),
 ):
     _require_pypdf()
-    content = await archivo.read()
+    content = archivo.file.read()
     original_size = len(content)
 
     compressed = None
@@ -251,7 +251,7 @@ async def pdf_comprimir(
 # ── 5. Rotar páginas ──────────────────────────────────────────────────────────
 
 @router.post("/rotar")
-async def pdf_rotar(
+def pdf_rotar(
     archivo: UploadFile = File(...),
     grados: int = Form(90),
     paginas: str = Form(""),
@@ -259,7 +259,7 @@ async def pdf_rotar(
     _require_pypdf()
     if grados not in (90, 180, 270):
         raise HTTPException(400, "Los grados deben ser 90, 180 o 270.")
-    content = await archivo.read()
+    content = archivo.file.read()
     reader = PdfReader(io.BytesIO(content))
     total = len(reader.pages)
     rotar_idx = set(_parse_paginas(paginas, total))
@@ -276,11 +276,11 @@ async def pdf_rotar(
 # ── 6. PDF → Word ─────────────────────────────────────────────────────────────
 
 @router.post("/pdf-a-word")
-async def pdf_a_word(archivo: UploadFile = File(...)):
+def pdf_a_word(archivo: UploadFile = File(...)):
     if not PDF2DOCX_OK:
         raise HTTPException(501,
             "La librería 'pdf2docx' no está instalada. Ejecute: pip install pdf2docx")
-    content = await archivo.read()
+    content = archivo.file.read()
     tmpdir = tempfile.mkdtemp(prefix="ocdi_pdf_")
     try:
         pdf_path  = os.path.join(tmpdir, "input.pdf")
@@ -305,11 +305,11 @@ async def pdf_a_word(archivo: UploadFile = File(...)):
 # ── 7. Word → PDF ─────────────────────────────────────────────────────────────
 
 @router.post("/word-a-pdf")
-async def word_a_pdf(archivo: UploadFile = File(...)):
+def word_a_pdf(archivo: UploadFile = File(...)):
     if not DOCX2PDF_OK:
         raise HTTPException(501,
             "La librería 'docx2pdf' no está instalada. Ejecute: pip install docx2pdf")
-    content = await archivo.read()
+    content = archivo.file.read()
     tmpdir = tempfile.mkdtemp(prefix="ocdi_word_")
     try:
         docx_path = os.path.join(tmpdir, "input.docx")
@@ -332,7 +332,7 @@ async def word_a_pdf(archivo: UploadFile = File(...)):
 # ── 8. Agregar Sello / Marca de agua ─────────────────────────────────────────
 
 @router.post("/sello")
-async def pdf_sello(
+def pdf_sello(
     archivo: UploadFile = File(...),
     texto: str = Form(...),
     paginas: str = Form(""),
@@ -352,7 +352,7 @@ async def pdf_sello(
     }
     rgb = colores.get(color, (0.45, 0.45, 0.45))
 
-    content = await archivo.read()
+    content = archivo.file.read()
     doc = fitz.open(stream=content, filetype="pdf")
     total = len(doc)
     paginas_idx = _parse_paginas(paginas, total)
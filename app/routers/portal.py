@@ -7,59 +7,27 @@ from datetime import date
 from app.database import get_db
 from app.auth_utils import tpl
 from app.routers.backup import backup_necesario
-from app.routers.expedientes import _enriquecer as _enriquecer_expediente
-from app.routers.sdqs import _calcular_semaforo_sdqs
-from app.routers.correspondencia import _calcular_semaforo_row
 
 router = APIRouter()
 templates = make_templates(str(Path(__file__).parent.parent / "templates"))
 
-_UMBRAL_DIAS = 3
-
 
 def _contar_vencimientos_proximos(conn) -> dict:
     """
-    Cuenta cuántos casos activos vencen en <= _UMBRAL_DIAS días (o ya vencieron),
-    reutilizando los mismos cálculos que usan la Lista/Dashboard/Reporte de cada
-    módulo, para que el banner nunca diverja de lo que se ve en pantalla.
+    Cuenta cuántos casos activos vencen en <= alertas.DIAS_AVISO días (o ya vencieron).
+    Sale de la tabla `alertas` (app/alertas.py), cuyas fechas de aviso derivan
+    de los mismos cálculos de la Lista/Dashboard/Reporte de cada módulo, para
+    que el banner nunca diverja de lo que se ve en pantalla. Compara fecha_aviso
+    con hoy: no lee `estado`, así que no espera al cambio de día del planificador.
     """
-    n_exp = 0
-    for row in conn.execute("SELECT * FROM expedientes WHERE eliminado_en IS NULL").fetchall():
-        exp = _enriquecer_expediente(dict(row))
-        alertas = (exp.get("alerta_ind"), exp.get("alerta_inv"),
-                   exp.get("alerta_prescripcion"), exp.get("alerta_prorroga"))
-        if any(a and a.get("dias") is not None and a["dias"] <= _UMBRAL_DIAS for a in alertas):
-            n_exp += 1
-
-    n_sdqs = 0
-    hoy = date.today()
-    for row in conn.execute(
-        "SELECT * FROM sdqs WHERE eliminado_en IS NULL AND (rad_salida IS NULL OR rad_salida = '')"
-    ).fetchall():
-        reg = _calcular_semaforo_sdqs(dict(row))
-        fv = reg.get("fecha_vencimiento")
-        if not fv:
-            continue
-        try:
-            dias_restantes = (date.fromisoformat(str(fv)[:10]) - hoy).days
-        except ValueError:
-            continue
-        if dias_restantes <= _UMBRAL_DIAS:
-            n_sdqs += 1
-
-    n_corr = 0
-    for row in conn.execute("""
-        SELECT * FROM correspondencia
-        WHERE eliminado_en IS NULL
-          AND (fecha_radicado_salida IS NULL OR fecha_radicado_salida = '')
-    """).fetchall():
-        reg = _calcular_semaforo_row(dict(row))
-        if reg.get("termino_dias"):
-            if reg.get("dias_restantes") is not None and reg["dias_restantes"] <= _UMBRAL_DIAS:
-                n_corr += 1
-        elif reg.get("semaforo") == "roja":
-            n_corr += 1
-
+    conteos = dict(conn.execute("""
+        SELECT modulo, COUNT(DISTINCT registro_id) FROM alertas
+        WHERE modulo IN ('expedientes', 'sdqs', 'correspondencia') AND fecha_aviso <= ?
+        GROUP BY modulo
+    """, (date.today().isoformat(),)).fetchall())
+    n_exp = conteos.get("expedientes", 0)
+    n_sdqs = conteos.get("sdqs", 0)
+    n_corr = conteos.get("correspondencia", 0)
     return {
         "expedientes": n_exp, "sdqs": n_sdqs, "correspondencia": n_corr,
         "total": n_exp + n_sdqs + n_corr,
@@ -67,7 +35,7 @@ def _contar_vencimientos_proximos(conn) -> dict:
 
 
 @router.get("/", response_class=HTMLResponse)
-async def hub(request: Request, msg: str = "", backup: str = ""):
+def hub(request: Request, msg: str = "", backup: str = ""):
     conn = get_db()
 
     total_base      = conn.execute("SELECT COUNT(*) FROM expedientes WHERE eliminado_en IS NULL").fetchone()[0]
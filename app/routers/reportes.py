@@ -9,18 +9,12 @@ Pensado para revisión los martes y jueves.
 """
 
 from fastapi import APIRouter, Request
-from fastapi.responses import StreamingResponse
 from pathlib import Path
 from datetime import date, datetime
-import io
 
-import openpyxl
-from openpyxl.styles import (
-    PatternFill, Font, Alignment, Border, Side
-)
-from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font, Alignment, Border, Side
 
-from app.database import get_db
+from app.excel import Columna, Hoja, celda, na as _na, respuesta_xlsx
 from app.routers.correspondencia import _calcular_semaforo_row
 from app.routers.sdqs import _calcular_semaforo_sdqs
 
@@ -32,10 +26,10 @@ def _row_to_dict(row) -> dict:
 
 
 # ── Colores ───────────────────────────────────────────────────────────────────
-_ROJO_BG    = PatternFill("solid", fgColor="FFCCCC")
-_AMARILLO_BG = PatternFill("solid", fgColor="FFF8CC")
-_SINPLAZO_BG = PatternFill("solid", fgColor="FCE7F3")
-_HEADER_BG   = PatternFill("solid", fgColor="0D3060")
+_ROJO_BG     = "FFCCCC"
+_AMARILLO_BG = "FFF8CC"
+_SINPLAZO_BG = "FCE7F3"
+_HEADER_BG   = "0D3060"
 _HEADER_FONT = Font(bold=True, color="FFFFFF", size=10)
 _TITLE_FONT  = Font(bold=True, size=12, color="0D3060")
 _CENTER      = Alignment(horizontal="center", vertical="center", wrap_text=True)
@@ -47,8 +41,6 @@ _THIN_BORDER = Border(
     bottom=Side(style="thin", color="CCCCCC"),
 )
 
-_na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
 
 def _fmt_fecha(s):
     if not s:
@@ -70,249 +62,151 @@ def _fmt_ts(s):
         return str(s)
 
 
-def _set_header_row(ws, fila: int, cols: list[str]):
-    for ci, h in enumerate(cols, 1):
-        c = ws.cell(row=fila, column=ci, value=h)
-        c.fill = _HEADER_BG
-        c.font = _HEADER_FONT
-        c.alignment = _CENTER
-        c.border = _THIN_BORDER
-    ws.row_dimensions[fila].height = 32
+def _hoja(titulo: str, columnas: list[Columna], filas, rango: str, encabezado: str, incluye: str) -> Hoja:
+    """Hoja del reporte: título y subtítulo combinados en `rango`, encabezados en la fila 3."""
+    def previas(ws, conn):
+        ws.merged_cells.add(rango.format(1))
+        ws.row_dimensions[1].height = 28
+        ws.merged_cells.add(rango.format(2))
+        ws.row_dimensions[2].height = 18
+        return [
+            [celda(ws, encabezado, fuente=Font(bold=True, size=13, color="0D3060"), alineacion=_CENTER)],
+            [celda(ws, incluye, fuente=Font(size=10, italic=True, color="555555"), alineacion=_CENTER)],
+        ]
+
+    return Hoja(
+        titulo, columnas, filas, color=_HEADER_BG, fuente_encabezado=_HEADER_FONT,
+        alto_encabezado=32, relleno_fila=lambda d, n: d["relleno"], fuente=Font(size=10),
+        borde=_THIN_BORDER, alineacion=_LEFT, alto_fila=16, congelar="A4", previas=previas,
+    )
 
 
-def _set_data_cell(ws, ri, ci, val, fill=None, align=None):
-    c = ws.cell(row=ri, column=ci, value=val)
-    if fill:
-        c.fill = fill
-    c.alignment = align or _LEFT
-    c.border = _THIN_BORDER
-    c.font = Font(size=10)
-    return c
+def _columnas(especificacion, centradas) -> list[Columna]:
+    return [
+        Columna(titulo, campo, ancho, alineacion=_CENTER if i in centradas else None)
+        for i, (titulo, campo, ancho) in enumerate(especificacion, 1)
+    ]
 
 
 # ── Hoja 1: Correspondencia ───────────────────────────────────────────────────
 
-def _build_hoja_correspondencia(wb, hoy: date):
-    ws = wb.active
-    ws.title = "Correspondencia"
-
-    # Título
-    ws.merge_cells("A1:R1")
-    t = ws.cell(row=1, column=1,
-        value=f"REPORTE VENCIMIENTOS — CORRESPONDENCIA — {hoy.strftime('%d/%m/%Y')}")
-    t.font = Font(bold=True, size=13, color="0D3060")
-    t.alignment = _CENTER
-    ws.row_dimensions[1].height = 28
-
-    ws.merge_cells("A2:R2")
-    sub = ws.cell(row=2, column=1,
-        value="Incluye: 🔴 Vencidos · 🟡 Por vencer · ⚠️ Sin plazo definido — pendientes sin respuesta")
-    sub.font = Font(size=10, italic=True, color="555555")
-    sub.alignment = _CENTER
-    ws.row_dimensions[2].height = 18
-
-    COLS = [
-        "AÑO", "MES", "FECHA INGRESO", "N. RADICADO",
-        "ENTIDAD / ORIGEN", "ASUNTO", "TIPO REQUERIMIENTO",
-        "TÉRMINO (DÍAS HAB.)", "PLAZO DEFINIDO",
-        "RESPONSABLE", "CASO BMP",
-        "ESTADO SEMÁFORO", "DÍAS TRANSCURRIDOS",
-        "FECHA VENCIMIENTO LEGAL", "DÍAS RESTANTES",
-        "TIPO RESPUESTA", "FECHA CREACIÓN", "ÚLTIMA MODIFICACIÓN",
-    ]
-    _set_header_row(ws, 3, COLS)
-
-    conn = get_db()
-    rows_raw = conn.execute("""
+def _filas_correspondencia(conn):
+    # Radicados de salida distintos en orden de registro. GROUP_CONCAT(DISTINCT
+    # ... ORDER BY) necesita SQLite 3.44; la subconsulta da lo mismo antes.
+    cur = conn.execute("""
         SELECT c.*,
-               GROUP_CONCAT(DISTINCT rs.radicado ORDER BY rs.id) AS radicados_concat
+               (SELECT GROUP_CONCAT(radicado) FROM (
+                    SELECT radicado FROM correspondencia_radicados_salida
+                    WHERE correspondencia_id = c.id
+                    GROUP BY radicado ORDER BY MIN(id))) AS radicados_concat
         FROM correspondencia c
-        LEFT JOIN correspondencia_radicados_salida rs ON rs.correspondencia_id = c.id
         WHERE c.eliminado_en IS NULL
-        GROUP BY c.id
         ORDER BY c.fecha_ingreso ASC
-    """).fetchall()
-    conn.close()
-
-    ri = 4
-    total = 0
-    for raw in rows_raw:
+    """)
+    for raw in cur:
         d = _calcular_semaforo_row(_row_to_dict(raw))
         sem = d.get("semaforo")
         pendiente = not bool(d.get("fecha_radicado_salida"))
         sin_plazo = pendiente and not d.get("termino_dias")
 
         # Incluir: amarilla, roja, o pendiente sin plazo
-        if sem not in ("amarilla", "roja") and not sin_plazo:
-            continue
-
         if sem == "roja":
-            fill = _ROJO_BG
-            estado_label = "🔴 VENCIDO"
+            d["relleno"], d["estado_label"] = _ROJO_BG, "🔴 VENCIDO"
         elif sem == "amarilla":
-            fill = _AMARILLO_BG
-            estado_label = "🟡 POR VENCER"
+            d["relleno"], d["estado_label"] = _AMARILLO_BG, "🟡 POR VENCER"
         elif sin_plazo:
-            fill = _SINPLAZO_BG
-            estado_label = "⚠️ SIN PLAZO"
+            d["relleno"], d["estado_label"] = _SINPLAZO_BG, "⚠️ SIN PLAZO"
         else:
             continue
-
-        dias_r = d.get("dias_restantes")
-        dias_r_str = str(dias_r) if dias_r is not None else "N/A"
-        n_rad = d.get("radicados_concat") or d.get("n_radicado") or "N/A"
-
-        vals = [
-            _na(d.get("anio")),
-            _na(d.get("mes")),
-            _fmt_fecha(d.get("fecha_ingreso")),
-            _na(n_rad),
-            _na(d.get("origen")),
-            _na(d.get("asunto")),
-            _na(d.get("tipo_requerimiento")),
-            d.get("termino_dias") if d.get("termino_dias") is not None else "N/A",
-            "SÍ" if d.get("termino_dias") else "NO ⚠️",
-            _na(d.get("responsable")),
-            _na(d.get("caso_bmp")),
-            estado_label,
-            _na(d.get("dias_transcurridos")),
-            _fmt_fecha(d.get("fecha_vencimiento")),
-            dias_r_str,
-            _na(d.get("tipo_respuesta")) if d.get("tipo_respuesta") else "PENDIENTE",
-            _fmt_ts(d.get("created_at")),
-            _fmt_ts(d.get("updated_at")),
-        ]
-        for ci, v in enumerate(vals, 1):
-            _set_data_cell(ws, ri, ci, v, fill=fill,
-                           align=_CENTER if ci in (1, 2, 8, 9, 12, 13, 15) else _LEFT)
-        ws.row_dimensions[ri].height = 16
-        ri += 1
-        total += 1
-
-    # Anchos de columna
-    anchos = [7, 10, 14, 22, 28, 36, 22, 10, 10, 20, 14, 14, 10, 16, 10, 16, 18, 18]
-    for i, w in enumerate(anchos, 1):
-        ws.column_dimensions[get_column_letter(i)].width = w
-
-    ws.freeze_panes = "A4"
-    return total
+        yield d
+
+
+def _hoja_correspondencia(hoy: date) -> Hoja:
+    columnas = _columnas([
+        ("AÑO", lambda d: _na(d.get("anio")), 7),
+        ("MES", lambda d: _na(d.get("mes")), 10),
+        ("FECHA INGRESO", lambda d: _fmt_fecha(d.get("fecha_ingreso")), 14),
+        ("N. RADICADO", lambda d: d.get("radicados_concat") or d.get("n_radicado") or "N/A", 22),
+        ("ENTIDAD / ORIGEN", lambda d: _na(d.get("origen")), 28),
+        ("ASUNTO", lambda d: _na(d.get("asunto")), 36),
+        ("TIPO REQUERIMIENTO", lambda d: _na(d.get("tipo_requerimiento")), 22),
+        ("TÉRMINO (DÍAS HAB.)",
+         lambda d: d.get("termino_dias") if d.get("termino_dias") is not None else "N/A", 10),
+        ("PLAZO DEFINIDO", lambda d: "SÍ" if d.get("termino_dias") else "NO ⚠️", 10),
+        ("RESPONSABLE", lambda d: _na(d.get("responsable")), 20),
+        ("CASO BMP", lambda d: _na(d.get("caso_bmp")), 14),
+        ("ESTADO SEMÁFORO", "estado_label", 14),
+        ("DÍAS TRANSCURRIDOS", lambda d: _na(d.get("dias_transcurridos")), 10),
+        ("FECHA VENCIMIENTO LEGAL", lambda d: _fmt_fecha(d.get("fecha_vencimiento")), 16),
+        ("DÍAS RESTANTES",
+         lambda d: str(d["dias_restantes"]) if d.get("dias_restantes") is not None else "N/A", 10),
+        ("TIPO RESPUESTA", lambda d: _na(d.get("tipo_respuesta")) if d.get("tipo_respuesta") else "PENDIENTE", 16),
+        ("FECHA CREACIÓN", lambda d: _fmt_ts(d.get("created_at")), 18),
+        ("ÚLTIMA MODIFICACIÓN", lambda d: _fmt_ts(d.get("updated_at")), 18),
+    ], centradas=(1, 2, 8, 9, 12, 13, 15))
+    return _hoja(
+        "Correspondencia", columnas, _filas_correspondencia, "A{0}:R{0}",
+        f"REPORTE VENCIMIENTOS — CORRESPONDENCIA — {hoy.strftime('%d/%m/%Y')}",
+        "Incluye: 🔴 Vencidos · 🟡 Por vencer · ⚠️ Sin plazo definido — pendientes sin respuesta",
+    )
 
 
 # ── Hoja 2: SDQS ─────────────────────────────────────────────────────────────
 
-def _build_hoja_sdqs(wb, hoy: date):
-    ws = wb.create_sheet("SDQS")
-
-    ws.merge_cells("A1:N1")
-    t = ws.cell(row=1, column=1,
-        value=f"REPORTE VENCIMIENTOS — SDQS — {hoy.strftime('%d/%m/%Y')}")
-    t.font = Font(bold=True, size=13, color="0D3060")
-    t.alignment = _CENTER
-    ws.row_dimensions[1].height = 28
-
-    ws.merge_cells("A2:N2")
-    sub = ws.cell(row=2, column=1,
-        value="Incluye: 🔴 Vencidos (≤ 2 días) · 🟡 Segunda mitad del plazo · ⚠️ Sin fecha de vencimiento — activos")
-    sub.font = Font(size=10, italic=True, color="555555")
-    sub.alignment = _CENTER
-    ws.row_dimensions[2].height = 18
-
-    COLS = [
-        "MES", "SDQS", "QUEJOSO", "TEMA",
-        "FECHA ASIGNACIÓN", "FECHA VENCIMIENTO", "PLAZO DEFINIDO",
-        "ESTADO SEMÁFORO", "DÍAS RESTANTES",
-        "COMPETENCIA OCDI", "BPM", "RESPONSABLE",
-        "FECHA CREACIÓN", "ÚLTIMA MODIFICACIÓN",
-    ]
-    _set_header_row(ws, 3, COLS)
-
-    conn = get_db()
-    rows_raw = conn.execute("""
-        SELECT * FROM sdqs WHERE eliminado_en IS NULL ORDER BY fecha_asignacion ASC
-    """).fetchall()
-    conn.close()
-
-    ri = 4
-    total = 0
-    for raw in rows_raw:
+def _filas_sdqs(conn):
+    for raw in conn.execute("SELECT * FROM sdqs WHERE eliminado_en IS NULL ORDER BY fecha_asignacion ASC"):
         d = _calcular_semaforo_sdqs(_row_to_dict(raw))
         sem = d.get("semaforo_sdqs")
         activo = not bool((d.get("rad_salida") or "").strip())
         sin_vencimiento = activo and not (d.get("fecha_vencimiento") or "").strip()
 
-        if sem not in ("amarillo", "rojo") and not sin_vencimiento:
-            continue
-
         if sem == "rojo":
-            fill = _ROJO_BG
-            estado_label = "🔴 VENCIDO"
+            d["relleno"], d["estado_label"] = _ROJO_BG, "🔴 VENCIDO"
         elif sem == "amarillo":
-            fill = _AMARILLO_BG
-            estado_label = "🟡 POR VENCER"
+            d["relleno"], d["estado_label"] = _AMARILLO_BG, "🟡 POR VENCER"
         elif sin_vencimiento:
-            fill = _SINPLAZO_BG
-            estado_label = "⚠️ SIN VENCIMIENTO"
+            d["relleno"], d["estado_label"] = _SINPLAZO_BG, "⚠️ SIN VENCIMIENTO"
         else:
             continue
+        yield d
 
-        fa = d.get("fecha_asignacion") or ""
-        fv = d.get("fecha_vencimiento") or ""
-        dias_rest = "N/A"
-        if fv:
-            try:
-                dias_rest = str((date.fromisoformat(fv[:10]) - hoy).days)
-            except Exception:
-                pass
-
-        vals = [
-            _na(d.get("mes")),
-            _na(d.get("sdqs")),
-            _na(d.get("quejoso")),
-            _na(d.get("tema")),
-            _fmt_fecha(fa),
-            _fmt_fecha(fv) if fv else "N/A ⚠️",
-            "SÍ" if fv else "NO ⚠️",
-            estado_label,
-            dias_rest,
-            _na(d.get("competencia_ocdi")),
-            _na(d.get("bpm")),
-            _na(d.get("responsable")),
-            _fmt_ts(d.get("created_at")),
-            _fmt_ts(d.get("updated_at")),
-        ]
-        for ci, v in enumerate(vals, 1):
-            _set_data_cell(ws, ri, ci, v, fill=fill,
-                           align=_CENTER if ci in (5, 6, 7, 8, 9, 10) else _LEFT)
-        ws.row_dimensions[ri].height = 16
-        ri += 1
-        total += 1
 
-    anchos = [10, 18, 22, 32, 14, 14, 10, 14, 10, 10, 14, 20, 18, 18]
-    for i, w in enumerate(anchos, 1):
-        ws.column_dimensions[get_column_letter(i)].width = w
-
-    ws.freeze_panes = "A4"
-    return total
+def _hoja_sdqs(hoy: date) -> Hoja:
+    def dias_restantes(d):
+        fv = d.get("fecha_vencimiento") or ""
+        try:
+            return str((date.fromisoformat(fv[:10]) - hoy).days) if fv else "N/A"
+        except Exception:
+            return "N/A"
+
+    columnas = _columnas([
+        ("MES", lambda d: _na(d.get("mes")), 10),
+        ("SDQS", lambda d: _na(d.get("sdqs")), 18),
+        ("QUEJOSO", lambda d: _na(d.get("quejoso")), 22),
+        ("TEMA", lambda d: _na(d.get("tema")), 32),
+        ("FECHA ASIGNACIÓN", lambda d: _fmt_fecha(d.get("fecha_asignacion") or ""), 14),
+        ("FECHA VENCIMIENTO",
+         lambda d: _fmt_fecha(d["fecha_vencimiento"]) if d.get("fecha_vencimiento") else "N/A ⚠️", 14),
+        ("PLAZO DEFINIDO", lambda d: "SÍ" if d.get("fecha_vencimiento") else "NO ⚠️", 10),
+        ("ESTADO SEMÁFORO", "estado_label", 14),
+        ("DÍAS RESTANTES", dias_restantes, 10),
+        ("COMPETENCIA OCDI", lambda d: _na(d.get("competencia_ocdi")), 10),
+        ("BPM", lambda d: _na(d.get("bpm")), 14),
+        ("RESPONSABLE", lambda d: _na(d.get("responsable")), 20),
+        ("FECHA CREACIÓN", lambda d: _fmt_ts(d.get("created_at")), 18),
+        ("ÚLTIMA MODIFICACIÓN", lambda d: _fmt_ts(d.get("updated_at")), 18),
+    ], centradas=(5, 6, 7, 8, 9, 10))
+    return _hoja(
+        "SDQS", columnas, _filas_sdqs, "A{0}:N{0}",
+        f"REPORTE VENCIMIENTOS — SDQS — {hoy.strftime('%d/%m/%Y')}",
+        "Incluye: 🔴 Vencidos (≤ 2 días) · 🟡 Segunda mitad del plazo · ⚠️ Sin fecha de vencimiento — activos",
+    )
 
 
 # ── Endpoint ──────────────────────────────────────────────────────────────────
 
 @router.get("/vencimientos")
-async def reporte_vencimientos(request: Request):
+def reporte_vencimientos(request: Request):
     hoy = date.today()
-    dia_semana = hoy.strftime("%A")  # para el nombre del archivo
-
-    wb = openpyxl.Workbook()
-    total_corr = _build_hoja_correspondencia(wb, hoy)
-    total_sdqs = _build_hoja_sdqs(wb, hoy)
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-
     nombre = f"Reporte_Vencimientos_{hoy.strftime('%Y%m%d')}.xlsx"
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={nombre}"},
-    )
+    return respuesta_xlsx([_hoja_correspondencia(hoy), _hoja_sdqs(hoy)], nombre)
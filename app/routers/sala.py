@@ -85,7 +85,7 @@ def _build_calendar(year: int, month: int, eventos: list[dict]) -> list[list[dic
 # ── Calendario ─────────────────────────────────────────────────────────────────
 
 @router.get("/", response_class=HTMLResponse)
-async def calendario(
+def calendario(
     request: Request,
     year: int = 0,
     month: int = 0,
@@ -138,7 +138,7 @@ async def calendario(
 # ── Nuevo evento ───────────────────────────────────────────────────────────────
 
 @router.get("/evento/nuevo", response_class=HTMLResponse)
-async def evento_nuevo_form(
+def evento_nuevo_form(
     request: Request,
     fecha: str = "",
     franja: str = "",
@@ -164,7 +164,7 @@ async def evento_nuevo_form(
 
 
 @router.post("/evento/nuevo")
-async def evento_nuevo_post(
+def evento_nuevo_post(
     request: Request,
     fecha: str = Form(...),
     hora_inicio: str = Form(""),
@@ -197,7 +197,7 @@ async def evento_nuevo_post(
 # ── Editar evento ──────────────────────────────────────────────────────────────
 
 @router.get("/evento/{ev_id}/editar", response_class=HTMLResponse)
-async def evento_editar_form(request: Request, ev_id: int, msg: str = ""):
+def evento_editar_form(request: Request, ev_id: int, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/sala/?msg=sin_permiso", status_code=303)
@@ -218,7 +218,7 @@ async def evento_editar_form(request: Request, ev_id: int, msg: str = ""):
 
 
 @router.post("/evento/{ev_id}/editar")
-async def evento_editar_post(
+def evento_editar_post(
     request: Request,
     ev_id: int,
     fecha: str = Form(...),
@@ -252,7 +252,7 @@ async def evento_editar_post(
 # ── Eliminar evento ────────────────────────────────────────────────────────────
 
 @router.post("/evento/{ev_id}/eliminar")
-async def evento_eliminar(request: Request, ev_id: int):
+def evento_eliminar(request: Request, ev_id: int):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/sala/?msg=sin_permiso", status_code=303)
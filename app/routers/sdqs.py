@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from pathlib import Path
 from app.template_utils import make_templates
 from datetime import date, datetime
 import io
 
+from app.alertas import refrescar_alertas
 from app.database import get_db, row_to_dict, get_personal_oficina
+from app.radicados import normalizar
+from app.semaforos import semaforo_sdqs as _calcular_semaforo_sdqs
+from app.texto import normalizar_texto, patron_like
 from app.auth_utils import tpl, puede_escribir as _pw, puede_importar as _pi, registrar_log, historial_registro, ROLES_SUPERUSUARIO
 
 _MOD = "sdqs"
@@ -44,51 +48,63 @@ def _str(val) -> str:
     return s if s.upper() != "NAN" else ""
 
 
-def _calcular_semaforo_sdqs(reg: dict) -> dict:
-    """
-    Calcula estado_dias y semaforo_sdqs ('verde'/'amarillo'/'rojo'/'respondido').
-    Si ya existe rad_salida → 'respondido' (no aparece en filtros de plazo).
-    Verde    = primera mitad del plazo aún no cumplida.
-    Amarillo = segunda mitad del plazo (pero > 2 días restantes).
-    Rojo     = 2 días o menos hasta el vencimiento (o ya vencido).
-    """
-    # Si ya hay radicado de salida el caso fue respondido — no aplica semáforo de plazo
-    if reg.get("rad_salida") and str(reg.get("rad_salida")).strip():
-        reg["semaforo_sdqs"] = "respondido"
-        reg["estado_dias"] = None
-        return reg
-
-    fa = reg.get("fecha_asignacion")
-    fv = reg.get("fecha_vencimiento")
-    reg["estado_dias"] = None
-    reg["semaforo_sdqs"] = None
-    if not fa or not fv:
-        return reg
-    try:
-        fa_d = datetime.fromisoformat(str(fa)[:10]).date()
-        fv_d = datetime.fromisoformat(str(fv)[:10]).date()
-        total_dias = (fv_d - fa_d).days
-        if total_dias <= 0:
-            return reg
-        hoy = date.today()
-        dias_transcurridos = (hoy - fa_d).days
-        dias_restantes = (fv_d - hoy).days
-        reg["estado_dias"] = total_dias
-        if dias_restantes <= 2:
-            reg["semaforo_sdqs"] = "rojo"
-        elif dias_transcurridos >= total_dias // 2:
-            reg["semaforo_sdqs"] = "amarillo"
-        else:
-            reg["semaforo_sdqs"] = "verde"
-    except Exception:
-        pass
-    return reg
+# ── Semáforo en SQL ───────────────────────────────────────────────────────────
+# La misma clasificación de semaforo_sdqs() (app/semaforos.py) como expresión
+# SQL, para que la Lista y el Excel cuenten, filtren y paginen en la base. Una
+# fecha vale si sus 10 primeros caracteres son AAAA-MM-DD o AAAAMMDD válidos
+# (lo que escriben los formularios y la importación y acepta fromisoformat()),
+# y rad_salida se recorta con los mismos espacios que str.strip().
+
+_ESPACIOS = "".join(c for c in map(chr, range(0x3001)) if c.isspace())
+
+
+def _sql_dia(col: str) -> str:
+    s = f"substr({col}, 1, 10)"
+    v = (f"(CASE WHEN {s} GLOB '[0-9][0-9][0-9][0-9][0-9][0-9][0-9][0-9]' "
+         f"THEN substr({s}, 1, 4) || '-' || substr({s}, 5, 2) || '-' || substr({s}, 7, 2) ELSE {s} END)")
+    # date(julianday(v)) normaliza el 30 de febrero: solo coincide si el día existe
+    return f"CASE WHEN date(julianday({v})) = {v} AND {v} >= '0001' THEN julianday({v}) END"
+
+
+def _sql_semaforo(hoy: date) -> tuple[str, list]:
+    """Expresión SQL con el semaforo_sdqs de cada fila ('respondido', 'rojo',
+    'amarillo', 'verde' o NULL) para el día `hoy`."""
+    sql = f"""CASE WHEN trim(COALESCE(rad_salida, ''), ?) <> '' THEN 'respondido' ELSE (
+        SELECT CASE
+            WHEN fa IS NULL OR fv IS NULL OR fv - fa <= 0 THEN NULL
+            WHEN fv - h <= 2 THEN 'rojo'
+            WHEN h - fa >= CAST(fv - fa AS INTEGER) / 2 THEN 'amarillo'
+            ELSE 'verde' END
+        FROM (SELECT {_sql_dia("fecha_asignacion")} AS fa, {_sql_dia("fecha_vencimiento")} AS fv,
+                     julianday(?) AS h)
+    ) END"""
+    return sql, [_ESPACIOS, hoy.isoformat()]
+
+
+def _filtros_lista(mes: str, competencia_ocdi: str, responsable: str, q: str,
+                   semaforo: str) -> tuple[list, list]:
+    """WHERE de la Lista y del Excel (sin el prefijo), con sus parámetros."""
+    where, params = ["eliminado_en IS NULL"], []
+    # Columnas *_norm (app/texto.py): sin tildes ni mayúsculas, con índice
+    for valor, columna in ((mes, "mes_norm"), (competencia_ocdi, "competencia_norm"),
+                           (responsable, "responsable_norm")):
+        if normalizar_texto(valor):
+            where.append(f"{columna} = ?")
+            params.append(normalizar_texto(valor))
+    if patron_like(q):
+        where.append("texto_norm LIKE ?")
+        params.append(patron_like(q))
+    if semaforo:
+        expr, ps = _sql_semaforo(date.today())
+        where.append(f"({expr}) = ?")
+        params += ps + [semaforo]
+    return where, params
 
 
 # ── Lista ─────────────────────────────────────────────────────────────────────
 
 @router.get("/", response_class=HTMLResponse)
-async def lista(
+def lista(
     request: Request,
     mes: str = "",
     competencia_ocdi: str = "",
@@ -99,24 +115,15 @@ async def lista(
     msg: str = "",
 ):
     conn = get_db()
-    where, params = ["eliminado_en IS NULL"], []
-    if mes:
-        where.append("UPPER(mes) = ?")
-        params.append(mes.upper())
-    if competencia_ocdi:
-        where.append("UPPER(competencia_ocdi) = ?")
-        params.append(competencia_ocdi.upper())
-    if responsable:
-        where.append("UPPER(responsable) = ?")
-        params.append(responsable.upper())
-    if q:
-        where.append("(UPPER(sdqs) LIKE ? OR UPPER(quejoso) LIKE ? OR UPPER(tema) LIKE ?)")
-        like = f"%{q.upper()}%"
-        params += [like, like, like]
-
+    where, params = _filtros_lista(mes, competencia_ocdi, responsable, q, semaforo)
     sql_base = f"FROM sdqs WHERE {' AND '.join(where)}"
+
+    total = conn.execute(f"SELECT COUNT(*) {sql_base}", params).fetchone()[0]
+    total_pages = max(1, (total + _PAGE_SIZE - 1) // _PAGE_SIZE)
+    page = max(1, min(page, total_pages))
+    offset = (page - 1) * _PAGE_SIZE
     rows_raw = conn.execute(
-        f"SELECT * {sql_base} ORDER BY id DESC", params
+        f"SELECT * {sql_base} ORDER BY id DESC LIMIT ? OFFSET ?", params + [_PAGE_SIZE, offset]
     ).fetchall()
 
     meses_bd = [r[0] for r in conn.execute(
@@ -127,16 +134,8 @@ async def lista(
     ).fetchall()]
     conn.close()
 
-    # El semáforo se calcula en Python; se filtra aquí antes de paginar
-    todos = [_calcular_semaforo_sdqs(row_to_dict(r)) for r in rows_raw]
-    if semaforo:
-        todos = [r for r in todos if r.get("semaforo_sdqs") == semaforo]
-
-    total = len(todos)
-    total_pages = max(1, (total + _PAGE_SIZE - 1) // _PAGE_SIZE)
-    page = max(1, min(page, total_pages))
-    offset = (page - 1) * _PAGE_SIZE
-    registros = todos[offset:offset + _PAGE_SIZE]
+    # El filtro de semáforo ya se aplicó en SQL; aquí solo se calcula el de la página
+    registros = [_calcular_semaforo_sdqs(row_to_dict(r)) for r in rows_raw]
 
     return templates.TemplateResponse("sdqs_lista.html", tpl(request, _MOD,
         registros=registros,
@@ -157,7 +156,7 @@ async def lista(
 # ── Nuevo ─────────────────────────────────────────────────────────────────────
 
 @router.get("/nuevo", response_class=HTMLResponse)
-async def nuevo_get(request: Request):
+def nuevo_get(request: Request):
     conn = get_db()
     abogados = get_personal_oficina(conn)
     conn.close()
@@ -171,7 +170,7 @@ async def nuevo_get(request: Request):
 
 
 @router.post("/nuevo")
-async def nuevo_post(
+def nuevo_post(
     request: Request,
     mes: str = Form(""),
     fecha_asignacion: str = Form(""),
@@ -205,8 +204,8 @@ async def nuevo_post(
     conn = get_db()
     new_id = None
     en_papelera = conn.execute(
-        "SELECT 1 FROM sdqs WHERE UPPER(sdqs) = ? AND eliminado_en IS NOT NULL",
-        (sdqs_num.upper(),),
+        "SELECT 1 FROM sdqs WHERE radicado_norm = ? AND eliminado_en IS NOT NULL",
+        (normalizar(sdqs_num),),
     ).fetchone()
     if en_papelera:
         conn.close()
@@ -229,8 +228,9 @@ async def nuevo_post(
              valor_institucional or None, tipologia or None,
              user.get("nombre_completo") if user else None),
         )
-        conn.commit()
         new_id = cur.lastrowid
+        refrescar_alertas(conn, _MOD, [new_id])
+        conn.commit()
     except _sqlite3.IntegrityError:
         conn.rollback()
         return RedirectResponse("/sdqs/nuevo?msg=error_sdqs_duplicado", status_code=303)
@@ -243,7 +243,7 @@ async def nuevo_post(
 # ── Exportar Excel ────────────────────────────────────────────────────────────
 
 @router.get("/exportar")
-async def exportar(
+def exportar(
     request: Request,
     mes: str = "",
     competencia_ocdi: str = "",
@@ -252,107 +252,55 @@ async def exportar(
     semaforo: str = "",
 ):
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment
+        from app.excel import Columna, Hoja, na, respuesta_xlsx
+        from openpyxl.styles import Alignment, Font
     except ImportError:
         return RedirectResponse("/sdqs/?msg=error_archivo", status_code=303)
 
-    conn = get_db()
-    where, params = ["eliminado_en IS NULL"], []
-    if mes:
-        where.append("UPPER(mes) = ?")
-        params.append(mes.upper())
-    if competencia_ocdi:
-        where.append("UPPER(competencia_ocdi) = ?")
-        params.append(competencia_ocdi.upper())
-    if responsable:
-        where.append("UPPER(responsable) = ?")
-        params.append(responsable.upper())
-    if q:
-        where.append("(UPPER(sdqs) LIKE ? OR UPPER(quejoso) LIKE ? OR UPPER(tema) LIKE ?)")
-        like = f"%{q.upper()}%"
-        params += [like, like, like]
+    where, params = _filtros_lista(mes, competencia_ocdi, responsable, q, semaforo)
 
-    rows_raw = conn.execute(
-        f"SELECT * FROM sdqs WHERE {' AND '.join(where)} ORDER BY fecha_asignacion, id",
-        params,
-    ).fetchall()
-    conn.close()
-
-    # Calcular semáforo y aplicar filtro si se indicó
-    rows_data = [_calcular_semaforo_sdqs(row_to_dict(r)) for r in rows_raw]
-    if semaforo:
-        rows_data = [d for d in rows_data if d.get("semaforo_sdqs") == semaforo]
-
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "SDQS"
-
-    headers = [
-        "MES", "FECHA ASIGNACION", "SDQS", "FECHA VENCIMIENTO", "ESTADO DIAS",
-        "QUEJOSO", "CORREO", "TEMA",
-        "COMPETENCIA OCDI", "BPM", "RESPONSABLE", "RAD SALIDA",
-        "FECHA RESPUESTA", "OBSERVACIONES", "ESTADO PROCESO",
-        "HECHO CORRUPTO", "VALOR INSTITUCIONAL", "TIPOLOGIA", "URL SDQS",
-    ]
-    header_fill = PatternFill("solid", fgColor="1B4F8A")
-    header_font = Font(bold=True, color="FFFFFF")
-    ws.append(headers)
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center")
+    def filas(conn):
+        cur = conn.execute(
+            f"SELECT * FROM sdqs WHERE {' AND '.join(where)} ORDER BY fecha_asignacion, id",
+            params,
+        )
+        return (_calcular_semaforo_sdqs(row_to_dict(r)) for r in cur)
 
     SEM_COLORS = {"verde": "D4EDDA", "amarillo": "FFF3CD", "rojo": "F8D7DA"}
-    link_font = Font(color="0563C1", underline="single")
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    for d in rows_data:
-        ws.append([
-            _na(d.get("mes")), _na(d.get("fecha_asignacion")), _na(d.get("sdqs")),
-            _na(d.get("fecha_vencimiento")), _na(d.get("estado_dias")),
-            _na(d.get("quejoso")), _na(d.get("correo")), _na(d.get("tema")),
-            _na(d.get("competencia_ocdi")), _na(d.get("bpm")), _na(d.get("responsable")),
-            _na(d.get("rad_salida")), _na(d.get("fecha_respuesta")), _na(d.get("observaciones")),
-            _na(d.get("estado_proceso")), _na(d.get("hecho_corrupto")),
-            _na(d.get("valor_institucional")), _na(d.get("tipologia")), _na(d.get("url_sdqs")),
-        ])
-        ri = ws.max_row
-        sem = d.get("semaforo_sdqs")
-        if sem and sem in SEM_COLORS:
-            ws.cell(ri, 5).fill = PatternFill("solid", fgColor=SEM_COLORS[sem])
-        # Hipervínculo en columna SDQS (col 3)
-        url_sdqs = d.get("url_sdqs")
-        if url_sdqs and d.get("sdqs"):
-            sdqs_cell = ws.cell(ri, 3)
-            sdqs_cell.hyperlink = url_sdqs
-            sdqs_cell.font = link_font
-        # Hipervínculo en columna RAD SALIDA (col 12)
-        url = d.get("url_rad_salida")
-        if url and d.get("rad_salida"):
-            rad_cell = ws.cell(ri, 12)
-            rad_cell.hyperlink = url
-            rad_cell.font = link_font
-
-    col_widths = [10, 16, 14, 16, 12, 28, 28, 50, 14, 14, 28, 16, 16, 40, 22, 22, 22, 20, 40]
-    for i, w in enumerate(col_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-    ws.freeze_panes = "A2"
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    buf.seek(0)
-    return StreamingResponse(
-        buf,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=SDQS_export.xlsx"},
+
+    def enlace(url_campo, campo):
+        return lambda d: d.get(url_campo) if d.get(url_campo) and d.get(campo) else None
+
+    columnas = [
+        Columna(titulo, campo, ancho, formato=na) for titulo, campo, ancho in [
+            ("MES", "mes", 10), ("FECHA ASIGNACION", "fecha_asignacion", 16), ("SDQS", "sdqs", 14),
+            ("FECHA VENCIMIENTO", "fecha_vencimiento", 16), ("ESTADO DIAS", "estado_dias", 12),
+            ("QUEJOSO", "quejoso", 28), ("CORREO", "correo", 28), ("TEMA", "tema", 50),
+            ("COMPETENCIA OCDI", "competencia_ocdi", 14), ("BPM", "bpm", 14),
+            ("RESPONSABLE", "responsable", 28), ("RAD SALIDA", "rad_salida", 16),
+            ("FECHA RESPUESTA", "fecha_respuesta", 16), ("OBSERVACIONES", "observaciones", 40),
+            ("ESTADO PROCESO", "estado_proceso", 22), ("HECHO CORRUPTO", "hecho_corrupto", 22),
+            ("VALOR INSTITUCIONAL", "valor_institucional", 22), ("TIPOLOGIA", "tipologia", 20),
+            ("URL SDQS", "url_sdqs", 40),
+        ]
+    ]
+    # Semáforo en ESTADO DIAS; hipervínculos en SDQS y RAD SALIDA
+    columnas[4].relleno = lambda d: SEM_COLORS.get(d.get("semaforo_sdqs"))
+    columnas[2].enlace = enlace("url_sdqs", "sdqs")
+    columnas[11].enlace = enlace("url_rad_salida", "rad_salida")
+
+    hoja = Hoja(
+        "SDQS", columnas, filas,
+        fuente_encabezado=Font(bold=True, color="FFFFFF"), alto_encabezado=None,
+        alineacion_encabezado=Alignment(horizontal="center"), alterna=None, alineacion=None,
     )
+    return respuesta_xlsx([hoja], "SDQS_export.xlsx")
 
 
 # ── Importar ──────────────────────────────────────────────────────────────────
 
 @router.get("/importar", response_class=HTMLResponse)
-async def importar_get(request: Request, msg: str = ""):
+def importar_get(request: Request, msg: str = ""):
     user = request.state.user
     if not _pi(user, _MOD):
         return RedirectResponse("/sdqs/?msg=sin_permiso", status_code=303)
@@ -366,12 +314,12 @@ async def importar_get(request: Request, msg: str = ""):
 
 
 @router.post("/importar")
-async def importar_post(request: Request, archivo: UploadFile = File(...)):
+def importar_post(request: Request, archivo: UploadFile = File(...)):
     user = request.state.user
     if not _pi(user, _MOD):
         return RedirectResponse("/sdqs/?msg=sin_permiso", status_code=303)
 
-    contenido = await archivo.read()
+    contenido = archivo.file.read()
     count, errors = _importar_excel_sdqs(contenido)
     if errors:
         return RedirectResponse("/sdqs/importar?msg=error_archivo", status_code=303)
@@ -380,12 +328,13 @@ async def importar_post(request: Request, archivo: UploadFile = File(...)):
 
 
 @router.post("/limpiar")
-async def limpiar(request: Request):
+def limpiar(request: Request):
     user = request.state.user
     if not _pi(user, _MOD):
         return RedirectResponse("/sdqs/?msg=sin_permiso", status_code=303)
     conn = get_db()
     conn.execute("DELETE FROM sdqs")
+    refrescar_alertas(conn, _MOD)
     conn.commit()
     conn.close()
     registrar_log(user, "limpiar", _MOD, "Tabla SDQS borrada")
@@ -395,7 +344,7 @@ async def limpiar(request: Request):
 # ── Papelera de reciclaje (DEBE ir antes de "/{id}" — ruta estática) ───────────
 
 @router.get("/papelera", response_class=HTMLResponse)
-async def papelera(request: Request, msg: str = ""):
+def papelera(request: Request, msg: str = ""):
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
         return RedirectResponse("/sdqs/?msg=sin_permiso", status_code=303)
@@ -420,7 +369,7 @@ async def papelera(request: Request, msg: str = ""):
 # ── Ver ───────────────────────────────────────────────────────────────────────
 
 @router.get("/{id}", response_class=HTMLResponse)
-async def ver(request: Request, id: int, msg: str = ""):
+def ver(request: Request, id: int, msg: str = ""):
     conn = get_db()
     row = conn.execute("SELECT * FROM sdqs WHERE id = ?", (id,)).fetchone()
     abogados = get_personal_oficina(conn)
@@ -444,7 +393,7 @@ async def ver(request: Request, id: int, msg: str = ""):
 # ── Editar ────────────────────────────────────────────────────────────────────
 
 @router.get("/{id}/editar", response_class=HTMLResponse)
-async def editar_get(request: Request, id: int):
+def editar_get(request: Request, id: int):
     conn = get_db()
     row = conn.execute("SELECT * FROM sdqs WHERE id = ?", (id,)).fetchone()
     abogados = get_personal_oficina(conn)
@@ -463,7 +412,7 @@ async def editar_get(request: Request, id: int):
 
 
 @router.post("/{id}/editar")
-async def editar_post(
+def editar_post(
     request: Request,
     id: int,
     mes: str = Form(""),
@@ -510,6 +459,7 @@ async def editar_post(
          observaciones, estado_proceso or None, hecho_corrupto or None,
          valor_institucional or None, tipologia or None, id),
     )
+    refrescar_alertas(conn, _MOD, [id])
     conn.commit()
     conn.close()
     registrar_log(user, "editar", _MOD, f"ID: {id}", registro_id=id)
@@ -519,7 +469,7 @@ async def editar_post(
 # ── Eliminar ──────────────────────────────────────────────────────────────────
 
 @router.post("/{id}/eliminar")
-async def eliminar(request: Request, id: int):
+def eliminar(request: Request, id: int):
     user = request.state.user
     if not _pw(user, _MOD):
         return RedirectResponse("/sdqs/?msg=sin_permiso", status_code=303)
@@ -528,6 +478,7 @@ async def eliminar(request: Request, id: int):
         "UPDATE sdqs SET eliminado_en = datetime('now','localtime'), eliminado_por = ? WHERE id = ?",
         (user.get("nombre_completo") if user else None, id),
     )
+    refrescar_alertas(conn, _MOD, [id])
     conn.commit()
     conn.close()
     registrar_log(user, "eliminar", _MOD, f"ID: {id}", registro_id=id)
@@ -535,7 +486,7 @@ async def eliminar(request: Request, id: int):
 
 
 @router.post("/{id}/restaurar")
-async def restaurar(request: Request, id: int):
+def restaurar(request: Request, id: int):
     import sqlite3 as _sqlite3
     user = getattr(request.state, "user", None)
     if not _pw(user, _MOD):
@@ -543,6 +494,7 @@ async def restaurar(request: Request, id: int):
     conn = get_db()
     try:
         conn.execute("UPDATE sdqs SET eliminado_en = NULL, eliminado_por = NULL WHERE id = ?", (id,))
+        refrescar_alertas(conn, _MOD, [id])
         conn.commit()
     except _sqlite3.IntegrityError:
         conn.close()
@@ -553,12 +505,13 @@ async def restaurar(request: Request, id: int):
 
 
 @router.post("/{id}/purgar")
-async def purgar(request: Request, id: int):
+def purgar(request: Request, id: int):
     user = getattr(request.state, "user", None)
     if not user or user.get("rol") not in ROLES_SUPERUSUARIO:
         return RedirectResponse("/sdqs/papelera?msg=sin_permiso", status_code=303)
     conn = get_db()
     conn.execute("DELETE FROM sdqs WHERE id = ? AND eliminado_en IS NOT NULL", (id,))
+    refrescar_alertas(conn, _MOD, [id])
     conn.commit()
     conn.close()
     registrar_log(user, "PURGAR", _MOD, f"ID: {id} — eliminado definitivamente", registro_id=id)
@@ -740,6 +693,7 @@ def _importar_excel_sdqs(archivo_bytes: bytes):
         except Exception as e:
             errors.append(str(e))
 
+    refrescar_alertas(conn, _MOD)
     conn.commit()
     conn.close()
     return count, errors
@@ -1,11 +1,14 @@
-import io
 from datetime import date
-from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from itertools import groupby
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from starlette.datastructures import FormData
 
 from app.database import get_db
-from app.auth_utils import tpl, puede_escribir
+from app.escritor import get_escritor
+from app.texto import patron_like
+from app.auth_utils import tpl, puede_escribir, form_request
 
 router = APIRouter()
 templates = Jinja2Templates(directory="app/templates")
@@ -19,7 +22,7 @@ _MOD = "expedientes"
 
 
 @router.get("/seguimiento", response_class=HTMLResponse)
-async def seguimiento_get(request: Request, anio: int = -1, abogado: str = "", q: str = "", msg: str = ""):
+def seguimiento_get(request: Request, anio: int = -1, abogado: str = "", q: str = "", msg: str = ""):
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=302)
@@ -66,11 +69,10 @@ async def seguimiento_get(request: Request, anio: int = -1, abogado: str = "", q
         params.append(abogado)
 
     if q.strip():
-        sql += " AND (n_expediente LIKE ? OR UPPER(nombre_investigado) LIKE ?)"
-        like = f"%{q.strip().upper()}%"
-        params += [like, like]
+        sql += " AND (n_expediente LIKE ? OR nombre_investigado_norm LIKE ?)"
+        params += [f"%{q.strip()}%", patron_like(q)]
 
-    sql += " ORDER BY anio DESC, CAST(n_expediente AS INTEGER), n_expediente"
+    sql += " ORDER BY anio DESC, n_num, n_expediente"
     exp_rows = conn.execute(sql, params).fetchall()
     expedientes = [dict(r) for r in exp_rows]
 
@@ -112,7 +114,7 @@ async def seguimiento_get(request: Request, anio: int = -1, abogado: str = "", q
 
 
 @router.post("/seguimiento/guardar")
-async def seguimiento_guardar(request: Request):
+def seguimiento_guardar(request: Request, form: FormData = Depends(form_request)):
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=302)
@@ -120,7 +122,6 @@ async def seguimiento_guardar(request: Request):
     if not puede_escribir(user, _MOD):
         return RedirectResponse("/seguimiento?msg=sin_permiso", status_code=302)
 
-    form = await request.form()
     try:
         expediente_id = int(form.get("expediente_id", 0))
         anio = int(form.get("anio", date.today().year))
@@ -134,10 +135,18 @@ async def seguimiento_guardar(request: Request):
         return RedirectResponse(f"/seguimiento?anio={anio}&msg=error_datos", status_code=302)
 
     conn = get_db()
-    if not conn.execute("SELECT 1 FROM expedientes WHERE id=? AND eliminado_en IS NULL", (expediente_id,)).fetchone():
-        conn.close()
+    existe = conn.execute("SELECT 1 FROM expedientes WHERE id=? AND eliminado_en IS NULL", (expediente_id,)).fetchone()
+    conn.close()
+    if not existe:
         return RedirectResponse(f"/seguimiento?anio={anio}&msg=error_datos", status_code=302)
 
+    get_escritor().ejecutar(_guardar_seguimiento, expediente_id, anio, mes, descripcion, created_by)
+
+    return RedirectResponse(f"/seguimiento?anio={anio}", status_code=302)
+
+
+def _guardar_seguimiento(conn, expediente_id: int, anio: int, mes: str, descripcion: str, created_by: str):
+    """Tarea del escritor: upsert de la celda de seguimiento (o borrado si queda vacía)."""
     if descripcion:
         conn.execute(
             """INSERT INTO seguimiento_mensual
@@ -154,128 +163,70 @@ async def seguimiento_guardar(request: Request):
             "DELETE FROM seguimiento_mensual WHERE expediente_id=? AND anio=? AND mes=?",
             (expediente_id, anio, mes),
         )
-    conn.commit()
-    conn.close()
-
-    return RedirectResponse(f"/seguimiento?anio={anio}", status_code=302)
 
 
 @router.get("/seguimiento/exportar")
-async def seguimiento_exportar(request: Request, anio: int = 0, abogado: str = "", q: str = ""):
+def seguimiento_exportar(request: Request, anio: int = 0, abogado: str = "", q: str = ""):
     user = request.state.user
     if not user:
         return RedirectResponse("/login", status_code=302)
 
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+        from app.excel import Columna, Hoja, na, respuesta_xlsx
+        from openpyxl.styles import Alignment, Border, Side
     except ImportError:
         return RedirectResponse("/seguimiento?msg=error_openpyxl")
 
-    conn = get_db()
-
+    # Una fila por actividad mensual (o una sola si no tiene), agrupadas por expediente
     sql = (
-        "SELECT id, n_expediente, anio, etapa_actual AS etapa, abogado_asignado AS nombre_abogado "
-        "FROM expedientes WHERE eliminado_en IS NULL"
+        "SELECT e.id, e.n_expediente, e.anio, e.etapa_actual AS etapa, "
+        "e.abogado_asignado AS nombre_abogado, s.mes, s.descripcion "
+        "FROM expedientes e "
+        "LEFT JOIN seguimiento_mensual s ON s.expediente_id = e.id"
     )
     params: list = []
     if anio != 0:
-        sql += " AND anio = ?"
+        sql += " AND s.anio = ?"
+        params.append(anio)
+    sql += " WHERE e.eliminado_en IS NULL"
+    if anio != 0:
+        sql += " AND e.anio = ?"
         params.append(anio)
     if abogado:
-        sql += " AND abogado_asignado = ?"
+        sql += " AND e.abogado_asignado = ?"
         params.append(abogado)
     if q.strip():
-        sql += " AND (n_expediente LIKE ? OR UPPER(nombre_investigado) LIKE ?)"
-        like = f"%{q.strip().upper()}%"
-        params += [like, like]
-    sql += " ORDER BY anio DESC, CAST(n_expediente AS INTEGER), n_expediente"
-
-    exp_rows = conn.execute(sql, params).fetchall()
-    expedientes = [dict(r) for r in exp_rows]
+        sql += " AND (e.n_expediente LIKE ? OR e.nombre_investigado_norm LIKE ?)"
+        params += [f"%{q.strip()}%", patron_like(q)]
+    sql += " ORDER BY e.anio DESC, e.n_num, e.n_expediente, e.id, s.anio, s.id"
 
-    acts_map: dict = {}
-    if expedientes:
-        ids = [e["id"] for e in expedientes]
-        placeholders = ",".join("?" * len(ids))
-        if anio != 0:
-            act_rows = conn.execute(
-                f"SELECT expediente_id, mes, descripcion FROM seguimiento_mensual "
-                f"WHERE anio = ? AND expediente_id IN ({placeholders})",
-                [anio] + ids,
-            ).fetchall()
-        else:
-            act_rows = conn.execute(
-                f"SELECT expediente_id, mes, descripcion FROM seguimiento_mensual "
-                f"WHERE expediente_id IN ({placeholders})",
-                ids,
-            ).fetchall()
-        for r in act_rows:
-            acts_map[(r["expediente_id"], r["mes"])] = r["descripcion"] or ""
-    conn.close()
+    def filas(conn):
+        for _, grupo in groupby(conn.execute(sql, params), key=lambda r: r["id"]):
+            grupo = list(grupo)
+            exp = dict(grupo[0])
+            # Sin filtro de año, el mes del año más reciente queda encima
+            exp["actividades"] = {r["mes"]: r["descripcion"] or "" for r in grupo if r["mes"]}
+            yield exp
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    titulo = f"Seguimiento {anio}" if anio else "Seguimiento Todos"
-    ws.title = titulo
+    def actividad(mes_completo):
+        return lambda exp: exp["actividades"].get(mes_completo, "")
 
-    # Estilos
-    hdr_font   = Font(bold=True, color="FFFFFF", size=10)
-    hdr_fill   = PatternFill("solid", fgColor="0D3060")
-    mes_fill   = PatternFill("solid", fgColor="1B4F8A")
-    center     = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    wrap       = Alignment(wrap_text=True, vertical="top")
-    thin       = Side(style="thin", color="CBD5E1")
-    border     = Border(left=thin, right=thin, top=thin, bottom=thin)
+    thin   = Side(style="thin", color="CBD5E1")
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    wrap   = Alignment(wrap_text=True, vertical="top")
 
     meses_abrev = ["ENE","FEB","MAR","ABR","MAY","JUN","JUL","AGO","SEP","OCT","NOV","DIC"]
-    encabezados = ["N. EXPEDIENTE", "AÑO", "ABOGADO", "ETAPA"] + meses_abrev
-
-    ws.append(encabezados)
-    for col_idx, hdr in enumerate(encabezados, 1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = hdr_font
-        cell.fill = hdr_fill if col_idx <= 4 else mes_fill
-        cell.alignment = center
-        cell.border = border
-
-    _na = lambda v: v if (v is not None and str(v).strip() != "") else "N/A"
-
-    for exp in expedientes:
-        row_data = [
-            _na(exp["n_expediente"]),
-            _na(exp.get("anio", "")),
-            _na(exp["nombre_abogado"] or ""),
-            _na(exp["etapa"] or ""),
-        ]
-        for mes_completo in MESES:
-            row_data.append(_na(acts_map.get((exp["id"], mes_completo), "")))
-        ws.append(row_data)
-        row_idx = ws.max_row
-        for col_idx in range(1, len(encabezados) + 1):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            cell.border = border
-            cell.alignment = wrap if col_idx > 4 else Alignment(vertical="center")
-            if row_idx % 2 == 0:
-                cell.fill = PatternFill("solid", fgColor="F8FAFC")
-
-    # Anchos de columna
-    ws.column_dimensions["A"].width = 14
-    ws.column_dimensions["B"].width = 7
-    ws.column_dimensions["C"].width = 30
-    ws.column_dimensions["D"].width = 22
-    for i, col_letter in enumerate(["E","F","G","H","I","J","K","L","M","N","O","P"], 0):
-        ws.column_dimensions[col_letter].width = 22
-    ws.row_dimensions[1].height = 30
-    ws.freeze_panes = "E2"
-
-    output = io.BytesIO()
-    wb.save(output)
-    output.seek(0)
+    columnas = [
+        Columna("N. EXPEDIENTE", "n_expediente", 14, formato=na),
+        Columna("AÑO", "anio", 7, formato=na),
+        Columna("ABOGADO", "nombre_abogado", 30, formato=na),
+        Columna("ETAPA", "etapa", 22, formato=na),
+    ] + [
+        Columna(abrev, actividad(mes_completo), 22, formato=na, alineacion=wrap, color="1B4F8A")
+        for abrev, mes_completo in zip(meses_abrev, MESES)
+    ]
+    titulo = f"Seguimiento {anio}" if anio else "Seguimiento Todos"
+    hoja = Hoja(titulo, columnas, filas, color="0D3060", alterna="F8FAFC", borde=border, congelar="E2")
+
     hoy_str = date.today().strftime("%Y%m%d")
-    nombre = f"SeguimientoMensual_{anio if anio else 'Todos'}_{hoy_str}.xlsx"
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={nombre}"},
-    )
+    return respuesta_xlsx([hoja], f"SeguimientoMensual_{anio if anio else 'Todos'}_{hoy_str}.xlsx")
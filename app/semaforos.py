@@ -0,0 +1,139 @@
+"""
+Semáforos de plazo de SDQS y correspondencia.
+
+Las reglas viven aquí y no en los routers para que las pantallas, los
+reportes, el backup y la tabla de alertas (app/alertas.py) usen las mismas
+sin importar código de un handler. Los routers las siguen exponiendo con sus
+nombres de siempre:
+
+    sdqs._calcular_semaforo_sdqs            = semaforo_sdqs
+    correspondencia._calcular_semaforo_row  = semaforo_correspondencia
+"""
+from datetime import date, datetime
+
+from app.calendario import get_calendario
+
+# Tipos de respuesta de correspondencia que no corren plazo (siempre verdes)
+ANEXO_VALS = {"ANEXO EXPEDIENTE", "ANEXO AL EXPEDIENTE"}
+
+
+# ── SDQS ──────────────────────────────────────────────────────────────────────
+
+def semaforo_sdqs(reg: dict) -> dict:
+    """
+    Calcula estado_dias y semaforo_sdqs ('verde'/'amarillo'/'rojo'/'respondido').
+    Si ya existe rad_salida → 'respondido' (no aparece en filtros de plazo).
+    Verde    = primera mitad del plazo aún no cumplida.
+    Amarillo = segunda mitad del plazo (pero > 2 días restantes).
+    Rojo     = 2 días o menos hasta el vencimiento (o ya vencido).
+    """
+    # Si ya hay radicado de salida el caso fue respondido — no aplica semáforo de plazo
+    if reg.get("rad_salida") and str(reg.get("rad_salida")).strip():
+        reg["semaforo_sdqs"] = "respondido"
+        reg["estado_dias"] = None
+        return reg
+
+    fa = reg.get("fecha_asignacion")
+    fv = reg.get("fecha_vencimiento")
+    reg["estado_dias"] = None
+    reg["semaforo_sdqs"] = None
+    if not fa or not fv:
+        return reg
+    try:
+        fa_d = datetime.fromisoformat(str(fa)[:10]).date()
+        fv_d = datetime.fromisoformat(str(fv)[:10]).date()
+        total_dias = (fv_d - fa_d).days
+        if total_dias <= 0:
+            return reg
+        hoy = date.today()
+        dias_transcurridos = (hoy - fa_d).days
+        dias_restantes = (fv_d - hoy).days
+        reg["estado_dias"] = total_dias
+        if dias_restantes <= 2:
+            reg["semaforo_sdqs"] = "rojo"
+        elif dias_transcurridos >= total_dias // 2:
+            reg["semaforo_sdqs"] = "amarillo"
+        else:
+            reg["semaforo_sdqs"] = "verde"
+    except Exception:
+        pass
+    return reg
+
+
+# ── Correspondencia ───────────────────────────────────────────────────────────
+
+def semaforo_correspondencia(r: dict) -> dict:
+    """
+    Calcula semaforo ('verde'/'amarilla'/'roja'/'respondido'), dias_restantes,
+    fecha_vencimiento y fecha_termino_respuesta de un oficio.
+    Con término: verde/amarilla/roja según los días hasta la fecha de revisión.
+    Sin término: según los días transcurridos desde el ingreso.
+    """
+    r["dias_restantes"] = None
+    r["fecha_vencimiento"] = None        # fecha legal real: fecha_ingreso + termino días hábiles
+    r["fecha_termino_respuesta"] = None  # fecha de revisión: 2 días hábiles antes del vencimiento
+    r["pendiente"] = not bool(r.get("fecha_radicado_salida"))
+
+    if r.get("tipo_respuesta") and r["tipo_respuesta"].strip().upper() in ANEXO_VALS:
+        r["semaforo"] = "verde"
+        r["dias_transcurridos"] = None
+        return r
+
+    if r.get("fecha_radicado_salida"):
+        r["semaforo"] = "respondido"
+        if r.get("fecha_ingreso"):
+            try:
+                fi = date.fromisoformat(r["fecha_ingreso"][:10])
+                fs = date.fromisoformat(r["fecha_radicado_salida"][:10])
+                r["dias_transcurridos"] = (fs - fi).days
+            except Exception:
+                pass
+        return r
+
+    if not r.get("fecha_ingreso"):
+        r["semaforo"] = None
+        r["dias_transcurridos"] = None
+        return r
+
+    if r.get("termino_dias"):
+        try:
+            fi = date.fromisoformat(r["fecha_ingreso"][:10])
+            termino = int(r["termino_dias"])
+            # Fecha legal de vencimiento: fecha_ingreso + N días hábiles
+            fecha_venc = get_calendario().sumar(fi, termino)
+            # Fecha de revisión: 2 días hábiles antes del vencimiento (nunca cae en finde/festivo)
+            fecha_rev = get_calendario().restar(fecha_venc, 2)
+            r["fecha_vencimiento"] = fecha_venc.isoformat()
+            r["fecha_termino_respuesta"] = fecha_rev.isoformat()
+            dias_restantes = (fecha_rev - date.today()).days
+            r["dias_restantes"] = dias_restantes
+            # dias_transcurridos (calendario, informativo) se mantiene disponible
+            # aunque haya término legal — lo usa el Dashboard para mostrar
+            # "lleva X días" sin afectar la clasificación verde/amarilla/roja,
+            # que siempre depende de dias_restantes en este caso.
+            r["dias_transcurridos"] = (date.today() - fi).days
+            if dias_restantes >= 2:
+                r["semaforo"] = "verde"
+            elif dias_restantes >= 0:
+                r["semaforo"] = "amarilla"
+            else:
+                r["semaforo"] = "roja"
+        except Exception:
+            r["semaforo"] = None
+        return r
+
+    # Sin término definido: usar días transcurridos desde ingreso
+    try:
+        fi = date.fromisoformat(r["fecha_ingreso"][:10])
+        dias = (date.today() - fi).days
+        r["dias_transcurridos"] = dias
+        if dias <= 5:
+            r["semaforo"] = "verde"
+        elif dias <= 8:
+            r["semaforo"] = "amarilla"
+        else:
+            r["semaforo"] = "roja"
+    except Exception:
+        r["semaforo"] = None
+
+    return r
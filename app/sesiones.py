@@ -0,0 +1,293 @@
+"""
+Actividad de sesiones: last_seen acumulado en memoria y volcado por lotes.
+
+Antes cada request (incluidas las llamadas JSON pequeñas como
+/correspondencia/verificar-radicado) hacía `UPDATE sesiones SET last_seen`
+con su commit: toda lectura se volvía una transacción de escritura. Ahora la
+request solo anota en memoria la hora de su actividad y un hilo vuelca todas
+las sesiones tocadas cada INTERVALO_LAST_SEEN segundos, en una sola tarea del
+escritor (app/escritor.py).
+
+Se guarda la hora real de la última actividad, no la del volcado, así que el
+valor que termina en la base es el mismo que dejaba el UPDATE por request.
+Quien lea last_seen antes del volcado debe usar `last_seen()`, que superpone
+lo pendiente sobre lo guardado.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+INTERVALO_LAST_SEEN = float(os.environ.get("OCDI_LAST_SEEN_SEG", "30"))
+
+
+def _ahora() -> str:
+    # Mismo formato que datetime('now','localtime') de SQLite
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _volcar_last_seen(conn, pendientes: list[tuple[str, str]]):
+    """Tarea del escritor: aplica los last_seen acumulados."""
+    conn.executemany(
+        "UPDATE sesiones SET last_seen = ? WHERE token = ? AND (last_seen IS NULL OR last_seen < ?)",
+        [(ts, token, ts) for token, ts in pendientes],
+    )
+
+
+class ActividadSesiones:
+    """Acumula last_seen por token y lo vuelca periódicamente."""
+
+    def __init__(self, intervalo: float = INTERVALO_LAST_SEEN):
+        self.intervalo = intervalo
+        self._pendientes: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: threading.Thread | None = None
+        self.volcados = 0
+
+    def registrar(self, token: str):
+        """Anota actividad de la sesión ahora (sin tocar la base)."""
+        with self._lock:
+            self._pendientes[token] = _ahora()
+            if self._hilo is None:
+                self._hilo = threading.Thread(target=self._bucle, name="last-seen", daemon=True)
+                self._hilo.start()
+
+    def pendiente(self, token: str) -> str | None:
+        with self._lock:
+            return self._pendientes.get(token)
+
+    def olvidar(self, token: str):
+        """Descarta lo pendiente de una sesión (logout: la fila ya no existe)."""
+        with self._lock:
+            self._pendientes.pop(token, None)
+
+    def vaciar(self, esperar: bool = False):
+        """Vuelca todo lo pendiente en una sola tarea del escritor."""
+        from app.escritor import get_escritor
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        if not pendientes:
+            return
+        fut = get_escritor().enviar(_volcar_last_seen, list(pendientes.items()))
+        self.volcados += 1
+        if esperar:
+            fut.result(timeout=30)
+
+    def detener(self):
+        """Detiene el hilo y vuelca lo pendiente (apagado)."""
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
+            self._hilo = None
+        self._detener.clear()
+        self.vaciar(esperar=True)
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.vaciar()
+            except Exception:
+                pass  # el próximo ciclo reintenta con lo que se acumule
+
+
+actividad = ActividadSesiones()
+
+
+def last_seen(conn, token: str) -> str | None:
+    """last_seen efectivo de la sesión: lo pendiente en memoria o lo guardado."""
+    pendiente = actividad.pendiente(token)
+    if pendiente is not None:
+        return pendiente
+    row = conn.execute("SELECT last_seen FROM sesiones WHERE token = ?", (token,)).fetchone()
+    return row[0] if row else None
+
+
+# ── Caché de sesión y permisos ────────────────────────────────────────────────
+#
+# auth_middleware resolvía en cada request `sesiones JOIN usuarios` y
+# permisos_modulo. Con la caché, una request de una sesión ya vista no hace
+# ninguna consulta de autorización. Las entradas vencen a los TTL_CACHE_SESION
+# segundos y se invalidan explícitamente cuando cambian los datos que las
+# originan: toggle_activo, actualizar_permisos y cambiar_password (por usuario)
+# y logout (por token).
+
+TTL_CACHE_SESION = float(os.environ.get("OCDI_CACHE_SESION_SEG", "60"))
+
+
+class CacheSesiones:
+    """token → user_id y user_id → (usuario, permisos), con vencimiento."""
+
+    def __init__(self, ttl: float = TTL_CACHE_SESION):
+        self.ttl = ttl
+        self._tokens: dict[str, tuple[float, int]] = {}
+        self._usuarios: dict[int, tuple[float, dict, dict]] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, token: str) -> tuple[dict, dict] | None:
+        """(usuario, permisos) de la sesión, o None si no está o venció."""
+        ahora = time.time()
+        with self._lock:
+            t = self._tokens.get(token)
+            u = self._usuarios.get(t[1]) if t else None
+            if t is None or u is None or t[0] < ahora or u[0] < ahora:
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            return dict(u[1]), u[2]
+
+    def guardar(self, token: str, usuario: dict, permisos: dict, vence_sesion: float | None = None):
+        """vence_sesion (epoch) acota la entrada del token al vencimiento absoluto de la sesión."""
+        vence = time.time() + self.ttl
+        with self._lock:
+            self._tokens[token] = (min(vence, vence_sesion) if vence_sesion else vence, usuario["id"])
+            self._usuarios[usuario["id"]] = (vence, dict(usuario), permisos)
+
+    def invalidar_token(self, token: str):
+        with self._lock:
+            self._tokens.pop(token, None)
+
+    def invalidar_usuario(self, user_id: int):
+        """Descarta el usuario y todas sus sesiones en caché."""
+        with self._lock:
+            self._usuarios.pop(user_id, None)
+            for tok in [k for k, (_v, uid) in self._tokens.items() if uid == user_id]:
+                del self._tokens[tok]
+
+    def limpiar(self):
+        with self._lock:
+            self._tokens.clear()
+            self._usuarios.clear()
+
+
+cache_sesiones = CacheSesiones()
+
+
+# ── Vencimiento y barrido de sesiones ────────────────────────────────────────
+#
+# Una sesión vence por inactividad (SESION_INACTIVIDAD_MIN desde su last_seen
+# efectivo) o por antigüedad absoluta (SESION_MAXIMA_HORAS desde created_at),
+# lo que ocurra primero. cargar_sesion() rechaza las vencidas y el barredor
+# borra periódicamente las que quedaron en la tabla, en lotes de LOTE_BARRIDO
+# filas por transacción, así `sesiones` y su índice quedan acotados a las
+# sesiones realmente vivas.
+
+SESION_INACTIVIDAD_MIN = float(os.environ.get("OCDI_SESION_INACTIVIDAD_MIN", "480"))
+SESION_MAXIMA_HORAS = float(os.environ.get("OCDI_SESION_MAXIMA_HORAS", "24"))
+BARRIDO_SESIONES_MIN = float(os.environ.get("OCDI_BARRIDO_SESIONES_MIN", "15"))
+LOTE_BARRIDO = 500
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def limites_vigencia(ahora: datetime | None = None) -> tuple[str, str]:
+    """(creada_desde, activa_desde): vive si created_at >= la primera y last_seen >= la segunda."""
+    ahora = ahora or datetime.now()
+    return (
+        (ahora - timedelta(hours=SESION_MAXIMA_HORAS)).strftime(_FMT),
+        (ahora - timedelta(minutes=SESION_INACTIVIDAD_MIN)).strftime(_FMT),
+    )
+
+
+def sesion_vigente(created_at: str | None, last_seen_efectivo: str | None, ahora: datetime | None = None) -> bool:
+    creada_desde, activa_desde = limites_vigencia(ahora)
+    return (created_at or "") >= creada_desde and (last_seen_efectivo or created_at or "") >= activa_desde
+
+
+def vencimiento(created_at: str | None, last_seen_efectivo: str | None) -> str | None:
+    """Fecha/hora en que vence la sesión si no vuelve a usarse."""
+    try:
+        creada = datetime.strptime(created_at, _FMT)
+        visto = datetime.strptime(last_seen_efectivo or created_at, _FMT)
+    except (TypeError, ValueError):
+        return None
+    return min(
+        creada + timedelta(hours=SESION_MAXIMA_HORAS),
+        visto + timedelta(minutes=SESION_INACTIVIDAD_MIN),
+    ).strftime(_FMT)
+
+
+def vence_absoluto_epoch(created_at: str | None) -> float | None:
+    """Instante (epoch) del vencimiento absoluto; acota la entrada en caché."""
+    try:
+        creada = datetime.strptime(created_at, _FMT)
+    except (TypeError, ValueError):
+        return None
+    return (creada + timedelta(hours=SESION_MAXIMA_HORAS)).timestamp()
+
+
+def _borrar_lote_vencidas(conn, creada_desde: str, activa_desde: str, lote: int) -> list[str]:
+    """Tarea del escritor: borra hasta `lote` sesiones vencidas; devuelve sus tokens."""
+    return [r[0] for r in conn.execute(
+        """DELETE FROM sesiones WHERE id IN (
+               SELECT id FROM sesiones
+               WHERE created_at < ? OR COALESCE(last_seen, created_at) < ?
+               LIMIT ?
+           ) RETURNING token""",
+        (creada_desde, activa_desde, lote),
+    ).fetchall()]
+
+
+def _borrar_token(conn, token: str):
+    conn.execute("DELETE FROM sesiones WHERE token = ?", (token,))
+
+
+def descartar_sesion(token: str):
+    """Borra una sesión (vencida o cerrada por admin) y la saca de memoria."""
+    from app.escritor import get_escritor
+    actividad.olvidar(token)
+    cache_sesiones.invalidar_token(token)
+    get_escritor().enviar(_borrar_token, token)
+
+
+class BarredorSesiones:
+    """Hilo que borra sesiones vencidas cada BARRIDO_SESIONES_MIN minutos."""
+
+    def __init__(self, intervalo_min: float = BARRIDO_SESIONES_MIN, lote: int = LOTE_BARRIDO):
+        self.intervalo = intervalo_min * 60
+        self.lote = lote
+        self._detener = threading.Event()
+        self._hilo: threading.Thread | None = None
+        self.borradas = 0
+
+    def barrer(self) -> int:
+        """Un barrido completo ahora. Devuelve cuántas sesiones borró."""
+        from app.escritor import get_escritor
+        actividad.vaciar(esperar=True)  # last_seen al día antes de decidir
+        creada_desde, activa_desde = limites_vigencia()
+        total = 0
+        while True:
+            tokens = get_escritor().ejecutar(_borrar_lote_vencidas, creada_desde, activa_desde, self.lote)
+            for tok in tokens:
+                cache_sesiones.invalidar_token(tok)
+            total += len(tokens)
+            if len(tokens) < self.lote:
+                break
+        self.borradas += total
+        return total
+
+    def iniciar(self):
+        if self._hilo is None:
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="barrido-sesiones", daemon=True)
+            self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout=10)
+            self._hilo = None
+
+    def _bucle(self):
+        while True:
+            try:
+                self.barrer()
+            except Exception:
+                pass  # se reintenta en el próximo ciclo
+            if self._detener.wait(self.intervalo):
+                return
+
+
+barredor = BarredorSesiones()
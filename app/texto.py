@@ -0,0 +1,168 @@
+"""
+Texto normalizado para filtros sin tildes ni mayúsculas.
+
+Los filtros de las listas comparaban UPPER(columna) = ? o UPPER(columna)
+LIKE ?: la expresión impide usar índices sobre la columna y UPPER() de
+SQLite solo cambia letras ASCII ("CORRUPCIÓN" nunca coincidía con
+"corrupcion"). Desde la migración 20:
+
+- normalizar_texto() pasa tabs y saltos de línea a espacio, colapsa
+  espacios y recorta cada valor, une los no vacíos, quita tildes, diéresis y
+  virgulillas y pasa a minúsculas ASCII. sql_pasadas() arma la misma
+  transformación con replace(), trim() y lower() de SQLite, en el mismo
+  orden: las dos dan el mismo resultado sin registrar funciones en la
+  conexión.
+- Cada tabla de COLUMNAS_NORMALIZADAS tiene columnas sombra *_norm que
+  mantienen triggers AFTER INSERT / UPDATE OF de sus columnas fuente; los
+  routers filtran sobre ellas con el valor buscado normalizado en Python.
+- Las columnas de igualdad (mes, competencia y responsable de SDQS) tienen
+  índice parcial: el filtro es un SEARCH. Las de texto (texto_norm) juntan
+  varias columnas en una sola para que la búsqueda libre sea un único LIKE.
+
+Como los triggers solo usan SQL nativo, cualquier conexión puede escribir
+en estas tablas (sqlite3 de consola, scripts de mantenimiento) y las
+columnas quedan al día.
+"""
+
+# Separa las columnas dentro de texto_norm: no aparece en lo que se escribe
+# en un buscador, así que un LIKE no coincide "a caballo" entre dos columnas.
+_SEPARADOR = "\n"
+
+# Letra base -> letras con tilde, diéresis o virgulilla que se reducen a ella
+_VARIANTES = {
+    "a": "áàâäã", "e": "éèêë", "i": "íìîï", "o": "óòôöõ", "u": "úùûü",
+    "n": "ñ", "c": "ç",
+}
+
+# (buscado, reemplazo) en orden de aplicación, por columna antes de unirlas:
+# tabs y saltos de línea a espacio, fuera las marcas combinantes (texto que
+# llega descompuesto, p. ej. "e" + U+0301 pegado de un PDF) y cinco pasadas
+# de ("  ", " "), que colapsan tramos de hasta 32 espacios.
+_ESPACIOS = (
+    [(c, " ") for c in "\t\r\n"]
+    + [(m, "") for m in "\u0300\u0301\u0302\u0303\u0308"]
+    + [("  ", " ")] * 5
+)
+# Y sobre el texto ya unido: letras con tilde a su base
+_TILDES = [(v, base) for base, vs in _VARIANTES.items() for v in vs + vs.upper()]
+
+# lower() de SQLite solo cambia A-Z: la versión de Python tampoco toca el resto
+_MINUSCULAS_ASCII = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+# replace() anidados por sentencia: el parser de SQLite se desborda pasadas
+# las ~25 llamadas anidadas, así que _TILDES se aplica en varias pasadas
+_POR_PASADA = 16
+
+
+def _limpiar(valor) -> str:
+    texto = str(valor)
+    for buscado, reemplazo in _ESPACIOS:
+        texto = texto.replace(buscado, reemplazo)
+    return texto.strip(" ")
+
+
+def normalizar_texto(*valores) -> str | None:
+    """Valores no vacíos sin tildes, en minúsculas y con espacios simples.
+
+    Con varios valores los une con un salto de línea; None si no queda texto.
+    Da lo mismo que las pasadas de sql_pasadas() sobre las mismas columnas.
+    """
+    texto = _SEPARADOR.join(t for t in (_limpiar(v) for v in valores if v is not None) if t)
+    for buscado, reemplazo in _TILDES:
+        texto = texto.replace(buscado, reemplazo)
+    return texto.translate(_MINUSCULAS_ASCII) or None
+
+
+def patron_like(q: str) -> str | None:
+    """Patrón LIKE '%q%' normalizado, para comparar contra una columna *_norm."""
+    texto = normalizar_texto(q)
+    return f"%{texto}%" if texto else None
+
+
+def _literal(texto: str) -> str:
+    # Tabs, saltos de línea y marcas combinantes van como char(): el SQL de
+    # los triggers queda legible en sqlite_master
+    if texto.isprintable() and not any(0x300 <= ord(c) <= 0x36F for c in texto):
+        return "'" + texto.replace("'", "''") + "'"
+    return "char(" + ", ".join(str(ord(c)) for c in texto) + ")"
+
+
+def _reemplazar(expr: str, reemplazos) -> str:
+    for buscado, reemplazo in reemplazos:
+        expr = f"replace({expr}, {_literal(buscado)}, {_literal(reemplazo)})"
+    return expr
+
+
+def sql_pasadas(columnas, destino: str) -> list[str]:
+    """Expresiones SQL que, asignadas en orden a `destino`, dan normalizar_texto(*columnas).
+
+    La primera lee `columnas` (limpia, recorta y une); las siguientes leen
+    `destino` (quitan tildes y la última pasa a minúsculas). Solo usan
+    replace(), trim(), rtrim(), lower() y ||: sirven en triggers sin
+    funciones registradas en la conexión.
+    """
+    partes = [f"NULLIF(trim({_reemplazar(c, _ESPACIOS)}, ' '), '')" for c in columnas]
+    if len(partes) == 1:
+        pasadas = [partes[0]]
+    else:
+        sep = _literal(_SEPARADOR)
+        unidas = " || ".join(f"COALESCE({p} || {sep}, '')" for p in partes)
+        pasadas = [f"NULLIF(rtrim({unidas}, {sep}), '')"]
+    tandas = [_TILDES[i:i + _POR_PASADA] for i in range(0, len(_TILDES), _POR_PASADA)]
+    pasadas += [_reemplazar(destino, t) for t in tandas]
+    pasadas[-1] = f"lower({pasadas[-1]})"
+    return pasadas
+
+
+# tabla -> {columna sombra: columnas fuente}
+COLUMNAS_NORMALIZADAS = {
+    "sdqs": {
+        "mes_norm": ("mes",),
+        "competencia_norm": ("competencia_ocdi",),
+        "responsable_norm": ("responsable",),
+        "texto_norm": ("sdqs", "quejoso", "tema"),
+    },
+    "expedientes": {
+        "nombre_investigado_norm": ("nombre_investigado",),
+    },
+    "prestamos_equipos": {
+        "texto_norm": ("equipo_descripcion", "funcionario", "observaciones"),
+    },
+    "bienes_muebles": {
+        "texto_norm": ("descripcion_elemento", "descripcion_detallada", "marca", "modelo",
+                       "numero_serial", "nombre_responsable"),
+    },
+}
+
+
+# ── Esquema (migración 20) ─────────────────────────────────────────────────────
+
+def _sentencias(tabla: str, prefijo: str = "", where: str = "") -> list[str]:
+    """Un UPDATE por pasada, con todas las columnas sombra de la tabla."""
+    sombras = COLUMNAS_NORMALIZADAS[tabla]
+    pasadas = {s: sql_pasadas([prefijo + c for c in fuentes], s) for s, fuentes in sombras.items()}
+    n = len(next(iter(pasadas.values())))
+    return [
+        f"UPDATE {tabla} SET " + ", ".join(f"{s} = {p[i]}" for s, p in pasadas.items()) + where
+        for i in range(n)
+    ]
+
+
+def sql_backfill(tabla: str) -> str:
+    """UPDATEs que recalculan todas las columnas sombra de la tabla."""
+    return ";\n".join(_sentencias(tabla)) + ";"
+
+
+def sql_triggers(tabla: str) -> str:
+    """Triggers que recalculan las columnas sombra del registro escrito."""
+    fuentes = sorted({c for cols in COLUMNAS_NORMALIZADAS[tabla].values() for c in cols})
+    # Los UPDATE internos solo tocan columnas *_norm: no vuelven a disparar el de UPDATE OF
+    recalcula = "\n    ".join(s + ";" for s in _sentencias(tabla, "NEW.", " WHERE id = NEW.id"))
+    return f"""
+CREATE TRIGGER IF NOT EXISTS tr_{tabla}_norm_ins AFTER INSERT ON {tabla} BEGIN
+    {recalcula}
+END;
+CREATE TRIGGER IF NOT EXISTS tr_{tabla}_norm_upd AFTER UPDATE OF {', '.join(fuentes)} ON {tabla} BEGIN
+    {recalcula}
+END;
+"""
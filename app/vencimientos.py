@@ -0,0 +1,218 @@
+"""
+Fechas de vencimiento persistidas: expedientes y correspondencia.
+
+Las columnas de vencimiento de expedientes (migración 12) y de plazo de
+correspondencia (migración 14) se calculan aquí y no en los routers, para
+que las migraciones, los routers, el backup y las alertas usen las mismas
+reglas sin importar código de las pantallas.
+
+vencimientos() da las fechas de indagación, investigación, prescripción y
+prórroga de una fila; enriquecer() le suma las alertas que muestran las
+pantallas (expedientes._enriquecer) y actualizar_vencimientos() las guarda.
+
+plazos() da el día de ingreso, el vencimiento legal en días hábiles y la
+fecha de revisión (2 hábiles antes) de un oficio, con las reglas de
+semaforo_correspondencia(); actualizar_plazos() las guarda.
+
+Todo camino que escribe los campos de origen (crear, editar, importar,
+restaurar backup) llama a actualizar_vencimientos() / actualizar_plazos()
+antes de su commit. Ninguna hace commit.
+
+    from app.vencimientos import actualizar_vencimientos
+    actualizar_vencimientos(conn, [exp_id])
+"""
+from calendar import monthrange
+from datetime import date
+
+from app.calendario import get_calendario
+from app.database import calcular_alerta
+
+
+# Estados que cierran el expediente: a partir de aquí los plazos dejan de "correr".
+# Fuente única de verdad — usada por enriquecer() para que TODAS las vistas
+# (lista, dashboard, detalle, exportar-filtrado) coincidan en qué cuenta como "vencido".
+ESTADOS_CERRADOS = {"AUTO DE ARCHIVO", "ACUMULADO", "INCORPORADO"}
+
+
+# ── Fechas ────────────────────────────────────────────────────────────────────
+
+def safe_date(s) -> date | None:
+    """Acepta 'YYYY-MM-DD' y también 'YYYY-MM-DD HH:MM:SS' (legacy de importaciones anteriores)."""
+    if not s:
+        return None
+    try:
+        return date.fromisoformat(str(s).strip()[:10])
+    except ValueError:
+        return None
+
+
+def add_months(d: date, months: int) -> date:
+    m = d.month - 1 + months
+    year = d.year + m // 12
+    month = m % 12 + 1
+    day = min(d.day, monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def add_years(d: date, years: int) -> date:
+    try:
+        return d.replace(year=d.year + years)
+    except ValueError:
+        return date(d.year + years, 2, 28)
+
+
+def parse_flexible_date(s: str) -> date | None:
+    if not s:
+        return None
+    s = s.strip()
+    if len(s) == 4 and s.isdigit():
+        try:
+            return date(int(s), 1, 1)
+        except ValueError:
+            return None
+    elif len(s) == 7 and s[4] == "-":
+        try:
+            return date(int(s[:4]), int(s[5:]), 1)
+        except ValueError:
+            return None
+    else:
+        try:
+            return date.fromisoformat(s)
+        except ValueError:
+            return None
+
+
+# ── Expedientes ───────────────────────────────────────────────────────────────
+
+CAMPOS_ORIGEN_EXPEDIENTE = (
+    "fecha_auto_apertura_ind", "fecha_hechos", "fecha_apertura_investigacion",
+    "fecha_prorroga", "tiempo_prorroga", "estado_proceso",
+)
+COLUMNAS_EXPEDIENTE = (
+    "fecha_vencimiento_ind", "fecha_vencimiento_inv", "fecha_prescripcion",
+    "fecha_vencimiento_prorroga", "fecha_proximo_vencimiento",
+)
+
+
+def cerrado(exp: dict) -> bool:
+    return (exp.get("estado_proceso") or "").strip().upper() in ESTADOS_CERRADOS
+
+
+def vencimientos(exp: dict) -> dict:
+    """Fechas de vencimiento del expediente (ISO o None), tal como se persisten.
+
+    fecha_proximo_vencimiento es la más cercana de indagación, investigación y
+    prescripción — las tres que cuentan para las alertas — y queda en None si
+    el expediente está cerrado (el plazo dejó de correr).
+    """
+    # VENCIMIENTO ETAPA INDAGACIÓN = 6 meses desde FECHA DEL AUTO
+    d = safe_date(exp.get("fecha_auto_apertura_ind"))
+    fv_ind = add_months(d, 6).isoformat() if d else None
+
+    # PRESCRIPCION = 5 años desde FECHA DE LOS HECHOS
+    d_hechos = parse_flexible_date(exp.get("fecha_hechos") or "")
+    fv_presc = add_years(d_hechos, 5).isoformat() if d_hechos else None
+
+    # VENCIMIENTO ETAPA INVESTIGACIÓN = 6 meses desde FECHA APERTURA INVESTIGACION
+    d = safe_date(exp.get("fecha_apertura_investigacion"))
+    fv_inv = add_months(d, 6).isoformat() if d else None
+
+    # VENCIMIENTO PRORROGA = FECHA DE PRORROGA + TIEMPO PRORROGA meses
+    fv_prorr = None
+    d_prorr = safe_date(exp.get("fecha_prorroga"))
+    if d_prorr and exp.get("tiempo_prorroga"):
+        try:
+            fv_prorr = add_months(d_prorr, int(exp["tiempo_prorroga"])).isoformat()
+        except (ValueError, TypeError):
+            pass
+
+    proximo = None
+    if not cerrado(exp):
+        proximo = min((f for f in (fv_ind, fv_inv, fv_presc) if f), default=None)
+
+    return {
+        "fecha_vencimiento_ind": fv_ind,
+        "fecha_vencimiento_inv": fv_inv,
+        "fecha_prescripcion": fv_presc,
+        "fecha_vencimiento_prorroga": fv_prorr,
+        "fecha_proximo_vencimiento": proximo,
+    }
+
+
+def enriquecer(exp: dict) -> dict:
+    """Agrega a la fila sus vencimientos y la alerta de cada uno (calcular_alerta)."""
+    exp.update(vencimientos(exp))
+    exp["alerta_ind"] = calcular_alerta(exp["fecha_vencimiento_ind"])
+    exp["alerta_prescripcion"] = calcular_alerta(exp["fecha_prescripcion"])
+    exp["alerta_inv"] = calcular_alerta(exp["fecha_vencimiento_inv"])
+    exp["alerta_prorroga"] = calcular_alerta(exp["fecha_vencimiento_prorroga"])
+
+    # Si el expediente ya está cerrado, el plazo dejó de correr: no debe contar
+    # como "vencido" ni "próximo" en ninguna vista (lista, dashboard, export).
+    if cerrado(exp):
+        _cerrado_alerta = {"dias": None, "clase": "sin-plazo", "texto": "Cerrado — plazo no aplica"}
+        exp["alerta_ind"] = dict(_cerrado_alerta)
+        exp["alerta_inv"] = dict(_cerrado_alerta)
+        exp["alerta_prescripcion"] = dict(_cerrado_alerta)
+        exp["alerta_prorroga"] = dict(_cerrado_alerta)
+
+    return exp
+
+
+def actualizar_vencimientos(conn, ids: list[int] | None = None) -> int:
+    """Recalcula las columnas de vencimiento de `ids` (o de todos). No hace commit."""
+    sql = f"SELECT id, {', '.join(CAMPOS_ORIGEN_EXPEDIENTE)} FROM expedientes"
+    params: list = []
+    if ids is not None:
+        if not ids:
+            return 0
+        sql += f" WHERE id IN ({','.join('?' * len(ids))})"
+        params = list(ids)
+    filas = []
+    for r in conn.execute(sql, params).fetchall():
+        v = vencimientos(dict(r))
+        filas.append((*(v[c] for c in COLUMNAS_EXPEDIENTE), r["id"]))
+    conn.executemany(
+        f"UPDATE expedientes SET {', '.join(f'{c} = ?' for c in COLUMNAS_EXPEDIENTE)} WHERE id = ?",
+        filas,
+    )
+    return len(filas)
+
+
+# ── Correspondencia ───────────────────────────────────────────────────────────
+
+COLUMNAS_PLAZO = ("fecha_ingreso_dia", "fecha_vencimiento_plazo", "fecha_revision_plazo")
+
+
+def plazos(r: dict) -> tuple:
+    """(fecha_ingreso_dia, fecha_vencimiento_plazo, fecha_revision_plazo) de la
+    fila, con las mismas reglas que semaforo_correspondencia()."""
+    try:
+        fi = date.fromisoformat(r["fecha_ingreso"][:10])
+    except Exception:
+        return None, None, None
+    if not r.get("termino_dias"):
+        return fi.isoformat(), None, None
+    cal = get_calendario()
+    try:
+        venc = cal.sumar(fi, int(r["termino_dias"]))
+    except Exception:
+        return fi.isoformat(), None, None
+    return fi.isoformat(), venc.isoformat(), cal.restar(venc, 2).isoformat()
+
+
+def actualizar_plazos(conn, ids: list[int] | None = None) -> int:
+    """Recalcula las columnas de plazo de `ids` (o de todos). No hace commit."""
+    sql = "SELECT id, fecha_ingreso, termino_dias FROM correspondencia"
+    params: list = []
+    if ids is not None:
+        if not ids:
+            return 0
+        sql += f" WHERE id IN ({','.join('?' * len(ids))})"
+        params = list(ids)
+    filas = [(*plazos(dict(r)), r["id"]) for r in conn.execute(sql, params).fetchall()]
+    conn.executemany(
+        f"UPDATE correspondencia SET {', '.join(f'{c} = ?' for c in COLUMNAS_PLAZO)} WHERE id = ?",
+        filas,
+    )
+    return len(filas)
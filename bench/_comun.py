@@ -0,0 +1,141 @@
+"""
+Utilidades compartidas por los benchmarks de bench/.
+
+Todos trabajan sobre una base temporal (nunca data/ocdi.db): se apunta
+app.database.DB_PATH a un archivo nuevo, se corre init_db() y se siembran
+filas sintéticas. Correr desde la raíz del proyecto:
+
+    python -m bench.bench_listas --filas 5000
+"""
+import logging
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+
+def preparar_bd(ruta: Path | None = None) -> Path:
+    """Apunta la app a una BD temporal inicializada. Devuelve la ruta."""
+    from app import database
+
+    if ruta is None:
+        ruta = Path(tempfile.mkdtemp(prefix="ocdi_bench_")) / "bench.db"
+    database.cerrar_pool()
+    database.DB_PATH = ruta
+    database.init_db()
+    return ruta
+
+
+def sembrar_expedientes(n: int):
+    """Inserta n expedientes sintéticos con fechas de vencimiento variadas."""
+    from app.database import get_db
+    from app.vencimientos import actualizar_vencimientos
+
+    conn = get_db()
+    conn.executemany(
+        """INSERT INTO expedientes
+           (n_expediente, anio, nombre_investigado, abogado_asignado, n_radicado,
+            fecha_auto_apertura_ind, fecha_hechos, estado_proceso, etapa_actual)
+           VALUES (?,?,?,?,?,?,?,?,?)""",
+        [
+            (
+                str(i % 900 + 1), 2000 + i // 900, f"INVESTIGADO {i}", f"ABOGADO {i % 7}",
+                f"2026ER{i:07d}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                f"2022-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+                "ACTIVO" if i % 5 else "ARCHIVADO", "INDAGACION PREVIA",
+            )
+            for i in range(n)
+        ],
+    )
+    actualizar_vencimientos(conn)
+    conn.commit()
+    conn.close()
+
+
+def sembrar_casos(n: int, papelera: float = 0.1):
+    """n filas sintéticas en correspondencia, sdqs, exp_digitales y control de
+    autos; una fracción `papelera` queda con eliminado_en."""
+    from app.database import get_db
+    from app.vencimientos import actualizar_plazos
+
+    meses = ["ENERO", "FEBRERO", "MARZO", "ABRIL", "MAYO", "JUNIO", "JULIO",
+             "AGOSTO", "SEPTIEMBRE", "OCTUBRE", "NOVIEMBRE", "DICIEMBRE"]
+    cada = max(1, round(1 / papelera)) if papelera else 0
+
+    def borrado(i):
+        return "2026-01-01 00:00:00" if cada and i % cada == 0 else None
+
+    conn = get_db()
+    conn.executemany(
+        """INSERT INTO correspondencia
+           (anio, mes, fecha_ingreso, n_radicado, responsable, asunto, termino_dias, eliminado_en)
+           VALUES (?,?,?,?,?,?,?,?)""",
+        [
+            (2020 + i % 6, meses[i % 12], f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+             f"2026ER{i:07d}", f"ABOGADO {i % 7}", f"ASUNTO {i}", 10 + i % 20, borrado(i))
+            for i in range(n)
+        ],
+    )
+    conn.executemany(
+        """INSERT INTO sdqs
+           (mes, fecha_asignacion, sdqs, quejoso, tema, responsable, fecha_vencimiento, eliminado_en)
+           VALUES (?,?,?,?,?,?,?,?)""",
+        [
+            (meses[i % 12], f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", f"{i}-2025", f"QUEJOSO {i}",
+             "TEMA", f"ABOGADO {i % 7}", f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", borrado(i))
+            for i in range(n)
+        ],
+    )
+    conn.executemany(
+        "INSERT INTO exp_digitales (n_expediente, anio, abogado, etapa, eliminado_en) VALUES (?,?,?,?,?)",
+        [(str(i % 900 + 1), 2000 + i // 900, f"ABOGADO {i % 7}", "INDAGACION PREVIA", borrado(i)) for i in range(n)],
+    )
+    conn.executemany(
+        """INSERT INTO control_autos_sustanciacion
+           (expediente, numero_auto, fecha_auto, asunto_auto, abogado_responsable, eliminado_en)
+           VALUES (?,?,?,?,?,?)""",
+        [
+            (f"{i % 900 + 1}-{2000 + i // 900}", f"A-{i}", f"{2020 + i % 6}-{i % 12 + 1:02d}-{i % 28 + 1:02d}",
+             "AUTO DE PRUEBAS", f"ABOGADO {i % 7}", borrado(i))
+            for i in range(n)
+        ],
+    )
+    actualizar_plazos(conn)
+    conn.commit()
+    conn.close()
+
+
+def cliente_admin():
+    """TestClient con sesión de admin ya creada."""
+    from fastapi.testclient import TestClient
+    from app.auth_utils import new_token
+    from app.database import get_db
+    from app.main import app
+
+    conn = get_db()
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol = 'admin' LIMIT 1").fetchone()[0]
+    token = new_token()
+    conn.execute("INSERT INTO sesiones (token, user_id) VALUES (?,?)", (token, uid))
+    conn.commit()
+    conn.close()
+    logging.getLogger("httpx").setLevel(logging.WARNING)  # pdf2docx activa logging INFO global
+    c = TestClient(app)
+    c.cookies.set("ocdi_session", token)
+    return c
+
+
+def medir(fn, repeticiones: int) -> dict:
+    """Ejecuta fn() `repeticiones` veces y devuelve latencias (ms) y req/s."""
+    tiempos = []
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) * 1000)
+    total = time.perf_counter() - inicio
+    tiempos.sort()
+    return {
+        "p50_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[int(len(tiempos) * 0.95) - 1], 2),
+        "req_s": round(repeticiones / total, 1),
+    }
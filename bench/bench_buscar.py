@@ -0,0 +1,61 @@
+"""
+Benchmark de la búsqueda global: LIKE '%q%' de antes contra los índices FTS5.
+
+    python -m bench.bench_buscar --filas 100000 --repeticiones 20
+
+Siembra `--filas` registros por módulo y mide, para cada texto, las cuatro
+consultas LIKE que corría /buscar y la ruta /buscar actual (FTS5 + bm25);
+después, el autocompletar /buscar/sugerencias para prefijos de número.
+"""
+import argparse
+
+from bench._comun import cliente_admin, medir, preparar_bd, sembrar_casos, sembrar_expedientes
+
+TEXTOS = ["investigado 4242", "abogado", "2026ER00123", "quejoso 99"]
+PREFIJOS = ["20", "2026ER000", "2026er0012345", "77", "999"]
+
+# Las cuatro consultas de /buscar antes de FTS5
+_LIKE = [
+    """SELECT id, n_expediente, anio, nombre_investigado, quejoso, etapa_actual FROM expedientes
+       WHERE eliminado_en IS NULL AND (n_expediente LIKE ? OR nombre_investigado LIKE ? OR quejoso LIKE ?)
+       ORDER BY id DESC LIMIT 20""",
+    """SELECT id, sdqs, quejoso, tema, mes FROM sdqs
+       WHERE eliminado_en IS NULL AND (sdqs LIKE ? OR quejoso LIKE ?) ORDER BY id DESC LIMIT 20""",
+    """SELECT id, n_radicado, origen, asunto, anio FROM correspondencia
+       WHERE eliminado_en IS NULL AND (n_radicado LIKE ? OR origen LIKE ?) ORDER BY id DESC LIMIT 20""",
+    """SELECT id, n_expediente, anio, abogado, etapa FROM exp_digitales
+       WHERE eliminado_en IS NULL AND n_expediente LIKE ? ORDER BY id DESC LIMIT 20""",
+]
+
+
+def _buscar_like(conn, q: str):
+    like = f"%{q}%"
+    for sql in _LIKE:
+        conn.execute(sql, (like,) * sql.count("?")).fetchall()
+
+
+def main():
+    from app.database import get_db
+
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=100000)
+    ap.add_argument("--repeticiones", type=int, default=20)
+    args = ap.parse_args()
+
+    preparar_bd()
+    sembrar_expedientes(args.filas)
+    sembrar_casos(args.filas)
+    conn = get_db()
+    with cliente_admin() as c:
+        for q in TEXTOS:
+            antes = medir(lambda: _buscar_like(conn, q), args.repeticiones)
+            ahora = medir(lambda: c.get("/buscar", params={"q": q}), args.repeticiones)
+            print(f"{q!r:22} LIKE p50 {antes['p50_ms']:>8} ms   /buscar (FTS5) p50 {ahora['p50_ms']:>8} ms")
+        for p in PREFIJOS:
+            r = medir(lambda: c.get("/buscar/sugerencias", params={"q": p}), args.repeticiones)
+            print(f"sugerencias {p!r:16} p50 {r['p50_ms']:>8} ms   p95 {r['p95_ms']:>8} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
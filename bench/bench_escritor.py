@@ -0,0 +1,80 @@
+"""
+Benchmark de escrituras concurrentes: commit por conexión vs escritor único.
+
+    python -m bench.bench_escritor --usuarios 20 --escrituras 200
+
+Simula N usuarios (hilos) que registran actividad en logs_actividad, la
+escritura pequeña más frecuente de la app. "directo" es el esquema anterior
+(cada escritura hace su propio commit en su conexión); "escritor" encola en
+app.escritor y agrupa las tareas simultáneas en un solo commit.
+"""
+import argparse
+import sqlite3
+import threading
+import time
+
+from app import database
+from app.auth_utils import _insertar_log
+from app.escritor import cerrar_escritor, get_escritor
+from bench._comun import preparar_bd
+
+
+def _valores(i, j):
+    return (1, f"USUARIO {i}", "secretario", "editar", "expedientes", f"registro {j}", "127.0.0.1", j)
+
+
+def _directo(i, n, errores):
+    for j in range(n):
+        conn = database.get_db()
+        try:
+            _insertar_log(conn, _valores(i, j))
+            conn.commit()
+        except sqlite3.OperationalError:
+            errores.append(1)
+        finally:
+            conn.close()
+
+
+def _escritor(i, n, errores):
+    esc = get_escritor()
+    for j in range(n):
+        try:
+            esc.ejecutar(_insertar_log, _valores(i, j))
+        except sqlite3.OperationalError:
+            errores.append(1)
+
+
+def correr(modo, usuarios: int, escrituras: int) -> dict:
+    preparar_bd()
+    errores: list = []
+    fn = _directo if modo == "directo" else _escritor
+    hilos = [threading.Thread(target=fn, args=(i, escrituras, errores)) for i in range(usuarios)]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    total = time.perf_counter() - inicio
+    res = {"escrituras_s": round(usuarios * escrituras / total, 1), "errores": len(errores)}
+    if modo == "escritor":
+        esc = get_escritor()
+        res["tareas_por_commit"] = round(esc.tareas / max(esc.lotes, 1), 1)
+        cerrar_escritor()
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--usuarios", type=int, default=20)
+    ap.add_argument("--escrituras", type=int, default=200, help="escrituras por usuario")
+    args = ap.parse_args()
+
+    for modo in ("directo", "escritor"):
+        r = correr(modo, args.usuarios, args.escrituras)
+        extra = f"   {r['tareas_por_commit']} tareas/commit" if "tareas_por_commit" in r else ""
+        print(f"{modo:10} {r['escrituras_s']:>9} escrituras/s   errores {r['errores']}{extra}")
+    database.cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
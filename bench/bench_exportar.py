@@ -0,0 +1,113 @@
+"""
+Benchmark de las exportaciones a Excel: pico de memoria (RSS) y tiempos.
+
+    python -m bench.bench_exportar --filas 100000
+
+Siembra `--filas` registros por tabla y descarga cada ruta en un proceso
+nuevo (el pico de RSS de un proceso no baja, así que cada medición necesita
+el suyo). Compara el motor en streaming (app/excel.py) con la forma de
+antes, emulada sobre las mismas hojas: todas las filas en memoria, un
+openpyxl.Workbook() normal y el archivo completo en un BytesIO antes de
+responder (sin estilos, así que su tiempo es un piso). Muestra el RSS que
+suma la descarga sobre el de la app ya cargada y el tiempo total (el
+TestClient junta el cuerpo entero antes de devolverlo, así que el tiempo
+hasta el primer byte no se puede medir desde aquí).
+"""
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench._comun import cliente_admin, preparar_bd, sembrar_casos, sembrar_expedientes
+
+RUTAS = [
+    "/exportar-filtrado/descargar",
+    "/correspondencia/exportar",
+    "/sdqs/exportar",
+    "/control-autos/exportar",
+    "/digitales/exportar",
+    "/backup/zip",
+]
+
+
+def _rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB en Linux
+
+
+def _escribir_en_memoria(hojas, destino, conn):
+    """Exportación de antes: fetchall(), libro normal y BytesIO completo."""
+    import openpyxl
+
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for hoja in hojas:
+        ws = wb.create_sheet(hoja.titulo)
+        ws.append([c.titulo for c in hoja.columnas])
+        for fila in list(hoja.filas(conn)):
+            ws.append([c.valor(fila) for c in hoja.columnas])
+    buf = io.BytesIO()
+    wb.save(buf)
+    destino.write(buf.getvalue())
+
+
+def _medir_en_proceso(ruta: str, bd: Path, modo: str) -> dict:
+    """Descarga `ruta` una vez en este proceso; corre en el proceso hijo."""
+    from app import database, excel
+
+    database.cerrar_pool()
+    database.DB_PATH = bd
+    if modo == "memoria":
+        excel.escribir_xlsx = _escribir_en_memoria
+    cliente = cliente_admin()
+    cliente.get("/expedientes")  # carga plantillas y cachés antes de la línea base
+    base = _rss_mb()
+
+    t0 = time.perf_counter()
+    r = cliente.get(ruta)
+    assert r.status_code == 200, (ruta, r.status_code)
+    return {
+        "rss_mb": round(_rss_mb() - base, 1),
+        "total_ms": round((time.perf_counter() - t0) * 1000),
+        "kb": len(r.content) // 1024,
+    }
+
+
+def _medir(ruta: str, bd: Path, modo: str) -> dict:
+    salida = subprocess.run(
+        [sys.executable, "-m", "bench.bench_exportar", "--hijo", ruta, "--bd", str(bd), "--modo", modo],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=100000)
+    ap.add_argument("--rutas", nargs="*", default=RUTAS)
+    ap.add_argument("--sin-comparar", action="store_true", help="solo el motor en streaming")
+    ap.add_argument("--hijo", help=argparse.SUPPRESS)
+    ap.add_argument("--bd", type=Path, help=argparse.SUPPRESS)
+    ap.add_argument("--modo", default="streaming", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.hijo:
+        print(json.dumps(_medir_en_proceso(args.hijo, args.bd, args.modo)))
+        return
+
+    bd = preparar_bd()
+    sembrar_expedientes(args.filas)
+    sembrar_casos(args.filas)
+
+    modos = ["streaming"] if args.sin_comparar else ["memoria", "streaming"]
+    for ruta in args.rutas:
+        for modo in modos:
+            m = _medir(ruta, bd, modo)
+            print(f"{ruta:30} {modo:10} RSS +{m['rss_mb']:>7} MB   total {m['total_ms']:>7} ms   {m['kb']:>7} KB")
+
+
+if __name__ == "__main__":
+    main()
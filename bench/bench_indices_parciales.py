@@ -0,0 +1,106 @@
+"""
+Benchmark de los índices parciales de la papelera (migración 10).
+
+    python -m bench.bench_indices_parciales --filas 100000 --repeticiones 20
+
+Siembra `--filas` filas por tabla (10 % en papelera) y mide las consultas de
+las listas (lista_expedientes, correspondencia.lista, sdqs.lista,
+digitales.lista, ca_lista) con los índices actuales y con los de antes: el
+índice simple sobre eliminado_en y sin índices parciales.
+"""
+import argparse
+import re
+
+from bench._comun import medir, preparar_bd, sembrar_casos, sembrar_expedientes
+
+# (nombre, sql) — mismas formas que arman los handlers
+CONSULTAS = [
+    ("expedientes: página 1",
+     "SELECT * FROM expedientes WHERE eliminado_en IS NULL ORDER BY n_num DESC LIMIT 50 OFFSET 0"),
+    ("expedientes: total",
+     "SELECT COUNT(*) FROM expedientes WHERE eliminado_en IS NULL"),
+    ("expedientes: año",
+     "SELECT * FROM expedientes WHERE eliminado_en IS NULL AND anio = 2050 ORDER BY n_num DESC LIMIT 50 OFFSET 0"),
+    ("expedientes: años (filtro)",
+     "SELECT DISTINCT anio FROM expedientes WHERE anio IS NOT NULL AND eliminado_en IS NULL ORDER BY anio DESC"),
+    ("correspondencia: responsable",
+     """SELECT c.*, (SELECT GROUP_CONCAT(rs.radicado, ' | ') FROM correspondencia_radicados_salida rs
+                     WHERE rs.correspondencia_id = c.id) AS radicados_salida
+        FROM correspondencia c WHERE c.eliminado_en IS NULL AND c.responsable = 'ABOGADO 3'
+        ORDER BY c.fecha_ingreso DESC"""),
+    ("correspondencia: año y mes",
+     """SELECT c.* FROM correspondencia c
+        WHERE c.eliminado_en IS NULL AND c.anio = 2024 AND c.mes = 'MAYO' ORDER BY c.fecha_ingreso DESC"""),
+    ("sdqs: responsable",
+     "SELECT * FROM sdqs WHERE eliminado_en IS NULL AND responsable_norm = 'abogado 3' ORDER BY id DESC"),
+    ("sdqs: mes",
+     "SELECT * FROM sdqs WHERE eliminado_en IS NULL AND mes_norm = 'marzo' ORDER BY id DESC"),
+    ("digitales: página 1",
+     """SELECT e.* FROM exp_digitales e WHERE e.eliminado_en IS NULL
+        ORDER BY e.anio DESC, e.n_num ASC, e.n_expediente ASC LIMIT 20 OFFSET 0"""),
+    ("digitales: abogado",
+     """SELECT e.* FROM exp_digitales e WHERE e.eliminado_en IS NULL AND e.abogado = 'ABOGADO 3'
+        ORDER BY e.anio DESC, e.n_num ASC, e.n_expediente ASC LIMIT 20 OFFSET 0"""),
+    ("control autos: página 1",
+     "SELECT * FROM control_autos_sustanciacion WHERE eliminado_en IS NULL ORDER BY fecha_auto DESC, id DESC LIMIT 25 OFFSET 0"),
+    ("control autos: abogado",
+     """SELECT * FROM control_autos_sustanciacion WHERE eliminado_en IS NULL AND abogado_responsable = 'ABOGADO 3'
+        ORDER BY fecha_auto DESC, id DESC LIMIT 25 OFFSET 0"""),
+]
+
+INDICES_ANTERIORES = """
+CREATE INDEX IF NOT EXISTS ix_expedientes_eliminado_en ON expedientes(eliminado_en);
+CREATE INDEX IF NOT EXISTS ix_sdqs_eliminado_en ON sdqs(eliminado_en);
+CREATE INDEX IF NOT EXISTS ix_correspondencia_eliminado_en ON correspondencia(eliminado_en);
+CREATE INDEX IF NOT EXISTS ix_exp_digitales_eliminado_en ON exp_digitales(eliminado_en);
+CREATE INDEX IF NOT EXISTS ix_control_autos_eliminado_en ON control_autos_sustanciacion(eliminado_en);
+"""
+
+
+def volver_a_indices_anteriores(conn):
+    from app.database import INDICES_PARCIALES
+
+    # los de SDQS por columna normalizada (migración 20) reemplazaron a los parciales sobre UPPER(...)
+    sdqs_norm = ["ix_sdqs_act_mes_norm", "ix_sdqs_act_competencia_norm", "ix_sdqs_act_responsable_norm"]
+    for nombre in re.findall(r"CREATE INDEX IF NOT EXISTS (\w+)", INDICES_PARCIALES) + sdqs_norm:
+        conn.execute(f"DROP INDEX IF EXISTS {nombre}")
+    conn.executescript(INDICES_ANTERIORES)
+
+
+def medir_consultas(conn, repeticiones: int) -> dict[str, float]:
+    resultados = {}
+    for nombre, sql in CONSULTAS:
+        conn.execute(sql).fetchall()  # calentamiento
+        resultados[nombre] = medir(lambda: conn.execute(sql).fetchall(), repeticiones)["p50_ms"]
+    return resultados
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=100_000)
+    ap.add_argument("--repeticiones", type=int, default=20)
+    args = ap.parse_args()
+
+    from app.database import get_db
+
+    preparar_bd()
+    sembrar_expedientes(args.filas)
+    sembrar_casos(args.filas)
+    conn = get_db()
+    conn.execute("UPDATE expedientes SET eliminado_en = '2026-01-01 00:00:00' WHERE id % 10 = 0")
+    conn.commit()
+
+    despues = medir_consultas(conn, args.repeticiones)
+    volver_a_indices_anteriores(conn)
+    antes = medir_consultas(conn, args.repeticiones)
+    conn.close()
+
+    print(f"{args.filas} filas por tabla, p50 en ms")
+    print(f"{'consulta':32} {'antes':>10} {'parciales':>10} {'x':>7}")
+    for nombre, _sql in CONSULTAS:
+        a, d = antes[nombre], despues[nombre]
+        print(f"{nombre:32} {a:>10} {d:>10} {a / d if d else 0:>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
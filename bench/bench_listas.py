@@ -0,0 +1,39 @@
+"""
+Benchmark de las páginas de lista: req/s y latencia por ruta.
+
+    python -m bench.bench_listas --filas 5000 --repeticiones 50
+
+Sirve para comparar antes/después de cambios en la capa de datos (pool de
+conexiones, índices, etc.) sobre el mismo volumen sembrado.
+"""
+import argparse
+
+from bench._comun import cliente_admin, medir, preparar_bd, sembrar_expedientes
+
+RUTAS = [
+    "/expedientes",
+    "/correspondencia/",
+    "/sdqs/",
+    "/digitales/",
+    "/control-autos/",
+    "/dashboard",
+]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=5000)
+    ap.add_argument("--repeticiones", type=int, default=50)
+    args = ap.parse_args()
+
+    preparar_bd()
+    sembrar_expedientes(args.filas)
+    with cliente_admin() as c:
+        for ruta in RUTAS:
+            c.get(ruta)  # calentamiento
+            r = medir(lambda: c.get(ruta), args.repeticiones)
+            print(f"{ruta:28} {r['req_s']:>8} req/s   p50 {r['p50_ms']:>8} ms   p95 {r['p95_ms']:>8} ms")
+
+
+if __name__ == "__main__":
+    main()
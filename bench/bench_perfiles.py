@@ -0,0 +1,78 @@
+"""
+Benchmark de perfiles de rendimiento SQLite (PERFILES_BD) con cargas reales.
+
+    python -m bench.bench_perfiles --filas 5000 --repeticiones 20
+
+Para cada perfil crea una BD temporal nueva, siembra los mismos expedientes
+y mide por HTTP (TestClient): la lista de expedientes, el dashboard y la
+importación completa de "Base Expedientes" (el Excel que genera
+/backup/exportar). Reporta p50/p95 y req/s; con --concurrencia > 1 además
+lanza esa cantidad de hilos contra la lista para ver el efecto de busy_timeout.
+"""
+import argparse
+import threading
+import time
+
+from app import database
+from bench._comun import cliente_admin, medir, preparar_bd, sembrar_expedientes
+
+
+def _concurrente(c, ruta: str, hilos: int, por_hilo: int) -> dict:
+    errores = []
+
+    def trabajar():
+        for _ in range(por_hilo):
+            r = c.get(ruta)
+            if r.status_code != 200:
+                errores.append(r.status_code)
+
+    inicio = time.perf_counter()
+    ts = [threading.Thread(target=trabajar) for _ in range(hilos)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    total = time.perf_counter() - inicio
+    return {"req_s": round(hilos * por_hilo / total, 1), "errores": len(errores)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=5000)
+    ap.add_argument("--repeticiones", type=int, default=20)
+    ap.add_argument("--concurrencia", type=int, default=8)
+    ap.add_argument("--perfiles", nargs="*", default=list(database.PERFILES_BD))
+    args = ap.parse_args()
+
+    for perfil in args.perfiles:
+        database.PERFIL_BD = perfil
+        preparar_bd()
+        sembrar_expedientes(args.filas)
+        with cliente_admin() as c:
+            excel = c.get("/backup/exportar").content
+
+            def importar():
+                r = c.post(
+                    "/importar",
+                    files={"archivo": ("base.xlsx", excel)},
+                    follow_redirects=False,
+                )
+                assert r.status_code == 303, r.status_code
+
+            print(f"\n── Perfil: {perfil} {database.PERFILES_BD[perfil]}")
+            for nombre, fn, reps in (
+                ("lista /expedientes", lambda: c.get("/expedientes"), args.repeticiones),
+                ("dashboard", lambda: c.get("/dashboard"), args.repeticiones),
+                ("importar Base Expedientes", importar, max(1, args.repeticiones // 5)),
+            ):
+                fn()  # calentamiento
+                r = medir(fn, reps)
+                print(f"  {nombre:28} {r['req_s']:>8} req/s   p50 {r['p50_ms']:>9} ms   p95 {r['p95_ms']:>9} ms")
+            if args.concurrencia > 1:
+                r = _concurrente(c, "/expedientes", args.concurrencia, max(1, args.repeticiones // 2))
+                print(f"  {'lista x' + str(args.concurrencia) + ' hilos':28} {r['req_s']:>8} req/s   errores {r['errores']}")
+    database.cerrar_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Benchmark de los tableros: latencia recalculando y sirviendo desde la caché.
+
+    python -m bench.bench_tableros --filas 20000 --repeticiones 30
+
+"sin caché" vacía cache_estadisticas antes de cada request (equivale a
+datos recién modificados); "con caché" repite la request sin escrituras.
+Al final muestra los aciertos / fallos de la caché.
+"""
+import argparse
+
+from bench._comun import cliente_admin, medir, preparar_bd, sembrar_casos, sembrar_expedientes
+
+RUTAS = [
+    "/dashboard",
+    "/correspondencia/dashboard",
+    "/digitales/dashboard",
+    "/backup/",
+]
+
+
+def main():
+    from app.estadisticas import cache_estadisticas
+
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=20000)
+    ap.add_argument("--repeticiones", type=int, default=30)
+    args = ap.parse_args()
+
+    preparar_bd()
+    sembrar_expedientes(args.filas)
+    sembrar_casos(args.filas)
+    with cliente_admin() as c:
+        for ruta in RUTAS:
+            c.get(ruta)  # calentamiento
+
+            def sin_cache():
+                cache_estadisticas.limpiar()
+                c.get(ruta)
+
+            frio = medir(sin_cache, args.repeticiones)
+            caliente = medir(lambda: c.get(ruta), args.repeticiones)
+            print(f"{ruta:28} sin caché p50 {frio['p50_ms']:>8} ms   con caché p50 {caliente['p50_ms']:>8} ms")
+    print(f"aciertos {cache_estadisticas.aciertos}   fallos {cache_estadisticas.fallos}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark de la búsqueda por fragmento: LIKE '%q%' de antes contra los índices de trigramas.
+
+    python -m bench.bench_trigramas --filas 100000 --repeticiones 20
+
+Siembra `--filas` registros por tabla; muestra el tamaño de cada índice
+tri_* frente al de su tabla (dbstat) y mide, para cada fragmento, el
+COUNT(*) + página de cada lista con las columnas LIKE de antes y con
+filtro_subcadena().
+"""
+import argparse
+
+from bench._comun import medir, preparar_bd, sembrar_casos, sembrar_expedientes
+
+FRAGMENTOS = ["ER00123", "GADO 4", "0012345", "999"]
+
+# (clave de TRIGRAMAS, alias, orden de la página) — mismas formas que las listas
+LISTAS = [
+    ("expedientes", "", "n_num DESC LIMIT 50"),
+    ("correspondencia", "c", "c.fecha_ingreso DESC, c.id DESC LIMIT 25"),
+    ("control_autos", "", "fecha_auto DESC, id DESC LIMIT 25"),
+]
+
+
+def _consultar(conn, tabla: str, alias: str, orden: str, cond: str, params: list):
+    p = f"{alias}." if alias else ""
+    desde = f"{tabla} {alias}".strip()
+    conn.execute(f"SELECT COUNT(*) FROM {desde} WHERE {p}eliminado_en IS NULL AND {cond}", params).fetchone()
+    conn.execute(f"SELECT {p}* FROM {desde} WHERE {p}eliminado_en IS NULL AND {cond} ORDER BY {orden}",
+                 params).fetchall()
+
+
+def _mb(conn, nombre: str) -> float:
+    paginas = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = ? OR name LIKE ? || '\\_%' ESCAPE '\\'",
+                           (nombre, nombre)).fetchone()[0]
+    return round((paginas or 0) / 1024 / 1024, 1)
+
+
+def main():
+    from app.busqueda import TRIGRAMAS, filtro_subcadena, tabla_trigramas
+    from app.database import get_db
+
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--filas", type=int, default=100000)
+    ap.add_argument("--repeticiones", type=int, default=20)
+    args = ap.parse_args()
+
+    preparar_bd()
+    sembrar_expedientes(args.filas)
+    sembrar_casos(args.filas)
+    conn = get_db()
+
+    for clave, (tabla, _cols) in TRIGRAMAS.items():
+        print(f"{tabla:28} {_mb(conn, tabla):>8} MB   {tabla_trigramas(clave):20} {_mb(conn, tabla_trigramas(clave)):>8} MB")
+
+    for clave, alias, orden in LISTAS:
+        tabla, cols = TRIGRAMAS[clave]
+        p = f"{alias}." if alias else ""
+        like = "(" + " OR ".join(f"{p}{c} LIKE ?" for c in cols) + ")"
+        for q in FRAGMENTOS:
+            cond, params = filtro_subcadena(clave, q, alias=alias)
+            antes = medir(lambda: _consultar(conn, tabla, alias, orden, like, [f"%{q}%"] * len(cols)),
+                          args.repeticiones)
+            ahora = medir(lambda: _consultar(conn, tabla, alias, orden, cond, params), args.repeticiones)
+            print(f"{clave:16} {q!r:10} LIKE p50 {antes['p50_ms']:>8} ms   trigramas p50 {ahora['p50_ms']:>8} ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Fixtures compartidas para los tests que sí necesitan base de datos.
+
+`db_temporal` apunta app.database.DB_PATH a un archivo en tmp_path y corre
+init_db() sobre él — nunca se toca data/ocdi.db. `cliente` levanta la app con
+TestClient y deja una sesión de admin ya creada en la cookie ocdi_session
+(insertada directo en `sesiones`, sin pasar por PBKDF2 en cada test).
+`captura_sql` registra las sentencias que ejecutan las conexiones de la app
+(pool y escritor); pedirla ANTES de db_temporal/cliente para que las
+conexiones nuevas ya nazcan con el trace. `hoy_fijo` fija date.today() dentro
+de un módulo; `_d(n)` es la fecha ISO de hoy + n días, para armar casos.
+"""
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+
+def _d(dias: int) -> str:
+    return (date.today() + timedelta(days=dias)).isoformat()
+
+
+class CapturaSQL:
+    """Sentencias SQL ejecutadas mientras `activa`, con la ruta que las disparó."""
+
+    def __init__(self):
+        self.sentencias: dict[str, set[str]] = {}
+        self.activa = False
+        self.ruta = ""
+        self._lock = threading.Lock()
+
+    def registrar(self, sql: str):
+        if not self.activa or sql.startswith("--"):  # "--" = sentencias de triggers
+            return
+        with self._lock:
+            self.sentencias.setdefault(sql, set()).add(self.ruta)
+
+
+@pytest.fixture
+def captura_sql(monkeypatch):
+    from app import database
+
+    captura = CapturaSQL()
+    configurar = database.configurar_conexion
+
+    def configurar_con_trace(conn, perfil):
+        configurar(conn, perfil)
+        conn.set_trace_callback(captura.registrar)
+
+    monkeypatch.setattr(database, "configurar_conexion", configurar_con_trace)
+    yield captura
+
+
+@pytest.fixture
+def hoy_fijo(monkeypatch):
+    """fijar(modulo, dia): date.today() dentro de `modulo` devuelve `dia`."""
+
+    def fijar(modulo, dia: date):
+        class _Dia(date):
+            @classmethod
+            def today(cls):
+                return dia
+
+        monkeypatch.setattr(modulo, "date", _Dia)
+
+    return fijar
+
+
+@pytest.fixture
+def db_temporal(tmp_path, monkeypatch):
+    from app import database
+    from app.escritor import cerrar_escritor
+    from app.alertas import planificador
+    from app.estadisticas import cache_estadisticas
+    from app.sesiones import actividad, barredor, cache_sesiones
+
+    database.cerrar_pool()
+    monkeypatch.setattr(database, "DB_PATH", tmp_path / "ocdi_test.db")
+    database.init_db()
+    yield database.DB_PATH
+    barredor.detener()
+    planificador.detener()
+    actividad.detener()
+    cache_sesiones.limpiar()
+    cache_estadisticas.limpiar()
+    cerrar_escritor()
+    database.cerrar_pool()
+
+
+@pytest.fixture
+def cliente(db_temporal):
+    from fastapi.testclient import TestClient
+    from app.auth_utils import new_token
+    from app.database import get_db
+    from app.main import app
+
+    conn = get_db()
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol = 'admin' LIMIT 1").fetchone()[0]
+    token = new_token()
+    conn.execute("INSERT INTO sesiones (token, user_id) VALUES (?,?)", (token, uid))
+    conn.commit()
+    conn.close()
+
+    with TestClient(app) as c:
+        c.cookies.set("ocdi_session", token)
+        yield c
@@ -0,0 +1,49 @@
+"""
+last_seen de sesiones acumulado en memoria y volcado por lotes.
+
+Las requests ya no hacen UPDATE sesiones + commit: anotan la hora en
+app.sesiones.actividad y un hilo la vuelca periódicamente. El valor final en
+la base debe ser la hora de la última actividad, igual que antes.
+"""
+from app import database
+from app.sesiones import actividad, last_seen
+
+
+def _sesion(conn):
+    token = "tok-prueba"
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol='admin' LIMIT 1").fetchone()[0]
+    conn.execute(
+        "INSERT INTO sesiones (token, user_id, last_seen) VALUES (?,?,'2020-01-01 00:00:00')",
+        (token, uid),
+    )
+    conn.commit()
+    return token
+
+
+def test_registrar_no_escribe_y_vaciar_guarda_la_hora_de_actividad(db_temporal):
+    conn = database.get_db()
+    token = _sesion(conn)
+    actividad.registrar(token)
+    hora = actividad.pendiente(token)
+    guardado = conn.execute("SELECT last_seen FROM sesiones WHERE token=?", (token,)).fetchone()[0]
+    assert guardado == "2020-01-01 00:00:00"
+    assert last_seen(conn, token) == hora  # lectores ven lo pendiente
+
+    actividad.vaciar(esperar=True)
+    guardado = conn.execute("SELECT last_seen FROM sesiones WHERE token=?", (token,)).fetchone()[0]
+    assert guardado == hora
+    assert last_seen(conn, token) == hora
+    conn.close()
+
+
+def test_request_autenticada_no_escribe_en_sesiones(cliente):
+    conn = database.get_db()
+    sentencias = []
+    conn.set_trace_callback(sentencias.append)
+    conn.close()
+    try:
+        assert cliente.get("/expedientes").status_code == 200
+    finally:
+        conn.set_trace_callback(None)
+    assert not [s for s in sentencias if "UPDATE sesiones" in s]
+    assert actividad.pendiente(cliente.cookies.get("ocdi_session")) is not None
@@ -0,0 +1,150 @@
+"""
+Tabla de alertas (migración 13, app/alertas.py).
+
+La tabla debe coincidir con las funciones de cada pantalla después de cada
+escritura por los routers, y el cambio de día debe mover de estado solo las
+filas cuyo umbral quedó atrás.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app import database
+from app.alertas import MODULOS, avanzar_dia, estado_en, refrescar_alertas, verificar_alertas
+from app.vencimientos import actualizar_vencimientos
+from tests.conftest import _d
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    for tabla in MODULOS:
+        c.execute(f"DELETE FROM {tabla}")
+    exp = [
+        (_d(-200), None, None, "ACTIVO"),
+        (_d(-182), None, None, "ACTIVO"),     # seis meses: vence entre ayer y pasado mañana
+        (_d(-100), _d(-150), None, "ACTIVO"),
+        (_d(-200), None, None, "ACUMULADO"),
+        (None, None, _d(-1824), "ACTIVO"),
+    ]
+    for i, (ind, inv, hechos, estado) in enumerate(exp, start=1):
+        c.execute("""INSERT INTO expedientes (n_expediente, anio, fecha_auto_apertura_ind,
+                         fecha_apertura_investigacion, fecha_hechos, estado_proceso)
+                     VALUES (?, 2030, ?, ?, ?, ?)""", (str(i), ind, inv, hechos, estado))
+    sdqs = [
+        (_d(-10), _d(10), None), (_d(-10), _d(2), None), (_d(-2), _d(20), None),
+        (_d(-30), _d(-1), None), (None, _d(1), None), (_d(-10), _d(1), "RAD-1"),
+        (_d(-10), _d(3), "  "),
+    ]
+    for i, (fa, fv, rad) in enumerate(sdqs, start=1):
+        c.execute("""INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema, competencia_ocdi,
+                         fecha_vencimiento, rad_salida)
+                     VALUES ('ENERO', ?, ?, 'Q', 'T', 'NO', ?, ?)""", (fa or "", f"S-{i}", fv, rad))
+    corr = [
+        (_d(-3), None, None, None), (_d(-7), None, None, None), (_d(-12), None, None, None),
+        (_d(-1), 15, None, None), (_d(-20), 15, None, None), (_d(-30), 10, None, None),
+        (_d(-30), None, _d(-1), None), (_d(-30), None, None, "ANEXO EXPEDIENTE"),
+        (None, 10, None, None),
+    ]
+    for fi, termino, salida, tipo in corr:
+        c.execute("""INSERT INTO correspondencia (fecha_ingreso, termino_dias, fecha_radicado_salida,
+                         tipo_respuesta) VALUES (?, ?, ?, ?)""", (fi, termino, salida, tipo))
+    actualizar_vencimientos(c)
+    for modulo in MODULOS:
+        refrescar_alertas(c, modulo)
+    c.commit()
+    yield c
+    c.close()
+
+
+def test_tabla_coincide_con_las_pantallas(conn):
+    assert verificar_alertas(conn) == []
+    n = conn.execute("SELECT modulo, COUNT(*) FROM alertas GROUP BY modulo").fetchall()
+    assert dict(n) == {"expedientes": 5, "sdqs": 6, "correspondencia": 6}
+
+
+def test_verificar_detecta_tabla_desactualizada(conn):
+    conn.execute("UPDATE correspondencia SET fecha_radicado_salida = ? WHERE termino_dias = 10", (_d(0),))
+    diferencias = verificar_alertas(conn, modulos=("correspondencia",))
+    assert len(diferencias) == 1 and diferencias[0].startswith("correspondencia #")
+    conn.rollback()
+
+
+def test_escrituras_de_los_routers_mantienen_la_tabla(cliente, conn):
+    cid = conn.execute("SELECT id FROM correspondencia WHERE termino_dias = 10 AND fecha_ingreso IS NOT NULL").fetchone()[0]
+    r = cliente.post(f"/correspondencia/{cid}/editar", data={
+        "fecha_ingreso": _d(-30), "termino_dias": "10", "fecha_radicado_salida": _d(-2),
+    }, follow_redirects=False)
+    assert r.status_code == 303
+    assert conn.execute("SELECT 1 FROM alertas WHERE modulo = 'correspondencia' AND registro_id = ?", (cid,)).fetchone() is None
+
+    r = cliente.post("/correspondencia/nuevo", data={"fecha_ingreso": _d(-8)}, follow_redirects=False)
+    assert r.status_code == 303
+    sid = conn.execute("SELECT id FROM sdqs WHERE sdqs = 'S-1'").fetchone()[0]
+    assert cliente.post(f"/sdqs/{sid}/eliminar", follow_redirects=False).status_code == 303
+    eid = conn.execute("SELECT id FROM expedientes WHERE n_expediente = '3'").fetchone()[0]
+    r = cliente.post(f"/expediente/{eid}/editar", data={
+        "n_expediente": "3", "anio": "2030", "fecha_auto_apertura_ind": _d(-10), "estado_proceso": "ACTIVO",
+    }, follow_redirects=False)
+    assert r.status_code == 303
+
+    assert verificar_alertas(conn) == []
+    assert conn.execute("SELECT 1 FROM alertas WHERE modulo = 'sdqs' AND registro_id = ?", (sid,)).fetchone() is None
+
+
+def test_banner_del_portal_lee_fechas_de_aviso(conn):
+    from app.routers.portal import _contar_vencimientos_proximos
+
+    # expedientes 1, 2 y 5; SDQS 2, 4 y 5 (el de rad_salida en blanco no cuenta);
+    # correspondencia: roja sin término (12 días) y los dos con término vencido
+    assert _contar_vencimientos_proximos(conn) == {
+        "expedientes": 3, "sdqs": 3, "correspondencia": 3, "total": 9,
+    }
+
+
+def test_tablero_cuenta_igual_que_enriquecer(cliente, conn):
+    from app.routers.expedientes import _enriquecer
+
+    todos = [_enriquecer(dict(r)) for r in conn.execute("SELECT * FROM expedientes WHERE eliminado_en IS NULL")]
+
+    def contar(desde, hasta):
+        return sum(1 for e in todos if any(
+            a["dias"] is not None and desde <= a["dias"] <= hasta
+            for a in (e["alerta_ind"], e["alerta_inv"], e["alerta_prescripcion"])
+        ))
+
+    r = cliente.get("/dashboard")
+    assert r.status_code == 200
+    for clave, n in (("vencidos", contar(float("-inf"), -1)), ("prox30", contar(0, 30)), ("prox60", contar(31, 60))):
+        assert f"abrirModal('{clave}',{n}," in r.text
+
+
+def test_cambio_de_dia_mueve_solo_umbrales_cruzados(conn):
+    hoy = date.today()
+    avanzar_dia(conn, hoy)
+    manana = hoy + timedelta(days=10)
+    cruzan = conn.execute(
+        """SELECT COUNT(*) FROM alertas
+           WHERE (fecha_amarilla > :h AND fecha_amarilla <= :m) OR (fecha_roja > :h AND fecha_roja <= :m)""",
+        {"h": hoy.isoformat(), "m": manana.isoformat()},
+    ).fetchone()[0]
+    assert cruzan > 0
+    assert avanzar_dia(conn, manana) == cruzan
+    for r in conn.execute("SELECT fecha_amarilla, fecha_roja, estado FROM alertas").fetchall():
+        assert r["estado"] == estado_en(r["fecha_amarilla"], r["fecha_roja"], manana)
+    # el reloj vuelve atrás: recalcula todo
+    avanzar_dia(conn, hoy)
+    for r in conn.execute("SELECT fecha_amarilla, fecha_roja, estado FROM alertas").fetchall():
+        assert r["estado"] == estado_en(r["fecha_amarilla"], r["fecha_roja"], hoy)
+    assert avanzar_dia(conn, hoy) == 0
+    conn.rollback()
+
+
+def test_alertas_no_carga_los_routers():
+    """La migración 13 importa app.alertas dentro de init_db(): no debe arrastrar handlers."""
+    import subprocess
+    import sys
+
+    codigo = "import sys, app.alertas; print(sorted(m for m in sys.modules if m.startswith('app.routers')))"
+    salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True)
+    assert salida.stdout.strip() == "[]"
@@ -0,0 +1,96 @@
+"""
+Búsqueda global con índices FTS5 (migración 18, app/busqueda.py).
+
+Los triggers deben mantener los índices iguales a las tablas después de
+crear, editar y borrar; /buscar debe encontrar sin distinguir tildes ni
+mayúsculas, por prefijo, ordenar por relevancia, descartar la papelera y
+seguir respetando puede_ver de cada módulo.
+"""
+import re
+
+import pytest
+
+from app import database
+from app.auth_utils import new_token
+from app.busqueda import INDICES, consulta_fts, reconstruir, verificar
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    for tabla, _ in INDICES.values():
+        c.execute(f"DELETE FROM {tabla}")
+    exp = [
+        ("101", "José Gómez Pérez", "MARÍA LÓPEZ"),
+        ("102", "Ana Gómez", None),
+        ("103", "Pedro Ruiz", "gomez gomez gómez"),
+        ("104", "Gomezano Díaz", None),
+    ]
+    for n, investigado, quejoso in exp:
+        c.execute("INSERT INTO expedientes (n_expediente, anio, nombre_investigado, quejoso) VALUES (?, 2025, ?, ?)",
+                  (n, investigado, quejoso))
+    c.execute("""INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema)
+                 VALUES ('ENERO', '2026-01-01', '4455-2026', 'Luz Gómez', 'T')""")
+    c.execute("INSERT INTO correspondencia (n_radicado, origen) VALUES ('2026ER0001', 'Secretaría Gómez')")
+    c.execute("INSERT INTO exp_digitales (n_expediente, anio) VALUES ('GOMEZ-77', 2026)")
+    c.commit()
+    yield c
+    c.close()
+
+
+def _ids(html: str, ruta: str) -> list[int]:
+    return list(dict.fromkeys(int(i) for i in re.findall(rf'href="{ruta}(\d+)', html)))
+
+
+def test_consulta_de_prefijos():
+    assert consulta_fts('  José "López" 2026-ER ') == '"José"* "López"* "2026"* "ER"*'
+    assert consulta_fts(" -- ") is None
+
+
+def test_triggers_mantienen_los_indices(conn):
+    assert verificar(conn) == []
+    conn.execute("UPDATE expedientes SET quejoso = 'Otro' WHERE n_expediente = '103'")
+    conn.execute("UPDATE sdqs SET tema = 'no indexado'")
+    conn.execute("DELETE FROM correspondencia")
+    conn.execute("UPDATE exp_digitales SET n_expediente = 'X-1'")
+    assert verificar(conn) == []
+    n = conn.execute("SELECT COUNT(*) FROM fts_expedientes WHERE fts_expedientes MATCH ?",
+                     (consulta_fts("gomez"),)).fetchone()[0]
+    assert n == 3      # 101, 102 y 104 (prefijo); 103 ya no
+
+    # un índice desincronizado se detecta y se repara
+    conn.execute("INSERT INTO fts_sdqs (rowid, sdqs, quejoso) VALUES (999, 'fantasma', 'x')")
+    assert [m.split(":")[0] for m in verificar(conn)] == ["sdqs"]
+    reconstruir(conn, ("sdqs",))
+    assert verificar(conn) == []
+    conn.rollback()
+
+
+def test_buscar_sin_tildes_con_relevancia_y_papelera(cliente, conn):
+    ids = dict(conn.execute("SELECT n_expediente, id FROM expedientes").fetchall())
+    r = cliente.get("/buscar", params={"q": "GOMEZ"})
+    assert r.status_code == 200
+    # 103 repite el término; 104 solo coincide por prefijo ("Gomezano")
+    encontrados = _ids(r.text, "/expediente/")
+    assert encontrados[0] == ids["103"] and set(encontrados) == {ids["101"], ids["102"], ids["103"], ids["104"]}
+    for ruta in ("/sdqs/", "/correspondencia/", "/digitales/"):
+        assert len(_ids(r.text, ruta)) == 1, ruta
+
+    assert _ids(cliente.get("/buscar", params={"q": "jose lopez"}).text, "/expediente/") == [ids["101"]]
+    assert _ids(cliente.get("/buscar", params={"q": "4455"}).text, "/sdqs/")
+
+    cliente.post(f"/expediente/{ids['101']}/eliminar", follow_redirects=False)
+    assert ids["101"] not in _ids(cliente.get("/buscar", params={"q": "gómez"}).text, "/expediente/")
+
+
+def test_buscar_respeta_puede_ver(cliente, conn):
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol = 'secretario' LIMIT 1").fetchone()[0]
+    conn.execute("""INSERT INTO permisos_modulo (user_id, modulo, puede_ver) VALUES (?, 'sdqs', 0)
+                    ON CONFLICT (user_id, modulo) DO UPDATE SET puede_ver = 0""", (uid,))
+    token = new_token()
+    conn.execute("INSERT INTO sesiones (token, user_id) VALUES (?, ?)", (token, uid))
+    conn.commit()
+    cliente.cookies.set("ocdi_session", token)
+    r = cliente.get("/buscar", params={"q": "gomez"})
+    assert r.status_code == 200
+    assert _ids(r.text, "/sdqs/") == [] and _ids(r.text, "/correspondencia/")
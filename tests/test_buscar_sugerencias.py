@@ -0,0 +1,82 @@
+"""
+Autocompletar por prefijo de número (/buscar/sugerencias, migración 19).
+
+Cada fuente debe encontrar por prefijo sin distinguir mayúsculas ni espacios
+alrededor, usando su índice; la respuesta descarta la papelera, respeta
+puede_ver y se corta al agotar el presupuesto de tiempo.
+"""
+import pytest
+
+from app import database
+from app.auth_utils import new_token
+from app.busqueda import FUENTES_PREFIJO, rango_prefijo, sugerencias
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    for tabla in ("expedientes", "sdqs", "correspondencia", "exp_digitales"):
+        c.execute(f"DELETE FROM {tabla}")
+    c.executemany(
+        "INSERT INTO expedientes (n_expediente, anio, n_radicado, cedula, eliminado_en) VALUES (?, 2025, ?, ?, ?)",
+        [("4401", "2025er0101", "79444001", None), ("4402", " 2025ER0102", None, None),
+         ("4403", "2025ER0103", None, "2026-01-01"), ("5500", None, "44019999", None)],
+    )
+    c.execute("""INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema)
+                 VALUES ('ENERO', '2026-01-01', '4401-2026', 'Q', 'T')""")
+    c.execute("INSERT INTO correspondencia (n_radicado) VALUES ('2025ER0104')")
+    c.execute("INSERT INTO exp_digitales (n_expediente, anio) VALUES ('4401-D', 2026)")
+    c.commit()
+    yield c
+    c.close()
+
+
+def test_rango_prefijo():
+    assert rango_prefijo(" 2025er ") == ("2025ER", "2025ES")
+    assert rango_prefijo("ñá") == ("ñá", "ñâ")   # como UPPER() de SQLite: solo ASCII
+    assert rango_prefijo("  ") is None
+
+
+def test_fuentes_usan_su_indice(conn):
+    for _modulo, tabla, campo, expr, _ruta in FUENTES_PREFIJO:
+        plan = " ".join(r[3] for r in conn.execute(
+            f"""EXPLAIN QUERY PLAN SELECT id, {campo} FROM {tabla}
+                WHERE {expr} >= ? AND {expr} < ? AND eliminado_en IS NULL ORDER BY {expr}, id LIMIT 5""",
+            ("A", "B"),
+        ))
+        assert "SEARCH" in plan and "USING INDEX" in plan and "TEMP B-TREE" not in plan, (tabla, campo, plan)
+
+
+def test_sugerencias_por_prefijo(conn):
+    todos = {"expedientes", "sdqs", "correspondencia", "digitales"}
+    res, completo = sugerencias(conn, "4401", todos)
+    assert completo
+    assert [(r["modulo"], r["campo"], r["valor"]) for r in res] == [
+        ("expedientes", "n_expediente", "4401"),
+        ("expedientes", "cedula", "44019999"),
+        ("sdqs", "sdqs", "4401-2026"),
+        ("digitales", "n_expediente", "4401-D"),
+    ]
+    res, _ = sugerencias(conn, "2025er01", todos)
+    assert [r["valor"] for r in res] == ["2025er0101", " 2025ER0102", "2025ER0104"]   # 0103 en papelera
+    assert res[-1]["url"].startswith("/correspondencia/")
+
+    assert len(sugerencias(conn, "4", todos, limite=2)[0]) == 2
+    assert sugerencias(conn, "4401", todos, presupuesto_ms=-1) == ([], False)
+
+
+def test_endpoint_respeta_puede_ver(cliente, conn):
+    r = cliente.get("/buscar/sugerencias", params={"q": "4"})
+    assert r.status_code == 200 and r.json()["resultados"] == []       # menos de 2 caracteres
+    assert {x["modulo"] for x in cliente.get("/buscar/sugerencias", params={"q": "4401"}).json()["resultados"]} == {
+        "expedientes", "sdqs", "digitales"}
+
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol = 'secretario' LIMIT 1").fetchone()[0]
+    conn.execute("""INSERT INTO permisos_modulo (user_id, modulo, puede_ver) VALUES (?, 'expedientes', 0)
+                    ON CONFLICT (user_id, modulo) DO UPDATE SET puede_ver = 0""", (uid,))
+    token = new_token()
+    conn.execute("INSERT INTO sesiones (token, user_id) VALUES (?, ?)", (token, uid))
+    conn.commit()
+    cliente.cookies.set("ocdi_session", token)
+    datos = cliente.get("/buscar/sugerencias", params={"q": "4401"}).json()
+    assert datos["completo"] and {x["modulo"] for x in datos["resultados"]} == {"sdqs", "digitales"}
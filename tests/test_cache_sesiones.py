@@ -0,0 +1,104 @@
+"""
+Caché de sesión y permisos con invalidación desde admin_usuarios y logout.
+
+Con la sesión en caché, autorizar una request no consulta `sesiones`,
+`usuarios` ni `permisos_modulo`; y puede_escribir/puede_importar/puede_ver
+sobre el usuario de la request leen request.state.permisos. Los cambios de
+admin (desactivar, permisos, contraseña) y el logout invalidan la entrada.
+"""
+from app import database
+from app.auth_utils import new_token
+from app.sesiones import cache_sesiones
+
+
+def _sesion_de(rol: str) -> tuple[int, str]:
+    conn = database.get_db()
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol = ? LIMIT 1", (rol,)).fetchone()[0]
+    token = new_token()
+    conn.execute("INSERT INTO sesiones (token, user_id) VALUES (?,?)", (token, uid))
+    conn.commit()
+    conn.close()
+    return uid, token
+
+
+def _sentencias_durante(fn) -> list[str]:
+    conn = database.get_db()
+    sentencias: list[str] = []
+    conn.set_trace_callback(sentencias.append)
+    conn.close()
+    try:
+        fn()
+    finally:
+        conn.set_trace_callback(None)
+    return sentencias
+
+
+def test_sesion_en_cache_no_consulta_autorizacion(cliente):
+    uid, token = _sesion_de("secretario")
+    cliente.cookies.set("ocdi_session", token)
+    cliente.get("/sala/")  # carga la caché
+    sentencias = _sentencias_durante(lambda: cliente.get("/sala/"))
+    assert not [s for s in sentencias if "FROM sesiones" in s or "permisos_modulo" in s]
+    assert cache_sesiones.aciertos >= 1
+
+
+def test_desactivar_usuario_invalida_sus_sesiones(cliente):
+    uid, token = _sesion_de("secretario")
+    admin_token = cliente.cookies.get("ocdi_session")
+
+    cliente.cookies.set("ocdi_session", token)
+    assert cliente.get("/sala/", follow_redirects=False).status_code == 200
+
+    cliente.cookies.set("ocdi_session", admin_token)
+    r = cliente.post(f"/admin/usuarios/{uid}/toggle-activo", follow_redirects=False)
+    assert r.status_code == 303
+
+    cliente.cookies.set("ocdi_session", token)
+    r = cliente.get("/sala/", follow_redirects=False)
+    assert r.status_code in (302, 307)
+    assert "/login" in r.headers["location"]
+
+
+def test_actualizar_permisos_se_ve_en_la_request_siguiente(cliente):
+    uid, token = _sesion_de("secretario")
+    admin_token = cliente.cookies.get("ocdi_session")
+
+    cliente.cookies.set("ocdi_session", token)
+    assert cliente.get("/sdqs/", follow_redirects=False).status_code == 200
+
+    # Quitar visibilidad de SDQS (el formulario sin checkbox = 0)
+    cliente.cookies.set("ocdi_session", admin_token)
+    cliente.post(f"/admin/usuarios/{uid}/permisos", data={}, follow_redirects=False)
+
+    cliente.cookies.set("ocdi_session", token)
+    r = cliente.get("/sdqs/", follow_redirects=False)
+    assert r.status_code == 303
+    assert "sin_acceso" in r.headers["location"]
+
+
+def test_logout_invalida_el_token(cliente):
+    token = cliente.cookies.get("ocdi_session")
+    cliente.get("/expedientes")
+    assert cache_sesiones.obtener(token) is not None
+    cliente.post("/logout", follow_redirects=False)
+    assert cache_sesiones.obtener(token) is None
+
+
+def test_puede_escribir_usa_los_permisos_de_la_request(db_temporal):
+    from app.auth_utils import fijar_permisos_request, liberar_permisos_request, puede_escribir, puede_ver
+
+    user = {"id": 999, "rol": "secretario"}  # sin filas en permisos_modulo
+    permisos = {"sdqs": {"puede_ver": False, "puede_escribir": True, "puede_importar": False}}
+    tok = fijar_permisos_request(user, permisos)
+    try:
+        sentencias = _sentencias_durante(lambda: (
+            puede_escribir(user, "sdqs"), puede_ver(user, "sdqs"), puede_escribir(user, "sala"),
+        ))
+        assert puede_escribir(user, "sdqs") is True
+        assert puede_ver(user, "sdqs") is False
+        assert puede_escribir(user, "sala") is False
+        assert sentencias == []
+        # Otro usuario: se consulta la base como antes
+        assert puede_escribir({"id": 1000, "rol": "secretario"}, "sdqs") is False
+    finally:
+        liberar_permisos_request(tok)
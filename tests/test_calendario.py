@@ -0,0 +1,48 @@
+"""
+Calendario de días hábiles (app/calendario.py).
+
+Sumar y restar con el índice precalculado debe dar lo mismo que avanzar día
+por día, dentro y fuera del rango de años precalculado.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app.calendario import (
+    CalendarioHabil, _restar_dia_a_dia, _sumar_dia_a_dia, es_habil, festivos_colombia, pascua,
+)
+
+
+@pytest.fixture(scope="module")
+def cal():
+    return CalendarioHabil(2024, 2026)
+
+
+def test_festivos_conocidos():
+    f = festivos_colombia(2026)
+    assert pascua(2026) == date(2026, 4, 5)
+    assert date(2026, 4, 2) in f and date(2026, 4, 3) in f    # Jueves y Viernes Santo
+    assert date(2026, 1, 12) in f                              # Reyes trasladado al lunes
+    assert date(2026, 7, 20) in f and date(2026, 12, 25) in f
+    assert not es_habil(date(2026, 5, 1)) and es_habil(date(2026, 5, 4))
+
+
+def test_sumar_y_restar_iguales_a_dia_a_dia(cal):
+    # incluye el cruce de año y días fuera del rango (2023 y 2027)
+    d = date(2023, 12, 1)
+    while d <= date(2027, 1, 31):
+        for n in (0, 1, 2, 10, 15, 30):
+            assert cal.sumar(d, n) == _sumar_dia_a_dia(d, n), (d, n)
+            assert cal.restar(d, n) == _restar_dia_a_dia(d, n), (d, n)
+        d += timedelta(days=1)
+
+
+def test_habiles_entre(cal):
+    assert cal.habiles_entre(date(2026, 3, 27), date(2026, 4, 6)) == 4   # 30, 31, 1 y 6: Semana Santa
+    assert cal.habiles_entre(date(2026, 4, 6), date(2026, 3, 27)) == -4
+    a, b = date(2023, 12, 20), date(2024, 1, 10)                          # mitad fuera del rango
+    assert cal.habiles_entre(a, b) == sum(
+        1 for i in range(1, (b - a).days + 1) if es_habil(a + timedelta(days=i))
+    )
+    inicio = date(2025, 6, 10)
+    assert cal.habiles_entre(inicio, cal.sumar(inicio, 15)) == 15
@@ -0,0 +1,91 @@
+"""
+Plazo persistido y semáforo de correspondencia en SQL (migración 14).
+
+Con fecha_ingreso_dia / fecha_vencimiento_plazo / fecha_revision_plazo al
+día, _sql_semaforo() debe clasificar cada fila igual que
+_calcular_semaforo_row(), y la Lista debe contar, filtrar y paginar en la
+base trayendo los radicados de salida solo de la página mostrada.
+"""
+import re
+from datetime import date, timedelta
+from itertools import product
+
+import pytest
+
+from app import database, semaforos
+from app.routers.correspondencia import _calcular_semaforo_row, _sql_semaforo
+from app.vencimientos import actualizar_plazos
+from tests.conftest import _d
+
+_HOY = date.today()
+
+
+_FECHAS = [None, "", "  ", "x", "2026-02-30", _d(-7).replace("-", ""), _d(-4) + " 09:15"] + [
+    _d(n) for n in (-40, -20, -12, -9, -8, -6, -5, -3, -1, 0, 2)
+]
+_TERMINOS = [None, 0, 3, 10, 15, "abc"]
+_SALIDAS = [None, "", _d(-1)]
+_TIPOS = [None, "  ", " anexo expediente ", "ANEXO AL EXPEDIENTE", "RESPUESTA"]
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    c.execute("DELETE FROM correspondencia")
+    c.executemany(
+        """INSERT INTO correspondencia (n_radicado, fecha_ingreso, termino_dias, fecha_radicado_salida,
+               tipo_respuesta) VALUES (?, ?, ?, ?, ?)""",
+        [(f"R-{i}", *fila) for i, fila in enumerate(product(_FECHAS, _TERMINOS, _SALIDAS, _TIPOS))],
+    )
+    actualizar_plazos(c)
+    c.commit()
+    yield c
+    c.close()
+
+
+@pytest.mark.parametrize("desplazamiento", [0, -3, 6])
+def test_sql_igual_a_calcular_semaforo_row(conn, hoy_fijo, desplazamiento):
+    hoy = _HOY + timedelta(days=desplazamiento)
+    hoy_fijo(semaforos, hoy)
+    expr, params = _sql_semaforo(hoy)
+    distintos = [
+        (dict(r), r["sem"]) for r in conn.execute(f"SELECT *, ({expr}) AS sem FROM correspondencia", params)
+        if _calcular_semaforo_row(dict(r))["semaforo"] != r["sem"]
+    ]
+    assert distintos == []
+    clases = {r[0] for r in conn.execute(f"SELECT DISTINCT ({expr}) FROM correspondencia", params)}
+    assert clases == {None, "respondido", "roja", "amarilla", "verde"}
+
+
+def test_editar_recalcula_el_plazo(cliente, conn):
+    rid = conn.execute("SELECT id FROM correspondencia WHERE fecha_ingreso = ? AND termino_dias IS NULL",
+                       (_d(-3),)).fetchone()[0]
+    r = cliente.post(f"/correspondencia/{rid}/editar", data={
+        "fecha_ingreso": "2026-03-18", "termino_dias": "15",
+    }, follow_redirects=False)
+    assert r.status_code == 303
+    fila = conn.execute("SELECT * FROM correspondencia WHERE id = ?", (rid,)).fetchone()
+    esperado = _calcular_semaforo_row(dict(fila))
+    assert (fila["fecha_ingreso_dia"], fila["fecha_vencimiento_plazo"], fila["fecha_revision_plazo"]) == (
+        "2026-03-18", esperado["fecha_vencimiento"], esperado["fecha_termino_respuesta"],
+    )
+
+
+def test_lista_pagina_en_sql_con_radicados_de_la_pagina(cliente, conn):
+    filas = [dict(r) for r in conn.execute(
+        "SELECT * FROM correspondencia ORDER BY fecha_ingreso DESC, id DESC"
+    )]
+    rojas = [f["id"] for f in filas if _calcular_semaforo_row(dict(f))["semaforo"] == "roja"]
+    assert len(rojas) > 50
+    conn.execute("INSERT INTO correspondencia_radicados_salida (correspondencia_id, radicado, url) VALUES (?, 'S-1', '')",
+                 (rojas[25],))
+    conn.execute("INSERT INTO correspondencia_radicados_salida (correspondencia_id, radicado, url) VALUES (?, 'S-2', 'http://x/2')",
+                 (rojas[25],))
+    conn.commit()
+
+    r = cliente.get("/correspondencia/", params={"semaforo": "roja", "page": 2})
+    assert r.status_code == 200
+    ids = list(dict.fromkeys(int(i) for i in re.findall(r'href="/correspondencia/(\d+)(?:\?|")', r.text)))
+    assert ids == rojas[25:50]
+    assert 'href="http://x/2"' in r.text and "S-1 | S-2" in r.text
+    assert f"{len(rojas)} registros" in r.text
@@ -0,0 +1,143 @@
+"""
+Resumen de comunicaciones de expedientes digitales (migración 16).
+
+exp_digitales_resumen debe coincidir con las subconsultas correlacionadas que
+calculaba antes la Lista después de insertar, editar y borrar comunicaciones y
+revisiones (incluido el borrado en cascada del expediente), y los filtros de
+alerta y los conteos del dashboard deben dar lo mismo que las consultas viejas.
+"""
+import re
+
+import pytest
+
+from app import database
+
+_VIEJO = """
+    SELECT e.id,
+        (SELECT COUNT(*) FROM exp_comunicaciones WHERE exp_digital_id = e.id) AS num_coms,
+        (SELECT COUNT(*) FROM exp_comunicaciones
+         WHERE exp_digital_id = e.id AND (fecha_respuesta IS NULL OR fecha_respuesta = '')) AS coms_sin_resp,
+        (SELECT MAX(CAST(julianday('now') - julianday(fecha_envio) AS INTEGER))
+         FROM exp_comunicaciones
+         WHERE exp_digital_id = e.id AND (fecha_respuesta IS NULL OR fecha_respuesta = '')
+         AND fecha_envio IS NOT NULL AND fecha_envio != '') AS max_dias_pendiente,
+        (SELECT MAX(fecha_revision) FROM exp_revisiones WHERE exp_digital_id = e.id) AS ultima_revision
+    FROM exp_digitales e ORDER BY e.id
+"""
+_NUEVO = """
+    SELECT e.id, COALESCE(r.num_coms, 0), COALESCE(r.coms_sin_resp, 0),
+        CAST(julianday('now') - julianday(r.envio_pendiente_min) AS INTEGER), r.ultima_revision
+    FROM exp_digitales e LEFT JOIN exp_digitales_resumen r ON r.exp_digital_id = e.id ORDER BY e.id
+"""
+_DIAS = [None, "", "x", "2026-02-30 ", 0, 7, 8, 12, 13, 14, 30, -2]
+
+
+def _fecha(d):
+    return d if d is None or isinstance(d, str) else f"date('now', '{-d} days')"
+
+
+def _comparar(conn):
+    viejo = [tuple(r) for r in conn.execute(_VIEJO)]
+    assert [tuple(r) for r in conn.execute(_NUEVO)] == viejo
+    return viejo
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    c.execute("DELETE FROM exp_digitales")
+    for i, dias in enumerate(_DIAS):
+        eid = c.execute("INSERT INTO exp_digitales (n_expediente, anio) VALUES (?, 2030)", (f"D-{i}",)).lastrowid
+        for j, otro in enumerate(_DIAS[i:i + 3]):
+            envio = _fecha(otro)
+            sql_envio = envio if envio and envio.startswith("date(") else "?"
+            c.execute(
+                f"""INSERT INTO exp_comunicaciones (exp_digital_id, radicado_comunicacion, fecha_envio, fecha_respuesta)
+                    VALUES (?, ?, {sql_envio}, ?)""",
+                (eid, f"C-{i}-{j}", *([] if sql_envio != "?" else [envio]), "2026-01-01" if j == 2 else None),
+            )
+        if i % 3 == 0:
+            c.execute("INSERT INTO exp_revisiones (exp_digital_id, fecha_revision) VALUES (?, ?)",
+                      (eid, f"2026-0{1 + i % 9}-10 08:00:00"))
+    c.execute("INSERT INTO exp_digitales (n_expediente, anio) VALUES ('vacío', 2030)")
+    c.commit()
+    yield c
+    c.close()
+
+
+def test_triggers_igual_a_subconsultas(conn):
+    viejo = _comparar(conn)
+    assert {r[3] for r in viejo} >= {None, 8, 13, 14, 30}
+
+    ids = [r[0] for r in viejo]
+    com = conn.execute("SELECT id FROM exp_comunicaciones WHERE exp_digital_id = ? ORDER BY id", (ids[9],)).fetchall()
+    conn.execute("UPDATE exp_comunicaciones SET fecha_respuesta = '' WHERE id = ?", (com[2][0],))
+    conn.execute("UPDATE exp_comunicaciones SET fecha_envio = date('now', '-40 days') WHERE id = ?", (com[0][0],))
+    conn.execute("UPDATE exp_comunicaciones SET exp_digital_id = ? WHERE id = ?", (ids[0], com[1][0]))
+    conn.execute("DELETE FROM exp_comunicaciones WHERE exp_digital_id = ?", (ids[5],))
+    conn.execute("INSERT INTO exp_revisiones (exp_digital_id) VALUES (?)", (ids[1],))
+    conn.execute("DELETE FROM exp_revisiones WHERE exp_digital_id = ?", (ids[0],))
+    conn.execute("DELETE FROM exp_digitales WHERE id = ?", (ids[3],))        # cascada
+    _comparar(conn)
+    huerfanos = conn.execute(
+        "SELECT COUNT(*) FROM exp_digitales_resumen WHERE exp_digital_id NOT IN (SELECT id FROM exp_digitales)"
+    ).fetchone()[0]
+    assert huerfanos == 0
+    assert conn.execute("SELECT 1 FROM exp_digitales_resumen WHERE exp_digital_id = ?", (ids[5],)).fetchone() is None
+    conn.rollback()
+
+
+_FILTRO_VIEJO = {
+    "roja": ">= 14",
+    "amarilla": "= 13",
+    "azul": ">= 8 AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) < 13",
+}
+
+
+@pytest.mark.parametrize("alerta", ["roja", "amarilla", "azul", "sin_respuesta"])
+def test_filtros_de_la_lista(cliente, conn, alerta):
+    if alerta == "sin_respuesta":
+        cond, params = "", {"sin_respuesta": "1"}
+    else:
+        cond = f"""AND fecha_envio IS NOT NULL AND fecha_envio != ''
+                   AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) {_FILTRO_VIEJO[alerta]}"""
+        params = {"alerta": alerta}
+    esperado = {r[0] for r in conn.execute(f"""
+        SELECT DISTINCT exp_digital_id FROM exp_comunicaciones
+        WHERE (fecha_respuesta IS NULL OR fecha_respuesta = '') {cond}""")}
+    assert esperado
+    r = cliente.get("/digitales/", params={**params, "por_pagina": 100})
+    assert r.status_code == 200
+    assert {int(i) for i in re.findall(r'href="/digitales/(\d+)\?back', r.text)} == esperado
+
+    r = cliente.get("/digitales/comunicaciones", params=params)
+    assert r.status_code == 200
+    assert {int(i) for i in re.findall(r'href="/digitales/(\d+)" style', r.text)} == esperado
+
+
+def test_dashboard_cuenta_igual(cliente, conn, monkeypatch):
+    from app.routers import digitales
+
+    capturado = {}
+
+    def _captura(nombre, ctx, *a, **k):
+        capturado.update(ctx)
+        return ""
+
+    viejo = {
+        alerta: conn.execute(f"""
+            SELECT COUNT(*) FROM exp_comunicaciones
+            WHERE (fecha_respuesta IS NULL OR fecha_respuesta = '')
+            AND fecha_envio IS NOT NULL AND fecha_envio != ''
+            AND CAST(julianday('now') - julianday(fecha_envio) AS INTEGER) {cond}""").fetchone()[0]
+        for alerta, cond in _FILTRO_VIEJO.items()
+    }
+    monkeypatch.setattr(digitales.templates, "TemplateResponse", _captura)
+    cliente.get("/digitales/dashboard")
+    assert (capturado["alerta_roja"], capturado["alerta_amarilla"], capturado["alerta_azul"]) == (
+        viejo["roja"], viejo["amarilla"], viejo["azul"],
+    )
+    assert capturado["total_coms"] == conn.execute("SELECT COUNT(*) FROM exp_comunicaciones").fetchone()[0]
+    assert capturado["sin_respuesta"] == conn.execute(
+        "SELECT COUNT(*) FROM exp_comunicaciones WHERE fecha_respuesta IS NULL OR fecha_respuesta = ''"
+    ).fetchone()[0]
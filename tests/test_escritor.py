@@ -0,0 +1,90 @@
+"""
+Escritor único con commit por lotes (app/escritor.py).
+
+Cada tarea corre en su SAVEPOINT dentro de la transacción del lote: el
+resultado (o la excepción) vuelve a quien la envió y una tarea fallida no
+arrastra a las demás del mismo lote.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from app import database
+from app.auth_utils import registrar_log
+from app.escritor import EscritorBD, get_escritor
+
+
+def _insertar_sala(conn, titulo):
+    return conn.execute(
+        "INSERT INTO sala_agenda (fecha, franja, titulo) VALUES ('2026-01-01','manana',?)", (titulo,)
+    ).lastrowid
+
+
+def _falla(conn):
+    _insertar_sala(conn, "no debe quedar")
+    raise ValueError("tarea inválida")
+
+
+def _contar(titulo=None):
+    conn = database.get_db()
+    if titulo is None:
+        n = conn.execute("SELECT COUNT(*) FROM sala_agenda").fetchone()[0]
+    else:
+        n = conn.execute("SELECT COUNT(*) FROM sala_agenda WHERE titulo=?", (titulo,)).fetchone()[0]
+    conn.close()
+    return n
+
+
+def test_ejecutar_devuelve_resultado_y_confirma(db_temporal):
+    nuevo_id = get_escritor().ejecutar(_insertar_sala, "a")
+    assert isinstance(nuevo_id, int)
+    assert _contar("a") == 1
+
+
+def test_error_de_una_tarea_vuelve_al_llamador_y_no_afecta_al_lote(db_temporal):
+    esc = EscritorBD(database.DB_PATH, database.PERFIL_BD)
+    try:
+        # Retener el hilo escritor para que las tres tareas caigan en el mismo lote
+        liberar = threading.Event()
+        bloqueo = esc.enviar(lambda conn: liberar.wait(5))
+        ok1 = esc.enviar(_insertar_sala, "ok1")
+        mala = esc.enviar(_falla)
+        ok2 = esc.enviar(_insertar_sala, "ok2")
+        liberar.set()
+        bloqueo.result(5)
+        assert ok1.result(5) and ok2.result(5)
+        with pytest.raises(ValueError, match="tarea inválida"):
+            mala.result(5)
+        assert esc.lotes <= 2  # bloqueo + (ok1, mala, ok2) agrupadas
+    finally:
+        esc.cerrar()
+    assert _contar("ok1") == 1 and _contar("ok2") == 1
+    assert _contar("no debe quedar") == 0
+
+
+def test_escrituras_concurrentes_sin_database_locked(db_temporal):
+    errores = []
+
+    def usuario(i):
+        try:
+            for j in range(10):
+                get_escritor().ejecutar(_insertar_sala, f"u{i}-{j}")
+        except sqlite3.OperationalError as e:
+            errores.append(e)
+
+    hilos = [threading.Thread(target=usuario, args=(i,)) for i in range(20)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert not errores
+    assert _contar() == 200
+
+
+def test_registrar_log_pasa_por_el_escritor(db_temporal):
+    registrar_log({"id": 1, "nombre_completo": "PRUEBA", "rol": "admin"}, "crear", "sala", "x", registro_id=9)
+    conn = database.get_db()
+    row = conn.execute("SELECT accion, registro_id FROM logs_actividad WHERE nombre_usuario='PRUEBA'").fetchone()
+    conn.close()
+    assert (row["accion"], row["registro_id"]) == ("crear", 9)
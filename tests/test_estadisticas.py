@@ -0,0 +1,123 @@
+"""
+Caché de estadísticas de los tableros (migración 17, app/estadisticas.py).
+
+Los conteos de una sola pasada deben coincidir con los GROUP BY que corría
+cada tablero; toda escritura debe subir la versión de su tabla, y el tablero
+debe servirse desde la caché hasta que cambien los datos o el día.
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app import database
+from app.estadisticas import cache_estadisticas, versiones
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    c.execute("DELETE FROM expedientes")
+    c.execute("DELETE FROM correspondencia")
+    etapas = [None, "", "INDAGACION", "INVESTIGACION", "INDAGACION"]
+    for i in range(40):
+        c.execute(
+            """INSERT INTO expedientes (n_expediente, anio, mes, etapa_actual, estado_proceso,
+                   abogado_asignado, tipologia, eliminado_en) VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            (str(i), [2024, 2025, None][i % 3], ["ENERO", "MARZO", None, "marzo"][i % 4], etapas[i % 5],
+             ["ACTIVO", None][i % 2], ["A", "B", None][i % 3], [f"T{i % 11}", None][i % 7 == 0],
+             "2026-01-01" if i % 13 == 0 else None),
+        )
+        c.execute(
+            """INSERT INTO correspondencia (n_radicado, responsable, mes, fecha_ingreso, fecha_radicado_salida)
+               VALUES (?, ?, ?, ?, ?)""",
+            (f"R-{i}", ["ANA", "LUIS", None][i % 3], ["ENERO", "FEBRERO", None, "OTRO"][i % 4],
+             (date.today() - timedelta(days=i % 15)).isoformat(), ["2026-01-02", "", None][i % 3]),
+        )
+    from app.vencimientos import actualizar_plazos
+    actualizar_plazos(c)
+    c.commit()
+    yield c
+    c.close()
+
+
+def _grupos(conn, col, extra=""):
+    return dict(conn.execute(
+        f"SELECT {col}, COUNT(*) FROM expedientes WHERE eliminado_en IS NULL {extra} GROUP BY {col}"
+    ).fetchall())
+
+
+def test_una_pasada_igual_a_los_group_by(conn):
+    from app.routers import correspondencia, dashboard
+
+    datos = dashboard._estadisticas(conn)
+    assert datos["total"] == conn.execute("SELECT COUNT(*) FROM expedientes WHERE eliminado_en IS NULL").fetchone()[0]
+    for clave, col, vacio in (("por_etapa", "etapa_actual", "Sin etapa"), ("por_estado", "estado_proceso", "Sin estado"),
+                              ("por_abogado", "abogado_asignado", "Sin asignar")):
+        esperado = {}
+        for k, n in _grupos(conn, col).items():
+            esperado[k or vacio] = esperado.get(k or vacio, 0) + n
+        obtenido = {}
+        for d in datos[clave]:
+            nombre = list(d.values())[0]
+            obtenido[nombre] = obtenido.get(nombre, 0) + d["cantidad"]
+        assert obtenido == esperado, clave
+        assert [d["cantidad"] for d in datos[clave]] == sorted((d["cantidad"] for d in datos[clave]), reverse=True)
+    assert [d["anio"] for d in datos["por_anio"]] == [2025, 2024, "Sin año"]
+    assert len(datos["por_tipologia"]) == 8
+    con_mes = _grupos(conn, "anio", "AND anio IS NOT NULL AND mes IS NOT NULL")
+    assert sum(t["cantidad"] for t in datos["tendencia"]) == sum(con_mes.values())
+
+    corr = correspondencia._estadisticas(conn)
+    viejo = {r[0]: (r[1], r[2]) for r in conn.execute("""
+        SELECT responsable, COUNT(*),
+               SUM(CASE WHEN fecha_radicado_salida IS NOT NULL AND fecha_radicado_salida != '' THEN 1 ELSE 0 END)
+        FROM correspondencia WHERE responsable IS NOT NULL AND eliminado_en IS NULL GROUP BY responsable""")}
+    assert {r["responsable"]: (r["cant"], r["respondidos"]) for r in corr["por_responsable"]} == viejo
+    assert [m["mes"] for m in corr["por_mes"]] == ["ENERO", "FEBRERO", "OTRO"]
+    assert corr["total"] == 40 and sum(corr["stats"].values()) <= 40
+
+
+def test_escrituras_suben_la_version(conn):
+    tablas = ("expedientes", "correspondencia")
+    antes = versiones(conn, tablas)
+    conn.execute("UPDATE expedientes SET abogado_asignado = 'Z' WHERE n_expediente = '1'")
+    despues = versiones(conn, tablas)
+    assert despues[0] > antes[0] and despues[1] == antes[1]
+    conn.execute("DELETE FROM correspondencia WHERE n_radicado = 'R-1'")
+    conn.execute("INSERT INTO correspondencia (n_radicado) VALUES ('R-X')")
+    assert versiones(conn, tablas)[1] >= despues[1] + 2
+    conn.rollback()
+
+
+@pytest.mark.parametrize("ruta", ["/dashboard", "/correspondencia/dashboard", "/digitales/dashboard", "/backup/"])
+def test_tablero_desde_cache_hasta_que_cambian_los_datos(cliente, conn, ruta):
+    assert cliente.get(ruta).status_code == 200
+    aciertos, fallos = cache_estadisticas.aciertos, cache_estadisticas.fallos
+    primera = cliente.get(ruta).text
+    assert (cache_estadisticas.aciertos, cache_estadisticas.fallos) == (aciertos + 1, fallos)
+
+    r = cliente.post("/correspondencia/nuevo", data={"n_radicado": "R-NUEVO", "responsable": "ANA"},
+                     follow_redirects=False)
+    assert r.status_code == 303
+    conn.execute("INSERT INTO exp_digitales (n_expediente, anio) VALUES ('D-1', 2026)")
+    conn.execute("UPDATE expedientes SET etapa_actual = 'NUEVA' WHERE n_expediente = '2'")
+    conn.commit()
+    segunda = cliente.get(ruta).text
+    assert cache_estadisticas.fallos == fallos + 1
+    assert segunda != primera
+
+
+def test_cambio_de_dia_recalcula(conn):
+    from app.routers import correspondencia
+
+    llamadas = []
+    calcular = correspondencia._estadisticas
+
+    def _contar(c):
+        llamadas.append(1)
+        return calcular(c)
+
+    hoy = date.today()
+    for dia in (hoy, hoy, hoy + timedelta(days=1)):
+        cache_estadisticas.obtener(conn, "prueba", ("correspondencia",), _contar, dia=dia)
+    assert len(llamadas) == 2
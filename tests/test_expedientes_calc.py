@@ -7,25 +7,26 @@ divergente de su Lista" se repitió 2 veces en AUDITORIA.md (H9/H10, H17).
 from datetime import date
 
 from app.database import calcular_alerta
-from app.routers.expedientes import _enriquecer, _add_months, _add_years
+from app.routers.expedientes import _enriquecer
+from app.vencimientos import add_months, add_years
 
 
 def test_enriquecer_fecha_vencimiento_indagacion_6_meses():
     exp = {"fecha_auto_apertura_ind": "2026-01-15"}
     out = _enriquecer(exp)
-    assert out["fecha_vencimiento_ind"] == _add_months(date(2026, 1, 15), 6).isoformat()
+    assert out["fecha_vencimiento_ind"] == add_months(date(2026, 1, 15), 6).isoformat()
 
 
 def test_enriquecer_fecha_vencimiento_investigacion_6_meses():
     exp = {"fecha_apertura_investigacion": "2026-01-15"}
     out = _enriquecer(exp)
-    assert out["fecha_vencimiento_inv"] == _add_months(date(2026, 1, 15), 6).isoformat()
+    assert out["fecha_vencimiento_inv"] == add_months(date(2026, 1, 15), 6).isoformat()
 
 
 def test_enriquecer_prescripcion_5_anios_desde_hechos():
     exp = {"fecha_hechos": "2026-02-20"}
     out = _enriquecer(exp)
-    assert out["fecha_prescripcion"] == _add_years(date(2026, 2, 20), 5).isoformat()
+    assert out["fecha_prescripcion"] == add_years(date(2026, 2, 20), 5).isoformat()
 
 
 def test_enriquecer_sin_fechas_no_calcula_vencimientos():
@@ -37,7 +38,7 @@ def test_enriquecer_sin_fechas_no_calcula_vencimientos():
 
 def test_add_months_respeta_fin_de_mes():
     """31 de enero + 1 mes no debe desbordar a marzo (febrero no tiene día 31)."""
-    assert _add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
+    assert add_months(date(2026, 1, 31), 1) == date(2026, 2, 28)
 
 
 def test_calcular_alerta_vencido():
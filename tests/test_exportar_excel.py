@@ -0,0 +1,206 @@
+"""
+Exportaciones a Excel en streaming (app/excel.py).
+
+Las hojas se escriben write-only desde el cursor y el archivo sale al
+cliente por partes mientras se genera. Deben conservar encabezados,
+anchos, rellenos, enlaces y celdas combinadas; un error o una descarga
+cortada no deben dejar el hilo ni los temporales vivos, y el respaldo
+completo debe poder reimportarse.
+"""
+import io
+import tempfile
+import threading
+import zipfile
+
+import openpyxl
+import pytest
+
+from app import database
+from app.excel import Columna, Hoja, escribir_xlsx, transmitir
+from app.routers.backup import _totales
+
+
+@pytest.fixture
+def datos(db_temporal):
+    c = database.get_db()
+    exp = c.execute("""INSERT INTO expedientes (n_expediente, anio, nombre_investigado, abogado_asignado)
+                       VALUES ('901', 2025, 'Investigado con un nombre bastante largo', 'ABOGADO 1')""").lastrowid
+    c.execute("""INSERT INTO seguimiento_mensual (expediente_id, anio, mes, descripcion)
+                 VALUES (?, 2025, 'MARZO', 'Auto de pruebas')""", (exp,))
+    dig = c.execute("INSERT INTO exp_digitales (n_expediente, anio, abogado) VALUES ('D-1', 2025, 'ABOGADO 1')").lastrowid
+    c.executemany("""INSERT INTO exp_comunicaciones (exp_digital_id, radicado_comunicacion, fecha_envio)
+                     VALUES (?, ?, ?)""", [(dig, "COM-1", "2025-01-01"), (dig, "COM-2", "2025-02-01")])
+    corr = c.execute("""INSERT INTO correspondencia (n_radicado, fecha_ingreso, termino_dias, responsable)
+                        VALUES ('2026ER9001', '2020-01-01', 10, 'ABOGADO 1')""").lastrowid
+    c.executemany("INSERT INTO correspondencia_radicados_salida (correspondencia_id, radicado, url) VALUES (?, ?, ?)",
+                  [(corr, "2026EE1", ""), (corr, "2026EE2", "https://rad/2")])
+    c.execute("""INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema, url_sdqs)
+                 VALUES ('ENERO', '2026-01-05', '55-2026', 'Q', 'T', 'https://sdqs/55')""")
+    c.executemany("""INSERT INTO control_autos_sustanciacion (expediente, numero_auto, fecha_auto, abogado_responsable)
+                     VALUES (?, ?, ?, 'ABOGADO 1')""", [("901", "A-1", "2024-01-20"), ("902", "A-2", "2025-03-01")])
+    c.execute("INSERT INTO bienes_muebles (id_placa, marca, descripcion_elemento) VALUES ('P-1', '  ', 'SILLA')")
+    c.commit()
+    yield c
+    c.close()
+
+
+def _libro(contenido: bytes):
+    return openpyxl.load_workbook(io.BytesIO(contenido))
+
+
+def _fila(ws, n: int) -> list:
+    return [c.value for c in ws[n]]
+
+
+# ── Motor ─────────────────────────────────────────────────────────────────────
+
+def test_transmitir_por_partes(db_temporal):
+    bloque = b"x" * 100_000
+
+    def escribir(destino, conn):
+        assert conn.in_transaction
+        for _ in range(3):
+            destino.write(bloque)
+
+    partes = list(transmitir(escribir))
+    assert len(partes) > 1 and b"".join(partes) == bloque * 3
+
+    def falla(destino, conn):
+        destino.write(b"abc")
+        raise ValueError("roto")
+
+    with pytest.raises(ValueError, match="roto"):
+        list(transmitir(falla))
+
+
+def test_descarga_cortada_detiene_el_hilo(db_temporal):
+    termino = threading.Event()
+
+    def infinito(destino, conn):
+        try:
+            while True:
+                destino.write(b"y" * 70_000)
+        finally:
+            termino.set()
+
+    partes = transmitir(infinito)
+    next(partes)
+    partes.close()
+    assert termino.wait(timeout=5)
+
+
+def test_hoja_con_estilos(datos, tmp_path):
+    enlace = "https://ejemplo/1"
+    hoja = Hoja(
+        "Prueba",
+        [
+            Columna("EXPEDIENTE", "n_expediente", formato=lambda v: f"#{v}"),
+            Columna("INVESTIGADO", "nombre_investigado", relleno=lambda f: "FF0000" if f["anio"] == 2025 else None),
+            Columna("ENLACE", lambda f: "ver", 12, enlace=lambda f: enlace),
+        ],
+        lambda conn: conn.execute("SELECT * FROM expedientes WHERE n_expediente = '901'"),
+        congelar="A3", columna_inicial=2,
+        previas=lambda ws, conn: ws.merged_cells.add("B1:D1") or [[None, "TÍTULO"]],
+        anchos_desde=("expedientes WHERE n_expediente = '901'", []),
+    )
+    ruta = tmp_path / "prueba.xlsx"
+    escribir_xlsx([hoja], ruta, datos)
+
+    ws = openpyxl.load_workbook(ruta)["Prueba"]
+    assert _fila(ws, 1)[:2] == [None, "TÍTULO"] and "B1:D1" in ws.merged_cells
+    assert _fila(ws, 2) == [None, "EXPEDIENTE", "INVESTIGADO", "ENLACE"]
+    assert _fila(ws, 3) == [None, "#901", "Investigado con un nombre bastante largo", "ver"]
+    assert ws["C3"].fill.fgColor.rgb == "00FF0000" and ws["D3"].hyperlink.target == enlace
+    assert ws.freeze_panes == "A3"
+    # ancho = texto más largo + 4 (tope 40); sin ancho para columnas calculadas
+    assert ws.column_dimensions["B"].width == len("EXPEDIENTE") + 4
+    assert ws.column_dimensions["C"].width == 40 and ws.column_dimensions["D"].width == 12
+
+
+def test_error_a_mitad_de_hoja_borra_temporales(datos, tmp_path, monkeypatch):
+    temporales = tmp_path / "temporales"
+    temporales.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(temporales))
+
+    def filas(conn):
+        yield {"a": 1}
+        raise RuntimeError("cursor roto")
+
+    with pytest.raises(RuntimeError):
+        escribir_xlsx([Hoja("A", [Columna("A", "a")], filas)], io.BytesIO(), datos)
+    assert list(temporales.iterdir()) == []
+
+
+# ── Exportaciones de los módulos ──────────────────────────────────────────────
+
+@pytest.mark.parametrize("url, hoja, fila_encabezado, encabezados", [
+    ("/sdqs/exportar", "SDQS", 1, ["MES", "FECHA ASIGNACION", "SDQS"]),
+    ("/correspondencia/exportar", "CORRESPONDENCIA", 1, ["AÑO", "MES", "FECHA INGRESO DE OFICIO"]),
+    ("/control-autos/exportar", "CONTROL AUTOS", 6, [None, "EXPEDIENTE", "NÚMERO DEL AUTO"]),
+    ("/digitales/exportar", "EXP DIGIT 2025-2026", 2, ["N° Expediente", "Año", "Abogado"]),
+    ("/exportar-filtrado/descargar", "Base Expedientes", 1, ["N. EXPEDIENTE", "AÑO", "MES"]),
+    ("/seguimiento/exportar?anio=2025", "Seguimiento 2025", 1, ["N. EXPEDIENTE", "AÑO", "ABOGADO"]),
+    ("/reportes/vencimientos", "Correspondencia", 3, ["AÑO", "MES", "FECHA INGRESO"]),
+    ("/equipos/bienes/exportar", "BIENES MUEBLES OCDI", 1, ["ID_PLACA", "NUMERO PLACA FÍSICA", "MARCA DEL ELEMENTO"]),
+])
+def test_exportaciones(cliente, datos, url, hoja, fila_encabezado, encabezados):
+    r = cliente.get(url)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/vnd.openxmlformats")
+    assert "attachment; filename=" in r.headers["content-disposition"]
+    ws = _libro(r.content)[hoja]
+    assert _fila(ws, fila_encabezado)[:3] == encabezados
+
+
+def test_contenido_de_las_exportaciones(cliente, datos):
+    ws = _libro(cliente.get("/sdqs/exportar").content)["SDQS"]
+    assert ws["C2"].value == "55-2026" and ws["C2"].hyperlink.target == "https://sdqs/55"
+
+    ws = _libro(cliente.get("/correspondencia/exportar").content)["CORRESPONDENCIA"]
+    assert ws["N2"].value == "2026EE1 | 2026EE2" and ws["N2"].hyperlink.target == "https://rad/2"
+
+    # total del resumen de filtros contado aparte; encabezado combinado
+    ws = _libro(cliente.get("/control-autos/exportar", params={"abogado": "ABOGADO 1", "anio": "2025"}).content).active
+    assert "Total exportado: 1 registro(s)" in ws["B5"].value and "B1:G1" in ws.merged_cells
+    assert _fila(ws, 7)[1:3] == ["902", "A-2"] and ws.max_row == 7
+
+    # la segunda comunicación va como sub-fila sin datos del expediente
+    ws = _libro(cliente.get("/digitales/exportar").content).active
+    filas = [r for r in ws.iter_rows(min_row=3, values_only=True) if r[0] == "D-1" or r[10] == "COM-2"]
+    assert [(f[0], f[10]) for f in filas] == [("D-1", "COM-1"), (None, "COM-2")]
+
+    ws = _libro(cliente.get("/seguimiento/exportar", params={"anio": 2025}).content).active
+    fila = next(r for r in ws.iter_rows(min_row=2, values_only=True) if r[0] == "901")
+    assert fila[4 + 2] == "Auto de pruebas" and fila[4] == "N/A"
+
+    ws = _libro(cliente.get("/reportes/vencimientos").content)["Correspondencia"]
+    assert _fila(ws, 4)[3] == "2026EE1,2026EE2"
+
+    ws = _libro(cliente.get("/equipos/bienes/exportar").content).active
+    assert _fila(ws, 2)[:3] == ["P-1", "N/A", "N/A"] and _fila(ws, 2)[6] == "SILLA"
+    assert ws.freeze_panes == "A2" and ws.column_dimensions["Q"].width == 18
+    assert ws["A1"].fill.fgColor.rgb == "001B4F8A"
+
+
+def test_backup_zip(cliente, datos):
+    r = cliente.get("/backup/zip")
+    assert r.status_code == 200 and r.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+        nombres = zf.namelist()
+        assert len(nombres) == 6
+        libros = {n.split("/")[1]: _libro(zf.read(n)) for n in nombres}
+    assert libros["01_Base_Expedientes"].sheetnames == ["Base Expedientes", "Seguimiento Mensual"]
+    assert libros["05_Expedientes_Digitales"].active["A3"].value == "D-1"
+
+
+def test_backup_exportar_se_reimporta(cliente, datos):
+    antes = _totales(datos)
+    r = cliente.get("/backup/exportar")
+    assert r.status_code == 200
+    assert _libro(r.content).sheetnames == [
+        "Base Expedientes", "Exp. Digitales", "Sala de Audiencias", "Control Autos",
+        "SDQS", "Correspondencia", "Seguimiento Mensual",
+    ]
+    r = cliente.post("/backup/importar", files={"archivo": ("respaldo.xlsx", r.content)}, follow_redirects=False)
+    assert r.status_code == 303 and "error" not in r.headers["location"]
+    assert _totales(datos) == antes
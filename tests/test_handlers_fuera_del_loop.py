@@ -0,0 +1,82 @@
+"""
+Los handlers no deben bloquear el event loop.
+
+Antes todos los handlers eran `async def` con llamadas sqlite3/openpyxl
+bloqueantes adentro: mientras un usuario generaba /backup/zip, el servidor
+entero quedaba congelado para los demás. Ahora son `def` y FastAPI los corre
+en el pool de hilos.
+
+El test retiene /backup/zip dentro de la construcción del ZIP (hasta que se
+libera un Event) y comprueba que /expedientes responde mientras tanto.
+"""
+import threading
+import time
+import types
+import zipfile
+
+from app.routers import backup
+
+
+def test_expedientes_responde_mientras_se_construye_backup_zip(cliente, monkeypatch):
+    en_zip = threading.Event()
+    liberar = threading.Event()
+
+    class _ZipRetenido(zipfile.ZipFile):
+        def __init__(self, *a, **kw):
+            en_zip.set()
+            liberar.wait(timeout=10)
+            super().__init__(*a, **kw)
+
+    monkeypatch.setattr(
+        backup, "zipfile",
+        types.SimpleNamespace(ZipFile=_ZipRetenido, ZIP_DEFLATED=zipfile.ZIP_DEFLATED),
+    )
+
+    resultado = {}
+
+    def _descargar_zip():
+        resultado["zip"] = cliente.get("/backup/zip")
+
+    hilo = threading.Thread(target=_descargar_zip)
+    hilo.start()
+    try:
+        assert en_zip.wait(timeout=10), "/backup/zip nunca llegó a construir el ZIP"
+        t0 = time.perf_counter()
+        r = cliente.get("/expedientes")
+        duracion = time.perf_counter() - t0
+    finally:
+        liberar.set()
+        hilo.join(timeout=30)
+
+    assert r.status_code == 200
+    assert duracion < 2, f"/expedientes tardó {duracion:.2f}s con /backup/zip en curso"
+    assert resultado["zip"].status_code == 200
+    assert resultado["zip"].headers["content-type"] == "application/zip"
+
+
+def test_sesion_se_carga_fuera_del_event_loop(cliente, monkeypatch):
+    """La consulta de sesión y permisos del middleware también es sqlite3
+    bloqueante: en un fallo de caché debe correr en el pool de hilos, no en
+    el hilo del loop."""
+    import asyncio
+
+    from app import auth_utils
+    from app.sesiones import cache_sesiones
+
+    cargar = auth_utils.cargar_sesion
+    en_loop = []
+
+    def _cargar_sesion(token):
+        try:
+            asyncio.get_running_loop()
+            en_loop.append(True)
+        except RuntimeError:
+            en_loop.append(False)
+        return cargar(token)
+
+    monkeypatch.setattr(auth_utils, "cargar_sesion", _cargar_sesion)
+    cache_sesiones.limpiar()
+    assert cliente.get("/expedientes").status_code == 200
+    assert cliente.get("/expedientes").status_code == 200
+
+    assert en_loop == [False]  # la segunda request sale de la caché
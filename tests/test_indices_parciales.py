@@ -0,0 +1,49 @@
+"""
+Índices parciales de la papelera (migración 10).
+
+Las listas filtran `eliminado_en IS NULL` y ordenan por su propia clave; con
+los índices parciales la página sale del índice, sin ordenar en un B-tree
+temporal, y la papelera usa su índice `IS NOT NULL`.
+"""
+import pytest
+
+from app import database
+
+
+def _plan(sql: str) -> list[str]:
+    conn = database.get_db()
+    plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    conn.close()
+    return plan
+
+
+def test_indice_simple_de_eliminado_en_reemplazado(db_temporal):
+    conn = database.get_db()
+    nombres = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    conn.close()
+    assert "ix_expedientes_eliminado_en" not in nombres
+    assert {"ix_expedientes_act_num", "ix_correspondencia_act_fecha", "ix_sdqs_act_responsable_norm",
+            "ix_exp_digitales_act_orden", "ix_control_autos_act_fecha"} <= nombres
+
+
+@pytest.mark.parametrize("sql, indice", [
+    ("SELECT * FROM expedientes WHERE eliminado_en IS NULL ORDER BY n_num DESC LIMIT 50",
+     "ix_expedientes_act_num"),
+    ("SELECT * FROM expedientes WHERE eliminado_en IS NULL AND anio = 2024 ORDER BY n_num DESC LIMIT 50",
+     "ix_expedientes_act_anio_num"),
+    ("SELECT * FROM correspondencia c WHERE c.eliminado_en IS NULL AND c.responsable = 'X' ORDER BY c.fecha_ingreso DESC",
+     "ix_correspondencia_act_resp_fecha"),
+    ("SELECT * FROM sdqs WHERE eliminado_en IS NULL AND responsable_norm = 'X' ORDER BY id DESC",
+     "ix_sdqs_act_responsable_norm"),
+    ("""SELECT e.* FROM exp_digitales e WHERE e.eliminado_en IS NULL
+        ORDER BY e.anio DESC, e.n_num ASC, e.n_expediente ASC LIMIT 20""",
+     "ix_exp_digitales_act_orden"),
+    ("SELECT * FROM control_autos_sustanciacion WHERE eliminado_en IS NULL ORDER BY fecha_auto DESC, id DESC LIMIT 25",
+     "ix_control_autos_act_fecha"),
+    ("SELECT * FROM expedientes WHERE eliminado_en IS NOT NULL ORDER BY eliminado_en DESC",
+     "ix_expedientes_papelera"),
+])
+def test_listas_usan_indice_parcial_sin_ordenar(db_temporal, sql, indice):
+    plan = _plan(sql)
+    assert any(indice in paso for paso in plan), plan
+    assert not any(paso.startswith("USE TEMP B-TREE") for paso in plan), plan
@@ -0,0 +1,58 @@
+"""
+Migraciones versionadas con PRAGMA user_version.
+
+init_db() antes re-ejecutaba SCHEMA, decenas de ALTER TABLE en try/except,
+normalizaciones y chequeos de duplicados en cada arranque. Ahora cada
+migración corre una sola vez y una base al día solo lee el pragma.
+"""
+import sqlite3
+
+from app import database
+
+
+def test_versiones_unicas_y_consecutivas():
+    versiones = [v for v, _desc, _fn in database.MIGRACIONES]
+    assert sorted(versiones) == list(range(1, len(versiones) + 1))
+
+
+def test_base_nueva_queda_en_la_ultima_version(db_temporal):
+    conn = database.get_db()
+    assert database.version_esquema(conn) == len(database.MIGRACIONES)
+    assert conn.execute("SELECT COUNT(*) FROM usuarios").fetchone()[0] > 0
+    conn.close()
+
+
+def test_arranque_sobre_base_al_dia_es_un_solo_pragma(db_temporal):
+    conn = database.get_db()
+    sentencias = []
+    conn.set_trace_callback(sentencias.append)
+    conn.close()  # vuelve al pool; init_db() la reutiliza
+    try:
+        database.init_db()
+    finally:
+        conn.set_trace_callback(None)
+    assert sentencias == ["PRAGMA user_version"]
+
+
+def test_base_previa_sin_version_se_actualiza(tmp_path, monkeypatch):
+    """Bases creadas antes del registro (user_version = 0, sin columnas de papelera)."""
+    ruta = tmp_path / "previa.db"
+    previa = sqlite3.connect(ruta)
+    previa.executescript(database.SCHEMA)
+    previa.execute("INSERT INTO expedientes (n_expediente, anio) VALUES ('7', 2024)")
+    previa.commit()
+    previa.close()
+
+    database.cerrar_pool()
+    monkeypatch.setattr(database, "DB_PATH", ruta)
+    try:
+        database.init_db()
+        conn = database.get_db()
+        cols = {r[1] for r in conn.execute("PRAGMA table_info(expedientes)")}
+        assert "eliminado_en" in cols
+        assert database.version_esquema(conn) == len(database.MIGRACIONES)
+        # Con datos existentes no se siembran expedientes demo
+        assert conn.execute("SELECT COUNT(*) FROM expedientes").fetchone()[0] == 1
+        conn.close()
+    finally:
+        database.cerrar_pool()
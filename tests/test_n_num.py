@@ -0,0 +1,46 @@
+"""
+n_num: número de expediente como entero indexado (migración 11).
+
+La columna generada sigue a n_expediente en inserts y updates; el siguiente
+número y la verificación de expedientes en control de autos son búsquedas
+por índice, sin CAST fila por fila.
+"""
+from app import database
+from app.routers.control_autos import _expediente_reconocido
+from app.routers.expedientes import _next_n_expediente
+
+
+def _plan(conn, sql: str, params=()) -> list[str]:
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+def test_n_num_sigue_a_n_expediente(db_temporal):
+    conn = database.get_db()
+    exp_id = conn.execute("INSERT INTO expedientes (n_expediente, anio) VALUES ('007', 2031)").lastrowid
+    assert conn.execute("SELECT n_num FROM expedientes WHERE id = ?", (exp_id,)).fetchone()[0] == 7
+    conn.execute("UPDATE expedientes SET n_expediente = '12-2031' WHERE id = ?", (exp_id,))
+    assert conn.execute("SELECT n_num FROM expedientes WHERE id = ?", (exp_id,)).fetchone()[0] == 12
+    conn.rollback()
+    conn.close()
+
+
+def test_siguiente_numero_es_busqueda_por_indice(db_temporal):
+    conn = database.get_db()
+    conn.execute("INSERT INTO expedientes (n_expediente, anio) VALUES ('950', 2031)")
+    assert _next_n_expediente(conn) == "951"
+    plan = _plan(conn, "SELECT MAX(n_num) FROM expedientes")
+    conn.rollback()
+    conn.close()
+    assert plan == ["SEARCH expedientes USING INDEX ix_expedientes_n_num"]
+
+
+def test_expediente_reconocido_por_anio_y_numero(db_temporal):
+    conn = database.get_db()
+    conn.execute("INSERT INTO expedientes (n_expediente, anio) VALUES ('045', 2031)")
+    assert _expediente_reconocido(conn, "45-2031") is True
+    assert _expediente_reconocido(conn, "46-2031") is False
+    assert _expediente_reconocido(conn, "N/A") is None
+    plan = _plan(conn, "SELECT 1 FROM expedientes WHERE n_num = ? AND anio = ? AND eliminado_en IS NULL", (45, 2031))
+    conn.rollback()
+    conn.close()
+    assert plan == ["SEARCH expedientes USING INDEX ix_expedientes_act_anio_num (anio=? AND n_num=?)"]
@@ -0,0 +1,38 @@
+"""
+Perfil de rendimiento SQLite aplicado a cada conexión del pool.
+
+Sin busy_timeout explícito un segundo escritor fallaba con "database is
+locked"; los PRAGMAs del perfil se aplican una vez, al crear la conexión.
+"""
+import pytest
+
+from app import database
+
+
+def test_conexiones_del_pool_traen_el_perfil(db_temporal):
+    perfil = database.PERFILES_BD[database.PERFIL_BD]
+    conn = database.get_db()
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == perfil["busy_timeout"]
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == perfil["cache_size"]
+    conn.close()
+
+
+def test_cambiar_perfil_recrea_el_pool(db_temporal, monkeypatch):
+    monkeypatch.setattr(database, "PERFIL_BD", "seguro")
+    conn = database.get_db()
+    assert database.get_pool().perfil == "seguro"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 2  # FULL
+    conn.close()
+
+
+def test_perfil_desconocido_falla_con_mensaje_claro(db_temporal):
+    conn = database.get_db()
+    with pytest.raises(ValueError, match="Perfil de BD desconocido"):
+        database.aplicar_perfil(conn, "turbo")
+    conn.close()
+
+
+def test_ningun_perfil_desactiva_fsync():
+    """synchronous=OFF puede perder transacciones confirmadas ante un corte de luz."""
+    for nombre, perfil in database.PERFILES_BD.items():
+        assert perfil["synchronous"] in ("NORMAL", "FULL"), nombre
@@ -0,0 +1,303 @@
+"""
+Auditoría de planes de consulta sobre las rutas GET de la app.
+
+Las consultas de los routers se arman con f-strings y varias envuelven
+columnas en expresiones (CAST(n_expediente AS INTEGER), UPPER(TRIM(...)),
+UPPER(mes)) que impiden usar los índices de INDEXES. Este test recorre todas
+las rutas GET (sin parámetros y con cada filtro de su firma), captura cada
+sentencia con `captura_sql` y le corre EXPLAIN QUERY PLAN:
+
+- un SCAN sobre expedientes, correspondencia, sdqs o logs_actividad que no
+  esté en planes_scan_permitidos.txt hace fallar el test. Cuenta también
+  como SCAN el SEARCH cuya única restricción es `eliminado_en=?`: casi todas
+  las filas tienen eliminado_en NULL, así que recorre la tabla entera. El
+  detalle conserva el índice ("SCAN c USING INDEX ix_..."): recorrer la
+  tabla entera y recorrer un índice en orden hasta el LIMIT son hallazgos
+  distintos, y un índice nuevo que el planificador no elige se nota;
+- los "USE TEMP B-TREE" de sentencias sobre esas tablas se reportan como
+  warning (ordenamientos sin índice), sin fallar.
+
+Cada línea del archivo lleva el motivo por el que ese SCAN se acepta; una
+línea sin motivo (o con REVISAR) también hace fallar el test. Cuando un
+cambio quita un SCAN, su línea queda sobrando y se avisa con un warning.
+Con
+
+    OCDI_ACTUALIZAR_PLANES=1 python -m pytest tests/test_planes_consulta.py
+
+se quitan las líneas sobrantes y se agregan las nuevas con motivo REVISAR,
+conservando los motivos ya escritos; cada línea nueva se revisa a mano en el
+mismo cambio que la agrega.
+"""
+import hashlib
+import inspect
+import os
+import re
+import warnings
+from pathlib import Path
+
+import pytest
+
+from app import database
+
+TABLAS_GRANDES = {"expedientes", "correspondencia", "sdqs", "logs_actividad"}
+PERMITIDOS = Path(__file__).parent / "planes_scan_permitidos.txt"
+
+# Rutas que no se recorren: documentación, archivos y las que cierran la sesión
+_OMITIR = {"/logout", "/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json", "/favicon.ico", "/backup/zip"}
+
+# Valores de ejemplo por nombre de parámetro; el resto recibe "1"
+_MUESTRAS = {
+    "q": ["ACME"],
+    "anio": ["2024"],
+    "mes": ["ENERO"],
+    "abogado": ["ABOGADO 1"],
+    "alerta": ["roja", "amarilla", "azul", "vencido"],
+    "semaforo": ["rojo", "pendiente"],
+    "tipo_resp": ["pendiente"],
+    "sin_respuesta": ["1"],
+    "queja": ["si"],
+    "competencia_ocdi": ["SI"],
+    "estado": ["Prestado"],
+    "solo_vencidos": ["1"],
+    "proximos_30": ["1"],
+    "proximos_60": ["1"],
+    "fecha_desde": ["2024-01-01"],
+    "fecha_hasta": ["2024-12-31"],
+    "n_radicado": ["2024ER0000001"],
+    "modulo": ["expedientes"],
+    "page": ["2"],
+}
+_SIN_MUESTRA = {"msg", "back", "next", "error", "backup", "por_pagina"}
+
+# Columnas cuya igualdad no filtra casi nada (la papelera está casi vacía)
+_BAJA_SELECTIVIDAD = {"eliminado_en"}
+
+_ALIAS = re.compile(r"\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", re.IGNORECASE)
+_NO_ALIAS = {
+    "where", "join", "left", "inner", "cross", "on", "order", "group", "limit",
+    "set", "values", "select", "union", "having", "using", "natural", "as",
+}
+
+
+def firma_sql(sql: str) -> str:
+    """Forma normalizada de la sentencia: literales a ?, listas IN colapsadas, espacios simples."""
+    s = re.sub(r"'(?:[^']|'')*'", "?", sql)
+    s = re.sub(r"\b\d+(?:\.\d+)?\b", "?", s)
+    s = re.sub(r"\(\s*\?(?:\s*,\s*\?)*\s*\)", "(?)", s)
+    return re.sub(r"\s+", " ", s).strip()
+
+
+def _hash(firma: str) -> str:
+    return hashlib.sha1(firma.encode()).hexdigest()[:12]
+
+
+def alias_de_tablas(sql: str) -> dict[str, str]:
+    alias = {}
+    for tabla, al in _ALIAS.findall(sql):
+        alias[tabla] = tabla
+        if al and al.lower() not in _NO_ALIAS:
+            alias[al] = tabla
+    return alias
+
+
+def es_recorrido_completo(detalle: str) -> bool:
+    if detalle.startswith("SCAN "):
+        return True
+    m = re.search(r"\(([^()]*)\)$", detalle)
+    if not detalle.startswith("SEARCH ") or not m:
+        return False
+    # "eliminado_en>?" es la papelera (IS NOT NULL): pocas filas, no cuenta
+    restricciones = set(re.findall(r"(\w+)(=|<|>)", m.group(1)))
+    return bool(restricciones) and all(c in _BAJA_SELECTIVIDAD and op == "=" for c, op in restricciones)
+
+
+def analizar(conn, sql: str) -> tuple[list[tuple[str, str]], list[str]]:
+    """(scans sobre tablas grandes como (tabla, detalle), ordenamientos temporales)."""
+    plan = [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+    alias = alias_de_tablas(sql)
+    scans, tocadas = [], set()
+    for detalle in plan:
+        m = re.match(r"(SCAN|SEARCH) (\w+)", detalle)
+        if not m:
+            continue
+        tabla = alias.get(m.group(2), m.group(2))
+        if tabla in TABLAS_GRANDES:
+            tocadas.add(tabla)
+            if es_recorrido_completo(detalle):
+                scans.append((tabla, detalle.replace(m.group(2), tabla, 1)))
+    temporales = [d for d in plan if d.startswith("USE TEMP B-TREE")] if tocadas else []
+    return scans, temporales
+
+
+def _auditable(sql: str) -> bool:
+    return sql.lstrip().split(None, 1)[0].upper() in {"SELECT", "WITH", "INSERT", "UPDATE", "DELETE", "REPLACE"}
+
+
+def _sembrar():
+    conn = database.get_db()
+    exp_id = conn.execute(
+        """INSERT INTO expedientes (n_expediente, anio, mes, abogado_asignado, n_radicado, fecha_auto_apertura_ind)
+           VALUES ('1', 2024, 'ENERO', 'ABOGADO 1', '2024ER0000001', '2024-01-15')"""
+    ).lastrowid
+    conn.execute("INSERT INTO seguimiento_mensual (expediente_id, anio, mes) VALUES (?, 2024, 'ENERO')", (exp_id,))
+    dig_id = conn.execute(
+        "INSERT INTO exp_digitales (n_expediente, anio, abogado, etapa) VALUES ('1', 2024, 'ABOGADO 1', 'INDAGACION')"
+    ).lastrowid
+    conn.execute(
+        "INSERT INTO exp_comunicaciones (exp_digital_id, radicado_comunicacion, fecha_envio) VALUES (?, 'R1', '2024-02-01')",
+        (dig_id,),
+    )
+    corr_id = conn.execute(
+        """INSERT INTO correspondencia (anio, mes, fecha_ingreso, n_radicado, responsable, termino_dias)
+           VALUES (2024, 'ENERO', '2024-01-10', '2024ER0000001', 'ABOGADO 1', 10)"""
+    ).lastrowid
+    sdqs_id = conn.execute(
+        """INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema, fecha_vencimiento)
+           VALUES ('ENERO', '2024-01-05', '123-2024', 'QUEJOSO', 'TEMA', '2024-01-25')"""
+    ).lastrowid
+    auto_id = conn.execute(
+        "INSERT INTO control_autos_sustanciacion (expediente, numero_auto, fecha_auto) VALUES ('1', 'A-1', '2024-01-20')"
+    ).lastrowid
+    eq_id = conn.execute(
+        "INSERT INTO prestamos_equipos (equipo_descripcion, funcionario, fecha_prestamo) VALUES ('PORTATIL', 'F', '2024-01-01')"
+    ).lastrowid
+    ev_id = conn.execute("INSERT INTO sala_agenda (fecha, franja) VALUES ('2024-01-15', 'AM')").lastrowid
+    conn.commit()
+    conn.close()
+    return {
+        "/expediente/": exp_id, "/digitales/": dig_id, "/correspondencia/": corr_id, "/sdqs/": sdqs_id,
+        "/control-autos/": auto_id, "/equipos/": eq_id, "/sala/evento/": ev_id,
+    }
+
+
+def _urls(app, ids: dict) -> list[str]:
+    urls = []
+    for ruta in app.routes:
+        if "GET" not in getattr(ruta, "methods", ()) or ruta.path in _OMITIR:
+            continue
+        path = ruta.path
+        if "{" in path:
+            prefijo = path.split("{", 1)[0]
+            if prefijo not in ids:
+                continue
+            path = re.sub(r"\{\w+\}", str(ids[prefijo]), path)
+        urls.append(path)
+        for nombre, param in inspect.signature(ruta.endpoint).parameters.items():
+            if nombre in _SIN_MUESTRA or param.default is inspect.Parameter.empty:
+                continue
+            for valor in _MUESTRAS.get(nombre, ["1"]):
+                urls.append(f"{path}?{nombre}={valor}")
+    return urls
+
+
+_SIN_REVISAR = "REVISAR"
+
+
+def _leer_permitidos() -> dict[tuple[str, str, str], str]:
+    """{(firma, tabla, detalle): motivo} del archivo."""
+    if not PERMITIDOS.exists():
+        return {}
+    permitidos = {}
+    for linea in PERMITIDOS.read_text(encoding="utf-8").splitlines():
+        if linea.strip() and not linea.startswith("#"):
+            h, tabla, detalle, motivo = (linea.split("\t") + [""] * 4)[:4]
+            permitidos[(h, tabla, detalle)] = motivo.strip()
+    return permitidos
+
+
+def _escribir_permitidos(hallazgos: dict, motivos: dict):
+    lineas = [
+        "# SCANs aceptados sobre tablas grandes (ver tests/test_planes_consulta.py).",
+        "# firma\ttabla\tdetalle del plan\tmotivo\tsentencia normalizada",
+        '# motivo: por qué se acepta el SCAN; "línea base" = ya estaba antes de la auditoría.',
+    ]
+    for clave, (firma, _rutas) in sorted(hallazgos.items(), key=lambda kv: (kv[0][1], kv[1][0])):
+        h, tabla, detalle = clave
+        lineas.append(f"{h}\t{tabla}\t{detalle}\t{motivos.get(clave) or _SIN_REVISAR}\t{firma[:200]}")
+    PERMITIDOS.write_text("\n".join(lineas) + "\n", encoding="utf-8")
+
+
+def test_firma_normaliza_literales_y_listas():
+    a = firma_sql("SELECT * FROM sdqs WHERE mes = 'ENERO' AND id IN (1, 2, 3)\n LIMIT 50")
+    b = firma_sql("SELECT *  FROM sdqs WHERE mes = 'FEBRERO' AND id IN (7) LIMIT 20")
+    assert a == b == "SELECT * FROM sdqs WHERE mes = ? AND id IN (?) LIMIT ?"
+
+
+def test_search_por_papelera_cuenta_como_recorrido():
+    assert es_recorrido_completo("SCAN expedientes")
+    assert es_recorrido_completo("SEARCH e USING INDEX ix_expedientes_eliminado_en (eliminado_en=?)")
+    assert not es_recorrido_completo("SEARCH e USING INDEX ix_x (anio=? AND eliminado_en=?)")
+    assert not es_recorrido_completo("SEARCH e USING INDEX ix_expedientes_eliminado_en (eliminado_en>?)")
+    assert not es_recorrido_completo("SEARCH e USING INTEGER PRIMARY KEY (rowid=?)")
+
+
+def test_alias_se_resuelve_a_su_tabla(db_temporal):
+    conn = database.get_db()
+    scans, _ = analizar(conn, "SELECT e.id FROM expedientes e LEFT JOIN seguimiento_mensual s ON s.expediente_id = e.id")
+    conn.close()
+    assert scans and scans[0][0] == "expedientes"
+    assert scans[0][1].startswith("SCAN expedientes")
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+def test_sin_scans_nuevos_en_tablas_grandes(captura_sql, cliente):
+    from app.main import app
+    from app.escritor import get_escritor
+
+    ids = _sembrar()
+    captura_sql.activa = True
+    for url in _urls(app, ids):
+        captura_sql.ruta = url.split("?", 1)[0]
+        cliente.get(url, follow_redirects=False)
+    get_escritor().ejecutar(lambda conn: None)  # que el escritor termine lo encolado
+    captura_sql.activa = False
+
+    hallazgos: dict[tuple[str, str, str], tuple[str, set[str]]] = {}
+    temporales: dict[str, set[str]] = {}
+    conn = database.get_db()
+    for sql, rutas in captura_sql.sentencias.items():
+        if not _auditable(sql):
+            continue
+        firma = firma_sql(sql)
+        scans, tmp = analizar(conn, sql)
+        for tabla, detalle in scans:
+            clave = (_hash(firma), tabla, detalle)
+            hallazgos.setdefault(clave, (firma, set()))[1].update(rutas)
+        if tmp:
+            temporales.setdefault(firma, set()).update(rutas)
+    conn.close()
+
+    assert captura_sql.sentencias, "el recorrido no capturó sentencias"
+
+    permitidos = _leer_permitidos()
+    if os.environ.get("OCDI_ACTUALIZAR_PLANES"):
+        _escribir_permitidos(hallazgos, permitidos)
+        return
+
+    if temporales:
+        warnings.warn(
+            f"{len(temporales)} sentencia(s) sobre tablas grandes ordenan con USE TEMP B-TREE:\n"
+            + "\n".join(f"  [{', '.join(sorted(r))}] {f[:160]}" for f, r in sorted(temporales.items())),
+            UserWarning,
+        )
+
+    sobrantes = set(permitidos) - set(hallazgos)
+    if sobrantes:
+        warnings.warn(
+            f"{len(sobrantes)} SCAN(s) de planes_scan_permitidos.txt ya no aparecen; "
+            "regenerar con OCDI_ACTUALIZAR_PLANES=1", UserWarning,
+        )
+
+    nuevos = [
+        f"- {clave[2]}  [{', '.join(sorted(rutas))}]\n    {firma[:300]}"
+        for clave, (firma, rutas) in hallazgos.items()
+        if clave not in permitidos
+    ]
+    assert not nuevos, "SCAN nuevo sobre tablas grandes:\n" + "\n".join(nuevos)
+
+    sin_motivo = [
+        f"- {clave[2]}  {hallazgos[clave][0][:160]}"
+        for clave, motivo in permitidos.items()
+        if clave in hallazgos and motivo in ("", _SIN_REVISAR)
+    ]
+    assert not sin_motivo, "SCAN permitido sin motivo en planes_scan_permitidos.txt:\n" + "\n".join(sin_motivo)
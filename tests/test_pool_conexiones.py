@@ -0,0 +1,55 @@
+"""
+Pool de conexiones SQLite con una conexión por request.
+
+Antes cada get_db() abría un sqlite3.connect nuevo y repetía los PRAGMA; una
+sola vista de lista abría 3-5 conexiones (middleware, handler, registrar_log,
+puede_*, _abogados_activos). Ahora la request presta UNA conexión del pool y
+todos los get_db() internos la comparten.
+"""
+from app import database
+
+
+def test_conexion_configurada_una_vez_y_reutilizada(db_temporal):
+    pool = database.get_pool()
+    conn = database.get_db()
+    assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    creadas = pool.creadas
+
+    otra = database.get_db()
+    assert otra is conn  # close() la devolvió al pool, no la cerró
+    otra.close()
+    assert pool.creadas == creadas
+
+
+def test_get_db_dentro_de_request_devuelve_la_misma_conexion(db_temporal):
+    token = database.abrir_conexion_request()
+    try:
+        a = database.get_db()
+        b = database.get_db()
+        assert a is b
+        a.close()  # no-op dentro de la request
+        assert a.execute("SELECT 1").fetchone()[0] == 1
+    finally:
+        database.liberar_conexion_request(token)
+    assert database._conexion_request.get() is None
+
+
+def test_liberar_descarta_transaccion_pendiente(db_temporal):
+    conn = database.get_db()
+    conn.execute("INSERT INTO sala_agenda (fecha, franja, titulo) VALUES ('2026-01-01','manana','x')")
+    conn.close()  # sin commit → igual que antes, el cambio se descarta
+    conn = database.get_db()
+    assert conn.execute("SELECT COUNT(*) FROM sala_agenda").fetchone()[0] == 0
+    conn.close()
+
+
+def test_una_request_usa_una_sola_conexion(cliente):
+    pool = database.get_pool()
+    cliente.get("/expedientes")  # calienta el pool
+    creadas, prestamos = pool.creadas, pool.prestamos
+    r = cliente.get("/expedientes")
+    assert r.status_code == 200
+    assert pool.prestamos - prestamos == 1
+    assert pool.creadas == creadas
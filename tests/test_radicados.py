@@ -0,0 +1,83 @@
+"""
+Radicados normalizados y conteo de repetidos (migración 15, app/radicados.py).
+
+Los triggers deben dejar radicados_conteo igual a un GROUP BY sobre los
+registros activos después de crear, editar, enviar a la papelera, restaurar y
+purgar; /verificar-radicado debe buscar por índice.
+"""
+import pytest
+
+from app import database
+from app.radicados import COLUMNAS, recontar, repetidos, verificar_conteo
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    yield c
+    c.close()
+
+
+def test_triggers_mantienen_el_conteo(conn):
+    for tabla in COLUMNAS:
+        conn.execute(f"DELETE FROM {tabla}")
+    ins = {
+        "correspondencia": "INSERT INTO correspondencia (n_radicado) VALUES (?)",
+        "sdqs": "INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema) VALUES ('ENERO', '2026-01-01', ?, 'Q', 'T')",
+        "expedientes": "INSERT INTO expedientes (n_expediente, anio, n_radicado) VALUES (?, 2030, ?)",
+    }
+    for tabla, sql in ins.items():
+        for i, rad in enumerate([" ab-1", "AB-1 ", "ab-1", "cd-2", "", None, "ef-3"]):
+            if tabla == "sdqs":   # sdqs es NOT NULL y UNIQUE
+                rad = f"{rad or 'x'}{' ' * i}"
+            conn.execute(sql, (str(i), rad) if tabla == "expedientes" else (rad,))
+    assert verificar_conteo(conn) == []
+    assert [tuple(r) for r in repetidos(conn, "correspondencia")] == [("AB-1", 3)]
+
+    for tabla, col in COLUMNAS.items():
+        ids = [r[0] for r in conn.execute(f"SELECT id FROM {tabla} ORDER BY id")]
+        conn.execute(f"UPDATE {tabla} SET {col} = 'cd-2' WHERE id = ?", (ids[0],))
+        conn.execute(f"UPDATE {tabla} SET eliminado_en = '2026-01-01' WHERE id = ?", (ids[1],))
+        conn.execute(f"UPDATE {tabla} SET {col} = 'zz' WHERE id = ?", (ids[1],))      # en papelera: no cuenta
+        conn.execute(f"UPDATE {tabla} SET eliminado_en = NULL WHERE id = ?", (ids[1],))
+        conn.execute(f"DELETE FROM {tabla} WHERE id = ?", (ids[6],))
+        conn.execute(f"UPDATE {tabla} SET {col} = {col} WHERE id = ?", (ids[3],))    # sin cambios
+        assert verificar_conteo(conn) == [], tabla
+    assert [tuple(r) for r in repetidos(conn, "correspondencia")] == [("CD-2", 2)]
+    conn.rollback()
+
+
+def test_recontar_repara(conn):
+    conn.execute("INSERT INTO radicados_conteo VALUES ('sdqs', 'FANTASMA', 4)")
+    conn.execute("DELETE FROM radicados_conteo WHERE modulo = 'correspondencia'")
+    assert verificar_conteo(conn)
+    recontar(conn)
+    assert verificar_conteo(conn) == []
+    conn.rollback()
+
+
+def test_rutas_de_correspondencia(cliente, conn):
+    conn.execute("DELETE FROM correspondencia")
+    conn.commit()
+    for rad in ("2026ER001", "2026er001 ", "2026ER002"):
+        assert cliente.post("/correspondencia/nuevo", data={"n_radicado": rad},
+                            follow_redirects=False).status_code == 303
+    ids = [r[0] for r in conn.execute("SELECT id FROM correspondencia ORDER BY id")]
+
+    r = cliente.get("/correspondencia/verificar-radicado", params={"n_radicado": " 2026er001", "exclude_id": ids[0]})
+    assert [x["id"] for x in r.json()["registros"]] == [ids[1]]
+    assert "2026ER001</a>" in cliente.get("/correspondencia/").text
+
+    cliente.post(f"/correspondencia/{ids[1]}/eliminar", follow_redirects=False)
+    assert cliente.get("/correspondencia/verificar-radicado",
+                       params={"n_radicado": "2026ER001", "exclude_id": ids[0]}).json()["existe"] is False
+    assert 'id="dup-banner"' not in cliente.get("/correspondencia/").text
+    cliente.post(f"/correspondencia/{ids[1]}/restaurar", follow_redirects=False)
+    assert [tuple(r) for r in repetidos(conn, "correspondencia")] == [("2026ER001", 2)]
+    assert verificar_conteo(conn) == []
+
+    plan = " ".join(r[3] for r in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT id FROM correspondencia WHERE radicado_norm = ? AND id != ? AND eliminado_en IS NULL",
+        ("X", 0),
+    ))
+    assert "ix_correspondencia_act_radicado_norm" in plan
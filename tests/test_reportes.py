@@ -0,0 +1,33 @@
+"""
+Reporte de vencimientos (/reportes/vencimientos).
+
+La hoja de correspondencia juntaba los radicados de salida con
+GROUP_CONCAT(DISTINCT ... ORDER BY), que solo existe desde SQLite 3.44: en
+versiones anteriores la ruta fallaba con "near ORDER: syntax error". La
+encontró la auditoría de planes de consulta al recorrer todas las rutas GET.
+"""
+import io
+
+import openpyxl
+
+from app.database import get_db
+
+
+def test_radicados_de_salida_distintos_en_orden_de_registro(cliente):
+    conn = get_db()
+    corr_id = conn.execute(
+        "INSERT INTO correspondencia (anio, mes, fecha_ingreso, n_radicado) VALUES (2024, 'ENERO', '2024-01-10', 'E-1')"
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO correspondencia_radicados_salida (correspondencia_id, radicado) VALUES (?, ?)",
+        [(corr_id, "S-2"), (corr_id, "S-1"), (corr_id, "S-2")],
+    )
+    conn.commit()
+    conn.close()
+
+    r = cliente.get("/reportes/vencimientos")
+    assert r.status_code == 200
+
+    ws = openpyxl.load_workbook(io.BytesIO(r.content))["Correspondencia"]
+    radicados = [fila[3] for fila in ws.iter_rows(min_row=4, values_only=True) if fila[3]]
+    assert radicados == ["S-2,S-1"]
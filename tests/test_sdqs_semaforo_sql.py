@@ -0,0 +1,74 @@
+"""
+Semáforo de SDQS en SQL (sdqs._sql_semaforo).
+
+La expresión SQL debe clasificar cada fila igual que _calcular_semaforo_sdqs(),
+incluidas fechas vacías, inválidas o con hora y rad_salida en blanco, y la
+Lista debe contar y paginar en la base con el filtro ya aplicado.
+"""
+import re
+from datetime import date, timedelta
+from itertools import product
+
+import pytest
+
+from app import database, semaforos
+from app.routers import sdqs as mod_sdqs
+from app.routers.sdqs import _calcular_semaforo_sdqs, _sql_semaforo
+from tests.conftest import _d
+
+_HOY = date.today()
+
+
+_FECHAS = [
+    "", "   ", "abc", "2026-02-30", "2026-13-01", "0000-01-01", "2026-1-05",
+    "20260230", _d(-3).replace("-", ""), _d(5) + " 10:30:00", _d(1) + "T08:00",
+] + [_d(n) for n in (-20, -9, -6, -4, -3, -2, -1, 0, 1, 2, 3, 4, 7, 12, 30)]
+_RAD = [None, "", "  \t", "\xa0", "RAD-2026-1", "　x"]
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    c.execute("DELETE FROM sdqs")
+    filas = [
+        (fa, f"S-{i}", fv, rad)
+        for i, (fa, fv, rad) in enumerate(product(_FECHAS, _FECHAS + [None], _RAD))
+    ]
+    c.executemany(
+        """INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema, fecha_vencimiento, rad_salida)
+           VALUES ('ENERO', ?, ?, 'Q', 'T', ?, ?)""",
+        filas,
+    )
+    c.commit()
+    yield c
+    c.close()
+
+
+@pytest.mark.parametrize("desplazamiento", [0, -4, 3])
+def test_sql_igual_a_calcular_semaforo(conn, hoy_fijo, desplazamiento):
+    hoy = _HOY + timedelta(days=desplazamiento)
+    hoy_fijo(semaforos, hoy)
+    expr, params = _sql_semaforo(hoy)
+    distintos = [
+        (dict(r), r["sem"]) for r in conn.execute(f"SELECT *, ({expr}) AS sem FROM sdqs", params)
+        if _calcular_semaforo_sdqs(dict(r))["semaforo_sdqs"] != r["sem"]
+    ]
+    assert distintos == []
+    clases = {r[0] for r in conn.execute(f"SELECT DISTINCT ({expr}) FROM sdqs", params)}
+    assert clases == {None, "respondido", "rojo", "amarillo", "verde"}
+
+
+def test_lista_filtra_y_pagina_en_sql(cliente, conn):
+    rojos = [
+        r["id"] for r in sorted(conn.execute("SELECT * FROM sdqs"), key=lambda r: -r["id"])
+        if _calcular_semaforo_sdqs(dict(r))["semaforo_sdqs"] == "rojo"
+    ]
+    paginas = (len(rojos) + mod_sdqs._PAGE_SIZE - 1) // mod_sdqs._PAGE_SIZE
+    assert paginas > 1
+    r = cliente.get("/sdqs/", params={"semaforo": "rojo", "page": 2})
+    assert r.status_code == 200
+    assert f"{len(rojos)} registros encontrados" in r.text
+    assert f"&page={paginas}" in r.text and f"&page={paginas + 1}" not in r.text
+    pagina = rojos[mod_sdqs._PAGE_SIZE:2 * mod_sdqs._PAGE_SIZE]
+    ids = [int(i) for i in re.findall(r'href="/sdqs/(\d+)"', r.text)]
+    assert list(dict.fromkeys(ids)) == pagina
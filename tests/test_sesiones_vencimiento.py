@@ -0,0 +1,102 @@
+"""
+Vencimiento de sesiones, barrido por lotes y vista /admin/sesiones.
+
+Una sesión vence por inactividad o por antigüedad absoluta; cargar_sesion()
+la rechaza y la borra, y el barredor elimina las vencidas en lotes para que
+`sesiones` quede acotada a las sesiones vivas.
+"""
+from datetime import datetime, timedelta
+
+from app import database
+from app.auth_utils import cargar_sesion, new_token
+from app.escritor import get_escritor
+from app.sesiones import BarredorSesiones, cache_sesiones, sesion_vigente
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _hace(**delta) -> str:
+    return (datetime.now() - timedelta(**delta)).strftime(_FMT)
+
+
+def _insertar_sesion(created_at: str | None = None, last_seen: str | None = None, rol: str = "secretario") -> str:
+    conn = database.get_db()
+    uid = conn.execute("SELECT id FROM usuarios WHERE rol = ? LIMIT 1", (rol,)).fetchone()[0]
+    token = new_token()
+    conn.execute(
+        "INSERT INTO sesiones (token, user_id, created_at, last_seen) VALUES (?,?,?,?)",
+        (token, uid, created_at or _hace(), last_seen or created_at or _hace()),
+    )
+    conn.commit()
+    conn.close()
+    return token
+
+
+def _existe(token: str) -> bool:
+    conn = database.get_db()
+    fila = conn.execute("SELECT 1 FROM sesiones WHERE token = ?", (token,)).fetchone()
+    conn.close()
+    return fila is not None
+
+
+def test_sesion_vigente_por_inactividad_y_antiguedad():
+    assert sesion_vigente(_hace(hours=1), _hace(minutes=5))
+    assert not sesion_vigente(_hace(hours=1), _hace(days=1))      # inactiva
+    assert not sesion_vigente(_hace(days=3), _hace(minutes=1))     # demasiado antigua
+
+
+def test_sesion_vencida_se_rechaza_y_se_borra(db_temporal):
+    viva = _insertar_sesion()
+    vencida = _insertar_sesion(created_at=_hace(hours=2), last_seen=_hace(hours=20))
+
+    assert cargar_sesion(viva) is not None
+    assert cargar_sesion(vencida) is None
+    get_escritor().ejecutar(lambda conn: None)  # espera el borrado encolado
+    assert not _existe(vencida)
+    assert _existe(viva)
+
+
+def test_barrido_borra_en_lotes_y_deja_solo_las_vivas(db_temporal):
+    viejas = [_insertar_sesion(created_at=_hace(days=2)) for _ in range(23)]
+    vivas = [_insertar_sesion() for _ in range(3)]
+    cache_sesiones.guardar(viejas[0], {"id": 1}, {})
+
+    barredor = BarredorSesiones(lote=5)
+    tareas_antes = get_escritor().tareas
+    assert barredor.barrer() == 23
+    assert get_escritor().tareas - tareas_antes >= 5  # 23 filas en lotes de 5
+    assert cache_sesiones.obtener(viejas[0]) is None
+
+    conn = database.get_db()
+    restantes = {r[0] for r in conn.execute("SELECT token FROM sesiones")}
+    conn.close()
+    assert set(vivas) <= restantes
+    assert not restantes & set(viejas)
+    assert barredor.barrer() == 0
+
+
+def test_migracion_quita_indice_duplicado(db_temporal):
+    conn = database.get_db()
+    indices = {r[1] for r in conn.execute("PRAGMA index_list(sesiones)")}
+    conn.close()
+    assert "ix_sesiones_token" not in indices
+
+
+def test_admin_ve_y_cierra_sesiones(cliente):
+    otra = _insertar_sesion()
+    _insertar_sesion(created_at=_hace(days=2))  # vencida: no se lista
+
+    r = cliente.get("/admin/sesiones")
+    assert r.status_code == 200
+    assert "Sesiones Activas" in r.text
+    assert r.text.count("Cerrar sesión</button>") == 1  # la propia no se puede cerrar
+
+    conn = database.get_db()
+    sid = conn.execute("SELECT id FROM sesiones WHERE token = ?", (otra,)).fetchone()[0]
+    conn.close()
+    r = cliente.post(f"/admin/sesiones/{sid}/cerrar", follow_redirects=False)
+    assert r.status_code == 303
+    assert "msg=sesion_cerrada" in r.headers["location"]
+    get_escritor().ejecutar(lambda conn: None)
+    assert not _existe(otra)
+    assert cargar_sesion(otra) is None
@@ -0,0 +1,116 @@
+"""
+Columnas normalizadas para filtros (migración 20, app/texto.py).
+
+Los triggers deben mantener las columnas *_norm al crear y editar, también
+desde una conexión que no pasa por configurar_conexion(), con el mismo
+resultado que normalizar_texto(); los filtros de SDQS, seguimiento y equipos
+deben encontrar sin distinguir tildes ni mayúsculas, y los de igualdad de
+SDQS deben buscar por su índice.
+"""
+import itertools
+import sqlite3
+
+import pytest
+
+from app import database
+from app.texto import normalizar_texto, patron_like
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    for tabla in ("sdqs", "expedientes", "prestamos_equipos", "bienes_muebles"):
+        c.execute(f"DELETE FROM {tabla}")
+    c.executemany(
+        """INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema, responsable, competencia_ocdi)
+           VALUES (?, '2026-01-01', ?, ?, ?, ?, 'SI')""",
+        [("Enero", "7001-2026", "Luz Peña", "CORRUPCIÓN en contratos", "José Gómez"),
+         ("FEBRERO", "7002-2026", "Otro", "Vehículos", "ANA RUIZ")],
+    )
+    c.executemany("INSERT INTO expedientes (n_expediente, anio, nombre_investigado) VALUES (?, 2025, ?)",
+                  [("ZX-901", "Martín Álvarez"), ("ZX-902", "Pedro Ruiz")])
+    c.execute("""INSERT INTO prestamos_equipos (equipo_descripcion, funcionario, fecha_prestamo)
+                 VALUES ('Portátil Lenovo PX-77', 'Sofía', '2026-01-10')""")
+    c.execute("""INSERT INTO bienes_muebles (descripcion_elemento, marca, numero_placa_fisica)
+                 VALUES ('Escritorio en ángulo', 'Muebles Ñandú', 'PL-555')""")
+    c.commit()
+    yield c
+    c.close()
+
+
+def test_normalizar_texto():
+    assert normalizar_texto("  Corrupción   en\tel  ÁREA ") == "corrupcion en el area"
+    assert normalizar_texto("Peña", None, "", "Cañón\n") == "pena\ncanon"
+    assert normalizar_texto("Jose\u0301") == "jose"  # "e" + tilde combinante (NFD)
+    assert normalizar_texto(None, "  ") is None
+    assert patron_like("CORRUPCIÓN") == "%corrupcion%" and patron_like(" ") is None
+
+
+def test_triggers_mantienen_columnas(conn):
+    fila = conn.execute("SELECT mes_norm, responsable_norm, texto_norm FROM sdqs WHERE sdqs = '7001-2026'").fetchone()
+    assert tuple(fila) == ("enero", "jose gomez", "7001-2026\nluz pena\ncorrupcion en contratos")
+    conn.execute("UPDATE sdqs SET responsable = 'maría lópez', tema = '  ' WHERE sdqs = '7001-2026'")
+    conn.execute("UPDATE expedientes SET nombre_investigado = 'Íñigo' WHERE n_expediente = 'ZX-902'")
+    assert tuple(conn.execute("SELECT responsable_norm, texto_norm FROM sdqs WHERE sdqs = '7001-2026'").fetchone()) \
+        == ("maria lopez", "7001-2026\nluz pena")
+    assert conn.execute("SELECT nombre_investigado_norm FROM expedientes WHERE n_expediente = 'ZX-902'"
+                        ).fetchone()[0] == "inigo"
+    conn.rollback()
+
+
+def test_triggers_sin_funciones_de_la_app(conn):
+    """Una conexión sqlite3 pelada escribe y las columnas quedan como en Python."""
+    valores = [None, "", "  ", "Peña", " ÁREA\t de  CORRUPCIÓN ", "Jose\u0301", "ÄÖÜ çÇ", "x" + " " * 40 + "y", 7001]
+    externa = sqlite3.connect(database.DB_PATH)
+    try:
+        externa.executemany(
+            "INSERT INTO bienes_muebles (marca, modelo, nombre_responsable, numero_placa_fisica) VALUES (?, ?, ?, 'EXT')",
+            itertools.product(valores, repeat=3),
+        )
+        externa.execute(
+            """INSERT INTO sdqs (mes, fecha_asignacion, sdqs, quejoso, tema, responsable)
+               VALUES ('Marzo', '2026-01-01', 'EXT-1', 'x', 'y', ' María   López ')"""
+        )
+        externa.commit()
+    finally:
+        externa.close()
+
+    filas = conn.execute(
+        "SELECT marca, modelo, nombre_responsable, texto_norm FROM bienes_muebles WHERE numero_placa_fisica = 'EXT'"
+    ).fetchall()
+    assert len(filas) == len(valores) ** 3
+    for marca, modelo, responsable, texto_norm in filas:
+        assert texto_norm == normalizar_texto(marca, modelo, responsable)
+    assert conn.execute("SELECT responsable_norm FROM sdqs WHERE sdqs = 'EXT-1'").fetchone()[0] == "maria lopez"
+
+
+@pytest.mark.parametrize("columna, indice", [
+    ("mes_norm", "ix_sdqs_act_mes_norm"),
+    ("competencia_norm", "ix_sdqs_act_competencia_norm"),
+    ("responsable_norm", "ix_sdqs_act_responsable_norm"),
+])
+def test_igualdad_usa_indice(conn, columna, indice):
+    plan = " ".join(r[3] for r in conn.execute(
+        f"EXPLAIN QUERY PLAN SELECT * FROM sdqs WHERE eliminado_en IS NULL AND {columna} = ? ORDER BY id DESC",
+        ("X",),
+    ))
+    assert f"SEARCH sdqs USING INDEX {indice}" in plan and "TEMP B-TREE" not in plan, plan
+
+
+def test_filtros_sin_tildes(cliente, conn):
+    def lista(ruta, **params):
+        r = cliente.get(ruta, params=params)
+        assert r.status_code == 200, ruta
+        return r.text
+
+    assert "7001-2026" in lista("/sdqs/", q="corrupcion")
+    assert "7001-2026" in lista("/sdqs/", responsable="jose gomez", mes="enero")
+    assert "7001-2026" not in lista("/sdqs/", responsable="ana ruiz")
+    assert "7002-2026" in lista("/sdqs/", q="VEHICULOS")
+
+    texto = lista("/seguimiento", anio=0, q="alvarez")
+    assert "ZX-901" in texto and "ZX-902" not in texto
+
+    assert "PX-77" in lista("/equipos/", q="portatil")
+    assert "PL-555" in lista("/equipos/bienes/lista", q="nandu")
+    assert "PL-555" in lista("/equipos/bienes/lista", q="PL-5")
@@ -0,0 +1,110 @@
+"""
+Búsqueda por fragmento con índices de trigramas (migración 21, app/busqueda.py).
+
+Los triggers deben mantener los índices iguales a las tablas; las listas
+deben encontrar un fragmento del medio de un radicado o nombre por el índice
+(sin recorrer la tabla), combinado con los demás filtros, y volver al LIKE
+con menos de 3 caracteres. /buscar completa con esas coincidencias.
+"""
+import re
+
+import pytest
+
+from app import database
+from app.busqueda import TRIGRAMAS, consulta_subcadena, filtro_subcadena, verificar
+
+
+@pytest.fixture
+def conn(db_temporal):
+    c = database.get_db()
+    for tabla, _ in TRIGRAMAS.values():
+        c.execute(f"DELETE FROM {tabla}")
+    c.executemany(
+        """INSERT INTO expedientes (n_expediente, anio, nombre_investigado, n_radicado, abogado_asignado)
+           VALUES (?, ?, ?, ?, ?)""",
+        [("801", 2025, "Carla Gomezano", "2025ER0077123", "ABOGADO 1"),
+         ("802", 2024, "Luis Peña", "2024ER0077999", "ABOGADO 2"),
+         ("803", 2025, "Ana Ruiz", "2025EE0000001", "ABOGADO 1")],
+    )
+    c.executemany(
+        "INSERT INTO correspondencia (n_radicado, origen, responsable, fecha_ingreso) VALUES (?, ?, ?, ?)",
+        [("2026ER5550001", "Alcaldía Local", "ABOGADO 1", "2026-01-02"),
+         ("2026ER5550002", "Concejo", "ABOGADO 2", "2026-01-03")],
+    )
+    c.execute("""INSERT INTO control_autos_sustanciacion (expediente, numero_auto, asunto_auto, fecha_auto)
+                 VALUES ('801-2025', 'AUTO-4471', 'APERTURA', '2026-01-05')""")
+    c.commit()
+    yield c
+    c.close()
+
+
+def _ids(conn, tabla: str, condicion: str, params) -> set[int]:
+    return {r[0] for r in conn.execute(f"SELECT id FROM {tabla} WHERE {condicion}", params)}
+
+
+def test_consulta_de_subcadena():
+    assert consulta_subcadena(' ER0"07 ') == '"ER0""07"'
+    assert consulta_subcadena("abc", ("n_radicado", "origen")) == '{n_radicado origen} : "abc"'
+    assert consulta_subcadena(" ab ") is None
+
+
+def test_triggers_mantienen_los_indices(conn):
+    todos = tuple(TRIGRAMAS)
+    assert verificar(conn, (), todos) == []
+    conn.execute("UPDATE expedientes SET nombre_investigado = 'Otro' WHERE n_expediente = '801'")
+    conn.execute("DELETE FROM correspondencia WHERE origen = 'Concejo'")
+    conn.execute("UPDATE control_autos_sustanciacion SET numero_auto = 'AUTO-9'")
+    assert verificar(conn, (), todos) == []
+    sql, params = filtro_subcadena("expedientes", "mezan")
+    assert _ids(conn, "expedientes", sql, params) == set()
+    conn.rollback()
+
+
+def test_fragmento_igual_que_like(conn):
+    for q in ("ER0077", "omeza", "Peña", "er00", "2025"):
+        sql, params = filtro_subcadena("expedientes", q)
+        like = " OR ".join(f"{c} LIKE ?" for c in TRIGRAMAS["expedientes"][1])
+        assert _ids(conn, "expedientes", sql, params) == _ids(
+            conn, "expedientes", like, [f"%{q}%"] * 6), q
+    # a diferencia de LIKE, tampoco distingue mayúsculas fuera de ASCII
+    sql, params = filtro_subcadena("expedientes", "PEÑA")
+    assert _ids(conn, "expedientes", sql, params) == _ids(conn, "expedientes", "n_expediente = ?", ["802"])
+    # restringido a columnas; con 2 caracteres vuelve al LIKE
+    sql, params = filtro_subcadena("expedientes", "gomez", ("n_radicado",))
+    assert _ids(conn, "expedientes", sql, params) == set()
+    sql, params = filtro_subcadena("correspondencia", "02", alias="c")
+    assert "LIKE" in sql and len(params) == 4
+
+
+def test_listas_usan_el_indice(conn):
+    sql, params = filtro_subcadena("correspondencia", "ER555", alias="c")
+    plan = " ".join(r[3] for r in conn.execute(
+        f"""EXPLAIN QUERY PLAN SELECT c.* FROM correspondencia c
+            WHERE c.eliminado_en IS NULL AND {sql} AND c.responsable = ?
+            ORDER BY c.fecha_ingreso DESC, c.id DESC""", params + ["ABOGADO 1"]))
+    assert "tri_correspondencia VIRTUAL TABLE" in plan and "SCAN c " not in plan + " ", plan
+
+
+def _enlaces(html: str, ruta: str) -> set[int]:
+    return {int(i) for i in re.findall(rf'href="{ruta}(\d+)', html)}
+
+
+def test_listas_y_buscar_por_fragmento(cliente, conn):
+    ids = dict(conn.execute("SELECT n_expediente, id FROM expedientes").fetchall())
+    r = cliente.get("/expedientes", params={"q": "ER0077"})
+    assert r.status_code == 200
+    assert _enlaces(r.text, "/expediente/") == {ids["801"], ids["802"]}
+    # intersección con los demás filtros
+    r = cliente.get("/expedientes", params={"q": "ER0077", "anio": "2025"})
+    assert _enlaces(r.text, "/expediente/") == {ids["801"]}
+
+    r = cliente.get("/correspondencia/", params={"q": "555000", "responsable": "ABOGADO 2"})
+    assert r.status_code == 200 and "2026ER5550002" in r.text and "2026ER5550001" not in r.text
+    r = cliente.get("/control-autos/", params={"q": "o-447"})
+    assert r.status_code == 200 and "AUTO-4471" in r.text
+
+    # /buscar: "mezan" no es prefijo de ninguna palabra; sale por trigramas
+    assert _enlaces(cliente.get("/buscar", params={"q": "mezan"}).text, "/expediente/") == {ids["801"]}
+    # por prefijo y por trigramas a la vez: una sola vez en los resultados
+    r = cliente.get("/buscar", params={"q": "gomez"})
+    assert re.findall(r'href="/expediente/(\d+)', r.text).count(str(ids["801"])) == 1
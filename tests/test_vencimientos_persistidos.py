@@ -0,0 +1,95 @@
+"""
+Vencimientos persistidos de expedientes (migración 12).
+
+Las columnas fecha_vencimiento_* / fecha_prescripcion /
+fecha_proximo_vencimiento se mantienen al crear y editar, y el filtro de
+alerta de la Lista corre en SQL antes de paginar con el mismo resultado que
+calcular la alerta en Python con _enriquecer().
+"""
+from datetime import date
+
+import pytest
+
+from app import database
+from app.alertas import refrescar_alertas
+from app.routers.expedientes import _enriquecer, _sql_alerta
+from app.vencimientos import actualizar_vencimientos
+from tests.conftest import _d
+
+
+# (fecha_auto_apertura_ind, fecha_apertura_investigacion, fecha_hechos, estado_proceso)
+_CASOS = [
+    (_d(-200), None, None, "ACTIVO"),              # indagación vencida
+    (_d(-170), None, None, "ACTIVO"),              # indagación próxima
+    (_d(-100), None, None, "ACTIVO"),              # indagación vigente
+    (None, _d(-190), None, "ACTIVO"),              # investigación vencida
+    (_d(-200), _d(-10), None, "AUTO DE ARCHIVO"),  # cerrado: nada cuenta
+    (None, None, str(date.today().year - 5), "ACTIVO"),  # prescripción por año
+    (None, None, _d(-1820), "ACTIVO"),             # prescripción próxima
+    (_d(-175), _d(-100), _d(-400), "acumulado "),  # cerrado con espacios
+    (None, None, None, "ACTIVO"),                  # sin plazos
+    (_d(-181), _d(-20), None, "ACTIVO"),           # una vencida y otra vigente
+]
+
+
+@pytest.fixture
+def expedientes(db_temporal):
+    conn = database.get_db()
+    conn.execute("DELETE FROM expedientes")
+    for i, (ind, inv, hechos, estado) in enumerate(_CASOS, start=1):
+        conn.execute(
+            """INSERT INTO expedientes (n_expediente, anio, fecha_auto_apertura_ind,
+                   fecha_apertura_investigacion, fecha_hechos, estado_proceso)
+               VALUES (?, 2030, ?, ?, ?, ?)""",
+            (str(i), ind, inv, hechos, estado),
+        )
+    actualizar_vencimientos(conn)
+    refrescar_alertas(conn, "expedientes")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("alerta", ["vencido", "proximo", "vigente", "sin-plazo"])
+def test_filtro_sql_igual_a_calcular_alerta(expedientes, alerta):
+    conn = expedientes
+    esperados = {
+        e["id"] for e in (_enriquecer(dict(r)) for r in conn.execute("SELECT * FROM expedientes"))
+        if alerta in (e["alerta_ind"]["clase"], e["alerta_inv"]["clase"], e["alerta_prescripcion"]["clase"])
+    }
+    cond, params = _sql_alerta(alerta, date.today())
+    obtenidos = {r[0] for r in conn.execute(f"SELECT id FROM expedientes WHERE {cond}", params)}
+    assert obtenidos == esperados
+
+
+def test_columnas_iguales_a_enriquecer(expedientes):
+    for r in expedientes.execute("SELECT * FROM expedientes"):
+        guardado = dict(r)
+        calculado = _enriquecer(dict(r))
+        for col in ("fecha_vencimiento_ind", "fecha_vencimiento_inv", "fecha_prescripcion",
+                    "fecha_vencimiento_prorroga", "fecha_proximo_vencimiento"):
+            assert guardado[col] == calculado[col], (col, guardado["n_expediente"])
+
+
+def test_lista_filtra_alerta_antes_de_paginar(cliente, expedientes):
+    r = cliente.get("/expedientes?alerta=vencido&por_pagina=2")
+    assert r.status_code == 200
+    # vencidos: casos 1, 4, 6 y 10 -> el total cuenta todos, no sólo la página
+    cond, params = _sql_alerta("vencido", date.today())
+    total = expedientes.execute(f"SELECT COUNT(*) FROM expedientes WHERE {cond}", params).fetchone()[0]
+    assert total > 2
+    assert f"<strong>{total}</strong> expedientes encontrados" in r.text
+    assert f"página 1 de {(total + 1) // 2}" in r.text
+
+
+def test_editar_recalcula_vencimientos(cliente, expedientes):
+    conn = expedientes
+    exp_id = conn.execute("SELECT id FROM expedientes WHERE n_expediente = '9'").fetchone()[0]
+    r = cliente.post(f"/expediente/{exp_id}/editar", data={
+        "n_expediente": "9", "anio": "2030", "fecha_auto_apertura_ind": _d(-200), "estado_proceso": "ACTIVO",
+    }, follow_redirects=False)
+    assert r.status_code == 303
+    fila = conn.execute(
+        "SELECT fecha_vencimiento_ind, fecha_proximo_vencimiento FROM expedientes WHERE id = ?", (exp_id,)
+    ).fetchone()
+    assert fila[0] is not None and fila[0] == fila[1] < date.today().isoformat()